@@ -0,0 +1,114 @@
+"""
+Cross-Encoder Reranker for PLAZA-AI
+Budgeted second-stage reranking of FAISS search results
+"""
+
+import os
+import time
+import logging
+from typing import List, Dict, Optional, Any
+
+logger = logging.getLogger(__name__)
+
+try:
+    from sentence_transformers import CrossEncoder
+    CROSS_ENCODER_AVAILABLE = True
+except ImportError:
+    CROSS_ENCODER_AVAILABLE = False
+    logger.warning("⚠️ sentence-transformers not installed. Cross-encoder reranking disabled.")
+
+
+class CrossEncoderReranker:
+    """
+    Small CPU cross-encoder scoring (query, chunk) pairs in batches.
+
+    Scoring stops when the per-request time budget would be exceeded,
+    in which case the incoming (vector/boosted) order is kept.
+    """
+
+    def __init__(
+        self,
+        model_name: str = "cross-encoder/ms-marco-MiniLM-L-6-v2",
+        batch_size: int = 16,
+        time_budget_ms: float = 150.0,
+        max_passage_chars: int = 1200
+    ):
+        """
+        Initialize the reranker (model is loaded lazily).
+
+        Args:
+            model_name: Cross-encoder model name
+            batch_size: Pairs scored per forward pass
+            time_budget_ms: Per-request scoring budget
+            max_passage_chars: Chunk text is truncated to this length
+        """
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.time_budget_ms = time_budget_ms
+        self.max_passage_chars = max_passage_chars
+        self._model = None
+        self._load_failed = False
+
+    @property
+    def available(self) -> bool:
+        return CROSS_ENCODER_AVAILABLE and not self._load_failed
+
+    def _get_model(self):
+        if self._model is None and self.available:
+            try:
+                logger.info(f"📥 Loading cross-encoder: {self.model_name}")
+                self._model = CrossEncoder(self.model_name, device="cpu", max_length=512)
+            except Exception as e:
+                logger.error(f"❌ Failed to load cross-encoder: {e}")
+                self._load_failed = True
+        return self._model
+
+    def rerank(self, query: str, results: List[Dict[str, Any]], k: int) -> List[Dict[str, Any]]:
+        """
+        Reorder search results by cross-encoder score and keep the top k.
+
+        Args:
+            query: Search query
+            results: Search results (dicts with 'content') in ranked order
+            k: Number of results to keep
+
+        Returns:
+            Top k results; input order if the budget runs out
+        """
+        model = self._get_model()
+        if model is None or len(results) <= 1:
+            return results[:k]
+
+        budget_s = self.time_budget_ms / 1000.0
+        start = time.perf_counter()
+        pairs = [(query, r.get('content', '')[:self.max_passage_chars]) for r in results]
+        scores: List[float] = []
+
+        for offset in range(0, len(pairs), self.batch_size):
+            elapsed = time.perf_counter() - start
+            if offset and elapsed + elapsed / (offset / self.batch_size) > budget_s:
+                logger.info(f"⏱️ Rerank budget exceeded after {offset}/{len(pairs)} results, keeping order")
+                return results[:k]
+            batch = pairs[offset:offset + self.batch_size]
+            scores.extend(float(s) for s in model.predict(batch, show_progress_bar=False))
+
+        for result, score in zip(results, scores):
+            result['rerank_score'] = score
+        return sorted(results, key=lambda r: r['rerank_score'], reverse=True)[:k]
+
+
+# Global instance
+_reranker = None
+
+
+def get_reranker() -> Optional[CrossEncoderReranker]:
+    """Get global reranker instance (None when disabled or unavailable)"""
+    global _reranker
+    if os.getenv("RERANKER_ENABLED", "true").lower() != "true":
+        return None
+    if _reranker is None:
+        _reranker = CrossEncoderReranker(
+            model_name=os.getenv("RERANKER_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2"),
+            time_budget_ms=float(os.getenv("RERANK_BUDGET_MS", "150"))
+        )
+    return _reranker if _reranker.available else None
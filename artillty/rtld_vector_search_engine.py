@@ -10,6 +10,7 @@ import numpy as np
 from multi_modal_embedding_service import MultiModalEmbeddingService, get_embedding_service
 from faiss_vector_store import FAISSVectorStore, get_vector_store
 from document_processor import DocumentProcessor, get_document_processor
+from cross_encoder_reranker import get_reranker
 
 logger = logging.getLogger(__name__)
 
@@ -309,7 +310,8 @@ class RTLDVectorSearchEngine:
         rerank_top_k: int = 20
     ) -> List[Dict[str, Any]]:
         """
-        Search with simple reranking based on metadata relevance.
+        Search with metadata-boost reranking followed by a budgeted
+        cross-encoder pass when one is available.
 
         Args:
             query: Search query
@@ -350,6 +352,11 @@ class RTLDVectorSearchEngine:
         # Re-sort by boosted scores
         initial_results.sort(key=lambda x: x['score'], reverse=True)
 
+        # Cross-encoder pass over the boosted candidates (falls back to boosted order)
+        reranker = get_reranker()
+        if reranker:
+            return reranker.rerank(query, initial_results, k)
+
         return initial_results[:k]
 
     def get_document_chunks(self, doc_id: str) -> List[Dict[str, Any]]:
@@ -22,6 +22,7 @@ async def get_analytics_summary():
     - Feedback percentages
     - Confidence distribution
     - Top cited documents
+    - Response-time percentiles (last 30 days)
     """
     try:
         analytics_service = get_analytics_service()
@@ -61,7 +62,7 @@ async def get_feedback_stats():
         analytics_service = get_analytics_service()
         return {
             'percentages': analytics_service.get_feedback_percentage(),
-            'distribution': analytics_service.metrics['feedback']
+            'distribution': analytics_service.get_feedback_counts()
         }
     except Exception as e:
         logger.error(f"Error getting feedback stats: {e}")
@@ -101,3 +102,17 @@ async def get_top_citations(limit: int = 10):
         logger.error(f"Error getting top citations: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+
+
+@router.get("/response-times")
+async def get_response_times(days: int = 30):
+    """Get response-time percentiles for last N days, overall and per day."""
+    try:
+        analytics_service = get_analytics_service()
+        return {
+            'percentiles': analytics_service.get_response_time_percentiles(days),
+            'by_day': analytics_service.get_response_times_by_day(days)
+        }
+    except Exception as e:
+        logger.error(f"Error getting response times: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
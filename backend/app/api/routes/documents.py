@@ -4,6 +4,7 @@ from fastapi import APIRouter, HTTPException, Query
 from typing import List, Optional
 
 from app.services.document_service import get_document_service
+from app.rag.rag_service import get_rag_service
 
 logger = logging.getLogger(__name__)
 
@@ -15,19 +16,31 @@ async def list_documents(
     organization: Optional[str] = Query(None, description="Filter by organization"),
     subject: Optional[str] = Query(None, description="Filter by subject"),
     source_type: Optional[str] = Query(None, description="Filter by source type"),
-    tags: Optional[str] = Query(None, description="Comma-separated tags")
+    tags: Optional[str] = Query(None, description="Comma-separated tags"),
+    status: Optional[str] = Query(None, description="Filter by status"),
+    limit: int = Query(100, ge=1, le=1000, description="Page size"),
+    offset: int = Query(0, ge=0, description="Page offset")
 ):
-    """List documents with optional filters."""
+    """List documents with optional filters (paginated, most recently updated first)."""
     try:
         document_service = get_document_service()
         tag_list = tags.split(',') if tags else None
-        documents = document_service.list_documents(
+        filters = dict(
             organization=organization,
             subject=subject,
             source_type=source_type,
-            tags=tag_list
+            tags=tag_list,
+            status=status
         )
-        return {"documents": documents, "count": len(documents)}
+        documents = document_service.list_documents(**filters, limit=limit, offset=offset)
+        total = document_service.count_documents(**filters)
+        return {
+            "documents": documents,
+            "count": len(documents),
+            "total": total,
+            "limit": limit,
+            "offset": offset
+        }
     except Exception as e:
         logger.error(f"Error listing documents: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -51,12 +64,14 @@ async def get_document(doc_id: str):
 
 @router.delete("/{doc_id}")
 async def delete_document(doc_id: str):
-    """Delete document metadata."""
+    """Delete a document: its chunks, near-duplicate state and metadata."""
     try:
         document_service = get_document_service()
-        success = document_service.delete_document(doc_id)
-        if not success:
+        document = document_service.get_document(doc_id)
+        if not document:
             raise HTTPException(status_code=404, detail="Document not found")
+        get_rag_service().delete_document(doc_id, organization=document.get('organization'))
+        document_service.delete_document(doc_id)
         return {"status": "success", "message": f"Document {doc_id} deleted"}
     except HTTPException:
         raise
@@ -1,6 +1,7 @@
 """Endpoints for ingesting documents."""
 import logging
 from fastapi import APIRouter, UploadFile, File, HTTPException, Query
+from fastapi.responses import JSONResponse
 from pathlib import Path
 import tempfile
 import shutil
@@ -13,10 +14,17 @@ from app.models.schemas import (
     IngestImageResponse
 )
 from app.rag.rag_service import get_rag_service
+from app.rag.near_duplicates import get_near_duplicate_index
 from app.ocr.ocr_service import get_ocr_service
 from app.services.matter_service import get_matter_service
 from app.services.workflow_service import get_workflow_service, WorkflowEvent
 from app.services.document_service import get_document_service
+from app.services.ingestion_jobs import (
+    IngestionJob,
+    QueueFullError,
+    get_ingestion_queue,
+    wait_for_job
+)
 
 logger = logging.getLogger(__name__)
 
@@ -59,11 +67,52 @@ async def ingest_text(
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.post("/file", response_model=IngestFileResponse)
+def queue_ingestion_job(tenant: str, kind: str, fn, description: str = '') -> IngestionJob:
+    """Submit work to the ingestion queue, mapping a full queue to 429 + Retry-After."""
+    try:
+        return get_ingestion_queue().submit(tenant, kind, fn, description=description)
+    except QueueFullError as e:
+        raise HTTPException(
+            status_code=429,
+            detail=f"{e}. Retry in {e.retry_after}s.",
+            headers={"Retry-After": str(e.retry_after)}
+        )
+
+
+async def ingestion_job_response(job: IngestionJob, wait: Optional[bool], status_prefix: str = "/api/ingest/jobs"):
+    """
+    Return the job's result when waiting, otherwise a 202 job handle.
+    
+    Waiting requests block on the job (not on a request worker) up to
+    INGEST_WAIT_TIMEOUT, then fall back to the 202 handle.
+    """
+    from app.core.config import settings
+    if wait is None:
+        wait = not settings.INGEST_ASYNC_DEFAULT
+    
+    if wait and await wait_for_job(job, settings.INGEST_WAIT_TIMEOUT):
+        if job.status == 'failed':
+            if isinstance(job.exception, HTTPException):
+                raise job.exception
+            raise HTTPException(status_code=500, detail=job.error)
+        return job.result
+    
+    return JSONResponse(
+        status_code=202,
+        content={
+            "job_id": job.job_id,
+            "status": job.status,
+            "status_url": f"{status_prefix}/{job.job_id}"
+        }
+    )
+
+
+@router.post("/file", response_model=IngestFileResponse, responses={202: {"description": "Ingestion job queued"}})
 async def ingest_file(
     file: UploadFile = File(...),
     organization: Optional[str] = Query(None, description="Organization name"),
-    subject: Optional[str] = Query(None, description="Document subject")
+    subject: Optional[str] = Query(None, description="Document subject"),
+    wait: Optional[bool] = Query(None, description="Wait for the ingestion job to finish (default from INGEST_ASYNC_DEFAULT)")
 ):
     """
     Ingest a file (PDF, .txt, or .html) into the vector store.
@@ -72,80 +121,114 @@ async def ingest_file(
     - PDF files (extracted as text)
     - Text files (.txt)
     - HTML files (extracted as text)
+    
+    Processing runs on the ingestion worker pool. By default the response
+    is 202 with a job ID; poll /api/ingest/jobs/{job_id} (wait=true returns
+    the result, waiting up to INGEST_WAIT_TIMEOUT).
+    Returns 429 with Retry-After when the ingestion queue is full.
     """
+    from app.core.config import settings
+    
     if not file.filename:
         raise HTTPException(status_code=400, detail="Filename is required")
     
     file_ext = Path(file.filename).suffix.lower()
+    if settings.EMBEDDING_PROVIDER != "rtld" and file_ext not in ['.pdf', '.txt', '.html', '.htm']:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported file type: {file_ext}. Supported: .pdf, .txt, .html"
+        )
     
-    # Save uploaded file temporarily
+    # Save uploaded file temporarily (the job removes it when done)
     with tempfile.NamedTemporaryFile(delete=False, suffix=file_ext) as tmp_file:
         shutil.copyfileobj(file.file, tmp_file)
         tmp_path = tmp_file.name
     
+    filename = file.filename
+    try:
+        job = queue_ingestion_job(
+            organization or 'default', 'file',
+            lambda progress: _process_file(tmp_path, filename, file_ext, organization, subject, progress),
+            description=filename
+        )
+    except HTTPException:
+        Path(tmp_path).unlink(missing_ok=True)
+        raise
+    
+    return await ingestion_job_response(job, wait)
+
+
+def _process_file(
+    tmp_path: str,
+    filename: str,
+    file_ext: str,
+    organization: Optional[str],
+    subject: Optional[str],
+    progress
+) -> dict:
+    """Extract, chunk, embed, index and register an uploaded file (runs on the ingestion pool)."""
     try:
         # Check if RTLD is available and use it for multi-modal processing
         from app.core.config import settings
         if settings.EMBEDDING_PROVIDER == "rtld":
             # Use RTLD for direct file processing
+            progress(0.1, "processing")
             rag_service = get_rag_service()
             result = rag_service.ingest_file_rtld(
                 file_path=tmp_path,
-                source_name=file.filename,
+                source_name=filename,
                 content_type="document",  # RTLD will auto-detect
                 tags=[],
-                metadata={'original_filename': file.filename, 'organization': organization, 'subject': subject}
+                metadata={'original_filename': filename, 'organization': organization, 'subject': subject}
             )
         else:
             # Legacy processing: extract text first, then ingest
             # Extract text based on file type
+            progress(0.1, "extracting")
             if file_ext == '.pdf':
                 text = _extract_text_from_pdf(tmp_path)
             elif file_ext == '.txt':
                 with open(tmp_path, 'r', encoding='utf-8') as f:
                     text = f.read()
-            elif file_ext in ['.html', '.htm']:
-                text = _extract_text_from_html(tmp_path)
             else:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Unsupported file type: {file_ext}. Supported: .pdf, .txt, .html"
-                )
+                text = _extract_text_from_html(tmp_path)
 
             if not text.strip():
                 raise HTTPException(status_code=400, detail="File appears to be empty or unreadable")
 
             # Ingest the text
+            progress(0.4, "indexing")
             rag_service = get_rag_service()
             result = rag_service.ingest_text(
                 text=text,
-                source_name=file.filename,
+                source_name=filename,
                 source_type="pdf" if file_ext == '.pdf' else ("html" if file_ext in ['.html', '.htm'] else "text"),
                 tags=[],
-                metadata={'original_filename': file.filename},
+                metadata={'original_filename': filename},
                 organization=organization,
                 subject=subject
             )
 
         # Register document
+        progress(0.9, "registering")
         document_service = get_document_service()
         document_service.register_document(
             doc_id=result['doc_id'],
-            source_name=file.filename,
+            source_name=filename,
             source_type="pdf" if file_ext == '.pdf' else ("html" if file_ext in ['.html', '.htm'] else "text"),
             organization=organization,
             subject=subject,
             tags=[],
-            metadata={'original_filename': file.filename}
+            metadata={'original_filename': filename},
+            chunk_count=result.get('chunks', 0)
         )
-        document_service.update_document(result['doc_id'], chunk_count=result.get('chunks', 0))
         
         return IngestFileResponse(
             doc_id=result['doc_id'],
             chunks=result['chunks'],
             source_name=result['source_name'],
             file_type=file_ext
-        )
+        ).dict()
         
     except HTTPException:
         raise
@@ -157,14 +240,20 @@ async def ingest_file(
         Path(tmp_path).unlink(missing_ok=True)
 
 
-@router.post("/image", response_model=IngestImageResponse)
-async def ingest_image(file: UploadFile = File(...)):
+@router.post("/image", response_model=IngestImageResponse, responses={202: {"description": "Ingestion job queued"}})
+async def ingest_image(
+    file: UploadFile = File(...),
+    organization: Optional[str] = Query(None, description="Organization name"),
+    wait: Optional[bool] = Query(None, description="Wait for the ingestion job to finish (default from INGEST_ASYNC_DEFAULT)")
+):
     """
     Ingest an image (ticket, summons, etc.) using OCR.
     
     Supports:
     - JPG/JPEG
     - PNG
+    
+    Processing runs on the ingestion worker pool (see /file).
     """
     if not file.filename:
         raise HTTPException(status_code=400, detail="Filename is required")
@@ -177,27 +266,46 @@ async def ingest_image(file: UploadFile = File(...)):
             detail=f"Unsupported image type: {file_ext}. Supported: .jpg, .jpeg, .png"
         )
     
-    # Save uploaded file temporarily
+    # Save uploaded file temporarily (the job removes it when done)
     with tempfile.NamedTemporaryFile(delete=False, suffix=file_ext) as tmp_file:
         shutil.copyfileobj(file.file, tmp_file)
         tmp_path = tmp_file.name
     
+    filename = file.filename
+    try:
+        job = queue_ingestion_job(
+            organization or 'default', 'image',
+            lambda progress: _process_image(tmp_path, filename, organization, progress),
+            description=filename
+        )
+    except HTTPException:
+        Path(tmp_path).unlink(missing_ok=True)
+        raise
+    
+    return await ingestion_job_response(job, wait)
+
+
+def _process_image(tmp_path: str, filename: str, organization: Optional[str], progress) -> dict:
+    """OCR and ingest an uploaded image (runs on the ingestion pool)."""
     try:
+        text = ""
         # Check if RTLD is available for direct image processing
         from app.core.config import settings
         if settings.EMBEDDING_PROVIDER == "rtld":
             # Use RTLD for direct image processing
+            progress(0.1, "processing")
             rag_service = get_rag_service()
             result = rag_service.ingest_file_rtld(
                 file_path=tmp_path,
-                source_name=file.filename,
+                source_name=filename,
                 content_type="image",
                 tags=['image', 'ticket'],
-                metadata={'original_filename': file.filename, 'processed_by': 'rtld'}
+                metadata={'original_filename': filename, 'processed_by': 'rtld'}
             )
         else:
             # Legacy OCR processing
             # Extract text using OCR
+            progress(0.1, "ocr")
             ocr_service = get_ocr_service()
             text = ocr_service.extract_text_from_image(tmp_path)
 
@@ -208,13 +316,15 @@ async def ingest_image(file: UploadFile = File(...)):
                 )
 
             # Ingest the extracted text
+            progress(0.5, "indexing")
             rag_service = get_rag_service()
             result = rag_service.ingest_text(
                 text=text,
-                source_name=file.filename,
+                source_name=filename,
                 source_type="image_ticket",
                 tags=['ocr', 'ticket'],
-                metadata={'original_filename': file.filename, 'ocr_engine': ocr_service.engine}
+                metadata={'original_filename': filename, 'ocr_engine': ocr_service.engine},
+                organization=organization
             )
         
         return IngestImageResponse(
@@ -222,7 +332,7 @@ async def ingest_image(file: UploadFile = File(...)):
             chunks=result['chunks'],
             source_name=result['source_name'],
             extracted_text_preview=text[:200] + '...' if len(text) > 200 else text
-        )
+        ).dict()
         
     except HTTPException:
         raise
@@ -234,6 +344,34 @@ async def ingest_image(file: UploadFile = File(...)):
         Path(tmp_path).unlink(missing_ok=True)
 
 
+@router.get("/jobs/{job_id}")
+async def get_ingestion_job(job_id: str):
+    """Status and progress of an ingestion job."""
+    job = get_ingestion_queue().get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Ingestion job not found")
+    return job.to_dict()
+
+
+@router.get("/jobs")
+async def list_ingestion_jobs(
+    tenant: Optional[str] = Query(None, description="Filter by organization/user"),
+    limit: int = Query(50, ge=1, le=500)
+):
+    """Recent ingestion jobs and current queue depth."""
+    queue = get_ingestion_queue()
+    return {"jobs": queue.list_jobs(tenant=tenant, limit=limit), "queue": queue.stats()}
+
+
+@router.get("/dedup/stats")
+async def near_duplicate_stats(namespace: Optional[str] = Query(None, description="rag, artillery or rtld")):
+    """Chunks registered in the near-duplicate index and duplicates linked to them."""
+    dedup_index = get_near_duplicate_index()
+    if dedup_index is None:
+        return {"enabled": False}
+    return {"enabled": True, **dedup_index.stats(namespace)}
+
+
 def _extract_text_from_pdf(pdf_path: str) -> str:
     """
     Extract text from PDF file with multiple fallback methods.
@@ -109,16 +109,20 @@ async def list_matters(
     user_id: Optional[str] = Query(None, description="Filter by user ID"),
     session_id: Optional[str] = Query(None, description="Filter by session ID"),
     matter_type: Optional[MatterType] = Query(None, description="Filter by matter type"),
-    status: Optional[MatterStatus] = Query(None, description="Filter by status")
+    status: Optional[MatterStatus] = Query(None, description="Filter by status"),
+    limit: int = Query(100, ge=1, le=1000, description="Page size"),
+    offset: int = Query(0, ge=0, description="Page offset")
 ):
-    """List matters with optional filters."""
+    """List matters with optional filters (paginated, most recently updated first)."""
     try:
         matter_service = get_matter_service()
         matters = matter_service.list_matters(
             user_id=user_id,
             session_id=session_id,
             matter_type=matter_type,
-            status=status
+            status=status,
+            limit=limit,
+            offset=offset
         )
         
         return [
@@ -188,10 +192,11 @@ async def get_playbook(
     language: str = Query("en", description="Language code (en, fr, hi, pa, es, ta, zh)")
 ):
     """
-    Generate playbook options for a matter.
+    Get playbook options for a matter.
     
     Returns structured options (A1: conservative, A2: aggressive, A3: lawyer consultation).
-    Supports multiple languages.
+    Supports multiple languages. Served from the playbook cache; `stale` is true
+    while a playbook for the matter's updated details is being generated.
     """
     try:
         matter_service = get_matter_service()
@@ -201,7 +206,7 @@ async def get_playbook(
         if not matter:
             raise HTTPException(status_code=404, detail="Matter not found")
         
-        playbook = playbook_service.generate_playbook(matter, language=language)
+        playbook = await playbook_service.get_playbook(matter, language=language)
         return playbook
         
     except HTTPException:
@@ -8,6 +8,8 @@ import logging
 from typing import Optional, Dict, List, Any
 from datetime import datetime
 
+from app.services.bigquery_writer import get_bigquery_writer, utc_now
+
 logger = logging.getLogger(__name__)
 
 try:
@@ -410,9 +412,29 @@ class BigQueryIdentityClient:
         if not self.client:
             return False
         
+        event_id = str(uuid.uuid4())
+        try:
+            writer = get_bigquery_writer(self.client, self.project_id, self.dataset_id)
+        except Exception as e:
+            logger.warning(f"BigQuery writer unavailable, logging synchronously: {e}")
+            writer = None
+        if writer:
+            # Audit rows are append-only; batch them instead of one INSERT per login
+            writer.append('login_events', {
+                'event_id': event_id,
+                'user_id': user_id,
+                'auth_provider': auth_provider,
+                'event_type': event_type,
+                'ip_address': ip_address,
+                'user_agent': user_agent,
+                'success': success,
+                'failure_reason': failure_reason,
+                'timestamp': utc_now(),
+                'env': self.env,
+            })
+            return True
+        
         try:
-            event_id = str(uuid.uuid4())
-            
             query = f"""
             INSERT INTO `{self.project_id}.{self.dataset_id}.login_events`
             (event_id, user_id, auth_provider, event_type, ip_address, user_agent,
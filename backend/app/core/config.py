@@ -53,6 +53,13 @@ class Settings(BaseSettings):
     EMBEDDING_PROVIDER: str = "openai"  # Changed to OpenAI since sentence_transformers not working
     SENTENCE_TRANSFORMER_MODEL: str = "all-MiniLM-L6-v2"  # Popular models: all-MiniLM-L6-v2 (384 dim), all-mpnet-base-v2 (768 dim), sentence-transformers/all-MiniLM-L12-v2 (384 dim)
     # Note: Sentence Transformers runs locally, no API costs, works offline
+    SENTENCE_TRANSFORMER_BACKEND: str = "torch"  # "torch" (full precision) or "onnx_int8" (quantized ONNX Runtime)
+    ONNX_MODEL_DIR: str = "./data/models/onnx"  # Exported/quantized models are cached here
+    ONNX_MIN_COSINE: float = 0.98  # Quantized model must agree with the torch model this closely on the probe set
+    ONNX_VALIDATE: bool = True  # Measure agreement against the torch model when the quantized model loads
+    EMBED_MICRO_BATCHING: bool = True  # Merge concurrent local embedding calls into one forward pass
+    EMBED_BATCH_MAX: int = 64  # Max texts per merged forward pass
+    EMBED_BATCH_WAIT_MS: float = 5.0  # How long the first request waits for others to join
     
     # Azure AI Search Configuration - DISABLED (Using FAISS local storage)
     # Set to False to ensure Azure is never used
@@ -78,6 +85,12 @@ class Settings(BaseSettings):
     # FAISS is the vector database used for similarity search
     FAISS_INDEX_PATH: str = "./data/faiss/index.faiss"
     FAISS_METADATA_PATH: str = "./data/faiss/metadata.jsonl"
+    # Jurisdiction-sharded FAISS: one index per jurisdiction (and law type), loaded lazily and
+    # searched only when a query's scope includes it. Split an existing index with scripts/reshard_vector_store.py
+    FAISS_SHARDED: bool = False
+    FAISS_SHARD_DIR: str = "./data/faiss_shards"
+    FAISS_SHARD_BY_LAW_TYPE: bool = True
+    FAISS_SHARD_SEARCH_WORKERS: int = 4  # Threads for queries that fan out to several shards
     # Note: FAISS is local file-based storage, no cloud services required
     
     # Pinecone Configuration (Cloud vector database - FREE tier available)
@@ -120,6 +133,47 @@ class Settings(BaseSettings):
     CHILD_CHUNK_SIZE: int = 500
     CHILD_CHUNK_OVERLAP: int = 50
     USE_PARENT_CHILD: bool = True
+    PARENT_CACHE_SIZE: int = 2048  # Parent chunks kept in-process by RAGService
+    # Cross-encoder reranking (top-N vector candidates -> top-K for generation)
+    RERANKER_ENABLED: bool = True
+    RERANKER_MODEL: str = "cross-encoder/ms-marco-MiniLM-L-6-v2"  # Small CPU cross-encoder (~22M params)
+    RERANK_CANDIDATES: int = 20  # Vector candidates passed to the cross-encoder
+    RERANK_TOP_K: int = 5  # Chunks kept for the prompt after reranking
+    RERANK_BATCH_SIZE: int = 16
+    RERANK_BUDGET_MS: float = 150.0  # Fall back to vector order past this budget
+    # Near-duplicate chunk suppression at ingest (MinHash + LSH)
+    NEAR_DUP_ENABLED: bool = True
+    NEAR_DUP_THRESHOLD: float = 0.9  # Estimated Jaccard similarity treated as a duplicate
+    NEAR_DUP_ACTION: str = "link"  # "drop" or "link" (record duplicate -> canonical chunk)
+    NEAR_DUP_NUM_PERM: int = 128
+    NEAR_DUP_INDEX_PATH: str = "./data/dedup/near_duplicates.db"
+    # Compressed FAISS storage: "flat" (float32), "sq8" (int8, 4x smaller) or "pq" (product quantization);
+    # full vectors stay on disk for exact re-scoring. Migrate existing indexes with scripts/migrate_vector_compression.py
+    VECTOR_COMPRESSION: str = "flat"
+    VECTOR_RESCORE_FACTOR: int = 4  # Compressed candidates re-scored per requested result
+    # Versioned vector-store snapshots: stores map the latest snapshot at startup (synced by delta from
+    # VECTOR_SNAPSHOT_REMOTE, a gs://bucket/prefix or directory). Publish with scripts/publish_vector_snapshot.py
+    VECTOR_SNAPSHOTS: bool = False
+    VECTOR_SNAPSHOT_DIR: str = "./data/snapshots"  # Local snapshot cache
+    VECTOR_SNAPSHOT_REMOTE: Optional[str] = None
+    VECTOR_SNAPSHOT_BLOCK_MB: int = 8  # Delta granularity
+    VECTOR_SNAPSHOT_KEEP: int = 2  # Local versions kept
+    VECTOR_SNAPSHOT_WARMUP: bool = True  # Load the stores at startup; /ready reports when they are loaded
+    # Usage analytics: fixed-size daily sketches per worker, flushed to a local time series and merged on read
+    ANALYTICS_DB_PATH: str = "./data/analytics/analytics.db"
+    ANALYTICS_FLUSH_SECONDS: float = 30.0
+    ANALYTICS_HLL_PRECISION: int = 12  # 4 KB per day, ~1.6% unique-user error
+    ANALYTICS_TOP_K: int = 100  # Citations tracked as heavy hitters per day
+    # Request tracing: per-stage latency histograms on /metrics (Prometheus text format)
+    TRACING_ENABLED: bool = True
+    TRACE_SLOW_MS: float = 2000.0  # Requests at least this slow are exported with their spans
+    TRACE_EXPORT_PATH: Optional[str] = None  # JSONL file for slow traces, e.g. ./data/traces/slow.jsonl
+    # Identical concurrent LLM completions, embeddings and searches share one in-flight upstream call
+    SINGLE_FLIGHT_ENABLED: bool = True
+    # Prompt context assembly: retrieved chunks, citations and history are fitted to a token budget
+    PROMPT_CONTEXT_TOKENS: int = 3000
+    PROMPT_PASSAGE_MAX_TOKENS: int = 350  # Longer passages are reduced to their query-relevant sentences
+    PROMPT_DEDUP_THRESHOLD: float = 0.8  # Shingle containment treated as a duplicate passage
     
     # System Prompts
     LEGAL_ASSISTANT_SYSTEM_PROMPT: str = """You are a careful, professional LEGAL INFORMATION ASSISTANT built for traffic tickets, summons, and minor regulatory offences.
@@ -267,6 +321,42 @@ Extract the most important 4 words that capture the essence of the text."""
     
     # Batch processing
     BATCH_SIZE: int = 100
+    UPLOAD_CONCURRENCY: int = 4  # Index upload batches in flight at once
+
+    # Background ingestion jobs
+    INGEST_WORKERS: int = 2  # Dedicated ingestion threads (separate from request workers)
+    INGEST_QUEUE_MAX: int = 50  # Queued jobs across all tenants before returning 429
+    INGEST_MAX_JOBS_PER_TENANT: int = 10  # Queued jobs per organization/user before 429
+    INGEST_JOB_RETENTION: int = 1000  # Finished jobs kept for status lookups
+    INGEST_ASYNC_DEFAULT: bool = True  # Upload endpoints return a job ID instead of waiting (wait=true to block)
+    INGEST_WAIT_TIMEOUT: float = 300.0  # Max seconds a waiting upload request blocks
+
+    # Playbook cache (keyed by a fingerprint of the matter fields the playbook uses)
+    PLAYBOOK_CACHE_ENABLED: bool = True
+    PLAYBOOK_WORKERS: int = 2  # Background playbook generation threads
+    PLAYBOOK_WAIT_TIMEOUT: float = 120.0  # Max seconds a first view waits for generation
+
+    # Document generation: static clauses are rendered from templates; only
+    # free-text sections are drafted by the LLM when this is enabled. Off by
+    # default: drafting adds LLM round trips and rewords what the user typed
+    DOCUMENT_LLM_DRAFTING: bool = False
+
+    # Rolling conversation summaries
+    SUMMARY_CHUNK_TOKENS: int = 3000  # Largest conversation slice per summary prompt
+    SUMMARY_NOTES_MAX_TOKENS: int = 600  # Notes per slice when a backlog is condensed
+
+    # Large-object transfers (GCS / Azure Blob): parallel chunks, resumable
+    TRANSFER_CHUNK_MB: int = 16  # Part size for uploads and ranged downloads
+    TRANSFER_WORKERS: int = 8  # Parts in flight per transfer
+    TRANSFER_MULTIPART_THRESHOLD_MB: int = 32  # Smaller files go in one request
+    TRANSFER_STATE_DIR: str = "./data/transfers"  # Resume journals
+
+    # Conversation / message / login-event writes to BigQuery: spooled locally, flushed in batches
+    BIGQUERY_WRITE_BEHIND: bool = True  # False writes each change with its own DML statement
+    BIGQUERY_SPOOL_DIR: str = "./data/bigquery_spool"
+    BIGQUERY_FLUSH_SECONDS: float = 2.0
+    BIGQUERY_BATCH_ROWS: int = 500  # Buffered changes that trigger an early flush
+    BIGQUERY_APPEND_MODE: str = "stream"  # "stream" (streaming inserts) or "load" (load jobs, no streaming quota)
     EMBEDDING_DELAY: float = 0.1  # Delay between embedding requests (seconds)
     
     # Server Configuration
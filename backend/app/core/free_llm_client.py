@@ -6,6 +6,7 @@ import logging
 from typing import List, Optional, Dict, Any
 import httpx
 import os
+from app.core.tracing import traced
 
 logger = logging.getLogger(__name__)
 
@@ -234,6 +235,7 @@ def chat_completion_huggingface(
         raise
 
 
+@traced("llm.free")
 def chat_completion_free(
     messages: List[dict],
     provider: str = "ollama",  # "ollama", "gemini", "huggingface"
@@ -0,0 +1,546 @@
+"""Parallel, resumable large-object transfers.
+
+Files are moved in fixed-size chunks on a thread pool instead of as one
+stream, read from / written to disk one chunk at a time so memory stays at
+about workers x chunk size:
+
+- upload: each chunk is sent as a part (a temporary object composed into
+  the target on GCS, a staged block on Azure Blob), then the parts are
+  committed as one object
+- download: ranged reads written at their offset in a partial file,
+  renamed into place once complete
+
+Progress is journaled under TRANSFER_STATE_DIR, so a transfer interrupted
+by a network error resumes with the parts it still needs. Every chunk's
+SHA-256 is recorded; uploads store the chunk size and a digest over the
+chunk digests as object metadata, and downloads verify both before the
+file is moved into place.
+
+Backends implement ObjectStore; LocalObjectStore keeps objects in a
+directory and serves as the fake store for tests and local development.
+"""
+import os
+import json
+import time
+import uuid
+import base64
+import shutil
+import hashlib
+import logging
+import threading
+from dataclasses import dataclass, field
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+try:
+    from app.core.config import settings
+except Exception:  # settings unavailable (e.g. missing env); use defaults
+    settings = None
+
+try:
+    from google.cloud import storage as gcs_storage
+    GCS_AVAILABLE = True
+except ImportError:
+    GCS_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+META_CHUNK_SIZE = "transfer-chunk-size"
+META_DIGEST = "transfer-sha256-parts"
+GCS_COMPOSE_LIMIT = 32
+
+
+def _setting(name: str, default):
+    return getattr(settings, name, default) if settings is not None else default
+
+
+class TransferError(Exception):
+    """A transfer failed or its data did not verify; the journal is kept for a resume."""
+
+
+@dataclass
+class ObjectInfo:
+    """Size, version tag and user metadata of a stored object."""
+    size: int
+    etag: str
+    metadata: Dict[str, str] = field(default_factory=dict)
+
+
+@dataclass
+class TransferResult:
+    """Outcome of one upload or download."""
+    key: str
+    size: int
+    parts: int
+    transferred: int  # Bytes moved over the network in this run
+    resumed_parts: int
+    seconds: float
+    digest: str
+
+
+class ObjectStore:
+    """Operations a backend provides for chunked transfers."""
+
+    def stat(self, key: str) -> Optional[ObjectInfo]:
+        raise NotImplementedError
+
+    def read_range(self, key: str, start: int, length: int) -> bytes:
+        raise NotImplementedError
+
+    def put(self, key: str, data: bytes, metadata: Dict[str, str]):
+        raise NotImplementedError
+
+    def put_part(self, key: str, session: str, index: int, data: bytes):
+        raise NotImplementedError
+
+    def has_part(self, key: str, session: str, index: int, size: int) -> bool:
+        raise NotImplementedError
+
+    def complete(self, key: str, session: str, count: int, metadata: Dict[str, str]):
+        """Assemble parts 0..count-1 into the object."""
+        raise NotImplementedError
+
+    def abort(self, key: str, session: str, count: int):
+        """Drop the parts of an abandoned session (best effort)."""
+
+
+class LocalObjectStore(ObjectStore):
+    """Object store in a local directory (fake store for tests and development)."""
+
+    def __init__(self, root: str):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key: str) -> Path:
+        return self.root / key
+
+    def _part_path(self, key: str, session: str, index: int) -> Path:
+        return self.root / ".parts" / hashlib.sha1(key.encode('utf-8')).hexdigest() / session / f"{index:06d}"
+
+    def stat(self, key: str) -> Optional[ObjectInfo]:
+        path = self._path(key)
+        if not path.is_file():
+            return None
+        meta_path = path.with_name(path.name + ".meta.json")
+        metadata = json.loads(meta_path.read_text(encoding='utf-8')) if meta_path.exists() else {}
+        st = path.stat()
+        return ObjectInfo(st.st_size, f"{st.st_mtime_ns}-{st.st_size}", metadata)
+
+    def read_range(self, key: str, start: int, length: int) -> bytes:
+        with open(self._path(key), 'rb') as f:
+            f.seek(start)
+            return f.read(length)
+
+    def _write_metadata(self, path: Path, metadata: Dict[str, str]):
+        meta_path = path.with_name(path.name + ".meta.json")
+        if metadata:
+            meta_path.write_text(json.dumps(metadata), encoding='utf-8')
+        elif meta_path.exists():
+            meta_path.unlink()
+
+    def put(self, key: str, data: bytes, metadata: Dict[str, str]):
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + f".{uuid.uuid4().hex}.tmp")
+        tmp.write_bytes(data)
+        self._write_metadata(path, metadata)
+        os.replace(tmp, path)
+
+    def put_part(self, key: str, session: str, index: int, data: bytes):
+        path = self._part_path(key, session, index)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+
+    def has_part(self, key: str, session: str, index: int, size: int) -> bool:
+        path = self._part_path(key, session, index)
+        return path.is_file() and path.stat().st_size == size
+
+    def complete(self, key: str, session: str, count: int, metadata: Dict[str, str]):
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + f".{uuid.uuid4().hex}.tmp")
+        with open(tmp, 'wb') as out:
+            for index in range(count):
+                with open(self._part_path(key, session, index), 'rb') as part:
+                    shutil.copyfileobj(part, out)
+        self._write_metadata(path, metadata)
+        os.replace(tmp, path)
+        self.abort(key, session, count)
+
+    def abort(self, key: str, session: str, count: int):
+        shutil.rmtree(self._part_path(key, session, 0).parent, ignore_errors=True)
+
+
+class GCSObjectStore(ObjectStore):
+    """GCS bucket; parts are temporary objects joined with compose."""
+
+    def __init__(self, bucket, part_prefix: str = ".transfer-parts"):
+        """
+        Args:
+            bucket: google.cloud.storage Bucket, or a bucket name
+            part_prefix: Prefix of the temporary part objects
+        """
+        if isinstance(bucket, str):
+            if not GCS_AVAILABLE:
+                raise ImportError("google-cloud-storage is required for GCS transfers")
+            bucket = gcs_storage.Client().bucket(bucket)
+        self.bucket = bucket
+        self.part_prefix = part_prefix
+
+    def _part_name(self, key: str, session: str, index) -> str:
+        return f"{self.part_prefix}/{hashlib.sha1(key.encode('utf-8')).hexdigest()}/{session}/{index}"
+
+    def stat(self, key: str) -> Optional[ObjectInfo]:
+        blob = self.bucket.get_blob(key)
+        if blob is None:
+            return None
+        return ObjectInfo(blob.size or 0, str(blob.generation or blob.etag), dict(blob.metadata or {}))
+
+    def read_range(self, key: str, start: int, length: int) -> bytes:
+        # end is inclusive
+        return self.bucket.blob(key).download_as_bytes(start=start, end=start + length - 1, checksum=None)
+
+    def put(self, key: str, data: bytes, metadata: Dict[str, str]):
+        blob = self.bucket.blob(key)
+        blob.metadata = metadata or None
+        blob.upload_from_string(data)
+
+    def put_part(self, key: str, session: str, index: int, data: bytes):
+        self.bucket.blob(self._part_name(key, session, f"{index:06d}")).upload_from_string(data)
+
+    def has_part(self, key: str, session: str, index: int, size: int) -> bool:
+        blob = self.bucket.get_blob(self._part_name(key, session, f"{index:06d}"))
+        return blob is not None and blob.size == size
+
+    def complete(self, key: str, session: str, count: int, metadata: Dict[str, str]):
+        sources = [self.bucket.blob(self._part_name(key, session, f"{i:06d}")) for i in range(count)]
+        intermediates = []
+        level = 0
+        # Compose accepts at most 32 sources: join larger sets in rounds
+        while len(sources) > GCS_COMPOSE_LIMIT:
+            grouped = []
+            for start in range(0, len(sources), GCS_COMPOSE_LIMIT):
+                target = self.bucket.blob(self._part_name(key, session, f"c{level}-{start:06d}"))
+                target.compose(sources[start:start + GCS_COMPOSE_LIMIT])
+                grouped.append(target)
+            intermediates.extend(grouped)
+            sources = grouped
+            level += 1
+        destination = self.bucket.blob(key)
+        destination.metadata = metadata or None
+        destination.compose(sources)
+        self._delete([self._part_name(key, session, f"{i:06d}") for i in range(count)] +
+                     [blob.name for blob in intermediates])
+
+    def abort(self, key: str, session: str, count: int):
+        prefix = self._part_name(key, session, "")
+        self._delete([blob.name for blob in self.bucket.list_blobs(prefix=prefix)])
+
+    def _delete(self, names: List[str]):
+        for name in names:
+            try:
+                self.bucket.blob(name).delete()
+            except Exception as e:
+                logger.debug(f"Could not delete transfer part {name}: {e}")
+
+
+class AzureBlobObjectStore(ObjectStore):
+    """Azure Blob container; parts are staged blocks committed as a block list."""
+
+    def __init__(self, container_client):
+        """
+        Args:
+            container_client: azure.storage.blob ContainerClient
+        """
+        self.container = container_client
+        self._uncommitted: Dict[str, Dict[str, int]] = {}
+
+    @staticmethod
+    def _block_id(session: str, index: int) -> str:
+        return base64.b64encode(f"{session}-{index:06d}".encode('ascii')).decode('ascii')
+
+    def stat(self, key: str) -> Optional[ObjectInfo]:
+        blob = self.container.get_blob_client(key)
+        try:
+            props = blob.get_blob_properties()
+        except Exception as e:
+            if type(e).__name__ == "ResourceNotFoundError":
+                return None
+            raise
+        return ObjectInfo(props.size, str(props.etag), dict(props.metadata or {}))
+
+    def read_range(self, key: str, start: int, length: int) -> bytes:
+        return self.container.get_blob_client(key).download_blob(offset=start, length=length).readall()
+
+    def put(self, key: str, data: bytes, metadata: Dict[str, str]):
+        self.container.get_blob_client(key).upload_blob(data, overwrite=True, metadata=metadata or None)
+
+    def put_part(self, key: str, session: str, index: int, data: bytes):
+        self.container.get_blob_client(key).stage_block(self._block_id(session, index), data)
+
+    def has_part(self, key: str, session: str, index: int, size: int) -> bool:
+        # Uncommitted blocks live on the blob for about a week
+        blocks = self._uncommitted.get(key)
+        if blocks is None:
+            try:
+                _, uncommitted = self.container.get_blob_client(key).get_block_list('uncommitted')
+                blocks = {block.id: block.size for block in uncommitted}
+            except Exception:
+                blocks = {}
+            self._uncommitted[key] = blocks
+        return blocks.get(self._block_id(session, index)) == size
+
+    def complete(self, key: str, session: str, count: int, metadata: Dict[str, str]):
+        from azure.storage.blob import BlobBlock
+        self.container.get_blob_client(key).commit_block_list(
+            [BlobBlock(block_id=self._block_id(session, i)) for i in range(count)],
+            metadata=metadata or None
+        )
+        self._uncommitted.pop(key, None)
+
+
+class TransferManager:
+    """Parallel chunked uploads and downloads against one ObjectStore."""
+
+    def __init__(
+        self,
+        store: ObjectStore,
+        chunk_size: Optional[int] = None,
+        workers: Optional[int] = None,
+        threshold: Optional[int] = None,
+        state_dir: Optional[str] = None,
+        retries: int = 3
+    ):
+        """
+        Args:
+            store: Backend holding the objects
+            chunk_size: Bytes per part / ranged read (TRANSFER_CHUNK_MB)
+            workers: Parts in flight at once (TRANSFER_WORKERS)
+            threshold: Smaller files are sent in one request (TRANSFER_MULTIPART_THRESHOLD_MB)
+            state_dir: Where resume journals are kept (TRANSFER_STATE_DIR)
+            retries: Attempts per part before the transfer fails
+        """
+        self.store = store
+        self.chunk_size = chunk_size or int(_setting("TRANSFER_CHUNK_MB", 16)) << 20
+        self.workers = workers or int(_setting("TRANSFER_WORKERS", 8))
+        self.threshold = threshold if threshold is not None else int(_setting("TRANSFER_MULTIPART_THRESHOLD_MB", 32)) << 20
+        self.state_dir = Path(state_dir or _setting("TRANSFER_STATE_DIR", "./data/transfers"))
+        self.retries = max(1, retries)
+
+    # ----- journals -----
+
+    def _journal_path(self, direction: str, key: str, path: str) -> Path:
+        name = hashlib.sha1(f"{direction}\0{key}\0{os.path.abspath(path)}".encode('utf-8')).hexdigest()
+        return self.state_dir / f"{direction}-{name}.json"
+
+    @staticmethod
+    def _read_journal(path: Path) -> Optional[Dict]:
+        try:
+            return json.loads(path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _write_journal(path: Path, journal: Dict):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.write_text(json.dumps(journal), encoding='utf-8')
+        os.replace(tmp, path)
+
+    # ----- helpers -----
+
+    def _retry(self, fn: Callable, description: str):
+        for attempt in range(1, self.retries + 1):
+            try:
+                return fn()
+            except Exception as e:
+                if attempt == self.retries:
+                    raise TransferError(f"{description} failed after {attempt} attempts: {e}") from e
+                delay = min(8.0, 0.5 * 2 ** (attempt - 1))
+                logger.warning(f"{description} failed ({e}); retrying in {delay:.1f}s")
+                time.sleep(delay)
+
+    @staticmethod
+    def _composite(digests: List[str]) -> str:
+        return hashlib.sha256("".join(digests).encode('ascii')).hexdigest()
+
+    def _run_parts(self, indexes: List[int], work: Callable[[int], None]):
+        if not indexes:
+            return
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(indexes)), thread_name_prefix="transfer") as pool:
+            futures = [pool.submit(work, index) for index in indexes]
+            try:
+                for future in as_completed(futures):
+                    future.result()
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
+
+    # ----- upload -----
+
+    def upload_file(self, path: str, key: str, metadata: Optional[Dict[str, str]] = None) -> TransferResult:
+        """
+        Upload a local file, resuming an interrupted upload of the same file.
+
+        Args:
+            path: Local file
+            key: Object name in the store
+            metadata: Extra object metadata
+
+        Returns:
+            TransferResult for this run
+        """
+        started = time.perf_counter()
+        st = os.stat(path)
+        size = st.st_size
+        chunk = self.chunk_size
+        metadata = dict(metadata or {})
+
+        if size <= self.threshold:
+            with open(path, 'rb') as f:
+                data = f.read()
+            digest = self._composite([hashlib.sha256(data).hexdigest()])
+            metadata.update({META_CHUNK_SIZE: str(max(size, 1)), META_DIGEST: digest})
+            self._retry(lambda: self.store.put(key, data, metadata), f"Upload of {key}")
+            return TransferResult(key, size, 1, size, 0, time.perf_counter() - started, digest)
+
+        count = (size + chunk - 1) // chunk
+        journal_path = self._journal_path("upload", key, path)
+        journal = self._read_journal(journal_path)
+        fingerprint = {'size': size, 'mtime_ns': st.st_mtime_ns, 'chunk_size': chunk}
+        if not journal or journal.get('file') != fingerprint:
+            if journal:
+                self.store.abort(key, journal['session'], journal.get('count', 0))
+            journal = {'key': key, 'session': uuid.uuid4().hex, 'file': fingerprint, 'count': count, 'parts': {}}
+            self._write_journal(journal_path, journal)
+        session = journal['session']
+        parts: Dict[str, str] = journal['parts']
+
+        # Parts the journal records but the store lost (expired, cleaned up) are sent again
+        resumed = [int(i) for i in parts
+                   if self.store.has_part(key, session, int(i), min(chunk, size - int(i) * chunk))]
+        for i in list(parts):
+            if int(i) not in resumed:
+                del parts[i]
+        pending = [i for i in range(count) if str(i) not in parts]
+        lock = threading.Lock()
+        sent = [0]
+
+        def upload_part(index: int):
+            with open(path, 'rb') as f:
+                f.seek(index * chunk)
+                data = f.read(chunk)
+            digest = hashlib.sha256(data).hexdigest()
+            self._retry(lambda: self.store.put_part(key, session, index, data), f"Part {index + 1}/{count} of {key}")
+            with lock:
+                parts[str(index)] = digest
+                sent[0] += len(data)
+                self._write_journal(journal_path, journal)
+
+        if resumed:
+            logger.info(f"Resuming upload of {key}: {len(resumed)}/{count} parts already stored")
+        self._run_parts(pending, upload_part)
+
+        digest = self._composite([parts[str(i)] for i in range(count)])
+        metadata.update({META_CHUNK_SIZE: str(chunk), META_DIGEST: digest})
+        self._retry(lambda: self.store.complete(key, session, count, metadata), f"Completing {key}")
+        journal_path.unlink(missing_ok=True)
+
+        elapsed = time.perf_counter() - started
+        logger.info(f"Uploaded {key}: {size / 1e6:.1f} MB in {count} parts, {elapsed:.1f}s")
+        return TransferResult(key, size, count, sent[0], len(resumed), elapsed, digest)
+
+    # ----- download -----
+
+    def download_file(self, key: str, path: str) -> TransferResult:
+        """
+        Download an object to a local file, resuming an interrupted download.
+
+        The data is written to <path>.partial and moved to path only once
+        every chunk (and the object digest, when recorded) verifies.
+
+        Returns:
+            TransferResult for this run
+
+        Raises:
+            FileNotFoundError: The object does not exist
+        """
+        started = time.perf_counter()
+        info = self.store.stat(key)
+        if info is None:
+            raise FileNotFoundError(f"Object {key} not found")
+        size = info.size
+        expected_digest = info.metadata.get(META_DIGEST)
+        # Read in the upload's chunks so each one can be checked against its digest
+        chunk = int(info.metadata.get(META_CHUNK_SIZE) or self.chunk_size) if expected_digest else self.chunk_size
+        count = max(1, (size + chunk - 1) // chunk)
+
+        partial = f"{path}.partial"
+        journal_path = self._journal_path("download", key, path)
+        journal = self._read_journal(journal_path)
+        source = {'etag': info.etag, 'size': size, 'chunk_size': chunk}
+        if not journal or journal.get('source') != source or not os.path.exists(partial):
+            journal = {'key': key, 'source': source, 'parts': {}}
+        parts: Dict[str, str] = journal['parts']
+
+        Path(partial).parent.mkdir(parents=True, exist_ok=True)
+        mode = 'r+b' if os.path.exists(partial) and parts else 'wb'
+        with open(partial, mode) as f:
+            f.truncate(size)
+            # Re-check chunks written before the interruption
+            for i in list(parts):
+                index = int(i)
+                f.seek(index * chunk)
+                if hashlib.sha256(f.read(min(chunk, size - index * chunk))).hexdigest() != parts[i]:
+                    del parts[i]
+        resumed = len(parts)
+        self._write_journal(journal_path, journal)
+
+        lock = threading.Lock()
+        received = [0]
+
+        def download_part(index: int):
+            length = min(chunk, size - index * chunk)
+            data = self._retry(
+                lambda: self.store.read_range(key, index * chunk, length),
+                f"Chunk {index + 1}/{count} of {key}"
+            )
+            if len(data) != length:
+                raise TransferError(f"Short read for chunk {index + 1}/{count} of {key}")
+            with open(partial, 'r+b') as f:
+                f.seek(index * chunk)
+                f.write(data)
+            with lock:
+                parts[str(index)] = hashlib.sha256(data).hexdigest()
+                received[0] += length
+                self._write_journal(journal_path, journal)
+
+        if resumed:
+            logger.info(f"Resuming download of {key}: {resumed}/{count} chunks already on disk")
+        if size:
+            self._run_parts([i for i in range(count) if str(i) not in parts], download_part)
+
+        digest = self._composite([parts[str(i)] for i in range(count)]) if size else self._composite(
+            [hashlib.sha256(b"").hexdigest()])
+        if expected_digest and digest != expected_digest:
+            os.remove(partial)
+            journal_path.unlink(missing_ok=True)
+            raise TransferError(f"Checksum mismatch downloading {key}")
+        os.replace(partial, path)
+        journal_path.unlink(missing_ok=True)
+
+        elapsed = time.perf_counter() - started
+        logger.info(f"Downloaded {key}: {size / 1e6:.1f} MB in {count} chunks, {elapsed:.1f}s")
+        return TransferResult(key, size, count, received[0], resumed, elapsed, digest)
+
+    def exists(self, key: str) -> bool:
+        return self.store.stat(key) is not None
+
+
+def gcs_transfer_manager(bucket, **kwargs) -> TransferManager:
+    """TransferManager for a GCS bucket (Bucket object or name)."""
+    return TransferManager(GCSObjectStore(bucket), **kwargs)
@@ -6,6 +6,7 @@ import logging
 import time
 
 from app.core.config import settings
+from app.core.tracing import traced
 
 logger = logging.getLogger(__name__)
 
@@ -37,6 +38,7 @@ class AzureOpenAIClient:
         self.chat_api_version = settings.AZURE_OPENAI_CHAT_API_VERSION
         self.embedding_delay = settings.EMBEDDING_DELAY
     
+    @traced("embedding.azure_openai")
     def get_embeddings(self, texts: List[str], organization: Optional[str] = None, subject: Optional[str] = None) -> np.ndarray:
         """
         Get embeddings for a list of texts.
@@ -89,6 +91,7 @@ class AzureOpenAIClient:
             logger.error(f"Error generating embeddings: {e}")
             raise
     
+    @traced("llm.azure_openai")
     def chat_completion(
         self,
         messages: List[dict],
@@ -6,6 +6,8 @@ from openai import OpenAI, AzureOpenAI
 from openai import APIConnectionError, APIStatusError
 
 from app.core.config import settings
+from app.core.tracing import traced
+from app.core.single_flight import flight_key, get_single_flight
 
 logger = logging.getLogger(__name__)
 
@@ -129,6 +131,7 @@ def get_azure_openai_client():
     return _azure_openai_client
 
 
+@traced("embedding.openai")
 def get_embeddings(texts: List[str]) -> np.ndarray:
     """
     Generate embeddings for a list of texts.
@@ -167,6 +170,7 @@ def get_embeddings(texts: List[str]) -> np.ndarray:
         raise
 
 
+@traced("llm.openai")
 def chat_completion(
     messages: List[dict],
     model: Optional[str] = None,
@@ -188,12 +192,28 @@ def chat_completion(
     Returns:
         Generated text response
     """
-    import httpx
-    
     model = model or (settings.AZURE_OPENAI_CHAT_MODEL if settings.LLM_PROVIDER == "azure" else settings.OPENAI_CHAT_MODEL)
     temperature = temperature if temperature is not None else settings.OPENAI_TEMPERATURE
     max_tokens = max_tokens or settings.OPENAI_MAX_TOKENS
     
+    if streaming:
+        return _chat_completion(messages, model, temperature, max_tokens, streaming)
+    # Identical concurrent prompts share one upstream call
+    return get_single_flight("chat_completion").do(
+        flight_key(settings.LLM_PROVIDER, model, temperature, max_tokens, messages),
+        lambda: _chat_completion(messages, model, temperature, max_tokens, streaming)
+    )
+
+
+def _chat_completion(
+    messages: List[dict],
+    model: str,
+    temperature: Optional[float],
+    max_tokens: Optional[int],
+    streaming: bool
+):
+    import httpx
+    
     try:
         if settings.LLM_PROVIDER == "azure":
             client = get_azure_openai_client()
@@ -6,6 +6,8 @@ import numpy as np
 from typing import List, Union
 from app.core.openai_client_unified import get_openai_client
 from app.core.config import settings
+from app.embeddings.embedding_cache import cached_embed
+from app.core.tracing import traced
 
 logger = logging.getLogger(__name__)
 
@@ -23,6 +25,7 @@ class OpenAIEmbeddingService:
         self.dimension = 1536  # text-embedding-ada-002 dimension
         logger.info(f"OpenAI Embedding Service initialized (model: {self.model}, dim: {self.dimension})")
     
+    @traced("embedding.openai_fallback")
     def embed_text(self, texts: Union[str, List[str]]) -> np.ndarray:
         """
         Embed text using OpenAI API.
@@ -40,14 +43,15 @@ class OpenAIEmbeddingService:
             return np.array([]).reshape(0, self.dimension)
         
         try:
-            # Call OpenAI embeddings API
-            response = self.client.embeddings.create(
-                model=self.model,
-                input=texts
-            )
+            # Call OpenAI embeddings API for texts not already cached
+            def fetch(batch: List[str]) -> np.ndarray:
+                response = self.client.embeddings.create(
+                    model=self.model,
+                    input=batch
+                )
+                return np.array([d.embedding for d in response.data], dtype=np.float32)
             
-            # Extract embeddings
-            embeddings = np.array([d.embedding for d in response.data], dtype=np.float32)
+            embeddings = cached_embed(f"openai/{self.model}", texts, fetch)
             
             logger.debug(f"✅ OpenAI embeddings generated: {embeddings.shape}")
             return embeddings
@@ -0,0 +1,186 @@
+"""In-flight request coalescing ("single flight") for upstream calls.
+
+Concurrent callers that ask for the same normalized key share one upstream
+call: the first caller (the leader) runs it, the others wait and receive
+its result, or the same exception if it failed. Nothing is cached once the
+call finishes, so this only collapses bursts of identical work.
+
+Sync callers (threads) use do(); coroutines use do_async(), where the
+shared call runs as its own task so one caller being cancelled does not
+cancel it for the others - it is cancelled only when every waiter has
+gone.
+"""
+import json
+import asyncio
+import hashlib
+import logging
+import threading
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from app.core.tracing import METRICS, Counter
+
+try:
+    from app.core.config import settings
+except Exception:  # settings unavailable (e.g. missing env); use defaults
+    settings = None
+
+logger = logging.getLogger(__name__)
+
+COALESCED = Counter("legal_singleflight_coalesced_total", "Calls served by an identical in-flight call", ("group",))
+METRICS.append(COALESCED)
+
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace so trivially different inputs share a key."""
+    return " ".join(text.split()) if isinstance(text, str) else text
+
+
+def flight_key(*parts: Any) -> str:
+    """Stable key for a call's arguments (strings are whitespace-normalized)."""
+    def normalize(value):
+        if isinstance(value, str):
+            return normalize_text(value)
+        if isinstance(value, dict):
+            return {str(k): normalize(v) for k, v in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [normalize(v) for v in value]
+        if hasattr(value, "tobytes"):  # numpy vectors
+            return hashlib.sha1(value.tobytes()).hexdigest()
+        return value
+    payload = json.dumps([normalize(part) for part in parts], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class _Call:
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+class _AsyncCall:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: "asyncio.Future"):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key into one."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[str, _Call] = {}
+        self._async_calls: Dict[str, _AsyncCall] = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.coalesced = 0
+
+    def do(self, key: str, fn: Callable[[], Any], share: Optional[Callable[[Any], Any]] = None) -> Any:
+        """
+        Run fn() once for all concurrent callers with this key.
+
+        Args:
+            key: Normalized call key (see flight_key)
+            fn: The upstream call
+            share: Applied to the result handed to waiting callers (e.g. a copy
+                of a mutable result); the leader gets the original
+
+        Returns:
+            fn()'s result; its exception is raised in every caller
+        """
+        if not enabled():
+            return fn()
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.leaders += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            COALESCED.inc((self.name,))
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return share(call.result) if share else call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            # Forget the call before waking waiters so later callers start a fresh one
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+
+    async def do_async(
+        self,
+        key: str,
+        fn: Callable[[], Awaitable[Any]],
+        share: Optional[Callable[[Any], Any]] = None
+    ) -> Any:
+        """Async form of do(); fn returns an awaitable that is run as a shared task."""
+        if not enabled():
+            return await fn()
+        loop = asyncio.get_running_loop()
+        call = self._async_calls.get(key)
+        leader = call is None or call.task.done() or call.task.get_loop() is not loop
+        if leader:
+            call = self._async_calls[key] = _AsyncCall(asyncio.ensure_future(fn()))
+            call.task.add_done_callback(lambda task, key=key: self._forget(key, task))
+            self.leaders += 1
+        else:
+            self.coalesced += 1
+            COALESCED.inc((self.name,))
+
+        call.waiters += 1
+        try:
+            result = await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            call.waiters -= 1
+            if not call.task.done() and call.waiters == 0:
+                call.task.cancel()
+            raise
+        call.waiters -= 1
+        return result if leader or share is None else share(result)
+
+    def _forget(self, key: str, task: "asyncio.Future"):
+        call = self._async_calls.get(key)
+        if call is not None and call.task is task:
+            del self._async_calls[key]
+        if not task.cancelled() and task.exception() is not None:
+            logger.debug(f"Single-flight call {self.name} failed: {task.exception()}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'in_flight': len(self._calls) + len(self._async_calls),
+            'leaders': self.leaders,
+            'coalesced': self.coalesced,
+        }
+
+
+_flights: Dict[str, SingleFlight] = {}
+_flights_lock = threading.Lock()
+
+
+def enabled() -> bool:
+    return bool(getattr(settings, "SINGLE_FLIGHT_ENABLED", True)) if settings is not None else True
+
+
+def get_single_flight(name: str) -> SingleFlight:
+    """Get or create the named single-flight group."""
+    with _flights_lock:
+        flight = _flights.get(name)
+        if flight is None:
+            flight = _flights[name] = SingleFlight(name)
+        return flight
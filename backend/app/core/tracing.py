@@ -0,0 +1,263 @@
+"""Request tracing and per-stage latency metrics.
+
+Every HTTP request gets a trace (ASGI middleware); code wraps its stages in
+span("stage") or decorates them with @traced("stage"). Each finished span
+is observed in a per-(route, stage) histogram exposed in Prometheus text
+format by render_metrics(), and requests slower than TRACE_SLOW_MS are
+appended as JSON lines to TRACE_EXPORT_PATH with their full span tree.
+
+Spans outside a request (background jobs, scripts) are still measured and
+reported under route="background".
+"""
+import json
+import time
+import asyncio
+import logging
+import functools
+import threading
+from pathlib import Path
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    from app.core.config import settings
+except Exception:  # settings unavailable (e.g. missing env); use defaults
+    settings = None
+
+logger = logging.getLogger(__name__)
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+BACKGROUND = "background"
+MAX_SPANS_PER_TRACE = 500
+
+
+def _setting(name: str, default):
+    return getattr(settings, name, default) if settings is not None else default
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram keyed by label values."""
+
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...]):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._series: Dict[Tuple[str, ...], List[float]] = {}  # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, labels: Tuple[str, ...], seconds: float):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0.0] * (len(BUCKETS) + 2)
+            for i, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += seconds
+            series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {labels: list(values) for labels, values in self._series.items()}
+        for labels, values in sorted(series.items()):
+            label_text = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(self.label_names, labels))
+            cumulative = 0.0
+            for bound, count in zip(BUCKETS, values):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{label_text},le="{bound:g}"}} {cumulative:g}')
+            lines.append(f'{self.name}_bucket{{{label_text},le="+Inf"}} {values[-1]:g}')
+            lines.append(f"{self.name}_sum{{{label_text}}} {values[-2]:.6f}")
+            lines.append(f"{self.name}_count{{{label_text}}} {values[-1]:g}")
+        return lines
+
+
+class Counter:
+    """Monotonic counter keyed by label values."""
+
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...]):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: Tuple[str, ...], amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = dict(self._values)
+        for labels, value in sorted(values.items()):
+            label_text = ",".join(f'{name}="{_escape(v)}"' for name, v in zip(self.label_names, labels))
+            lines.append(f"{self.name}{{{label_text}}} {value:g}")
+        return lines
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+REQUEST_DURATION = Histogram("legal_request_duration_seconds", "HTTP request latency", ("route", "method"))
+REQUESTS = Counter("legal_requests_total", "HTTP requests by status", ("route", "method", "status"))
+STAGE_DURATION = Histogram("legal_stage_duration_seconds", "Latency of a traced stage", ("route", "stage"))
+STAGE_ERRORS = Counter("legal_stage_errors_total", "Traced stages that raised", ("route", "stage"))
+METRICS = [REQUEST_DURATION, REQUESTS, STAGE_DURATION, STAGE_ERRORS]
+
+
+class Trace:
+    """Spans recorded for one request."""
+
+    def __init__(self, name: str, scope: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.scope = scope
+        self.start = time.perf_counter()
+        self.started_at = time.time()
+        self.spans: List[Dict[str, Any]] = []
+        self.depth = 0
+
+    @property
+    def route(self) -> str:
+        # The router records the matched route on the scope; unmatched paths
+        # share one series instead of creating one per URL
+        if self.scope is None:
+            return self.name
+        return getattr(self.scope.get("route"), "path", None) or "unmatched"
+
+    def to_dict(self, duration: float, status: Optional[int]) -> Dict[str, Any]:
+        return {
+            'trace': self.name,
+            'route': self.route,
+            'status': status,
+            'started_at': self.started_at,
+            'duration_ms': round(duration * 1000, 2),
+            'spans': self.spans,
+        }
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("current_trace", default=None)
+_export_lock = threading.Lock()
+
+
+def tracing_enabled() -> bool:
+    return bool(_setting("TRACING_ENABLED", True))
+
+
+@contextmanager
+def span(stage: str, **attrs):
+    """Time a stage of the current request (or a background stage)."""
+    if not tracing_enabled():
+        yield
+        return
+    trace = _current_trace.get()
+    start = time.perf_counter()
+    depth = 0
+    if trace is not None:
+        depth = trace.depth
+        trace.depth += 1
+    error = None
+    try:
+        yield
+    except BaseException as e:
+        error = type(e).__name__
+        raise
+    finally:
+        duration = time.perf_counter() - start
+        route = trace.route if trace is not None else BACKGROUND
+        STAGE_DURATION.observe((route, stage), duration)
+        if error:
+            STAGE_ERRORS.inc((route, stage))
+        if trace is not None:
+            trace.depth = depth
+            if len(trace.spans) < MAX_SPANS_PER_TRACE:
+                record = {
+                    'stage': stage,
+                    'offset_ms': round((start - trace.start) * 1000, 2),
+                    'duration_ms': round(duration * 1000, 2),
+                    'depth': depth,
+                }
+                if error:
+                    record['error'] = error
+                if attrs:
+                    record['attrs'] = attrs
+                trace.spans.append(record)
+
+
+def traced(stage: str):
+    """Decorator form of span() for sync and async functions."""
+    def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(stage):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+def _export_slow(trace: Trace, duration: float, status: Optional[int]):
+    path = _setting("TRACE_EXPORT_PATH", None)
+    if not path or duration * 1000 < float(_setting("TRACE_SLOW_MS", 2000.0)):
+        return
+    try:
+        line = json.dumps(trace.to_dict(duration, status), default=str)
+        with _export_lock:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+    except Exception as e:
+        logger.warning(f"Could not export slow trace: {e}")
+
+
+class TracingMiddleware:
+    """ASGI middleware that opens a trace per HTTP request and records its latency."""
+
+    def __init__(self, app, skip_paths: Tuple[str, ...] = ("/metrics", "/health", "/ready")):
+        self.app = app
+        self.skip_paths = skip_paths
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope.get("path") in self.skip_paths or not tracing_enabled():
+            await self.app(scope, receive, send)
+            return
+
+        trace = Trace(f"{scope.get('method', '')} {scope.get('path', '')}", scope)
+        reset = _current_trace.set(trace)
+        status = {'code': 500}
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status['code'] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            _current_trace.reset(reset)
+            duration = time.perf_counter() - trace.start
+            method = scope.get("method", "")
+            REQUEST_DURATION.observe((trace.route, method), duration)
+            REQUESTS.inc((trace.route, method, str(status['code'])))
+            _export_slow(trace, duration, status['code'])
+
+
+def render_metrics() -> str:
+    """All metrics in the Prometheus text exposition format."""
+    lines: List[str] = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,264 @@
+"""Content-addressed embedding cache shared by all embedding services.
+
+Vectors are keyed by model ID plus a hash of the normalized text, so
+re-ingesting the same statutes or re-asking the same question skips the
+model forward pass / OpenAI call. Two tiers: an in-process LRU and a
+persistent SQLite file on local disk.
+"""
+import os
+import re
+import sqlite3
+import hashlib
+import logging
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from threading import Lock
+from typing import Callable, List, Optional
+
+import numpy as np
+
+from app.core.single_flight import flight_key, get_single_flight
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+# SQLite caps the number of bound parameters per statement
+_SQL_BATCH = 500
+
+
+def normalize_text(text: str) -> str:
+    """Canonical form used for hashing: NFC, collapsed whitespace, stripped."""
+    return _WHITESPACE_RE.sub(" ", unicodedata.normalize("NFC", text)).strip()
+
+
+def text_hash(text: str) -> str:
+    """SHA-256 of the normalized text."""
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """Two-tier (memory LRU + on-disk SQLite) embedding cache."""
+
+    def __init__(
+        self,
+        db_path: Optional[str] = None,
+        max_memory_items: int = 50000,
+        persistent: bool = True
+    ):
+        """
+        Initialize the embedding cache.
+
+        Args:
+            db_path: SQLite file for the persistent tier
+            max_memory_items: Capacity of the in-process LRU tier
+            persistent: Disable to keep the cache in memory only
+        """
+        self.max_memory_items = max_memory_items
+        self._memory: "OrderedDict[tuple, np.ndarray]" = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+        self._conn = None
+        if persistent:
+            if db_path is None:
+                db_path = os.path.join(
+                    os.path.dirname(os.path.dirname(os.path.dirname(__file__))),
+                    "data", "embedding_cache", "embeddings.db"
+                )
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(db_path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    model_id TEXT NOT NULL,
+                    text_hash TEXT NOT NULL,
+                    dim INTEGER NOT NULL,
+                    vector BLOB NOT NULL,
+                    PRIMARY KEY (model_id, text_hash)
+                ) WITHOUT ROWID
+                """
+            )
+            self._conn.commit()
+            logger.info(f"Embedding cache persistent tier: {db_path}")
+
+    # ----- memory tier -----
+
+    def _memory_get(self, key: tuple) -> Optional[np.ndarray]:
+        vector = self._memory.get(key)
+        if vector is not None:
+            self._memory.move_to_end(key)
+        return vector
+
+    def _memory_put(self, key: tuple, vector: np.ndarray):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_items:
+            self._memory.popitem(last=False)
+
+    # ----- public API -----
+
+    def get_many(self, model_id: str, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """
+        Look up cached vectors for a batch of texts.
+
+        Returns:
+            List aligned with `texts`; None where the vector is not cached
+        """
+        hashes = [text_hash(t) for t in texts]
+        results: List[Optional[np.ndarray]] = [None] * len(texts)
+        missing = {}
+
+        with self._lock:
+            for i, h in enumerate(hashes):
+                vector = self._memory_get((model_id, h))
+                if vector is not None:
+                    results[i] = vector
+                else:
+                    missing.setdefault(h, []).append(i)
+
+            if missing and self._conn is not None:
+                keys = list(missing)
+                for start in range(0, len(keys), _SQL_BATCH):
+                    batch = keys[start:start + _SQL_BATCH]
+                    placeholders = ",".join("?" * len(batch))
+                    rows = self._conn.execute(
+                        f"SELECT text_hash, dim, vector FROM embeddings "
+                        f"WHERE model_id = ? AND text_hash IN ({placeholders})",
+                        [model_id, *batch]
+                    ).fetchall()
+                    for h, dim, blob in rows:
+                        vector = np.frombuffer(blob, dtype=np.float32, count=dim)
+                        self._memory_put((model_id, h), vector)
+                        for i in missing.pop(h):
+                            results[i] = vector
+
+            found = sum(1 for r in results if r is not None)
+            self.hits += found
+            self.misses += len(texts) - found
+
+        return results
+
+    def put_many(self, model_id: str, texts: List[str], vectors: np.ndarray):
+        """Store vectors for a batch of texts in both tiers."""
+        rows = []
+        with self._lock:
+            for text, vector in zip(texts, vectors):
+                vector = np.ascontiguousarray(vector, dtype=np.float32)
+                h = text_hash(text)
+                self._memory_put((model_id, h), vector)
+                rows.append((model_id, h, int(vector.shape[0]), vector.tobytes()))
+
+            if self._conn is not None and rows:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings (model_id, text_hash, dim, vector) "
+                    "VALUES (?, ?, ?, ?)",
+                    rows
+                )
+                self._conn.commit()
+
+    def embed_with_cache(
+        self,
+        model_id: str,
+        texts: List[str],
+        compute: Callable[[List[str]], np.ndarray]
+    ) -> np.ndarray:
+        """
+        Return embeddings for `texts`, computing only the cache misses.
+
+        Misses are de-duplicated and sent to `compute` as a single batch;
+        the result preserves the order of `texts`.
+
+        Args:
+            model_id: Identifier of the model that produced the vectors
+            texts: Texts to embed
+            compute: Function embedding a list of texts -> (N, D) array
+
+        Returns:
+            float32 numpy array of shape (len(texts), D)
+        """
+        if not texts:
+            return compute(texts)
+
+        cached = self.get_many(model_id, texts)
+        miss_index = {}
+        for i, vector in enumerate(cached):
+            if vector is None:
+                miss_index.setdefault(normalize_text(texts[i]), []).append(i)
+
+        if miss_index:
+            miss_texts = [texts[positions[0]] for positions in miss_index.values()]
+            computed = np.asarray(compute(miss_texts), dtype=np.float32)
+            if computed.ndim == 1:
+                computed = computed.reshape(1, -1)
+            self.put_many(model_id, miss_texts, computed)
+            for vector, positions in zip(computed, miss_index.values()):
+                for i in positions:
+                    cached[i] = vector
+            logger.debug(f"Embedding cache [{model_id}]: {len(texts) - len(miss_texts)} hits, "
+                         f"{len(miss_texts)} computed")
+
+        return np.stack(cached).astype(np.float32, copy=False)
+
+    def stats(self) -> dict:
+        """Hit/miss counters and tier sizes."""
+        disk_items = None
+        if self._conn is not None:
+            with self._lock:
+                disk_items = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "memory_items": len(self._memory),
+            "disk_items": disk_items,
+        }
+
+
+# Global singleton instance
+_embedding_cache: Optional[EmbeddingCache] = None
+
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """
+    Get the shared embedding cache, or None when disabled.
+
+    Controlled by EMBEDDING_CACHE_ENABLED, EMBEDDING_CACHE_PATH and
+    EMBEDDING_CACHE_MEMORY_ITEMS environment variables.
+    """
+    global _embedding_cache
+    if os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() != "true":
+        return None
+    if _embedding_cache is None:
+        try:
+            _embedding_cache = EmbeddingCache(
+                db_path=os.getenv("EMBEDDING_CACHE_PATH") or None,
+                max_memory_items=int(os.getenv("EMBEDDING_CACHE_MEMORY_ITEMS", "50000"))
+            )
+        except Exception as e:
+            logger.warning(f"Persistent embedding cache unavailable, using memory only: {e}")
+            _embedding_cache = EmbeddingCache(persistent=False)
+    return _embedding_cache
+
+
+def cached_embed(
+    model_id: str,
+    texts: List[str],
+    compute: Callable[[List[str]], np.ndarray]
+) -> np.ndarray:
+    """
+    Embed through the shared cache, or call `compute` directly when disabled.
+
+    Identical concurrent requests (same model and texts) share one call.
+    """
+    cache = get_embedding_cache()
+    if cache is None:
+        run = lambda: compute(texts)
+    else:
+        run = lambda: cache.embed_with_cache(model_id, texts, compute)
+    return get_single_flight("embeddings").do(flight_key(model_id, texts), run, share=np.copy)
@@ -4,6 +4,9 @@ from typing import List, Optional, Dict, Tuple
 import logging
 
 from app.core.config import settings
+from app.embeddings.embedding_cache import cached_embed
+from app.embeddings.micro_batcher import MicroBatcher
+from app.core.tracing import traced
 
 logger = logging.getLogger(__name__)
 
@@ -15,6 +18,12 @@ except ImportError:
     SENTENCE_TRANSFORMERS_AVAILABLE = False
     logger.warning("sentence-transformers not installed. Install with: pip install sentence-transformers")
 
+# Try to import the quantized ONNX backend
+try:
+    from app.embeddings.onnx_backend import ONNX_AVAILABLE, QuantizedSentenceEncoder, measure_agreement
+except ImportError:
+    ONNX_AVAILABLE = False
+
 # Try to import RTLD service
 try:
     from app.embeddings.rtld_service import get_rtld_service, RTLDService
@@ -47,19 +56,81 @@ class EmbeddingService:
 
         # Initialize Sentence Transformer if selected
         self.sentence_model = None
+        self.quantized_model = None
+        self.embedding_batcher = None
+        self.local_model_id = None
         if self.embedding_provider == "sentence_transformers":
-            if not SENTENCE_TRANSFORMERS_AVAILABLE:
-                raise ImportError(
-                    "sentence-transformers not installed. Install with: pip install sentence-transformers"
-                )
             model_name = settings.SENTENCE_TRANSFORMER_MODEL
-            logger.info(f"Loading Sentence Transformer model: {model_name}")
-            self.sentence_model = SentenceTransformer(model_name)
-            # Get actual dimension from model
-            self.embedding_dimension = self.sentence_model.get_sentence_embedding_dimension()
+            if settings.SENTENCE_TRANSFORMER_BACKEND == "onnx_int8":
+                self.quantized_model = self._load_quantized_model(model_name)
+
+            if self.quantized_model is not None:
+                self.embedding_dimension = self.quantized_model.dimension
+                self.local_model_id = f"sentence-transformers/{model_name}#onnx-int8"
+            else:
+                if not SENTENCE_TRANSFORMERS_AVAILABLE:
+                    raise ImportError(
+                        "sentence-transformers not installed. Install with: pip install sentence-transformers"
+                    )
+                logger.info(f"Loading Sentence Transformer model: {model_name}")
+                self.sentence_model = SentenceTransformer(model_name)
+                # Get actual dimension from model
+                self.embedding_dimension = self.sentence_model.get_sentence_embedding_dimension()
+                self.local_model_id = f"sentence-transformers/{model_name}"
             logger.info(f"Sentence Transformer dimension: {self.embedding_dimension}")
             # Update settings for consistency
             settings.EMBEDDING_DIMENSIONS = self.embedding_dimension
+
+            if settings.EMBED_MICRO_BATCHING:
+                self.embedding_batcher = MicroBatcher(
+                    self._encode_local,
+                    max_batch_size=settings.EMBED_BATCH_MAX,
+                    max_wait_ms=settings.EMBED_BATCH_WAIT_MS
+                )
+    
+    def _load_quantized_model(self, model_name: str):
+        """
+        Load the int8 ONNX model, or None to fall back to the torch model.
+        
+        With ONNX_VALIDATE the quantized vectors are compared against the
+        full-precision model on a probe set; below ONNX_MIN_COSINE the
+        quantized model is rejected.
+        """
+        if not ONNX_AVAILABLE:
+            logger.warning("onnx_int8 backend requested but onnxruntime is not installed; using torch")
+            return None
+        try:
+            quantized = QuantizedSentenceEncoder(model_name, settings.ONNX_MODEL_DIR)
+        except Exception as e:
+            logger.error(f"Failed to load quantized model for {model_name}, using torch: {e}")
+            return None
+        
+        if settings.ONNX_VALIDATE and SENTENCE_TRANSFORMERS_AVAILABLE:
+            reference = SentenceTransformer(model_name)
+            agreement = measure_agreement(
+                lambda batch: reference.encode(batch, convert_to_numpy=True, show_progress_bar=False,
+                                               normalize_embeddings=True),
+                quantized.encode
+            )
+            del reference
+            logger.info(f"Quantized vs full-precision agreement for {model_name}: {agreement}")
+            if agreement['mean_cosine'] < settings.ONNX_MIN_COSINE:
+                logger.warning(f"Quantized model below ONNX_MIN_COSINE={settings.ONNX_MIN_COSINE}; using torch")
+                return None
+        return quantized
+    
+    def _encode_local(self, texts: List[str]) -> np.ndarray:
+        """One forward pass of the local model (quantized or torch)."""
+        if self.quantized_model is not None:
+            return self.quantized_model.encode(texts)
+        if self.sentence_model is None:
+            raise RuntimeError("Sentence Transformer model not initialized")
+        return np.array(self.sentence_model.encode(
+            texts,
+            convert_to_numpy=True,
+            show_progress_bar=False,
+            normalize_embeddings=True  # Normalize for cosine similarity
+        ), dtype=np.float32)
     
     def embed_texts(
         self,
@@ -96,29 +167,25 @@ class EmbeddingService:
         
         # Get embeddings based on provider
         if self.embedding_provider == "rtld":
-            # Use RTLD service (multi-modal, unified embeddings)
+            # Use RTLD service (multi-modal, unified embeddings; cached inside the service)
             if self.rtld_service is None:
                 raise RuntimeError("RTLD service not initialized")
             vectors, _ = self.rtld_service.embed_text(texts)
         elif self.embedding_provider == "sentence_transformers":
-            # Use Sentence Transformers (local, free, fast)
-            if self.sentence_model is None:
-                raise RuntimeError("Sentence Transformer model not initialized")
-            vectors = self.sentence_model.encode(
-                texts,
-                convert_to_numpy=True,
-                show_progress_bar=False,
-                normalize_embeddings=True  # Normalize for cosine similarity
-            )
-            vectors = np.array(vectors, dtype=np.float32)
+            # Use Sentence Transformers (local, free, fast); concurrent calls share a forward pass
+            encode = self.embedding_batcher.encode if self.embedding_batcher else self._encode_local
+            vectors = cached_embed(self.local_model_id, texts, encode)
         else:
             # Use OpenAI or Azure OpenAI
             from app.core.openai_client_unified import get_embeddings
-            vectors = get_embeddings(texts)
+            model = (settings.AZURE_OPENAI_EMBEDDING_MODEL if settings.LLM_PROVIDER == "azure"
+                     else settings.OPENAI_EMBEDDING_MODEL)
+            vectors = cached_embed(f"openai/{model}", texts, get_embeddings)
         
         logger.info(f"Generated {len(texts)} embeddings with dimension {vectors.shape[1]} using {self.embedding_provider}")
         return vectors
     
+    @traced("embedding")
     def embed_text(
         self,
         text: str,
@@ -0,0 +1,113 @@
+"""Dynamic micro-batching for local embedding models.
+
+Concurrent callers (chat queries, ingestion jobs, Artillery uploads) each
+used to run their own forward pass. The batcher queues their texts for a
+few milliseconds, runs one merged forward pass on a single worker thread
+and hands every caller back its own rows.
+"""
+import time
+import logging
+import threading
+from collections import deque
+from concurrent.futures import Future
+from typing import Callable, Deque, Dict, List, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """Merge concurrent encode() calls into shared forward passes."""
+
+    def __init__(
+        self,
+        encode: Callable[[List[str]], np.ndarray],
+        max_batch_size: int = 64,
+        max_wait_ms: float = 5.0,
+        name: str = "embed"
+    ):
+        """
+        Initialize the batcher and start its worker thread.
+
+        Args:
+            encode: Model call embedding a list of texts -> (N, D) array
+            max_batch_size: Max texts merged into one forward pass; larger
+                requests bypass the queue and run in the caller's thread
+            max_wait_ms: How long the oldest queued request waits for company
+            name: Worker thread name
+        """
+        self._encode = encode
+        self.max_batch_size = max_batch_size
+        self.max_wait_s = max_wait_ms / 1000.0
+        self._cond = threading.Condition()
+        self._pending: Deque[Tuple[List[str], Future, float]] = deque()
+        self.batches = 0
+        self.requests = 0
+        self.texts = 0
+
+        thread = threading.Thread(target=self._worker, name=f"{name}-batcher", daemon=True)
+        thread.start()
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """Embed texts, sharing the forward pass with concurrent callers."""
+        if not texts or len(texts) >= self.max_batch_size:
+            return self._encode(texts)
+
+        future: Future = Future()
+        with self._cond:
+            self._pending.append((texts, future, time.perf_counter()))
+            self._cond.notify()
+        return future.result()
+
+    def _collect(self) -> List[Tuple[List[str], Future, float]]:
+        """Wait for work, then gather requests until the batch is full or the window closes."""
+        with self._cond:
+            while not self._pending:
+                self._cond.wait()
+            deadline = self._pending[0][2] + self.max_wait_s
+            while True:
+                queued = sum(len(texts) for texts, _, _ in self._pending)
+                remaining = deadline - time.perf_counter()
+                if queued >= self.max_batch_size or remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            batch, size = [], 0
+            while self._pending and (not batch or size + len(self._pending[0][0]) <= self.max_batch_size):
+                request = self._pending.popleft()
+                batch.append(request)
+                size += len(request[0])
+            return batch
+
+    def _worker(self):
+        while True:
+            batch = self._collect()
+            texts = [text for request_texts, _, _ in batch for text in request_texts]
+            try:
+                vectors = np.asarray(self._encode(texts), dtype=np.float32)
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+
+            offset = 0
+            for request_texts, future, _ in batch:
+                future.set_result(vectors[offset:offset + len(request_texts)])
+                offset += len(request_texts)
+
+            self.batches += 1
+            self.requests += len(batch)
+            self.texts += len(texts)
+            if len(batch) > 1:
+                logger.debug(f"Merged {len(batch)} embedding requests into one pass of {len(texts)} texts")
+
+    def stats(self) -> Dict[str, float]:
+        """Batching counters."""
+        return {
+            'batches': self.batches,
+            'requests': self.requests,
+            'texts': self.texts,
+            'avg_requests_per_batch': round(self.requests / self.batches, 2) if self.batches else 0.0,
+            'avg_batch_size': round(self.texts / self.batches, 2) if self.batches else 0.0,
+        }
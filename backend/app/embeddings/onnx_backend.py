@@ -0,0 +1,179 @@
+"""Int8-quantized ONNX Runtime backend for sentence-transformer models.
+
+The Hugging Face checkpoint is exported to ONNX once, dynamically quantized
+to int8 weights and cached under ONNX_MODEL_DIR. Inference reproduces the
+sentence-transformers pipeline for MiniLM-style models (mean pooling over
+the attention mask, then L2 normalisation) without loading PyTorch.
+"""
+import re
+import logging
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+try:
+    import onnxruntime as ort
+    from transformers import AutoTokenizer
+    ONNX_AVAILABLE = True
+except ImportError:
+    ONNX_AVAILABLE = False
+    logger.warning("onnxruntime/transformers not installed. Quantized embedding backend disabled.")
+
+try:
+    from optimum.onnxruntime import ORTModelForFeatureExtraction
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    ONNX_EXPORT_AVAILABLE = True
+except ImportError:
+    ONNX_EXPORT_AVAILABLE = False
+
+# Statute-style probe sentences used to measure agreement with the torch model
+PROBE_TEXTS = [
+    "No person shall drive a motor vehicle on a highway at a speed greater than 50 kilometres per hour.",
+    "Every person who contravenes this section is guilty of an offence and liable to a fine.",
+    "The driver of a vehicle approaching a stop sign shall stop at the marked stop line.",
+    "A peace officer may require the driver to surrender their licence for inspection.",
+    "The tenant must give the landlord at least 60 days' written notice before terminating the lease.",
+    "An employer shall not dismiss an employee for filing a complaint under this Act.",
+    "Where a defendant fails to appear, the justice may enter a conviction in their absence.",
+    "The limitation period for a claim is two years from the day the claim was discovered.",
+    "Parking is prohibited within 9 metres of an intersection or fire hydrant.",
+    "A person charged with an offence has the right to be tried within a reasonable time.",
+    "Demerit points are recorded against the driver's record upon conviction.",
+    "The court may order restitution to the victim in addition to any fine imposed.",
+    "Speeding in a community safety zone doubles the set fine.",
+    "A notice of appeal must be filed within 30 days after the decision.",
+    "The contract may be rescinded where consent was obtained by misrepresentation.",
+    "Careless driving means driving without due care and attention or reasonable consideration for others.",
+]
+
+
+def _hub_id(model_name: str) -> str:
+    return model_name if "/" in model_name else f"sentence-transformers/{model_name}"
+
+
+def measure_agreement(
+    reference: Callable[[List[str]], np.ndarray],
+    candidate: Callable[[List[str]], np.ndarray],
+    texts: Optional[List[str]] = None,
+    k: int = 5
+) -> Dict[str, float]:
+    """
+    Compare two encoders on the same texts.
+
+    Returns:
+        mean/min cosine between paired vectors, and recall@k of each text's
+        nearest neighbours under the candidate versus the reference encoder
+    """
+    texts = texts or PROBE_TEXTS
+    ref = np.asarray(reference(texts), dtype=np.float32)
+    cand = np.asarray(candidate(texts), dtype=np.float32)
+    ref /= np.linalg.norm(ref, axis=1, keepdims=True) + 1e-12
+    cand /= np.linalg.norm(cand, axis=1, keepdims=True) + 1e-12
+
+    cosines = np.sum(ref * cand, axis=1)
+    k = min(k, len(texts) - 1)
+    recall = 1.0
+    if k > 0:
+        ref_sim, cand_sim = ref @ ref.T, cand @ cand.T
+        np.fill_diagonal(ref_sim, -np.inf)
+        np.fill_diagonal(cand_sim, -np.inf)
+        ref_nn = np.argsort(-ref_sim, axis=1)[:, :k]
+        cand_nn = np.argsort(-cand_sim, axis=1)[:, :k]
+        recall = float(np.mean([len(set(r) & set(c)) / k for r, c in zip(ref_nn, cand_nn)]))
+
+    return {
+        'mean_cosine': round(float(cosines.mean()), 5),
+        'min_cosine': round(float(cosines.min()), 5),
+        f'recall_at_{k}': round(recall, 4),
+    }
+
+
+class QuantizedSentenceEncoder:
+    """Int8 ONNX Runtime encoder producing sentence-transformers compatible vectors."""
+
+    def __init__(
+        self,
+        model_name: str,
+        model_dir: str,
+        max_seq_length: int = 256,
+        batch_size: int = 32,
+        intra_op_threads: Optional[int] = None
+    ):
+        """
+        Load (exporting and quantizing on first use) the int8 model.
+
+        Args:
+            model_name: Sentence-transformers model, e.g. all-MiniLM-L6-v2
+            model_dir: Cache directory for exported models
+            max_seq_length: Token limit (matches the sentence-transformers default for MiniLM)
+            batch_size: Texts per ONNX Runtime call
+            intra_op_threads: ONNX Runtime intra-op threads (None = runtime default)
+        """
+        if not ONNX_AVAILABLE:
+            raise ImportError("onnxruntime and transformers are required for the quantized backend")
+
+        self.model_name = model_name
+        self.max_seq_length = max_seq_length
+        self.batch_size = batch_size
+        self.path = Path(model_dir) / re.sub(r"[^\w.-]", "_", _hub_id(model_name))
+        self.model_file = self.path / "model_int8.onnx"
+        if not self.model_file.exists():
+            self._export()
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if intra_op_threads:
+            options.intra_op_num_threads = intra_op_threads
+        self.session = ort.InferenceSession(str(self.model_file), options, providers=["CPUExecutionProvider"])
+        self.tokenizer = AutoTokenizer.from_pretrained(str(self.path))
+        self._input_names = {i.name for i in self.session.get_inputs()}
+        self.dimension = int(self.encode(["dimension probe"]).shape[1])
+        logger.info(f"Loaded int8 ONNX embedding model {model_name} "
+                    f"({self.model_file.stat().st_size / 1e6:.1f} MB, dim={self.dimension})")
+
+    def _export(self):
+        if not ONNX_EXPORT_AVAILABLE:
+            raise ImportError(f"{self.model_file} not found and optimum[onnxruntime] is not installed to export it")
+        logger.info(f"Exporting {_hub_id(self.model_name)} to ONNX and quantizing to int8 in {self.path}")
+        self.path.mkdir(parents=True, exist_ok=True)
+        ORTModelForFeatureExtraction.from_pretrained(_hub_id(self.model_name), export=True).save_pretrained(self.path)
+        AutoTokenizer.from_pretrained(_hub_id(self.model_name)).save_pretrained(self.path)
+        quantize_dynamic(
+            str(self.path / "model.onnx"),
+            str(self.model_file),
+            weight_type=QuantType.QInt8,
+            per_channel=True
+        )
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """Normalized float32 embeddings of shape (N, D)."""
+        if not texts:
+            return np.zeros((0, getattr(self, 'dimension', 0)), dtype=np.float32)
+
+        # Length-sorted batches keep padding (and wasted compute) small
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        output: List[Optional[np.ndarray]] = [None] * len(texts)
+        for start in range(0, len(order), self.batch_size):
+            indices = order[start:start + self.batch_size]
+            encoded = self.tokenizer(
+                [texts[i] for i in indices],
+                padding=True,
+                truncation=True,
+                max_length=self.max_seq_length,
+                return_tensors="np"
+            )
+            feeds = {name: encoded[name].astype(np.int64) for name in self._input_names if name in encoded}
+            if "token_type_ids" in self._input_names and "token_type_ids" not in feeds:
+                feeds["token_type_ids"] = np.zeros_like(feeds["input_ids"])
+            token_embeddings = self.session.run(None, feeds)[0]
+
+            mask = encoded["attention_mask"][..., None].astype(np.float32)
+            pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+            for row, i in enumerate(indices):
+                output[i] = pooled[row]
+
+        return np.stack(output).astype(np.float32, copy=False)
@@ -44,6 +44,10 @@ except ImportError:
     EXCEL_AVAILABLE = False
 
 from app.core.config import settings
+from app.embeddings.embedding_cache import cached_embed
+from app.vector_store.compressed_index import write_index
+from app.vector_store.snapshot import load_store, local_saved_at, publish_store, snapshots_enabled
+from app.core.tracing import traced
 
 logger = logging.getLogger(__name__)
 
@@ -91,6 +95,7 @@ class RTLDService:
 
         # Initialize text embedding model (SentenceTransformer - winner from tests)
         logger.info("Loading text embedding model (SentenceTransformer)...")
+        self.text_model_name = text_model_name
         self.text_model = SentenceTransformer(text_model_name, device=self.device)
         self.text_embedding_dim = self.text_model.get_sentence_embedding_dimension()
 
@@ -115,9 +120,13 @@ class RTLDService:
         # Metadata storage
         self.metadata_store: List[Dict] = []
         self.text_store: List[str] = []
+        self.snapshot_version: Optional[str] = None
 
-        # Initialize or load index
-        if self.index_path.exists() and self.metadata_path.exists():
+        # Initialize or load index (a prebuilt snapshot first, when enabled
+        # and at least as new as the local files)
+        if snapshots_enabled() and self.load_snapshot():
+            pass
+        elif self.index_path.exists() and self.metadata_path.exists():
             self.load_index()
         else:
             # Create new IndexFlatIP (inner product) for normalized vectors
@@ -139,15 +148,19 @@ class RTLDService:
         if not texts:
             return np.array([], dtype=np.float32).reshape(0, self.embedding_dim), []
 
-        # Generate embeddings
-        embeddings = self.text_model.encode(
+        # Generate embeddings (only for texts not already in the shared cache)
+        embeddings = cached_embed(
+            f"sentence-transformers/{self.text_model_name}",
             texts,
-            convert_to_numpy=True,
-            show_progress_bar=False,
-            normalize_embeddings=True
+            lambda batch: np.array(self.text_model.encode(
+                batch,
+                convert_to_numpy=True,
+                show_progress_bar=False,
+                normalize_embeddings=True
+            ), dtype=np.float32)
         )
 
-        return np.array(embeddings, dtype=np.float32), texts
+        return embeddings, texts
 
     def embed_image(self, image_path: str) -> Tuple[np.ndarray, List[str]]:
         """
@@ -414,6 +427,7 @@ class RTLDService:
         logger.info(f"Added {len(embeddings)} vectors to RTLD index (IDs: {ids[0]}-{ids[-1]})")
         return ids
 
+    @traced("vector_search.rtld")
     def search(self, query: str, top_k: int = 10) -> List[Dict]:
         """
         Search the index for similar content
@@ -458,7 +472,7 @@ class RTLDService:
     def save_index(self):
         """Save index and metadata to disk"""
         # Save FAISS index
-        faiss.write_index(self.index, str(self.index_path))
+        write_index(self.index, str(self.index_path))
         logger.info(f"Saved FAISS index to {self.index_path}")
 
         # Save metadata as JSONL
@@ -495,6 +509,34 @@ class RTLDService:
 
             logger.info(f"Loaded {len(self.metadata_store)} metadata records from {self.metadata_path}")
 
+    def publish_snapshot(self) -> str:
+        """Save, then publish the index, metadata and texts as a new snapshot version"""
+        self.save_index()
+        return publish_store(
+            "faiss",
+            self.index_path,
+            records={'metadata': self.metadata_store, 'texts': self.text_store},
+            meta={'dim': self.embedding_dim, 'vectors': self.index.ntotal}
+        )
+
+    def load_snapshot(self) -> bool:
+        """Map the latest snapshot instead of reading the index and JSONL files (unless they are newer)"""
+        try:
+            index, records, _, manifest = load_store(
+                "faiss", self.index_path, ('metadata', 'texts'),
+                not_older_than=local_saved_at(self.index_path, self.metadata_path)
+            )
+        except Exception as e:
+            logger.warning(f"Snapshot unavailable, loading {self.index_path}: {e}")
+            return False
+
+        self.index = index
+        self.embedding_dim = index.d
+        self.metadata_store = records['metadata']
+        self.text_store = records['texts']
+        self.snapshot_version = manifest['version']
+        return True
+
     def get_stats(self) -> Dict:
         """Get statistics about the index"""
         return {
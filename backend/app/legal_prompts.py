@@ -10,6 +10,7 @@ and disclaimers.
 
 import logging
 from typing import Dict, Optional, List
+from app.core.tracing import traced
 
 logger = logging.getLogger(__name__)
 
@@ -679,6 +680,7 @@ You MUST respond in {language_names[language]}. Translate your entire response,
         return messages
     
     @staticmethod
+    @traced("prompt_build")
     def build_artillery_prompt(
         question: str,
         document_chunks: Optional[List[Dict]] = None,
@@ -13,7 +13,12 @@ from dataclasses import dataclass
 
 from app.embeddings.embedding_service import get_embedding_service
 from app.vector_store.faiss_store import get_vector_store
+from app.vector_store.sharded_store import (
+    JURISDICTION_COUNTRY, ShardedVectorStore, get_sharded_vector_store, shard_slug
+)
 from app.core.config import settings
+from app.rag.reranker import get_reranker
+from app.core.tracing import traced
 
 logger = logging.getLogger(__name__)
 
@@ -43,7 +48,12 @@ class LegalRetrievalService:
     def __init__(self):
         """Initialize the legal retrieval service."""
         self.embedding_service = get_embedding_service()
-        self.vector_store = get_vector_store(dim=settings.EMBEDDING_DIMENSIONS)
+        if settings.FAISS_SHARDED and settings.EMBEDDING_PROVIDER != "rtld":
+            # Jurisdiction-scoped queries only search their own shards
+            self.vector_store = get_sharded_vector_store(dim=settings.EMBEDDING_DIMENSIONS)
+        else:
+            self.vector_store = get_vector_store(dim=settings.EMBEDDING_DIMENSIONS)
+        self.sharded = isinstance(self.vector_store, ShardedVectorStore)
         logger.info("Legal retrieval service initialized")
 
     def load_legal_index(self) -> bool:
@@ -65,6 +75,7 @@ class LegalRetrievalService:
             logger.error(f"Failed to load legal index: {e}")
             return False
 
+    @traced("embedding")
     def embed_query(self, query: str) -> np.ndarray:
         """
         Convert query to embedding using the same model as document indexing.
@@ -106,22 +117,7 @@ class LegalRetrievalService:
 
         # Determine country from jurisdiction
         jurisdiction = metadata['jurisdiction'].lower()
-        if jurisdiction in ['canada', 'ontario', 'british_columbia', 'quebec', 'alberta',
-                           'nova_scotia', 'new_brunswick', 'manitoba', 'saskatchewan',
-                           'prince_edward_island', 'newfoundland', 'northwest_territories',
-                           'nunavut', 'yukon']:
-            metadata['country'] = 'Canada'
-        elif jurisdiction in ['usa', 'united_states', 'california', 'texas', 'florida',
-                             'new_york', 'pennsylvania', 'illinois', 'ohio', 'georgia',
-                             'north_carolina', 'new_jersey', 'virginia', 'washington',
-                             'arizona', 'massachusetts', 'tennessee', 'indiana', 'missouri',
-                             'maryland', 'wisconsin', 'colorado', 'minnesota', 'south_carolina',
-                             'alabama', 'louisiana', 'kentucky', 'oregon', 'oklahoma', 'connecticut',
-                             'utah', 'iowa', 'nevada', 'arkansas', 'mississippi', 'kansas',
-                             'new_mexico', 'nebraska', 'west_virginia', 'idaho', 'hawaii',
-                             'new_hampshire', 'maine', 'montana', 'rhode_island', 'delaware',
-                             'south_dakota', 'north_dakota', 'alaska', 'vermont', 'wyoming']:
-            metadata['country'] = 'USA'
+        metadata['country'] = JURISDICTION_COUNTRY.get(shard_slug(jurisdiction), '')
 
         # Extract law name and section from filename or content
         source_name = metadata['source_path'].lower()
@@ -181,6 +177,7 @@ class LegalRetrievalService:
 
         return ", ".join(parts) if parts else metadata.get('source_path', 'Unknown Source')
 
+    @traced("retrieval.legal_index")
     def search_legal_index(
         self,
         query: str,
@@ -202,13 +199,28 @@ class LegalRetrievalService:
             # Step 1: Embed the query
             query_embedding = self.embed_query(query)
 
+            # Rerank a larger candidate pool down to k when the cross-encoder is on
+            reranker = get_reranker()
+            candidate_k = max(k, settings.RERANK_CANDIDATES) if reranker else k
+
             # Step 2: Search the vector store
-            search_results = self.vector_store.search(
-                query_vector=query_embedding[0].tolist(),
-                top_k=k * 2,  # Get more results for filtering
-                search_text=None,  # FAISS doesn't use text search
-                filters=None  # FAISS doesn't support complex filters
-            )
+            if self.sharded:
+                # Routed to the shards of the requested jurisdiction/country,
+                # so every hit already matches and no over-fetch is needed
+                filters = {key.lower(): value for key, value in (filters or {}).items() if value}
+                search_results = self.vector_store.search(
+                    query_vector=query_embedding[0].tolist(),
+                    top_k=candidate_k,
+                    jurisdictions=[filters['jurisdiction']] if 'jurisdiction' in filters else None,
+                    countries=[filters['country']] if 'country' in filters else None
+                )
+            else:
+                search_results = self.vector_store.search(
+                    query_vector=query_embedding[0].tolist(),
+                    top_k=candidate_k * 2,  # Get more results for filtering
+                    search_text=None,  # FAISS doesn't use text search
+                    filters=None  # FAISS doesn't support complex filters
+                )
 
             if not search_results:
                 logger.info(f"No results found for query: {query}")
@@ -228,7 +240,7 @@ class LegalRetrievalService:
                         if filter_key.lower() == 'country' and legal_metadata.get('country', '').lower() != filter_value.lower():
                             skip = True
                             break
-                        elif filter_key.lower() == 'jurisdiction' and legal_metadata.get('jurisdiction', '').lower() != filter_value.lower():
+                        elif filter_key.lower() == 'jurisdiction' and shard_slug(legal_metadata.get('jurisdiction')) != shard_slug(filter_value):
                             skip = True
                             break
                     if skip:
@@ -253,10 +265,17 @@ class LegalRetrievalService:
 
                 filtered_chunks.append(chunk)
 
-                # Limit to k results after filtering
-                if len(filtered_chunks) >= k:
+                # Limit to the candidate pool after filtering
+                if len(filtered_chunks) >= candidate_k:
                     break
 
+            # Step 4: Cross-encoder rerank; only the best few reach the prompt
+            # (keeps vector order if the scoring budget runs out)
+            if reranker:
+                filtered_chunks = reranker.rerank(
+                    query, filtered_chunks, top_n=min(k, settings.RERANK_TOP_K)
+                )
+
             logger.info(f"Legal search returned {len(filtered_chunks)} filtered results for query: {query}")
             return filtered_chunks
 
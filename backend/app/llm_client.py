@@ -9,6 +9,8 @@ import asyncio
 from typing import List, Dict, Optional
 from app.core.openai_client_unified import chat_completion
 from app.core.config import settings
+from app.core.tracing import traced
+from app.core.single_flight import flight_key, get_single_flight
 
 logger = logging.getLogger(__name__)
 
@@ -43,6 +45,7 @@ class LegalLLMClient:
 
         logger.info(f"Legal LLM client initialized: model={self.model}, temp={self.temperature}")
 
+    @traced("llm.legal")
     async def call_legal_llm_async(self, messages: List[Dict[str, str]]) -> str:
         """
         Async call to LLM for legal Q&A.
@@ -54,14 +57,19 @@ class LegalLLMClient:
             LLM response text
         """
         try:
-            # Use the unified OpenAI client
-            response = await asyncio.get_event_loop().run_in_executor(
-                None,
-                lambda: chat_completion(
-                    messages=messages,
-                    model=self.model,
-                    temperature=self.temperature,
-                    max_tokens=self.max_tokens
+            # Use the unified OpenAI client; identical concurrent calls share one
+            # executor job, which keeps running while any caller still waits
+            loop = asyncio.get_running_loop()
+            response = await get_single_flight("legal_llm").do_async(
+                flight_key(self.model, self.temperature, self.max_tokens, messages),
+                lambda: loop.run_in_executor(
+                    None,
+                    lambda: chat_completion(
+                        messages=messages,
+                        model=self.model,
+                        temperature=self.temperature,
+                        max_tokens=self.max_tokens
+                    )
                 )
             )
 
@@ -76,6 +84,7 @@ class LegalLLMClient:
             logger.error(f"LLM call failed: {e}")
             return self._get_fallback_response(str(e))
 
+    @traced("llm.legal")
     def call_legal_llm(self, messages: List[Dict[str, str]]) -> str:
         """
         Synchronous call to LLM for legal Q&A.
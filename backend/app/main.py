@@ -12,6 +12,7 @@ import os
 import uuid
 import sys
 import json
+import threading
 from pathlib import Path
 from datetime import datetime
 from fastapi import FastAPI, UploadFile, File, HTTPException, Query, Form
@@ -114,6 +115,29 @@ if os.name == 'nt':  # Windows
 else:
     logger.info("[INFO] Non-Windows system - Tesseract should be in PATH")
 
+def _start_vector_store_warmup():
+    """Load the vector stores (from their snapshots) on a background thread."""
+    from app.vector_store.snapshot import mark_failed, mark_loading, mark_ready
+
+    components = [("artillery_vector_store", lambda: get_vector_store_artillery())]
+    if LEGACY_SYSTEMS_AVAILABLE:
+        components.insert(0, ("vector_store", lambda: get_vector_store()))
+    for name, _ in components:
+        mark_loading(name)
+
+    def warm():
+        for name, load in components:
+            try:
+                store = load()
+                stats = store.get_stats() if hasattr(store, 'get_stats') else {}
+                mark_ready(name, vectors=stats.get('total_vectors'), snapshot_version=stats.get('snapshot_version'))
+            except Exception as e:
+                logger.error(f"❌ Failed to load {name}: {e}")
+                mark_failed(name, str(e))
+
+    threading.Thread(target=warm, name="vector-store-warmup", daemon=True).start()
+
+
 # Create FastAPI app with lifespan
 from contextlib import asynccontextmanager
 
@@ -130,11 +154,32 @@ async def lifespan(app: FastAPI):
         logger.info("✅ Legal updates service initialized!")
     except Exception as e:
         logger.error(f"❌ Failed to initialize legal updates: {e}")
+
+    # Load the cross-encoder in the background; results keep vector order until it is ready
+    try:
+        from app.rag.reranker import get_reranker
+        get_reranker()
+    except Exception as e:
+        logger.warning(f"Could not start loading the reranker: {e}")
+
+    # Map the vector-store snapshots in the background; /ready turns 200 once they are loaded
+    if settings is not None and settings.VECTOR_SNAPSHOTS and settings.VECTOR_SNAPSHOT_WARMUP:
+        _start_vector_store_warmup()
     
     yield  # Application runs here
     
     # Shutdown
     logger.info("Shutting down application...")
+    try:
+        from app.services.analytics_service import shutdown_analytics_service
+        shutdown_analytics_service()
+    except Exception as e:
+        logger.warning(f"Could not flush analytics: {e}")
+    try:
+        from app.services.bigquery_writer import shutdown_bigquery_writers
+        shutdown_bigquery_writers()
+    except Exception as e:
+        logger.warning(f"Could not flush BigQuery writes: {e}")
 
 app = FastAPI(
     title="PLAZA-AI Legal RAG Backend",
@@ -152,6 +197,20 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request tracing: per-stage latency histograms for /metrics and slow-trace export
+try:
+    from app.core.tracing import TracingMiddleware
+    app.add_middleware(TracingMiddleware)
+except Exception as e:
+    logger.warning(f"Request tracing not available: {e}")
+
+# Per-request cache of verified JWT claims for RBAC checks
+try:
+    from app.services.rbac_service import RequestTokenScopeMiddleware
+    app.add_middleware(RequestTokenScopeMiddleware)
+except Exception as e:
+    logger.warning(f"RBAC request token scope not available: {e}")
+
 # Include API routers
 try:
     # Import Google OAuth router
@@ -393,6 +452,7 @@ class ChatHistorySearchRequest(BaseModel):
 class GenerateSummaryRequest(BaseModel):
     messages: List[Dict[str, Any]]
     metadata: Optional[Dict[str, Any]] = None
+    conversation_id: Optional[str] = None
 
 class DocumentGenerationRequest(BaseModel):
     document_type: str
@@ -458,11 +518,18 @@ Sources: {len(citations)} legal documents retrieved"""
 async def artillery_upload_document(
     file: UploadFile = File(...),
     user_id: str = Form("default_user"),
-    offence_number: Optional[str] = Form(None)
+    offence_number: Optional[str] = Form(None),
+    wait: Optional[bool] = Query(None, description="Wait for the ingestion job to finish (default from INGEST_ASYNC_DEFAULT)")
 ):
-    """Upload and process document with Artillery embedding system."""
-    import time
-    start_time = time.time()
+    """
+    Upload and process document with Artillery embedding system.
+
+    Processing runs on the ingestion worker pool (fair per user). By
+    default the response is 202 with a job ID to poll at
+    /api/artillery/jobs/{job_id} (wait=true returns the result); a full
+    queue returns 429 + Retry-After.
+    """
+    from app.api.routes.ingest import queue_ingestion_job, ingestion_job_response
 
     if not file.filename:
         raise HTTPException(status_code=400, detail="No file provided")
@@ -487,6 +554,48 @@ async def artillery_upload_document(
             detail=f"Unsupported file type: {file_ext}. Allowed: PDF, DOCX, TXT, XLSX, and Images (JPG, PNG, BMP, TIFF)"
         )
 
+    filename = file.filename
+    job = queue_ingestion_job(
+        user_id, 'artillery_upload',
+        lambda progress: _artillery_process_upload(content, filename, user_id, offence_number, progress),
+        description=filename
+    )
+    return await ingestion_job_response(job, wait, status_prefix="/api/artillery/jobs")
+
+
+@app.get("/api/artillery/jobs/{job_id}")
+async def artillery_upload_job(job_id: str):
+    """Status and progress of a queued Artillery upload."""
+    from app.services.ingestion_jobs import get_ingestion_queue
+    job = get_ingestion_queue().get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Ingestion job not found")
+    return job.to_dict()
+
+
+_artillery_index_lock = threading.Lock()
+
+
+def _get_near_duplicate_index():
+    """Near-duplicate index for uploads (None when disabled or unavailable)."""
+    try:
+        from app.rag.near_duplicates import get_near_duplicate_index
+        return get_near_duplicate_index()
+    except ImportError:
+        return None
+
+
+def _artillery_process_upload(
+    content: bytes,
+    filename: str,
+    user_id: str,
+    offence_number: Optional[str],
+    progress
+) -> Dict[str, Any]:
+    """Process, embed and index an Artillery upload (runs on the ingestion pool)."""
+    import time
+    start_time = time.time()
+
     try:
         # Create upload directory
         user_upload_dir = UPLOAD_DIR / user_id
@@ -496,11 +605,11 @@ async def artillery_upload_document(
         doc_id = f"doc_{user_id}_{uuid.uuid4().hex[:8]}"
 
         # Save uploaded file
-        file_path = user_upload_dir / f"{doc_id}_{file.filename}"
+        file_path = user_upload_dir / f"{doc_id}_{filename}"
         with open(file_path, "wb") as f:
             f.write(content)
 
-        logger.info(f"📄 Processing upload: {file.filename} ({len(content)} bytes)")
+        logger.info(f"📄 Processing upload: {filename} ({len(content)} bytes)")
 
         # Initialize services
         doc_processor = get_doc_processor()
@@ -519,6 +628,7 @@ async def artillery_upload_document(
             print(f"DEBUG: Available methods: {[m for m in dir(doc_processor) if not m.startswith('_')]}")
 
         # Process document using the unified process_document method
+        progress(0.1, "extracting")
         try:
             extracted = doc_processor.process_document(str(file_path))
         except Exception as e:
@@ -533,7 +643,7 @@ async def artillery_upload_document(
         if extracted.get('text_chunks'):
             first_chunk = extracted['text_chunks'][0].get('content', '')
             if 'OCR not available' in first_chunk or 'install Tesseract' in first_chunk:
-                logger.warning(f"Image uploaded without OCR: {file.filename}")
+                logger.warning(f"Image uploaded without OCR: {filename}")
 
         # Extract offence number if not provided
         if not offence_number:
@@ -544,35 +654,65 @@ async def artillery_upload_document(
         all_embeddings = []
         all_metadata = []
 
+        # Skip very short chunks
+        text_chunks = [
+            (idx, chunk) for idx, chunk in enumerate(extracted['text_chunks'])
+            if chunk['content'] and len(chunk['content'].strip()) >= 10
+        ]
+
+        def chunk_identity(idx: int, chunk: Dict[str, Any]) -> Dict[str, Any]:
+            return {
+                'user_id': user_id,
+                'doc_id': doc_id,
+                'filename': filename,
+                'page': chunk.get('page', 1),
+                'chunk_id': f"{doc_id}_chunk_{idx}",
+                'offence_number': offence_number
+            }
+
+        # Skip chunks that near-duplicate ones this user already indexed (before embedding them)
+        dedup = None
+        dedup_index = _get_near_duplicate_index()
+        dedup_ns = f"artillery:{user_id}"
+        if dedup_index:
+            dedup = dedup_index.check(
+                dedup_ns, text_chunks,
+                lambda c: c[1]['content'], lambda c: f"{doc_id}_chunk_{c[0]}"
+            )
+            text_chunks = dedup.kept
+
         # Process text chunks
-        for idx, chunk in enumerate(extracted['text_chunks']):
+        total_chunks = max(len(text_chunks), 1)
+        for n, (idx, chunk) in enumerate(text_chunks):
+            progress(0.2 + 0.7 * n / total_chunks, "embedding")
             chunk_text = chunk['content']
-            if not chunk_text or len(chunk_text.strip()) < 10:  # Skip very short chunks
-                continue
 
             # Generate embedding
             embedding = embedding_service.embed_text(chunk_text)
 
             # Create metadata
-            chunk_metadata = {
-                'user_id': user_id,
-                'doc_id': doc_id,
-                'filename': file.filename,
-                'page': chunk.get('page', 1),
-                'chunk_id': f"{doc_id}_chunk_{idx}",
-                'offence_number': offence_number,
-                'content': chunk_text
-            }
+            chunk_metadata = {**chunk_identity(idx, chunk), 'content': chunk_text}
 
             all_embeddings.append(embedding[0])  # embedding is (1, 384), take first
             all_metadata.append(chunk_metadata)
 
         # Add to vector store
-        if all_embeddings:
+        progress(0.9, "indexing")
+        # Linked duplicates become aliases of the chunks they duplicate, so
+        # searches for this document (e.g. a re-upload) still find them
+        links = []
+        if dedup and dedup_index.action == "link":
+            links = [(canonical, chunk_identity(*item)) for item, _, canonical, _ in dedup.duplicates]
+        if all_embeddings or links:
             import numpy as np
-            embeddings_array = np.array(all_embeddings)
-            vector_store.add_vectors(embeddings_array, all_metadata)
-            vector_store.save()
+            # Ingestion workers run concurrently; index writes are serialized
+            with _artillery_index_lock:
+                if all_embeddings:
+                    vector_store.add_vectors(np.array(all_embeddings), all_metadata)
+                vector_store.link_duplicates(links)
+                vector_store.save()
+        if dedup:
+            dedup_index.register(dedup_ns, dedup, source=doc_id)
 
         processing_time = time.time() - start_time
 
@@ -580,11 +720,15 @@ async def artillery_upload_document(
             "doc_id": doc_id,
             "detected_offence_number": offence_number,
             "chunks_indexed": len(all_metadata),
+            "chunks_linked": len(links),
             "file_path": str(file_path),
             "status": "success",
-            "message": f"Document '{file.filename}' uploaded and indexed. {len(all_metadata)} chunks processed."
+            "message": f"Document '{filename}' uploaded and indexed. {len(all_metadata)} chunks processed.",
+            "dedup": dedup.report(vector_dim=vector_store.dimension) if dedup else None
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"[ERROR] Upload failed: {e}")
         raise HTTPException(status_code=500, detail=f"Processing failed: {str(e)}")
@@ -613,9 +757,9 @@ async def artillery_chat(request: ChatRequest):
             # Embed the user's question
             query_embedding = embedding_service.embed_text(message)
             
-            # Search for relevant document chunks (top 5)
+            # Search for relevant document chunks (top 5, cross-encoder reranked)
             if vector_store.index.ntotal > 0:
-                results = vector_store.search(query_embedding[0], k=5, filters={})
+                results = vector_store.search(query_embedding[0], k=5, filters={}, query=message)
                 logger.info(f"[ARTILLERY_CHAT] Found {len(results)} relevant document chunks")
                 
                 for idx, result in enumerate(results):
@@ -711,6 +855,17 @@ async def artillery_chat(request: ChatRequest):
         except Exception as e:
             logger.warning(f"[ARTILLERY_CHAT] Case citation service failed: {e}")
         
+        # Fit case citations into their share of the prompt budget; chunks and history get the rest
+        context_budget = None
+        if case_citations_context:
+            from app.rag.context_assembler import count_tokens, get_context_assembler
+            assembler = get_context_assembler()
+            case_citations_context = assembler.fit(
+                case_citations_context, message,
+                assembler.section_budget('case_law', ['documents', 'case_law', 'history'])
+            )
+            context_budget = max(assembler.budget - count_tokens(case_citations_context), assembler.min_passage_tokens)
+        
         # 🤖 STEP 2: Build professional legal prompt using new system
         from app.legal_prompts import LegalPromptSystem
         
@@ -723,7 +878,8 @@ async def artillery_chat(request: ChatRequest):
                 law_category=request.law_category if hasattr(request, 'law_category') else None,
                 language=request.language if hasattr(request, 'language') else 'en',
                 conversation_history=request.conversation_history if hasattr(request, 'conversation_history') else None,
-                response_style='concise'  # Default to concise, fast responses
+                response_style='concise',  # Default to concise, fast responses
+                context_budget=context_budget
             )
             
             # Inject case citations into system prompt
@@ -1372,24 +1528,22 @@ async def delete_document(doc_id: str, user_id: str = "default_user"):
     try:
         vector_store = get_vector_store_artillery()
 
-        # Find chunks to delete by doc_id
-        deleted_count = 0
-        remaining_metadata = []
-        remaining_indices = []
-
-        for idx, metadata in enumerate(vector_store.metadata):
-            if not (metadata.get('doc_id') == doc_id and metadata.get('user_id') == user_id):
-                remaining_metadata.append(metadata)
-                remaining_indices.append(idx)
-
-        deleted_count = len(vector_store.metadata) - len(remaining_metadata)
-
-        if deleted_count == 0:
+        owned = [
+            chunk for chunk in vector_store.get_chunks_by_doc_id(doc_id)
+            if chunk['metadata'].get('user_id') == user_id
+        ]
+        if not owned:
             raise HTTPException(status_code=404, detail=f"Document {doc_id} not found")
 
-        # Note: FAISS doesn't support easy deletion, so we need to rebuild the index
-        # For now, we'll mark the document as deleted but keep the data
-        # In production, you'd want to rebuild the FAISS index
+        # FAISS doesn't support easy deletion: chunks are marked deleted (and
+        # skipped by search) until the index is rebuilt; chunks other
+        # documents' near-duplicates are linked to pass to those documents
+        with _artillery_index_lock:
+            deleted_count = vector_store.delete_document(doc_id)
+            vector_store.save()
+        dedup_index = _get_near_duplicate_index()
+        if dedup_index:
+            dedup_index.forget_source(doc_id, namespace=f"artillery:{user_id}")
         logger.info(f"Marked {deleted_count} chunks as deleted for document {doc_id}")
 
         return {
@@ -1434,6 +1588,22 @@ async def health_check():
     }
 
 
+@app.get("/ready", tags=["health"])
+async def readiness_check():
+    """Readiness probe - 503 until the vector-store snapshots are loaded."""
+    from app.vector_store.snapshot import readiness_report
+    report = readiness_report()
+    return JSONResponse(status_code=200 if report['ready'] else 503, content=report)
+
+
+@app.get("/metrics", tags=["health"])
+async def metrics():
+    """Request and per-stage latency histograms in Prometheus text format."""
+    from fastapi.responses import PlainTextResponse
+    from app.core.tracing import render_metrics
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
 # ============================================================================
 # LEGAL API INTEGRATIONS - Case Lookup, Amendments, Translation
 # ============================================================================
@@ -1527,6 +1697,35 @@ async def generate_amendment(request: AmendmentRequest, authorization: Optional[
         raise HTTPException(status_code=500, detail=f"Amendment generation failed: {str(e)}")
 
 
+def _document_generation_denial(authorization: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Access-denied response for the document generation API, or None if allowed."""
+    from app.services.rbac_service import get_rbac_service, UserRole
+    rbac = get_rbac_service()
+    
+    user_role = UserRole.STANDARD
+    if authorization:
+        token = authorization.replace("Bearer ", "")
+        user_role = rbac.get_user_role_from_token(token) or UserRole.STANDARD
+    
+    access_check = rbac.can_use_api(user_role, "document_generation")
+    if not access_check["has_access"]:
+        upgrade_info = rbac.get_upgrade_recommendation(user_role, "Document Generation API")
+        return {
+            "success": False,
+            "error": "Access denied",
+            "upgrade_info": upgrade_info
+        }
+    return None
+
+
+def _document_generation_service():
+    """Document generator; variable sections are drafted by the LLM when enabled."""
+    from app.services.document_generation_service import get_document_generation_service
+    from app.services.llm_client import LLMClient
+    drafting = settings is not None and settings.DOCUMENT_LLM_DRAFTING and chat_completion is not None
+    return get_document_generation_service(LLMClient(chat_completion) if drafting else None)
+
+
 @app.post("/api/legal/generate-document")
 async def generate_legal_document(request: DocumentGenerationRequest, authorization: Optional[str] = Header(None)):
     """
@@ -1535,26 +1734,12 @@ async def generate_legal_document(request: DocumentGenerationRequest, authorizat
     """
     try:
         # Check permissions
-        from app.services.rbac_service import get_rbac_service, UserRole
-        rbac = get_rbac_service()
-        
-        user_role = UserRole.STANDARD
-        if authorization:
-            token = authorization.replace("Bearer ", "")
-            user_role = rbac.get_user_role_from_token(token) or UserRole.STANDARD
-        
-        access_check = rbac.can_use_api(user_role, "document_generation")
-        if not access_check["has_access"]:
-            upgrade_info = rbac.get_upgrade_recommendation(user_role, "Document Generation API")
-            return {
-                "success": False,
-                "error": "Access denied",
-                "upgrade_info": upgrade_info
-            }
+        denial = _document_generation_denial(authorization)
+        if denial:
+            return denial
         
         # Use document generation service
-        from app.services.document_generation_service import get_document_generation_service
-        doc_gen_service = get_document_generation_service()
+        doc_gen_service = _document_generation_service()
         
         result = await doc_gen_service.generate_document(
             document_type=request.document_type,
@@ -1570,6 +1755,33 @@ async def generate_legal_document(request: DocumentGenerationRequest, authorizat
         raise HTTPException(status_code=500, detail=f"Document generation failed: {str(e)}")
 
 
+@app.post("/api/legal/generate-document/stream")
+async def stream_legal_document(request: DocumentGenerationRequest, authorization: Optional[str] = Header(None)):
+    """
+    Generate a legal document and stream it section by section.
+    
+    Returns newline-delimited JSON events: "start" (document metadata and
+    section names), one "section" per section in document order, then
+    "end" - or a single "error". Requires STANDARD role or higher.
+    """
+    denial = _document_generation_denial(authorization)
+    if denial:
+        return denial
+    
+    doc_gen_service = _document_generation_service()
+    
+    async def events():
+        async for event in doc_gen_service.stream_document(
+            document_type=request.document_type,
+            form_data=request.form_data,
+            jurisdiction=request.jurisdiction,
+            user_id=request.user_id
+        ):
+            yield json.dumps(event, ensure_ascii=False) + "\n"
+    
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+
 @app.post("/api/legal/search-statutes")
 async def search_statutes(
     query: str,
@@ -1821,7 +2033,8 @@ async def generate_ai_summary(request: GenerateSummaryRequest):
         
         result = await ai_summary_service.generate_case_summary(
             messages=request.messages,
-            metadata=request.metadata
+            metadata=request.metadata,
+            conversation_id=request.conversation_id
         )
         
         logger.info(f"[AI_SUMMARY] Summary generated successfully")
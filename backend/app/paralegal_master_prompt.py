@@ -3,6 +3,8 @@ LEGID PARALEGAL MASTER PROMPT
 Production-grade system prompt for paralegal-style legal intelligence
 """
 from typing import Optional, List, Dict
+from app.core.tracing import traced
+from app.rag.context_assembler import get_context_assembler
 
 PARALEGAL_MASTER_PROMPT = """SYSTEM / MASTER PROMPT — LEGID (Paralegal-Style Legal Intelligence Assistant)
 
@@ -184,6 +186,7 @@ END MASTER PROMPT.
 """
 
 
+@traced("prompt_build")
 def get_paralegal_prompt(
     question: str,
     document_chunks: Optional[List[Dict]] = None,
@@ -191,7 +194,8 @@ def get_paralegal_prompt(
     law_category: Optional[str] = None,
     language: str = 'en',
     conversation_history: Optional[List[Dict]] = None,
-    response_style: str = 'concise'
+    response_style: str = 'concise',
+    context_budget: Optional[int] = None
 ) -> List[Dict[str, str]]:
     """
     Build paralegal-style prompt with document citations.
@@ -204,6 +208,8 @@ def get_paralegal_prompt(
         language: Response language
         conversation_history: Previous messages
         response_style: 'concise', 'detailed', or 'legal_format'
+        context_budget: Token budget for document chunks and history
+            (defaults to settings.PROMPT_CONTEXT_TOKENS)
         
     Returns:
         List of messages for OpenAI API
@@ -212,14 +218,26 @@ def get_paralegal_prompt(
     # Build system prompt with context
     system_prompt = PARALEGAL_MASTER_PROMPT
     
+    # Fit document chunks and recent history (newest first, kept verbatim) into the token budget
+    recent_history = [
+        msg for msg in (conversation_history or [])[-6:]  # Last 6 for context
+        if msg.get('role') in ['user', 'assistant']
+    ]
+    assembled = get_context_assembler().assemble(
+        question,
+        {'documents': (document_chunks or [])[:5], 'history': list(reversed(recent_history))},
+        budget=context_budget
+    )
+    
     # Add document context if available
-    if document_chunks and len(document_chunks) > 0:
+    if assembled.sections['documents']:
         doc_context = "\n\n────────────────────────────────\nDOCUMENT CONTEXT (USE THESE FOR CITATIONS)\n────────────────────────────────\n\n"
         
-        for idx, chunk in enumerate(document_chunks[:5], 1):
+        for idx, passage in enumerate(assembled.sections['documents'], 1):
+            chunk = passage.metadata
             doc_name = chunk.get('metadata', {}).get('filename', chunk.get('filename', 'Unknown'))
             page = chunk.get('metadata', {}).get('page', chunk.get('page', 'unknown'))
-            text = chunk.get('text', chunk.get('content', ''))
+            text = passage.text
             source_type = chunk.get('metadata', {}).get('source_type', 'upload')
             
             doc_context += f"\n[CHUNK {idx}]\n"
@@ -248,14 +266,12 @@ def get_paralegal_prompt(
     # Build messages
     messages = [{"role": "system", "content": system_prompt}]
     
-    # Add conversation history for context
-    if conversation_history:
-        for msg in conversation_history[-6:]:  # Last 6 for context
-            if msg.get('role') in ['user', 'assistant']:
-                messages.append({
-                    "role": msg['role'],
-                    "content": msg.get('content', '')
-                })
+    # Add conversation history for context (oldest first)
+    for passage in reversed(assembled.sections['history']):
+        messages.append({
+            "role": passage.metadata['role'],
+            "content": passage.text
+        })
     
     # Add current question
     messages.append({"role": "user", "content": question})
@@ -0,0 +1,331 @@
+"""Sentence- and section-aware text chunker shared by all ingestion paths.
+
+Text is segmented in a single forward pass with one regex scan: every
+sentence end or line break becomes a candidate boundary, and lines that
+open a new Part / Section / numbered provision are marked as section
+boundaries. Segments are then packed greedily into chunks of at most
+`chunk_size` characters, carrying whole trailing segments forward as
+overlap. Chunks are slices of the original text and carry both character
+and UTF-8 byte offsets.
+
+Input may be a string or an iterable of text pieces (e.g. pages); only the
+current chunk window and an unterminated tail are held in memory, so the
+cost is linear in the input and independent of document size.
+"""
+import re
+import logging
+from collections import deque
+from typing import Deque, Iterable, Iterator, List, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# Boundary strength of the break in front of a segment
+WORD_BREAK = 0
+SENTENCE_BREAK = 1
+PARAGRAPH_BREAK = 2
+SECTION_BREAK = 3
+
+# Sentence end (with closing quotes/brackets) followed by spaces, or any
+# whitespace run containing a line break.
+_BREAK_RE = re.compile(
+    r"[.!?;][\"'\)\]”’]*([ \t]+)(?=\S)"
+    r"|([ \t\r\f\v]*\n\s*)(?=\S)"
+)
+
+# Headings that open a new provision in statutes, regulations and contracts
+_SECTION_RE = re.compile(
+    r"(?:PART|Part|DIVISION|Division|SECTION|Section|CHAPTER|Chapter|ARTICLE|Article|"
+    r"SCHEDULE|Schedule|APPENDIX|Appendix)\s+[0-9IVXLC]+[A-Za-z]?\b"
+    r"|§\s*\d"
+    r"|\d+(?:\.\d+)*\.?\s+[A-Z(“\"]"
+)
+
+_WHITESPACE_RE = re.compile(r"\s")
+
+# Characters that must follow a break before it is final when streaming
+_LOOKAHEAD = 32
+
+# Unterminated tail kept between pieces before it is force-split
+_MAX_TAIL_FACTOR = 4
+
+
+class TextChunk:
+    """A chunk of the source text with its position."""
+
+    __slots__ = ('index', 'text', 'start', 'end', 'byte_start', 'byte_end', 'section')
+
+    def __init__(
+        self,
+        index: int,
+        text: str,
+        start: int,
+        end: int,
+        byte_start: int,
+        byte_end: int,
+        section: Optional[str] = None
+    ):
+        self.index = index
+        self.text = text
+        self.start = start
+        self.end = end
+        self.byte_start = byte_start
+        self.byte_end = byte_end
+        self.section = section
+
+    def offsets(self) -> dict:
+        """Offset metadata attached to indexed chunks."""
+        offsets = {
+            'char_start': self.start,
+            'char_end': self.end,
+            'byte_start': self.byte_start,
+            'byte_end': self.byte_end,
+        }
+        if self.section:
+            offsets['section'] = self.section
+        return offsets
+
+    def __repr__(self) -> str:
+        return f"TextChunk(index={self.index}, start={self.start}, end={self.end}, len={len(self.text)})"
+
+
+class _Segment:
+    """Contiguous run of source text: content followed by its trailing whitespace."""
+
+    __slots__ = ('raw', 'start', 'byte_start', 'content_len', 'strength', 'section')
+
+    def __init__(self, raw: str, start: int, byte_start: int, content_len: int, strength: int,
+                 section: Optional[str]):
+        self.raw = raw
+        self.start = start
+        self.byte_start = byte_start
+        self.content_len = content_len
+        self.strength = strength
+        self.section = section
+
+    @property
+    def content_end(self) -> int:
+        return self.start + self.content_len
+
+
+class TextChunker:
+    """Single-pass greedy chunker over sentence/section segments."""
+
+    def __init__(self, chunk_size: int = 1000, overlap: int = 200, respect_sections: bool = True):
+        """
+        Initialize the chunker.
+
+        Args:
+            chunk_size: Maximum chunk length in characters
+            overlap: Trailing characters (whole segments) repeated at the start of the next chunk
+            respect_sections: Start a new chunk at section headings once the current
+                chunk is at least half full
+        """
+        if chunk_size <= 0:
+            raise ValueError("chunk_size must be positive")
+        self.chunk_size = chunk_size
+        self.overlap = max(0, min(overlap, chunk_size // 2))
+        self.respect_sections = respect_sections
+        self.min_section_fill = chunk_size // 2
+
+    # ----- segmentation -----
+
+    def _split_long(self, text: str, strength: int) -> List[Tuple[str, int, int]]:
+        """Split text longer than chunk_size at whitespace, else hard. Returns (raw, content_len, strength)."""
+        pieces = []
+        pos = 0
+        limit = self.chunk_size
+        while len(text) - pos > limit:
+            cut = -1
+            # Bounded look-back, so the whole split stays linear
+            for match in _WHITESPACE_RE.finditer(text, pos + limit // 2, pos + limit + 1):
+                cut = match.start()
+            if cut <= pos:
+                cut = pos + limit
+            end = cut
+            while end < len(text) and text[end].isspace():
+                end += 1
+            pieces.append((text[pos:end], cut - pos, strength))
+            strength = WORD_BREAK
+            pos = end
+        if pos < len(text):
+            rest = text[pos:]
+            pieces.append((rest, len(rest.rstrip()), strength))
+        return pieces
+
+    def _segments(self, pieces: Iterable[str]) -> Iterator[_Segment]:
+        """Yield segments in order, each tagged with the section heading in effect."""
+        offset = 0        # char offset of buffer[0] in the stream
+        byte_offset = 0   # byte offset of buffer[0] in the stream
+        buffer = ""
+        strength = PARAGRAPH_BREAK
+        section: Optional[str] = None
+        leading = True
+        max_tail = self.chunk_size * _MAX_TAIL_FACTOR
+
+        def make(raw: str, content_len: int, seg_strength: int) -> _Segment:
+            nonlocal offset, byte_offset, section
+            if seg_strength == SECTION_BREAK:
+                section = raw[:content_len].split('\n', 1)[0][:120]
+            segment = _Segment(raw, offset, byte_offset, content_len, seg_strength, section)
+            offset += len(raw)
+            byte_offset += len(raw.encode('utf-8'))
+            return segment
+
+        def scan(final: bool) -> Iterator[_Segment]:
+            nonlocal buffer, strength
+            seg_start = 0
+            for match in _BREAK_RE.finditer(buffer):
+                if not final and len(buffer) - match.end() < _LOOKAHEAD:
+                    # Heading detection needs the text after the break
+                    break
+                if match.group(1) is not None:
+                    next_strength = SENTENCE_BREAK
+                else:
+                    next_strength = PARAGRAPH_BREAK if match.group(2).count('\n') > 1 else SENTENCE_BREAK
+                    if _SECTION_RE.match(buffer, match.end()):
+                        next_strength = SECTION_BREAK
+                for raw, content_len, seg_strength in self._split_long(buffer[seg_start:match.end()], strength):
+                    yield make(raw, content_len, seg_strength)
+                seg_start = match.end()
+                strength = next_strength
+            buffer = buffer[seg_start:]
+
+            if final:
+                if buffer.strip():
+                    for raw, content_len, seg_strength in self._split_long(buffer, strength):
+                        yield make(raw, content_len, seg_strength)
+                buffer = ""
+            elif len(buffer) > max_tail:
+                # No boundary in a long run (e.g. OCR output without punctuation);
+                # keep the last chunk_size characters in case a break follows
+                split = self._split_long(buffer[:-self.chunk_size], strength)[:-1]
+                for raw, content_len, seg_strength in split:
+                    yield make(raw, content_len, seg_strength)
+                    strength = WORD_BREAK
+                buffer = buffer[sum(len(raw) for raw, _, _ in split):]
+
+        for piece in pieces:
+            if not piece:
+                continue
+            buffer += piece
+            if leading:
+                stripped = buffer.lstrip()
+                if len(stripped) < _LOOKAHEAD:
+                    continue
+                skipped = len(buffer) - len(stripped)
+                offset += skipped
+                byte_offset += len(buffer[:skipped].encode('utf-8'))
+                buffer = stripped
+                if not buffer:
+                    continue
+                leading = False
+                if _SECTION_RE.match(buffer):
+                    strength = SECTION_BREAK
+            yield from scan(final=False)
+
+        if leading:
+            stripped = buffer.lstrip()
+            skipped = len(buffer) - len(stripped)
+            offset += skipped
+            byte_offset += len(buffer[:skipped].encode('utf-8'))
+            buffer = stripped
+            if _SECTION_RE.match(buffer):
+                strength = SECTION_BREAK
+        yield from scan(final=True)
+
+    # ----- packing -----
+
+    def iter_chunks(self, text: Union[str, Iterable[str]]) -> Iterator[TextChunk]:
+        """
+        Stream chunks for a text or an iterable of consecutive text pieces.
+
+        Args:
+            text: Full text, or pieces concatenated as-is (add your own page separators)
+
+        Yields:
+            TextChunk objects in document order
+        """
+        pieces = (text,) if isinstance(text, str) else text
+        window: Deque[_Segment] = deque()
+        carried_end = 0  # end of the overlap carried into the window
+        index = 0
+
+        for segment in self._segments(pieces):
+            if window:
+                section_cut = (self.respect_sections and segment.strength == SECTION_BREAK
+                               and window[-1].content_end - carried_end >= self.min_section_fill)
+                if section_cut or segment.content_end - window[0].start > self.chunk_size:
+                    yield self._build(index, window)
+                    index += 1
+                    if section_cut:
+                        # No overlap across provisions
+                        window.clear()
+                        carried_end = 0
+                    else:
+                        # Keep whole trailing segments that fit in the overlap
+                        # (never the whole window, so every chunk makes progress)
+                        end = window[-1].content_end
+                        window.popleft()
+                        while window and (end - window[0].start > self.overlap
+                                          or segment.content_end - window[0].start > self.chunk_size):
+                            window.popleft()
+                        carried_end = window[-1].content_end if window else 0
+            if not window:
+                carried_end = segment.start
+            window.append(segment)
+
+        if window:
+            yield self._build(index, window)
+
+    @staticmethod
+    def _build(index: int, window: Deque[_Segment]) -> TextChunk:
+        first, last = window[0], window[-1]
+        chunk_text = "".join(s.raw for s in window)[:last.content_end - first.start]
+        return TextChunk(
+            index=index,
+            text=chunk_text,
+            start=first.start,
+            end=last.content_end,
+            byte_start=first.byte_start,
+            byte_end=first.byte_start + len(chunk_text.encode('utf-8')),
+            section=first.section
+        )
+
+    def chunk(self, text: Union[str, Iterable[str]]) -> List[TextChunk]:
+        """All chunks for a text (see iter_chunks)."""
+        return list(self.iter_chunks(text))
+
+    def split_text(self, text: str) -> List[str]:
+        """Chunk texts only."""
+        return [c.text for c in self.iter_chunks(text)]
+
+
+def chunk_parent_child(
+    text: Union[str, Iterable[str]],
+    parent_size: int,
+    parent_overlap: int,
+    child_size: int,
+    child_overlap: int
+) -> Iterator[Tuple[TextChunk, List[TextChunk]]]:
+    """
+    Stream (parent, children) pairs.
+
+    Children are produced by the same chunker over each parent's text and
+    their offsets are translated back into the source document.
+    """
+    child_chunker = TextChunker(child_size, child_overlap)
+    for parent in TextChunker(parent_size, parent_overlap).iter_chunks(text):
+        children = []
+        for child in child_chunker.iter_chunks(parent.text):
+            child.start += parent.start
+            child.end += parent.start
+            child.byte_start += parent.byte_start
+            child.byte_end += parent.byte_start
+            child.section = child.section or parent.section
+            children.append(child)
+        yield parent, children
+
+
+def split_text(text: str, chunk_size: int = 1000, overlap: int = 200) -> List[str]:
+    """Convenience wrapper returning chunk texts."""
+    return TextChunker(chunk_size, overlap).split_text(text)
@@ -0,0 +1,348 @@
+"""Token-budgeted context assembly for LLM prompts.
+
+Retrieved chunks, case citations, court information and history are fitted
+into a fixed token budget instead of being concatenated whole:
+
+- tokens are counted locally (tiktoken when installed, else ~4 chars/token)
+- every section gets a share of the budget; unused share rolls over to
+  the sections after it
+- near-duplicate passages (e.g. a child chunk already inside its parent
+  context) are dropped
+- passages longer than the per-passage limit are reduced to their most
+  query-relevant sentences, always keeping sentences that carry a
+  statute or case citation, in original order
+- conversation history is kept verbatim: turns are never deduplicated or
+  compressed (a repeated "yes" is still an answer), and when the history
+  does not fit, whole turns are dropped, oldest first
+
+Passages are considered in the order given (best first), so the sources
+that rank highest are the ones whose citations survive.
+"""
+import re
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    TIKTOKEN_AVAILABLE = False
+
+# Default split of the budget between prompt sections
+DEFAULT_SECTION_SHARES: Dict[str, float] = {
+    'documents': 0.6,
+    'case_law': 0.2,
+    'court_info': 0.1,
+    'history': 0.1,
+}
+# Sections passed newest first whose passages are kept whole or dropped
+VERBATIM_SECTIONS = frozenset({'history'})
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+_SENTENCE_RE = re.compile(r"(?<=[.!?;])[\"'\)\]”’]*\s+(?=[A-Z0-9(“\"§])|\n\s*\n|\n(?=\s*(?:\(?[0-9a-z]{1,3}[.)]|[-•*])\s)")
+# Statute sections, subsections, case citations and neutral citations
+_CITATION_RE = re.compile(
+    r"\b(?:s|ss|sec|section|art|article|reg|rule)\.?\s*\d+"
+    r"|§\s*\d+"
+    r"|\b\d{4}\s+[A-Z]{2,6}\s+\d+"
+    r"|\b[A-Z][\w.'-]*\s+v\.?\s+[A-Z]"
+    r"|\[\d{4}\]"
+    r"|\bR\.S\.[A-Z]\.|\bS\.[A-Z]\.\s*\d{4}|\bO\.\s*Reg\.",
+    re.IGNORECASE
+)
+_STOPWORDS = frozenset(
+    "a an the and or of to in on at for by with from is are was were be been it this that these those "
+    "i me my we our you your he she they them what which who whom how when where why can could should "
+    "would will do does did have has had not no if then than so as about into over under any all".split()
+)
+# Abbreviations that end in a period without ending the sentence ("R. v. Smith", "s. 128")
+_ABBREVIATION_RE = re.compile(r"(?:\b(?:[A-Za-z]|v|vs|no|nos|ss|reg|regs|art|sec|para|cf|e\.g|i\.e|etc|st|mr|mrs|ms|dr|jr|inc|ltd|co)\.)$", re.IGNORECASE)
+_GAP = "…"
+
+_encoding = None
+
+
+def count_tokens(text: str) -> int:
+    """Number of tokens in text for the chat models (estimated without tiktoken)."""
+    global _encoding
+    if not text:
+        return 0
+    if TIKTOKEN_AVAILABLE:
+        if _encoding is None:
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        return len(_encoding.encode(text, disallowed_special=()))
+    return (len(text) + 3) // 4
+
+
+def _terms(text: str) -> Set[str]:
+    return {w for w in _WORD_RE.findall(text.lower()) if w not in _STOPWORDS and len(w) > 1}
+
+
+def _shingles(text: str, size: int = 3) -> Set[str]:
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def split_sentences(text: str) -> List[str]:
+    """Split text into sentences / list items, keeping non-empty pieces."""
+    sentences: List[str] = []
+    for piece in _SENTENCE_RE.split(text):
+        piece = piece.strip() if piece else ""
+        if not piece:
+            continue
+        if sentences and _ABBREVIATION_RE.search(sentences[-1]):
+            sentences[-1] = f"{sentences[-1]} {piece}"
+        else:
+            sentences.append(piece)
+    return sentences
+
+
+def extract_relevant(text: str, query: str, max_tokens: int) -> str:
+    """
+    Reduce text to its most query-relevant sentences within max_tokens.
+
+    Citation-bearing sentences get a bonus so references survive; selected
+    sentences keep their original order and gaps are marked with an ellipsis.
+    """
+    if count_tokens(text) <= max_tokens:
+        return text
+    sentences = split_sentences(text)
+    query_terms = _terms(query)
+    scored = []
+    for position, sentence in enumerate(sentences):
+        terms = _terms(sentence)
+        overlap = len(terms & query_terms) / (len(query_terms) or 1)
+        bonus = 0.5 if _CITATION_RE.search(sentence) else 0.0
+        # Slight preference for earlier sentences (definitions, headings)
+        scored.append((overlap + bonus - position * 1e-3, position, sentence))
+
+    chosen: List[Tuple[int, str]] = []
+    picked: Set[str] = set()
+    used = 0
+    for _, position, sentence in sorted(scored, reverse=True):
+        key = " ".join(_WORD_RE.findall(sentence.lower()))
+        if key in picked:
+            continue
+        cost = count_tokens(sentence) + 1
+        if used + cost > max_tokens:
+            continue
+        chosen.append((position, sentence))
+        picked.add(key)
+        used += cost
+    if not chosen:
+        return _truncate(text, max_tokens)
+
+    parts = []
+    previous = -1
+    for position, sentence in sorted(chosen):
+        if parts and position != previous + 1:
+            parts.append(_GAP)
+        parts.append(sentence)
+        previous = position
+    return " ".join(parts)
+
+
+def _truncate(text: str, max_tokens: int) -> str:
+    """Cut text to about max_tokens at a word boundary."""
+    if max_tokens <= 0:
+        return ""
+    if TIKTOKEN_AVAILABLE and count_tokens(text) > max_tokens:
+        return _encoding.decode(_encoding.encode(text, disallowed_special=())[:max_tokens]).rsplit(" ", 1)[0] + "…"
+    limit = max_tokens * 4
+    if len(text) <= limit:
+        return text
+    return text[:limit].rsplit(" ", 1)[0] + "…"
+
+
+@dataclass
+class Passage:
+    """A piece of context plus the metadata needed to cite it."""
+    text: str
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    tokens: int = 0
+    compressed: bool = False
+
+
+@dataclass
+class AssembledContext:
+    """Passages chosen per section and the budget they used."""
+    sections: Dict[str, List[Passage]]
+    tokens_used: int
+    budget: int
+    dropped_duplicates: int = 0
+    dropped_over_budget: int = 0
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            'tokens_used': self.tokens_used,
+            'budget': self.budget,
+            'passages': {name: len(passages) for name, passages in self.sections.items()},
+            'dropped_duplicates': self.dropped_duplicates,
+            'dropped_over_budget': self.dropped_over_budget,
+        }
+
+
+class ContextAssembler:
+    """Fits prompt sections into a token budget."""
+
+    def __init__(
+        self,
+        budget: Optional[int] = None,
+        shares: Optional[Dict[str, float]] = None,
+        passage_max_tokens: Optional[int] = None,
+        dedup_threshold: Optional[float] = None,
+        min_passage_tokens: int = 40,
+        verbatim_sections: Optional[Set[str]] = None
+    ):
+        """
+        Initialize the assembler.
+
+        Args:
+            budget: Total context tokens (defaults to settings.PROMPT_CONTEXT_TOKENS)
+            shares: Fraction of the budget per section name
+            passage_max_tokens: Longer passages are reduced to relevant sentences
+            dedup_threshold: Shingle containment at or above which a passage is a duplicate
+            min_passage_tokens: Smallest useful remainder to fill with a compressed passage
+            verbatim_sections: Sections (given newest first) that are neither
+                deduplicated nor compressed; once a passage does not fit, it
+                and every older one are dropped
+        """
+        self.budget = budget or settings.PROMPT_CONTEXT_TOKENS
+        self.shares = shares or DEFAULT_SECTION_SHARES
+        self.passage_max_tokens = passage_max_tokens or settings.PROMPT_PASSAGE_MAX_TOKENS
+        self.dedup_threshold = dedup_threshold if dedup_threshold is not None else settings.PROMPT_DEDUP_THRESHOLD
+        self.min_passage_tokens = min_passage_tokens
+        self.verbatim_sections = verbatim_sections if verbatim_sections is not None else VERBATIM_SECTIONS
+
+    def assemble(
+        self,
+        query: str,
+        sections: Dict[str, Sequence[Any]],
+        budget: Optional[int] = None
+    ) -> AssembledContext:
+        """
+        Choose and compress passages for each section within the budget.
+
+        Args:
+            query: The user's question (drives sentence extraction)
+            sections: Section name -> passages, best first; items may be
+                Passage objects, strings or dicts with 'text'/'content'
+            budget: Override of the total budget for this prompt
+
+        Returns:
+            AssembledContext with the kept passages per section
+        """
+        budget = budget or self.budget
+        present = [name for name, items in sections.items() if items]
+        total_share = sum(self.shares.get(name, 0.1) for name in present) or 1.0
+        result = AssembledContext(sections={name: [] for name in sections}, tokens_used=0, budget=budget)
+
+        seen: List[Set[str]] = []
+        carry = 0
+        for name in present:
+            allowance = int(budget * self.shares.get(name, 0.1) / total_share) + carry
+            used = 0
+            if name in self.verbatim_sections:
+                used = self._fill_verbatim(sections[name], allowance, result, result.sections[name])
+                carry = max(allowance - used, 0)
+                result.tokens_used += used
+                continue
+            for item in sections[name]:
+                passage = self._passage(item)
+                if not passage.text.strip():
+                    continue
+                shingles = _shingles(passage.text)
+                if self._is_duplicate(shingles, seen):
+                    result.dropped_duplicates += 1
+                    continue
+
+                limit = min(self.passage_max_tokens, allowance - used)
+                if limit < self.min_passage_tokens and passage.tokens > limit:
+                    result.dropped_over_budget += 1
+                    continue
+                if passage.tokens > limit:
+                    passage.text = extract_relevant(passage.text, query, limit)
+                    passage.tokens = count_tokens(passage.text)
+                    passage.compressed = True
+                if used + passage.tokens > allowance:
+                    result.dropped_over_budget += 1
+                    continue
+
+                seen.append(shingles)
+                result.sections[name].append(passage)
+                used += passage.tokens
+            carry = max(allowance - used, 0)
+            result.tokens_used += used
+
+        logger.debug(f"Assembled prompt context: {result.report()}")
+        return result
+
+    def _fill_verbatim(
+        self,
+        items: Sequence[Any],
+        allowance: int,
+        result: AssembledContext,
+        kept: List[Passage]
+    ) -> int:
+        """Keep whole passages (newest first) until one does not fit; returns tokens used."""
+        used = 0
+        for position, item in enumerate(items):
+            passage = self._passage(item)
+            if not passage.text.strip():
+                continue
+            if used + passage.tokens > allowance:
+                result.dropped_over_budget += len(items) - position
+                break
+            kept.append(passage)
+            used += passage.tokens
+        return used
+
+    def fit(self, text: str, query: str, max_tokens: int) -> str:
+        """Fit a single block of text (e.g. pre-formatted citations) into max_tokens."""
+        return extract_relevant(text, query, max_tokens) if text else text
+
+    def _passage(self, item: Any) -> Passage:
+        if isinstance(item, Passage):
+            passage = Passage(item.text, dict(item.metadata))
+        elif isinstance(item, str):
+            passage = Passage(item)
+        else:
+            text = item.get('text') or item.get('content') or ''
+            passage = Passage(text, item)
+        passage.tokens = count_tokens(passage.text)
+        return passage
+
+    def _is_duplicate(self, shingles: Set[str], seen: List[Set[str]]) -> bool:
+        # How much of the new passage is already kept: a chunk inside a larger kept passage
+        # is dropped, a larger passage around a kept chunk is not
+        if not shingles:
+            return False
+        for other in seen:
+            if len(shingles & other) / len(shingles) >= self.dedup_threshold:
+                return True
+        return False
+
+    def section_budget(self, name: str, present: Sequence[str], budget: Optional[int] = None) -> int:
+        """Tokens a section gets when the given sections are present."""
+        budget = budget or self.budget
+        total_share = sum(self.shares.get(n, 0.1) for n in present) or 1.0
+        return int(budget * self.shares.get(name, 0.1) / total_share)
+
+
+# Global singleton instance
+_context_assembler: Optional[ContextAssembler] = None
+
+
+def get_context_assembler() -> ContextAssembler:
+    """Get or create the global context assembler."""
+    global _context_assembler
+    if _context_assembler is None:
+        _context_assembler = ContextAssembler()
+    return _context_assembler
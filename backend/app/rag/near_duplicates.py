@@ -0,0 +1,351 @@
+"""Near-duplicate chunk detection for ingestion (MinHash + LSH).
+
+Amended and re-published statutes produce chunks that differ by a few
+words. Each chunk is reduced to a MinHash signature over word shingles;
+LSH banding finds previously indexed chunks whose estimated Jaccard
+similarity is above the threshold, so they can be skipped (and optionally
+linked to the canonical chunk) instead of being embedded and indexed again.
+
+Chunks are only compared within a namespace. Uploads use one namespace per
+user or organization (dedup_namespace), so one tenant's chunks never stand
+in for another's; the shared statute corpora use the bare corpus name.
+Linked duplicates are resolved to their canonical chunk at search time by
+the stores (aliases). forget_source() removes a deleted document and the
+links to its chunks; the linked duplicates were never embedded, so they are
+indexed again the next time their documents are ingested.
+"""
+import re
+import sqlite3
+import hashlib
+import logging
+from pathlib import Path
+from threading import Lock
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS signatures (
+    namespace TEXT NOT NULL,
+    chunk_key TEXT NOT NULL,
+    signature BLOB NOT NULL,
+    source TEXT,
+    PRIMARY KEY (namespace, chunk_key)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS buckets (
+    namespace TEXT NOT NULL,
+    bucket TEXT NOT NULL,
+    chunk_key TEXT NOT NULL,
+    PRIMARY KEY (namespace, bucket, chunk_key)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS links (
+    namespace TEXT NOT NULL,
+    chunk_key TEXT NOT NULL,
+    canonical_key TEXT NOT NULL,
+    similarity REAL NOT NULL,
+    source TEXT,
+    PRIMARY KEY (namespace, chunk_key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_links_canonical ON links(namespace, canonical_key);
+CREATE INDEX IF NOT EXISTS idx_links_source ON links(source);
+"""
+
+
+def dedup_namespace(corpus: str, tenant: Optional[str] = None) -> str:
+    """Namespace for a corpus; a tenant's chunks are only compared with the same tenant's."""
+    return f"{corpus}:{tenant}" if tenant else corpus
+
+
+def _lsh_params(threshold: float, num_perm: int) -> Tuple[int, int]:
+    """(bands, rows) whose S-curve midpoint (1/b)^(1/r) is closest to threshold."""
+    best = (1, num_perm)
+    best_err = float("inf")
+    for rows in range(1, num_perm + 1):
+        bands = num_perm // rows
+        err = abs((1.0 / bands) ** (1.0 / rows) - threshold)
+        if err < best_err:
+            best, best_err = (bands, rows), err
+    return best
+
+
+class MinHasher:
+    """MinHash signatures over word shingles."""
+
+    def __init__(self, num_perm: int = 128, shingle_size: int = 5, seed: int = 1):
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, 1 << 32, size=num_perm, dtype=np.uint64)
+        self._b = rng.randint(0, 1 << 32, size=num_perm, dtype=np.uint64)
+
+    def shingles(self, text: str) -> List[str]:
+        tokens = _TOKEN_RE.findall(text.lower())
+        if len(tokens) < self.shingle_size:
+            return [" ".join(tokens)] if tokens else []
+        return [" ".join(tokens[i:i + self.shingle_size]) for i in range(len(tokens) - self.shingle_size + 1)]
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        """uint64 signature of length num_perm, or None for empty text."""
+        shingles = set(self.shingles(text))
+        if not shingles:
+            return None
+        hashes = np.fromiter(
+            (int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "little")
+             for s in shingles),
+            dtype=np.uint64, count=len(shingles)
+        )
+        # (a*x + b) mod p, truncated to 32 bits, minimised over shingles
+        permuted = (np.outer(hashes, self._a) + self._b) % _MERSENNE_PRIME & _MAX_HASH
+        return permuted.min(axis=0)
+
+
+class DedupResult:
+    """Outcome of checking a batch of chunks against the index."""
+
+    def __init__(self):
+        self.kept: List[Any] = []
+        self.duplicates: List[Tuple[Any, str, str, float]] = []  # (item, key, canonical_key, similarity)
+        self.pending: List[Tuple[str, np.ndarray]] = []  # signatures to register once indexed
+        self.chars_checked = 0
+        self.chars_skipped = 0
+
+    def report(self, vector_dim: Optional[int] = None) -> Dict[str, Any]:
+        """Space saved by this batch."""
+        total = len(self.kept) + len(self.duplicates)
+        report = {
+            'chunks_checked': total,
+            'chunks_kept': len(self.kept),
+            'duplicates_skipped': len(self.duplicates),
+            'chars_skipped': self.chars_skipped,
+            'duplicate_ratio': round(len(self.duplicates) / total, 4) if total else 0.0,
+        }
+        if vector_dim:
+            report['vector_bytes_saved'] = len(self.duplicates) * vector_dim * 4
+        return report
+
+
+class NearDuplicateIndex:
+    """Persistent MinHash/LSH index of already-ingested chunks."""
+
+    def __init__(
+        self,
+        db_path: Optional[str] = None,
+        threshold: Optional[float] = None,
+        num_perm: Optional[int] = None,
+        action: Optional[str] = None
+    ):
+        """
+        Initialize the near-duplicate index.
+
+        Args:
+            db_path: SQLite file (defaults to settings.NEAR_DUP_INDEX_PATH)
+            threshold: Estimated Jaccard similarity at or above which a chunk is a duplicate
+            num_perm: MinHash permutations
+            action: "drop" to skip duplicates, "link" to also record them against the canonical chunk
+        """
+        self.threshold = threshold if threshold is not None else settings.NEAR_DUP_THRESHOLD
+        self.action = action or settings.NEAR_DUP_ACTION
+        self.hasher = MinHasher(num_perm=num_perm or settings.NEAR_DUP_NUM_PERM)
+        self.bands, self.rows = _lsh_params(self.threshold, self.hasher.num_perm)
+        self._lock = Lock()
+
+        db_path = db_path or settings.NEAR_DUP_INDEX_PATH
+        if db_path != ':memory:':
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(signatures)")}
+            if 'source' not in columns:  # index files written before sources were recorded
+                self._conn.execute("ALTER TABLE signatures ADD COLUMN source TEXT")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_signatures_source ON signatures(source)")
+            self._conn.commit()
+        logger.info(f"Near-duplicate index ready: {db_path} "
+                    f"(threshold={self.threshold}, bands={self.bands}, rows={self.rows})")
+
+    def _buckets(self, signature: np.ndarray) -> List[str]:
+        return [
+            f"{band}:{hashlib.blake2b(signature[band * self.rows:(band + 1) * self.rows].tobytes(), digest_size=8).hexdigest()}"
+            for band in range(self.bands)
+        ]
+
+    def _candidates(self, namespace: str, buckets: List[str]) -> Dict[str, np.ndarray]:
+        placeholders = ",".join("?" * len(buckets))
+        rows = self._conn.execute(
+            f"SELECT DISTINCT s.chunk_key, s.signature FROM buckets b "
+            f"JOIN signatures s ON s.namespace = b.namespace AND s.chunk_key = b.chunk_key "
+            f"WHERE b.namespace = ? AND b.bucket IN ({placeholders})",
+            [namespace, *buckets]
+        ).fetchall()
+        return {key: np.frombuffer(blob, dtype=np.uint64) for key, blob in rows}
+
+    def check(
+        self,
+        namespace: str,
+        items: List[Any],
+        get_text: Callable[[Any], str],
+        get_key: Callable[[Any], str]
+    ) -> DedupResult:
+        """
+        Split a batch into kept chunks and near-duplicates.
+
+        Chunks are compared against everything already registered in the
+        namespace and against earlier chunks of the same batch. Kept
+        chunks are not registered until register() is called, so a failed
+        ingest does not poison the index.
+        """
+        result = DedupResult()
+        batch: Dict[str, np.ndarray] = {}
+        batch_buckets: Dict[str, List[str]] = {}
+
+        with self._lock:
+            for item in items:
+                text = get_text(item) or ""
+                result.chars_checked += len(text)
+                signature = self.hasher.signature(text)
+                if signature is None:
+                    result.kept.append(item)
+                    continue
+
+                buckets = self._buckets(signature)
+                candidates = self._candidates(namespace, buckets)
+                for bucket in buckets:
+                    for key in batch_buckets.get(bucket, ()):
+                        candidates[key] = batch[key]
+                best_key, best_sim = None, 0.0
+                for key, other in candidates.items():
+                    similarity = float(np.mean(signature == other))
+                    if similarity > best_sim:
+                        best_key, best_sim = key, similarity
+
+                key = get_key(item)
+                if best_key is not None and best_sim >= self.threshold:
+                    result.duplicates.append((item, key, best_key, best_sim))
+                    result.chars_skipped += len(text)
+                else:
+                    result.kept.append(item)
+                    result.pending.append((key, signature))
+                    batch[key] = signature
+                    for bucket in buckets:
+                        batch_buckets.setdefault(bucket, []).append(key)
+
+        if result.duplicates:
+            logger.info(f"Near-duplicate check [{namespace}]: {result.report()}")
+        return result
+
+    def register(self, namespace: str, result: DedupResult, source: Optional[str] = None):
+        """Record kept chunks (and duplicate links) after they were indexed."""
+        with self._lock, self._conn:
+            for key, signature in result.pending:
+                self._add_signature(namespace, key, signature.tobytes(), source)
+            if self.action == "link":
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO links (namespace, chunk_key, canonical_key, similarity, source) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    [(namespace, key, canonical, similarity, source)
+                     for _, key, canonical, similarity in result.duplicates]
+                )
+        result.pending = []
+
+    def _add_signature(self, namespace: str, key: str, blob: bytes, source: Optional[str]):
+        self._conn.execute(
+            "INSERT OR REPLACE INTO signatures (namespace, chunk_key, signature, source) VALUES (?, ?, ?, ?)",
+            (namespace, key, blob, source)
+        )
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO buckets (namespace, bucket, chunk_key) VALUES (?, ?, ?)",
+            [(namespace, bucket, key) for bucket in self._buckets(np.frombuffer(blob, dtype=np.uint64))]
+        )
+
+    def forget_source(self, source: str, namespace: str) -> int:
+        """
+        Remove a deleted document's signatures, its own links and the links
+        other documents' duplicates had to its chunks.
+
+        Links are dropped rather than handed to a duplicate: a duplicate was
+        never embedded, so later chunks must not be skipped in its favour.
+
+        Returns:
+            Number of signatures removed
+        """
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM links WHERE namespace = ? AND source = ?", (namespace, source))
+            keys = [(namespace, key) for key, in self._conn.execute(
+                "SELECT chunk_key FROM signatures WHERE namespace = ? AND source = ?", (namespace, source)
+            )]
+            self._conn.executemany("DELETE FROM signatures WHERE namespace = ? AND chunk_key = ?", keys)
+            self._conn.executemany("DELETE FROM buckets WHERE namespace = ? AND chunk_key = ?", keys)
+            dropped = sum(
+                self._conn.execute(
+                    "DELETE FROM links WHERE namespace = ? AND canonical_key = ?", key
+                ).rowcount
+                for key in keys
+            )
+        if keys:
+            logger.info(f"Near-duplicate index [{namespace}]: forgot {len(keys)} chunks of {source} "
+                        f"({dropped} linked duplicates dropped)")
+        return len(keys)
+
+    def get_links(self, namespace: str, canonical_key: str) -> List[Dict[str, Any]]:
+        """Sources whose duplicate chunks were linked to a canonical chunk."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT chunk_key, similarity, source FROM links WHERE namespace = ? AND canonical_key = ?",
+                (namespace, canonical_key)
+            ).fetchall()
+        return [{'chunk_key': k, 'similarity': s, 'source': src} for k, s, src in rows]
+
+    def links_for(self, canonical_keys: List[str], corpus: Optional[str] = None) -> Dict[str, List[Dict[str, Any]]]:
+        """Linked duplicates of several canonical chunks (optionally only in one corpus's namespaces)."""
+        if not canonical_keys:
+            return {}
+        placeholders = ",".join("?" * len(canonical_keys))
+        scope, params = ("AND (namespace = ? OR namespace LIKE ?)", [corpus, f"{corpus}:%"]) if corpus else ("", [])
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT canonical_key, chunk_key, similarity, source FROM links "
+                f"WHERE canonical_key IN ({placeholders}) {scope}",
+                [*canonical_keys, *params]
+            ).fetchall()
+        links: Dict[str, List[Dict[str, Any]]] = {}
+        for canonical, key, similarity, source in rows:
+            links.setdefault(canonical, []).append({'chunk_key': key, 'similarity': similarity, 'source': source})
+        return links
+
+    def stats(self, namespace: Optional[str] = None) -> Dict[str, Any]:
+        """Registered chunk and link counts (a bare corpus name covers all of its tenants)."""
+        where, params = (
+            ("WHERE namespace = ? OR namespace LIKE ?", [namespace, f"{namespace}:%"]) if namespace else ("", [])
+        )
+        with self._lock:
+            chunks = self._conn.execute(f"SELECT COUNT(*) FROM signatures {where}", params).fetchone()[0]
+            links = self._conn.execute(f"SELECT COUNT(*) FROM links {where}", params).fetchone()[0]
+        return {'indexed_chunks': chunks, 'linked_duplicates': links, 'threshold': self.threshold}
+
+
+# Global singleton instance
+_near_duplicate_index: Optional[NearDuplicateIndex] = None
+
+
+def get_near_duplicate_index() -> Optional[NearDuplicateIndex]:
+    """Get the shared near-duplicate index, or None when disabled."""
+    global _near_duplicate_index
+    if not settings.NEAR_DUP_ENABLED:
+        return None
+    if _near_duplicate_index is None:
+        try:
+            _near_duplicate_index = NearDuplicateIndex()
+        except Exception as e:
+            logger.error(f"Failed to open near-duplicate index: {e}")
+            return None
+    return _near_duplicate_index
@@ -2,15 +2,24 @@
 import logging
 from typing import List, Dict, Optional, Tuple
 import uuid
+import threading
+from collections import OrderedDict
 from datetime import datetime
 
 from app.core.config import settings
 from app.embeddings.embedding_service import get_embedding_service
 from app.vector_store import get_vector_store
 from app.core.openai_client_unified import chat_completion, get_embeddings
+from app.rag.near_duplicates import dedup_namespace, get_near_duplicate_index
+from app.rag.chunker import TextChunker, chunk_parent_child
+from app.rag.context_assembler import Passage, get_context_assembler
+from app.core.tracing import traced
+from app.core.single_flight import flight_key, get_single_flight
 
 logger = logging.getLogger(__name__)
 
+NO_CONTEXT_ANSWER = "I don't have enough information in my knowledge base to answer this question. Please ensure relevant documents have been ingested.\n\nTo ingest documents:\n1. Use the upload feature in the chat interface\n2. Or run the bulk ingestion script: `python backend/scripts/bulk_ingest_documents.py`\n\nThis will index documents from:\n- US state codes\n- Canada traffic acts\n- Paralegal advice dataset\n- All legal document folders"
+
 
 class RAGService:
     """Service for RAG-based question answering with parent-child chunking."""
@@ -27,6 +36,63 @@ class RAGService:
         self.parent_chunk_overlap = settings.PARENT_CHUNK_OVERLAP
         self.child_chunk_size = settings.CHILD_CHUNK_SIZE
         self.child_chunk_overlap = settings.CHILD_CHUNK_OVERLAP
+        
+        # Small LRU of parent chunks so repeat questions skip the store round trip
+        self.parent_cache_size = settings.PARENT_CACHE_SIZE
+        self._parent_cache: "OrderedDict[str, Dict]" = OrderedDict()
+        self._parent_cache_lock = threading.Lock()
+    
+    def _cache_parents(self, parents: Dict[str, Dict]):
+        """Add parent chunks to the in-process LRU cache."""
+        with self._parent_cache_lock:
+            for parent_id, parent_doc in parents.items():
+                self._parent_cache[parent_id] = parent_doc
+                self._parent_cache.move_to_end(parent_id)
+            while len(self._parent_cache) > self.parent_cache_size:
+                self._parent_cache.popitem(last=False)
+    
+    @traced("parent_context")
+    def get_parent_contexts(self, parent_ids: List[str]) -> Dict[str, Dict]:
+        """
+        Resolve parent chunks for a set of results in one batched lookup.
+        
+        IDs are de-duplicated, served from the parent cache where possible,
+        and the remainder fetched with a single multi-get on the store.
+        
+        Args:
+            parent_ids: Parent IDs (may contain duplicates / None)
+            
+        Returns:
+            Dict of parent_id -> parent document
+        """
+        unique_ids = list(dict.fromkeys(pid for pid in parent_ids if pid))
+        parents = {}
+        missing = []
+        # Requests run on several threads; the LRU reorders on every hit
+        with self._parent_cache_lock:
+            for parent_id in unique_ids:
+                parent_doc = self._parent_cache.get(parent_id)
+                if parent_doc is not None:
+                    self._parent_cache.move_to_end(parent_id)
+                    parents[parent_id] = parent_doc
+                else:
+                    missing.append(parent_id)
+        
+        if missing:
+            if hasattr(self.vector_store, 'get_parent_contexts'):
+                fetched = self.vector_store.get_parent_contexts(missing)
+            elif hasattr(self.vector_store, 'get_parent_context'):
+                fetched = {}
+                for parent_id in missing:
+                    parent_doc = self.vector_store.get_parent_context(parent_id)
+                    if parent_doc:
+                        fetched[parent_id] = parent_doc
+            else:
+                fetched = {}
+            self._cache_parents(fetched)
+            parents.update(fetched)
+        
+        return parents
     
     def chunk_text(
         self,
@@ -35,35 +101,17 @@ class RAGService:
         overlap: int
     ) -> List[str]:
         """
-        Split text into overlapping chunks.
+        Split text into overlapping, sentence-aligned chunks.
         
         Args:
             text: Text to chunk
-            chunk_size: Size of each chunk in characters
+            chunk_size: Maximum size of each chunk in characters
             overlap: Overlap between chunks in characters
             
         Returns:
             List of text chunks
         """
-        if len(text) <= chunk_size:
-            return [text]
-        
-        chunks = []
-        start = 0
-        
-        while start < len(text):
-            end = start + chunk_size
-            chunk = text[start:end]
-            chunks.append(chunk)
-            
-            # Move start forward by (chunk_size - overlap) for next chunk
-            start += chunk_size - overlap
-            
-            # Prevent infinite loop if overlap >= chunk_size
-            if overlap >= chunk_size:
-                break
-        
-        return chunks
+        return TextChunker(chunk_size, overlap).split_text(text)
     
     def create_parent_child_chunks(
         self,
@@ -90,19 +138,21 @@ class RAGService:
         Returns:
             Tuple of (parent_documents, child_documents)
         """
-        # Create parent chunks
-        parent_chunks = self.chunk_text(text, self.parent_chunk_size, self.parent_chunk_overlap)
-        
         parent_docs = []
         child_docs = []
         
-        for parent_idx, parent_text in enumerate(parent_chunks):
-            parent_id = f"{doc_id}_parent_{parent_idx}"
+        # Parents and their children come from one streaming pass over the text
+        for parent, children in chunk_parent_child(
+            text,
+            self.parent_chunk_size, self.parent_chunk_overlap,
+            self.child_chunk_size, self.child_chunk_overlap
+        ):
+            parent_id = f"{doc_id}_parent_{parent.index}"
             
             # Create parent document (without vector, reference only)
             parent_doc = {
                 "id": parent_id,
-                "content": parent_text,
+                "content": parent.text,
                 "parent_id": None,
                 "child_id": None,
                 "subject": subject or "",
@@ -114,15 +164,12 @@ class RAGService:
             }
             parent_docs.append(parent_doc)
             
-            # Create child chunks from this parent
-            child_chunks = self.chunk_text(parent_text, self.child_chunk_size, self.child_chunk_overlap)
-            
-            for child_idx, child_text in enumerate(child_chunks):
-                child_id = f"{parent_id}_child_{child_idx}"
+            for child in children:
+                child_id = f"{parent_id}_child_{child.index}"
                 
                 child_doc = {
                     "id": child_id,
-                    "content": child_text,
+                    "content": child.text,
                     "parent_id": parent_id,
                     "child_id": child_id,
                     "subject": subject or "",
@@ -261,43 +308,66 @@ class RAGService:
                 subject=subject
             )
             
+            # Skip children that near-duplicate chunks already indexed for the
+            # same organization, and parents left without children
+            dedup = None
+            dedup_index = get_near_duplicate_index()
+            dedup_ns = dedup_namespace("rag", organization)
+            if dedup_index:
+                dedup = dedup_index.check(
+                    dedup_ns, child_docs, lambda d: d["content"], lambda d: d["id"]
+                )
+                child_docs = dedup.kept
+                live_parents = {doc["parent_id"] for doc in child_docs}
+                parent_docs = [doc for doc in parent_docs if doc["id"] in live_parents]
+            
             # Generate embeddings for child chunks only
             child_texts = [doc["content"] for doc in child_docs]
-            child_embeddings = self.embedding_service.embed_texts(
-                child_texts,
-                organization=organization,
-                subject=subject
-            )
-            
-            # Add vectors to child documents
-            for i, child_doc in enumerate(child_docs):
-                child_doc["vector"] = child_embeddings[i].tolist()
-            
-            # Upload parent documents (no vectors)
-            if parent_docs:
-                self.vector_store.add_documents(parent_docs)
+            if child_texts:
+                child_embeddings = self.embedding_service.embed_texts(
+                    child_texts,
+                    organization=organization,
+                    subject=subject
+                )
+                
+                # Add vectors to child documents
+                for i, child_doc in enumerate(child_docs):
+                    child_doc["vector"] = child_embeddings[i].tolist()
             
-            # Upload child documents (with vectors)
-            if child_docs:
-                self.vector_store.add_documents(child_docs)
+            # Upload parents (no vectors) and children (with vectors) as one
+            # batched call so the store can pipeline the upload
+            if parent_docs or child_docs:
+                self.vector_store.add_documents(parent_docs + child_docs)
+            self._cache_parents({doc["id"]: doc for doc in parent_docs})
+            if dedup:
+                dedup_index.register(dedup_ns, dedup, source=doc_id)
             
             total_chunks = len(parent_docs) + len(child_docs)
             
         else:
             # Simple chunking (fallback)
-            chunks = self.chunk_text(text, self.child_chunk_size, self.child_chunk_overlap)
+            chunks = list(enumerate(self.chunk_text(text, self.child_chunk_size, self.child_chunk_overlap)))
+            
+            dedup = None
+            dedup_index = get_near_duplicate_index()
+            dedup_ns = dedup_namespace("rag", organization)
+            if dedup_index:
+                dedup = dedup_index.check(
+                    dedup_ns, chunks, lambda c: c[1], lambda c: f"{doc_id}_chunk_{c[0]}"
+                )
+                chunks = dedup.kept
             
             # Generate embeddings
             embeddings = self.embedding_service.embed_texts(
-                chunks,
+                [chunk for _, chunk in chunks],
                 organization=organization,
                 subject=subject
-            )
+            ) if chunks else []
             
             # Create documents
             documents = []
-            for i, chunk in enumerate(chunks):
-                chunk_id = f"{doc_id}_chunk_{i}"
+            for i, (chunk_index, chunk) in enumerate(chunks):
+                chunk_id = f"{doc_id}_chunk_{chunk_index}"
                 doc = {
                     "id": chunk_id,
                     "content": chunk,
@@ -312,18 +382,75 @@ class RAGService:
                 }
                 documents.append(doc)
             
-            self.vector_store.add_documents(documents)
+            if documents:
+                self.vector_store.add_documents(documents)
+            if dedup:
+                dedup_index.register(dedup_ns, dedup, source=doc_id)
             total_chunks = len(documents)
         
         logger.info(f"Ingested document {doc_id} with {total_chunks} chunks")
         
-        return {
+        result = {
             'doc_id': doc_id,
             'chunks': total_chunks,
             'source_name': source_name,
             'parent_child': self.use_parent_child
         }
+        if dedup:
+            result['dedup'] = dedup.report(vector_dim=getattr(self.vector_store, 'dim', None))
+        return result
     
+    def delete_document(self, doc_id: str, organization: Optional[str] = None) -> int:
+        """
+        Remove an ingested document's chunks, parent chunks and near-duplicate state.
+        
+        Args:
+            doc_id: Document ID returned by ingest_text
+            organization: Organization the document was ingested for
+            
+        Returns:
+            Number of chunks removed from the vector store
+        """
+        delete = getattr(self.vector_store, 'delete_document', None)
+        if delete is None:
+            raise NotImplementedError(f"{type(self.vector_store).__name__} cannot delete documents")
+        deleted = delete(doc_id, organization=organization)
+        if hasattr(self.vector_store, 'save'):
+            self.vector_store.save()
+        
+        prefix = f"{doc_id}_"
+        with self._parent_cache_lock:
+            for parent_id in [pid for pid in self._parent_cache if pid.startswith(prefix)]:
+                del self._parent_cache[parent_id]
+        
+        # Let a re-upload of the document be indexed again
+        dedup_index = get_near_duplicate_index()
+        if dedup_index:
+            dedup_index.forget_source(doc_id, dedup_namespace("rag", organization))
+        
+        logger.info(f"Deleted document {doc_id} ({deleted} chunks)")
+        return deleted
+    
+    def _retrieve(self, query: str, top_k: int, hybrid_search: bool) -> List[Tuple[float, Dict]]:
+        """Embed the query and search the vector store, coalescing identical in-flight retrievals."""
+        def retrieve():
+            query_embedding = self.embedding_service.embed_text(query)
+            query_vector = query_embedding[0].tolist()
+            # Note: search_text and filters are for Azure compatibility, FAISS uses vector similarity only
+            return self.vector_store.search(
+                query_vector=query_vector,
+                top_k=top_k,
+                search_text=query if hybrid_search else None,  # Ignored by FAISS, kept for compatibility
+                filters="is_config eq false"  # Ignored by FAISS, kept for compatibility
+            )
+
+        return get_single_flight("rag_retrieval").do(
+            flight_key(query, top_k, hybrid_search),
+            retrieve,
+            share=lambda results: [(score, dict(doc)) for score, doc in results]
+        )
+
+    @traced("rag.answer_question")
     def answer_question(
         self,
         query: str,
@@ -348,30 +475,94 @@ class RAGService:
         Returns:
             Dict with 'answer' and 'sources'
         """
-        top_k = top_k or self.top_k
-        
-        # Step 1: Embed query
-        query_embedding = self.embedding_service.embed_text(query)
-        query_vector = query_embedding[0].tolist()
-        
-        # Step 2: Search FAISS vector database (local)
-        # Note: search_text and filters are for Azure compatibility, FAISS uses vector similarity only
-        search_text = query if hybrid_search else None
-        results = self.vector_store.search(
-            query_vector=query_vector,
-            top_k=top_k,
-            search_text=search_text,  # Ignored by FAISS, kept for compatibility
-            filters="is_config eq false"  # Ignored by FAISS, kept for compatibility
-        )
+        # Steps 1-2: Embed query and search (shared by identical concurrent questions)
+        results, parents = self.retrieve_context(query, top_k, hybrid_search, include_parent_context)
         
         if not results:
             return {
-                'answer': "I don't have enough information in my knowledge base to answer this question. Please ensure relevant documents have been ingested.\n\nTo ingest documents:\n1. Use the upload feature in the chat interface\n2. Or run the bulk ingestion script: `python backend/scripts/bulk_ingest_documents.py`\n\nThis will index documents from:\n- US state codes\n- Canada traffic acts\n- Paralegal advice dataset\n- All legal document folders",
+                'answer': NO_CONTEXT_ANSWER,
                 'sources': []
             }
         
-        # Step 3: Build context with parent-child expansion
-        context_parts = []
+        # Steps 3-4: Build the prompt and generate the answer
+        messages, sources = self.build_answer_messages(
+            query, results, parents,
+            include_parent_context=include_parent_context,
+            language=language,
+            country=country,
+            province=province,
+            offense_type=offense_type,
+            context=context
+        )
+        
+        try:
+            answer = chat_completion(
+                messages=messages,
+                temperature=settings.OPENAI_TEMPERATURE,
+                max_tokens=settings.OPENAI_MAX_TOKENS
+            )
+        except Exception as e:
+            logger.error(f"Error generating answer: {e}")
+            answer = f"I encountered an error while generating an answer: {str(e)}"
+        
+        return {
+            'answer': answer,
+            'sources': sources
+        }
+    
+    def retrieve_context(
+        self,
+        query: str,
+        top_k: Optional[int] = None,
+        hybrid_search: bool = True,
+        include_parent_context: bool = True
+    ) -> Tuple[List[Tuple[float, Dict]], Dict[str, Dict]]:
+        """
+        Retrieval stage of answer_question: scored chunks and their parent chunks.
+        
+        Returns:
+            (results, parents) where parents maps parent_id -> parent chunk
+        """
+        results = self._with_linked_sources(self._retrieve(query, top_k or self.top_k, hybrid_search))
+        parents = {}
+        if results and include_parent_context and self.use_parent_child:
+            parents = self.get_parent_contexts([doc.get('parent_id') for _, doc in results])
+        return results, parents
+    
+    def _with_linked_sources(self, results: List[Tuple[float, Dict]]) -> List[Tuple[float, Dict]]:
+        """Attach the documents whose near-duplicate chunks were linked to each result instead of indexed."""
+        dedup_index = get_near_duplicate_index()
+        if not results or dedup_index is None or dedup_index.action != "link":
+            return results
+        links = dedup_index.links_for([doc['id'] for _, doc in results if doc.get('id')], corpus="rag")
+        if not links:
+            return results
+        return [
+            (score, {**doc, 'linked_sources': [link['source'] for link in links[doc['id']]]})
+            if doc.get('id') in links else (score, doc)
+            for score, doc in results
+        ]
+    
+    def build_answer_messages(
+        self,
+        query: str,
+        results: List[Tuple[float, Dict]],
+        parents: Dict[str, Dict],
+        include_parent_context: bool = True,
+        language: Optional[str] = "en",
+        country: Optional[str] = None,
+        province: Optional[str] = None,
+        offense_type: Optional[str] = None,
+        context: Optional[Dict] = None
+    ) -> Tuple[List[Dict], List[Dict]]:
+        """
+        Prompt stage of answer_question: chat messages and the cited sources.
+        
+        Deterministic for given inputs, so the messages can key a cache of
+        LLM outputs (see scripts/run_evaluation.py).
+        """
+        # Step 3: Build context with parent-child expansion, fitted to the token budget
+        passages = []
         sources = []
         seen_parents = set()
         
@@ -384,6 +575,7 @@ class RAGService:
                 'source_type': 'document',
                 'page': doc.get('page', 0),
                 'score': score,
+                'linked_sources': doc.get('linked_sources', []),
                 'snippet': doc.get('content', '')[:200] + '...' if len(doc.get('content', '')) > 200 else doc.get('content', '')
             }
             sources.append(source_info)
@@ -392,20 +584,25 @@ class RAGService:
             if include_parent_context and self.use_parent_child:
                 parent_id = doc.get('parent_id')
                 if parent_id and parent_id not in seen_parents:
-                    parent_doc = self.vector_store.get_parent_context(parent_id)
+                    parent_doc = parents.get(parent_id)
                     if parent_doc:
                         seen_parents.add(parent_id)
                         # Add parent context
-                        context_parts.append(
-                            f"[Parent Context from {doc.get('source', 'Unknown')}, Page {doc.get('page', 0)}]\n{parent_doc.get('content', '')}\n"
-                        )
+                        passages.append(Passage(
+                            parent_doc.get('content', ''),
+                            {'label': f"[Parent Context from {doc.get('source', 'Unknown')}, Page {doc.get('page', 0)}]"}
+                        ))
             
-            # Add the retrieved chunk
-            context_parts.append(
-                f"[Source: {doc.get('source', 'Unknown')}, Page {doc.get('page', 0)}]\n{doc.get('content', '')}\n"
-            )
+            # Add the retrieved chunk (dropped as a duplicate when its parent is already in)
+            passages.append(Passage(
+                doc.get('content', ''),
+                {'label': f"[Source: {doc.get('source', 'Unknown')}, Page {doc.get('page', 0)}]"}
+            ))
         
-        context = "\n---\n".join(context_parts)
+        assembled = get_context_assembler().assemble(query, {'documents': passages})
+        documents_context = "\n---\n".join(
+            f"{passage.metadata['label']}\n{passage.text}\n" for passage in assembled.sections['documents']
+        )
         
         # Build context information for the prompt
         context_info = []
@@ -432,7 +629,7 @@ USER CONTEXT:
 {context_header}
 
 RETRIEVED DOCUMENTS:
-{context}
+{documents_context}
 
 HISTORY:
 (No previous conversation)
@@ -445,21 +642,7 @@ ANSWER:"""
             {'role': 'system', 'content': system_prompt},
             {'role': 'user', 'content': query}
         ]
-        
-        try:
-            answer = chat_completion(
-                messages=messages,
-                temperature=settings.OPENAI_TEMPERATURE,
-                max_tokens=settings.OPENAI_MAX_TOKENS
-            )
-        except Exception as e:
-            logger.error(f"Error generating answer: {e}")
-            answer = f"I encountered an error while generating an answer: {str(e)}"
-        
-        return {
-            'answer': answer,
-            'sources': sources
-        }
+        return messages, sources
 
 
 # Global singleton instance
@@ -0,0 +1,181 @@
+"""Cross-encoder reranking stage for retrieval results.
+
+Scores (query, passage) pairs for the top-N vector candidates with a small
+CPU cross-encoder and keeps the best few. Scoring runs in batches under a
+per-request time budget; if the budget would be exceeded (or the model is
+unavailable or still loading) the original vector order is returned
+unchanged. The model loads on a background thread, never inside a request.
+"""
+import time
+import logging
+from threading import Lock, Thread
+from typing import Any, Callable, List, Optional
+
+from app.core.config import settings
+from app.core.tracing import traced
+
+logger = logging.getLogger(__name__)
+
+try:
+    from sentence_transformers import CrossEncoder
+    CROSS_ENCODER_AVAILABLE = True
+except ImportError:
+    CROSS_ENCODER_AVAILABLE = False
+    logger.warning("sentence-transformers not installed. Cross-encoder reranking disabled.")
+
+
+def _default_text(candidate: Any) -> str:
+    """Passage text for the candidate shapes used across the retrieval paths."""
+    if isinstance(candidate, dict):
+        return candidate.get('content') or candidate.get('text') or ''
+    if isinstance(candidate, tuple) and len(candidate) == 2 and isinstance(candidate[1], dict):
+        # (score, doc) tuples returned by the app vector stores
+        return candidate[1].get('content', '')
+    return getattr(candidate, 'text', '') or ''
+
+
+class CrossEncoderReranker:
+    """Budgeted cross-encoder reranker over vector search candidates."""
+
+    def __init__(
+        self,
+        model_name: Optional[str] = None,
+        batch_size: Optional[int] = None,
+        time_budget_ms: Optional[float] = None,
+        max_passage_chars: int = 1200
+    ):
+        """
+        Initialize the reranker (start_loading() loads the model in the background).
+
+        Args:
+            model_name: Cross-encoder model (defaults to settings.RERANKER_MODEL)
+            batch_size: Pairs scored per forward pass
+            time_budget_ms: Per-request scoring budget
+            max_passage_chars: Passages are truncated to this length before scoring
+        """
+        self.model_name = model_name or settings.RERANKER_MODEL
+        self.batch_size = batch_size or settings.RERANK_BATCH_SIZE
+        self.time_budget_ms = time_budget_ms if time_budget_ms is not None else settings.RERANK_BUDGET_MS
+        self.max_passage_chars = max_passage_chars
+        self._model = None
+        self._loading = False
+        self._load_failed = False
+        self._lock = Lock()
+        self._pair_seconds: Optional[float] = None  # Scoring time per pair, moving average
+
+    @property
+    def available(self) -> bool:
+        return CROSS_ENCODER_AVAILABLE and not self._load_failed
+
+    @property
+    def ready(self) -> bool:
+        return self._model is not None
+
+    def start_loading(self):
+        """Load the model on a background thread (once)."""
+        with self._lock:
+            if self._model is not None or self._loading or not self.available:
+                return
+            self._loading = True
+        Thread(target=self._load, name="reranker-load", daemon=True).start()
+
+    def _load(self):
+        try:
+            logger.info(f"Loading cross-encoder model: {self.model_name}")
+            model = CrossEncoder(self.model_name, device="cpu", max_length=512)
+            # Calibrate the per-batch estimate the first request's budget check
+            # uses, on full-length passages (the first pass is a cold start)
+            batch = [("warmup", "warmup " * (self.max_passage_chars // 7))] * self.batch_size
+            for _ in range(2):
+                start = time.perf_counter()
+                model.predict(batch, show_progress_bar=False)
+            self._record_batch(len(batch), time.perf_counter() - start)
+            self._model = model
+            logger.info(f"Cross-encoder ready ({self._pair_seconds * self.batch_size * 1000:.0f}ms per batch)")
+        except Exception as e:
+            logger.error(f"Failed to load cross-encoder {self.model_name}: {e}")
+            self._load_failed = True
+        finally:
+            self._loading = False
+
+    def _record_batch(self, pairs: int, seconds: float):
+        per_pair = seconds / pairs
+        self._pair_seconds = per_pair if self._pair_seconds is None else 0.8 * self._pair_seconds + 0.2 * per_pair
+
+    @traced("rerank")
+    def rerank(
+        self,
+        query: str,
+        candidates: List[Any],
+        top_n: int,
+        get_text: Callable[[Any], str] = _default_text
+    ) -> List[Any]:
+        """
+        Reorder candidates by cross-encoder relevance and keep the top_n.
+
+        Args:
+            query: User query
+            candidates: Candidates in vector-score order
+            top_n: Number of candidates to keep
+            get_text: Extracts the passage text from a candidate
+
+        Returns:
+            Up to top_n candidates; vector order if the model is unavailable
+            or still loading, or the time budget runs out. Dict candidates
+            get a 'rerank_score'.
+        """
+        if len(candidates) <= 1:
+            return candidates[:top_n]
+
+        model = self._model
+        if model is None:
+            self.start_loading()
+            return candidates[:top_n]
+
+        budget_s = self.time_budget_ms / 1000.0
+        start = time.perf_counter()
+        pairs = [(query, get_text(c)[:self.max_passage_chars]) for c in candidates]
+        scores: List[float] = []
+
+        for offset in range(0, len(pairs), self.batch_size):
+            batch = pairs[offset:offset + self.batch_size]
+            elapsed = time.perf_counter() - start
+            # Skip the next batch (the first one too) if it would likely overrun the budget
+            if elapsed + len(batch) * self._pair_seconds > budget_s:
+                logger.info(f"Rerank budget exceeded after {offset}/{len(pairs)} candidates "
+                            f"({elapsed * 1000:.0f}ms); keeping vector order")
+                if not offset:
+                    # Nothing was measured: decay the estimate so that one slow
+                    # batch does not turn reranking off for good
+                    self._pair_seconds *= 0.9
+                return candidates[:top_n]
+            batch_start = time.perf_counter()
+            scores.extend(float(s) for s in model.predict(batch, show_progress_bar=False))
+            self._record_batch(len(batch), time.perf_counter() - batch_start)
+
+        order = sorted(range(len(candidates)), key=lambda i: scores[i], reverse=True)[:top_n]
+        reranked = []
+        for i in order:
+            candidate = candidates[i]
+            if isinstance(candidate, dict):
+                candidate['rerank_score'] = scores[i]
+            reranked.append(candidate)
+
+        logger.debug(f"Reranked {len(candidates)} candidates in "
+                     f"{(time.perf_counter() - start) * 1000:.0f}ms")
+        return reranked
+
+
+# Global singleton instance
+_reranker: Optional[CrossEncoderReranker] = None
+
+
+def get_reranker() -> Optional[CrossEncoderReranker]:
+    """Get the shared reranker, or None when reranking is disabled."""
+    global _reranker
+    if not settings.RERANKER_ENABLED:
+        return None
+    if _reranker is None:
+        _reranker = CrossEncoderReranker()
+        _reranker.start_loading()
+    return _reranker if _reranker.available else None
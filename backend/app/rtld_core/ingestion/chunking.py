@@ -2,18 +2,20 @@
 
 import logging
 from typing import List, Dict, Any, Optional
+from app.rag.chunker import TextChunker as SharedTextChunker
 from ..schemas import Chunk
 
 logger = logging.getLogger(__name__)
 
 
 class TextChunker:
-    """Text chunking with semantic awareness."""
+    """Text chunking with semantic awareness (shared sentence/section chunker)."""
 
     def __init__(self, chunk_size: int = 1000, overlap: int = 200):
         """Initialize chunker."""
         self.chunk_size = chunk_size
         self.overlap = overlap
+        self._chunker = SharedTextChunker(chunk_size, overlap)
 
     def chunk_text(
         self,
@@ -28,84 +30,16 @@ class TextChunker:
 
         metadata = metadata or {}
 
-        # Split into paragraphs first (preserve semantic units)
-        paragraphs = [p.strip() for p in text.split('\n\n') if p.strip()]
-
-        # If no paragraphs found, treat the whole text as one paragraph
-        if not paragraphs:
-            paragraphs = [text]
-
-        chunks = []
-        current_chunk = ""
-        chunk_index = 0
-
-        for paragraph in paragraphs:
-            # Split long paragraphs into smaller chunks
-            if len(paragraph) <= self.chunk_size:
-                # Paragraph fits in a chunk
-                if len(current_chunk) + len(paragraph) > self.chunk_size and current_chunk:
-                    # Finalize current chunk
-                    chunk = self._create_chunk(
-                        text=current_chunk.strip(),
-                        doc_id=doc_id,
-                        chunk_index=chunk_index,
-                        source_name=source_name,
-                        metadata=metadata
-                    )
-                    chunks.append(chunk)
-                    chunk_index += 1
-
-                    # Start new chunk with overlap
-                    words = current_chunk.split()
-                    if len(words) > 5:
-                        overlap_words = min(len(words) // 4, self.overlap // 6)  # Rough word estimate
-                        overlap_text = ' '.join(words[-overlap_words:]) if overlap_words > 0 else ""
-                        current_chunk = overlap_text + (' ' if overlap_text else '') + paragraph
-                    else:
-                        current_chunk = paragraph
-                else:
-                    current_chunk += ('\n\n' if current_chunk else '') + paragraph
-            else:
-                # Long paragraph - split it
-                words = paragraph.split()
-                temp_chunk = current_chunk
-
-                for i, word in enumerate(words):
-                    if len(temp_chunk) + len(word) + 1 > self.chunk_size and temp_chunk:
-                        # Save current chunk
-                        chunk = self._create_chunk(
-                            text=temp_chunk.strip(),
-                            doc_id=doc_id,
-                            chunk_index=chunk_index,
-                            source_name=source_name,
-                            metadata=metadata
-                        )
-                        chunks.append(chunk)
-                        chunk_index += 1
-
-                        # Start new chunk with overlap
-                        chunk_words = temp_chunk.split()
-                        if len(chunk_words) > 5:
-                            overlap_words = min(len(chunk_words) // 4, self.overlap // 6)
-                            temp_chunk = ' '.join(chunk_words[-overlap_words:]) if overlap_words > 0 else ""
-                        else:
-                            temp_chunk = ""
-                        temp_chunk += ' ' + word
-                    else:
-                        temp_chunk += (' ' if temp_chunk else '') + word
-
-                current_chunk = temp_chunk
-
-        # Add final chunk
-        if current_chunk.strip():
-            chunk = self._create_chunk(
-                text=current_chunk.strip(),
+        chunks = [
+            self._create_chunk(
+                text=piece.text,
                 doc_id=doc_id,
-                chunk_index=chunk_index,
+                chunk_index=piece.index,
                 source_name=source_name,
-                metadata=metadata
+                metadata={**metadata, **piece.offsets()}
             )
-            chunks.append(chunk)
+            for piece in self._chunker.iter_chunks(text)
+        ]
 
         logger.info(f"Chunked document {doc_id} into {len(chunks)} chunks")
         return chunks
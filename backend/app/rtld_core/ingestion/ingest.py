@@ -16,6 +16,13 @@ from .parsers import RTLDUnifiedParser
 
 logger = logging.getLogger(__name__)
 
+# Near-duplicate suppression (optional, shared with the app ingestion paths)
+try:
+    from app.rag.near_duplicates import dedup_namespace, get_near_duplicate_index
+    NEAR_DUP_AVAILABLE = True
+except ImportError:
+    NEAR_DUP_AVAILABLE = False
+
 
 class RTLDIngestionPipeline(IngestionPipeline):
     """Complete ingestion pipeline for RTLD"""
@@ -98,6 +105,14 @@ class RTLDIngestionPipeline(IngestionPipeline):
                     'content_type': content_type
                 })
 
+            # Drop chunks that near-duplicate ones this user already indexed
+            dedup = None
+            dedup_index = get_near_duplicate_index() if NEAR_DUP_AVAILABLE else None
+            dedup_ns = dedup_namespace("rtld", user_id) if dedup_index else None
+            if dedup_index and chunks:
+                dedup = dedup_index.check(dedup_ns, chunks, lambda c: c.content, lambda c: c.id)
+                chunks = dedup.kept
+
             # Step 3: Generate embeddings
             if chunks:
                 texts_to_embed = [chunk.content for chunk in chunks]
@@ -107,9 +122,17 @@ class RTLDIngestionPipeline(IngestionPipeline):
                 self.vector_search_engine.index_documents("documents", chunks, embeddings)
 
                 logger.info(f"Successfully ingested {filename}: {len(chunks)} chunks, offence_number={detected_offence_number}")
-            else:
+            elif not dedup or not dedup.duplicates:
                 logger.warning(f"No chunks generated for {filename}")
 
+            # Linked duplicates stay findable (e.g. by doc_id) through the chunks they duplicate
+            if dedup:
+                if dedup_index.action == "link" and dedup.duplicates:
+                    self.vector_search_engine.link_duplicates(
+                        "documents", [(chunk, canonical) for chunk, _, canonical, _ in dedup.duplicates]
+                    )
+                dedup_index.register(dedup_ns, dedup, source=doc_id)
+
             return IngestResult(
                 doc_id=doc_id,
                 chunks=chunks,
@@ -122,7 +145,8 @@ class RTLDIngestionPipeline(IngestionPipeline):
                     'user_id': user_id,
                     'case_id': case_id,
                     'file_size': len(file_bytes),
-                    'processing_success': len(chunks) > 0
+                    'processing_success': len(chunks) > 0,
+                    'dedup': dedup.report() if dedup else None
                 }
             )
 
@@ -5,8 +5,9 @@ OCR functionality for image processing and offence number extraction
 import re
 import tempfile
 import os
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Optional, Tuple, List
+from typing import Optional, Tuple, List, Iterator, Dict, Union
 import logging
 
 try:
@@ -26,19 +27,49 @@ from ..schemas import OffenceExtractionResult
 
 logger = logging.getLogger(__name__)
 
+# Pages with fewer non-whitespace characters than this in their text layer
+# (page numbers, scanner stamps) are treated as scanned and OCR'd
+MIN_TEXT_LAYER_CHARS = 16
+
+
+def _has_text_layer(page_text: Optional[str]) -> bool:
+    """Whether a page's embedded text layer is usable as-is"""
+    return bool(page_text) and len(re.sub(r'\s+', '', page_text)) >= MIN_TEXT_LAYER_CHARS
+
+
+def _ocr_page_buffer(data: bytes, size: Tuple[int, int], tesseract_cmd: Optional[str]) -> str:
+    """OCR a rendered grayscale page (runs in a worker process)"""
+    if tesseract_cmd:
+        pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+    image = Image.frombytes('L', size, data)
+    return pytesseract.image_to_string(image)
+
 
 class OCRProcessor:
     """
     OCR processor for extracting text from images and documents
     """
 
-    def __init__(self, tesseract_cmd: Optional[str] = None):
+    def __init__(
+        self,
+        tesseract_cmd: Optional[str] = None,
+        max_workers: Optional[int] = None,
+        max_buffer_mb: Optional[int] = None
+    ):
         """
         Initialize OCR processor
 
         Args:
             tesseract_cmd: Path to tesseract executable (optional)
+            max_workers: Processes used for page OCR (env OCR_MAX_WORKERS)
+            max_buffer_mb: Ceiling on rendered page buffers in flight (env OCR_MAX_BUFFER_MB)
         """
+        self.tesseract_cmd = tesseract_cmd
+        self.max_workers = max_workers or int(
+            os.getenv("OCR_MAX_WORKERS", str(min(4, os.cpu_count() or 1)))
+        )
+        self.max_buffer_bytes = (max_buffer_mb or int(os.getenv("OCR_MAX_BUFFER_MB", "256"))) * 1024 * 1024
+
         if TESSERACT_AVAILABLE:
             if tesseract_cmd:
                 pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
@@ -79,57 +110,114 @@ class OCRProcessor:
             logger.error(f"OCR failed for {image_path}: {e}")
             return ""
 
-    def extract_text_from_pdf_images(self, pdf_path: str) -> str:
+    def iter_pdf_page_text(self, pdf_path: str, resolution: int = 300) -> Iterator[Tuple[int, str]]:
         """
-        Extract text from image-based PDF pages
+        Stream page text from a PDF, OCR'ing scanned pages in parallel
+
+        Pages are rendered lazily one at a time; pages with a usable text
+        layer skip OCR, the rest are OCR'd across a bounded process pool.
+        Rendered buffers in flight are capped at max_buffer_bytes - when the
+        ceiling is reached, rendering waits for the oldest OCR job to finish.
 
         Args:
             pdf_path: Path to PDF file
+            resolution: Render DPI for OCR
 
-        Returns:
-            Extracted text from image pages
+        Yields:
+            (page_index, text) in page order, as soon as each page is ready
         """
-        if not PDFPLUMBER_AVAILABLE or not TESSERACT_AVAILABLE:
-            logger.warning("PDF image OCR not available")
-            return ""
+        if not PDFPLUMBER_AVAILABLE:
+            logger.warning("PDF processing not available")
+            return
+
+        # page index -> text, or (future, buffer size) while OCR is running
+        pending: Dict[int, Union[str, Tuple[object, int]]] = {}
+        in_flight: List[int] = []
+        in_flight_bytes = 0
+        next_page = 0
+        executor = None
+
+        def collect(index: int) -> str:
+            nonlocal in_flight_bytes
+            item = pending.pop(index)
+            if isinstance(item, str):
+                return item
+            future, nbytes = item
+            in_flight.remove(index)
+            in_flight_bytes -= nbytes
+            try:
+                return future.result()
+            except Exception as e:
+                logger.warning(f"OCR failed for PDF page {index}: {e}")
+                return ""
+
+        def ready(index: int) -> bool:
+            item = pending.get(index)
+            return item is not None and (isinstance(item, str) or item[0].done())
 
         try:
-            logger.info(f"Extracting text from PDF images: {pdf_path}")
-            text_parts = []
-
             with pdfplumber.open(pdf_path) as pdf:
                 for i, page in enumerate(pdf.pages):
                     try:
-                        # Check if page has text
-                        page_text = page.extract_text()
-                        if page_text and page_text.strip():
-                            # Page has extractable text, use it
-                            text_parts.append(page_text)
+                        page_text = page.extract_text() or ""
+                        if _has_text_layer(page_text) or not TESSERACT_AVAILABLE:
+                            pending[i] = page_text
                         else:
-                            # Page is image-based, use OCR
                             logger.info(f"Page {i} appears to be image-based, using OCR")
-
-                            # Convert page to image
-                            page_image = page.to_image(resolution=300)
-                            pil_image = page_image.original
-
-                            # OCR the image
-                            ocr_text = pytesseract.image_to_string(pil_image)
-                            if ocr_text.strip():
-                                text_parts.append(ocr_text)
-
+                            image = page.to_image(resolution=resolution).original.convert('L')
+                            data = image.tobytes()
+
+                            # Hold rendering until buffers in flight fit under the ceiling
+                            while in_flight and in_flight_bytes + len(data) > self.max_buffer_bytes:
+                                oldest = in_flight[0]
+                                pending[oldest] = collect(oldest)
+
+                            if executor is None:
+                                executor = ProcessPoolExecutor(max_workers=self.max_workers)
+                            future = executor.submit(_ocr_page_buffer, data, image.size, self.tesseract_cmd)
+                            pending[i] = (future, len(data))
+                            in_flight.append(i)
+                            in_flight_bytes += len(data)
+                            del image, data
                     except Exception as e:
                         logger.warning(f"Error processing PDF page {i}: {e}")
-                        continue
+                        pending[i] = ""
+
+                    while ready(next_page):
+                        yield next_page, collect(next_page)
+                        next_page += 1
 
-            full_text = "\n\n".join(text_parts)
-            logger.info(f"Extracted {len(full_text)} characters from PDF with OCR")
-            return full_text
+            while next_page in pending:
+                yield next_page, collect(next_page)
+                next_page += 1
 
         except Exception as e:
             logger.error(f"PDF OCR failed for {pdf_path}: {e}")
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
+
+    def extract_text_from_pdf_images(self, pdf_path: str) -> str:
+        """
+        Extract text from image-based PDF pages
+
+        Args:
+            pdf_path: Path to PDF file
+
+        Returns:
+            Extracted text from image pages
+        """
+        if not PDFPLUMBER_AVAILABLE or not TESSERACT_AVAILABLE:
+            logger.warning("PDF image OCR not available")
             return ""
 
+        logger.info(f"Extracting text from PDF images: {pdf_path}")
+        text_parts = [text for _, text in self.iter_pdf_page_text(pdf_path) if text.strip()]
+
+        full_text = "\n\n".join(text_parts)
+        logger.info(f"Extracted {len(full_text)} characters from PDF with OCR")
+        return full_text
+
     def process_file(self, file_path: str) -> Tuple[str, Optional[str]]:
         """
         Process a file and extract text and offence number
@@ -159,6 +247,10 @@ class OCRProcessor:
                             for page in pdf.pages:
                                 page_text = page.extract_text() or ""
                                 extracted_text += page_text + "\n"
+
+                        # Scanned PDF with no usable text layer - OCR the image pages
+                        if not _has_text_layer(extracted_text) and TESSERACT_AVAILABLE:
+                            extracted_text = self.extract_text_from_pdf_images(str(file_path))
                     except Exception as e:
                         logger.warning(f"PDF text extraction failed: {e}, falling back to OCR")
                         extracted_text = self.extract_text_from_pdf_images(str(file_path))
@@ -2,7 +2,6 @@
 Document parsers for different file types - extracted from artillty
 """
 
-import re
 import uuid
 from typing import List, Dict, Optional, Any, Tuple
 from pathlib import Path
@@ -26,6 +25,7 @@ try:
 except ImportError:
     PANDAS_AVAILABLE = False
 
+from app.rag.chunker import TextChunker
 from ..schemas import Chunk
 
 logger = logging.getLogger(__name__)
@@ -37,6 +37,7 @@ class RTLDTextParser:
     def __init__(self, chunk_size: int = 1000, overlap: int = 200):
         self.chunk_size = chunk_size
         self.overlap = overlap
+        self._chunker = TextChunker(chunk_size, overlap)
 
     def parse_text(self, text: str, doc_id: str, metadata: Optional[Dict[str, Any]] = None) -> List[Chunk]:
         """Parse text into chunks"""
@@ -45,34 +46,14 @@ class RTLDTextParser:
 
         metadata = metadata or {}
 
-        # Split into paragraphs first
-        paragraphs = [p.strip() for p in re.split(r'\n\s*\n', text) if p.strip()]
-
-        if not paragraphs:
-            return []
-
-        # If content is small, return as single chunk
-        if len(text) <= self.chunk_size:
-            chunk = Chunk(
-                id=f"{doc_id}_chunk_0",
-                content=text,
-                metadata={**metadata, 'doc_id': doc_id, 'chunk_index': 0},
-                doc_id=doc_id,
-                chunk_index=0
-            )
-            return [chunk]
-
-        # Chunk larger documents
         chunks = []
-        chunk_texts = self._chunk_text(text)
-
-        for i, chunk_text in enumerate(chunk_texts):
+        for piece in self._chunker.iter_chunks(text):
             chunk = Chunk(
-                id=f"{doc_id}_chunk_{i}",
-                content=chunk_text,
-                metadata={**metadata, 'doc_id': doc_id, 'chunk_index': i},
+                id=f"{doc_id}_chunk_{piece.index}",
+                content=piece.text,
+                metadata={**metadata, **piece.offsets(), 'doc_id': doc_id, 'chunk_index': piece.index},
                 doc_id=doc_id,
-                chunk_index=i
+                chunk_index=piece.index
             )
             chunks.append(chunk)
 
@@ -80,41 +61,7 @@ class RTLDTextParser:
 
     def _chunk_text(self, text: str) -> List[str]:
         """Split text into overlapping chunks"""
-        if len(text) <= self.chunk_size:
-            return [text]
-
-        chunks = []
-        start = 0
-
-        while start < len(text):
-            end = start + self.chunk_size
-
-            # If we're not at the end, try to find a good breaking point
-            if end < len(text):
-                # Look for sentence endings within the last 100 characters
-                last_period = text.rfind('.', start, end)
-                last_newline = text.rfind('\n', start, end)
-
-                # Use the latest good breaking point
-                break_point = max(last_period, last_newline)
-                if break_point > start + self.chunk_size - 100:
-                    end = break_point + 1
-                else:
-                    # Force break at chunk_size
-                    pass
-
-            chunk = text[start:end].strip()
-            if chunk:
-                chunks.append(chunk)
-
-            # Move start forward
-            start = end - self.overlap
-
-            # Prevent infinite loop
-            if start >= len(text):
-                break
-
-        return chunks
+        return self._chunker.split_text(text)
 
 
 class RTLDDocxParser:
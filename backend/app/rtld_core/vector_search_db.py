@@ -5,11 +5,14 @@ Vector search database implementation using FAISS
 import json
 import os
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 import logging
 import faiss
 import numpy as np
 
+from app.vector_store.compressed_index import (
+    create_index, default_compression, index_stats, open_index, write_index
+)
 from .schemas import VectorSearchDatabase, SearchResult, Chunk
 
 logger = logging.getLogger(__name__)
@@ -23,7 +26,8 @@ class FAISSVectorSearchDatabase(VectorSearchDatabase):
     def __init__(
         self,
         index_dir: str = "./data/rtld_faiss",
-        default_dim: int = 384
+        default_dim: int = 384,
+        compression: Optional[str] = None
     ):
         """
         Initialize FAISS vector database
@@ -31,13 +35,16 @@ class FAISSVectorSearchDatabase(VectorSearchDatabase):
         Args:
             index_dir: Directory to store index files
             default_dim: Default embedding dimension
+            compression: Storage for new indices: "flat", "sq8" or "pq"
+                (defaults to the VECTOR_COMPRESSION setting)
         """
         self.index_dir = Path(index_dir)
         self.index_dir.mkdir(parents=True, exist_ok=True)
         self.default_dim = default_dim
+        self.compression = compression or default_compression()
 
         # In-memory indices and metadata
-        self.indices: Dict[str, faiss.Index] = {}
+        self.indices: Dict[str, Any] = {}  # faiss.Index or CompressedVectorIndex
         self.metadata: Dict[str, List[Dict[str, Any]]] = {}
         self.texts: Dict[str, List[str]] = {}
 
@@ -48,7 +55,9 @@ class FAISSVectorSearchDatabase(VectorSearchDatabase):
         """Ensure an index exists for the given name and dimension"""
         if index_name not in self.indices:
             logger.info(f"Creating new FAISS index: {index_name} (dim={dim})")
-            self.indices[index_name] = faiss.IndexFlatIP(dim)
+            self.indices[index_name] = create_index(
+                dim, str(self.index_dir / f"{index_name}.faiss"), compression=self.compression
+            )
             self.metadata[index_name] = []
             self.texts[index_name] = []
 
@@ -140,8 +149,9 @@ class FAISSVectorSearchDatabase(VectorSearchDatabase):
             metadata = self.metadata[index_name][idx]
             text = self.texts[index_name][idx]
 
-            # Apply filters if provided
-            if filters and not self._matches_filters(metadata, filters):
+            # Apply filters if provided (to the chunk or a near-duplicate linked to it)
+            metadata = self._matching_view(metadata, filters)
+            if metadata is None:
                 continue
 
             # Create chunk object
@@ -162,6 +172,45 @@ class FAISSVectorSearchDatabase(VectorSearchDatabase):
         logger.info(f"Search in '{index_name}' returned {len(results)} results")
         return results
 
+    def link_duplicates(self, index_name: str, links: List[Tuple[str, Dict[str, Any]]]) -> int:
+        """
+        Record near-duplicate chunks that were skipped at ingest as aliases
+        of the chunks they duplicate
+
+        Args:
+            index_name: Name of the index
+            links: (canonical chunk id, the duplicate's metadata) pairs
+
+        Returns:
+            Number of aliases recorded
+        """
+        if not links or index_name not in self.metadata:
+            return 0
+        positions = {metadata.get('id'): i for i, metadata in enumerate(self.metadata[index_name])}
+        linked = 0
+        for canonical_id, alias in links:
+            i = positions.get(canonical_id)
+            if i is None:
+                continue
+            self.metadata[index_name][i].setdefault('aliases', []).append(alias)
+            linked += 1
+        if linked:
+            self._save_index(index_name)
+        return linked
+
+    def _matching_view(
+        self,
+        metadata: Dict[str, Any],
+        filters: Optional[Dict[str, Any]]
+    ) -> Optional[Dict[str, Any]]:
+        """The chunk's metadata, or a linked duplicate's merged over it, that matches the filters"""
+        if not filters:
+            return metadata
+        for view in [metadata, *({**metadata, **alias} for alias in metadata.get('aliases', ()))]:
+            if self._matches_filters(view, filters):
+                return view
+        return None
+
     def _matches_filters(self, metadata: Dict[str, Any], filters: Dict[str, Any]) -> bool:
         """Check if metadata matches the given filters"""
         for key, value in filters.items():
@@ -174,7 +223,7 @@ class FAISSVectorSearchDatabase(VectorSearchDatabase):
         try:
             # Save FAISS index
             index_path = self.index_dir / f"{index_name}.faiss"
-            faiss.write_index(self.indices[index_name], str(index_path))
+            write_index(self.indices[index_name], str(index_path))
 
             # Save metadata
             metadata_path = self.index_dir / f"{index_name}_metadata.jsonl"
@@ -200,7 +249,7 @@ class FAISSVectorSearchDatabase(VectorSearchDatabase):
 
             if index_path.exists() and metadata_path.exists():
                 # Load FAISS index
-                self.indices[index_name] = faiss.read_index(str(index_path))
+                self.indices[index_name] = open_index(str(index_path))
 
                 # Load metadata
                 self.metadata[index_name] = []
@@ -237,7 +286,8 @@ class FAISSVectorSearchDatabase(VectorSearchDatabase):
         return {
             'total_vectors': index.ntotal,
             'dimension': index.d,
-            'index_type': type(index).__name__
+            'index_type': type(index).__name__,
+            'storage': index_stats(index)
         }
 
 
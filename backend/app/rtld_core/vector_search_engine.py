@@ -3,7 +3,7 @@ Vector search engine that combines embedding and retrieval
 """
 
 import logging
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 
 from .schemas import VectorSearchEngine, Chunk, SearchResult
 from .ingestion.embeddings import RTLDTextEmbeddingModel
@@ -79,6 +79,30 @@ class RTLDVectorSearchEngine(VectorSearchEngine):
 
         logger.info(f"Indexed {len(chunks)} documents in '{index_name}'")
 
+    def link_duplicates(self, index_name: str, duplicates: List[Tuple[Chunk, str]]) -> int:
+        """
+        Make near-duplicate chunks skipped at ingest findable through the
+        chunks they duplicate
+
+        Args:
+            index_name: Name of the index
+            duplicates: (duplicate chunk, canonical chunk id) pairs
+
+        Returns:
+            Number of duplicates linked
+        """
+        links = [
+            (canonical_id, {
+                **chunk.metadata,
+                'id': chunk.id,
+                'source_file': chunk.source_file,
+                'page': chunk.page,
+                'chunk_index': chunk.chunk_index
+            })
+            for chunk, canonical_id in duplicates
+        ]
+        return self.vector_db.link_duplicates(index_name, links)
+
     def search(
         self,
         query: str,
@@ -1,25 +1,134 @@
 """
 AI-Powered Case Summary Service
 Generates intelligent summaries of legal conversations using OpenAI
+
+Summaries are rolling: a running summary is persisted per conversation and
+each request folds in only the messages added since it was written, so the
+prompt stays about the size of the summary plus the new turns. A backlog of
+new messages too long for one prompt (e.g. the first summary of a long
+consultation) is summarized hierarchically - chunk notes first, then notes
+of notes - before it is folded in.
 """
+import asyncio
+import hashlib
 import logging
-from typing import List, Dict, Any, Optional
+import sqlite3
+import threading
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime
 import json
 
 logger = logging.getLogger(__name__)
 
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS conversation_summaries (
+    conversation_id TEXT PRIMARY KEY,
+    summary_text TEXT NOT NULL,
+    message_count INTEGER NOT NULL,
+    prefix_hash TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+) WITHOUT ROWID;
+"""
+
+NOTES_PROMPT = """Summarize this part of a conversation between a client and a legal AI assistant as concise factual notes.
+Keep every fact, date, amount, party, document, deadline, law or case cited, and piece of advice given.
+Leave out greetings and repetition. Use short bullet points.
+
+{conversation}"""
+
+UPDATE_PROMPT = """You maintain a running LEGAL CASE SUMMARY of a conversation between a client and a legal AI assistant.
+
+CONVERSATION CONTEXT:
+- Law Type: {law_type}
+- Jurisdiction: {jurisdiction}
+- Date: {date}
+
+CURRENT SUMMARY (covers the conversation so far):
+{summary}
+
+NEW PART OF THE CONVERSATION:
+{conversation}
+
+Rewrite the summary so it also covers the new part. Keep the same seven sections (1. CLIENT SITUATION, 2. LEGAL ISSUES IDENTIFIED, 3. ADVICE PROVIDED, 4. KEY FACTS & EVIDENCE, 5. NEXT STEPS, 6. RISK ASSESSMENT, 7. PROFESSIONAL RECOMMENDATIONS).
+Keep earlier facts unless the new messages correct them; update next steps, risks and recommendations to the current state.
+Format the summary professionally, clearly, and concisely. Use bullet points where appropriate.
+
+IMPORTANT: This is a summary of general legal information provided, NOT legal advice."""
+
+
+def _count_tokens(text: str) -> int:
+    try:
+        from app.rag.context_assembler import count_tokens
+        return count_tokens(text)
+    except Exception:
+        return (len(text) + 3) // 4
+
+
+class SummaryStore:
+    """SQLite store of the running summary per conversation."""
+    
+    def __init__(self, storage_path: str):
+        self.storage_path = Path(storage_path)
+        self.storage_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.storage_path), check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+            self._conn.commit()
+    
+    def get(self, conversation_id: str) -> Optional[Tuple[str, int, str]]:
+        """(summary_text, message_count, prefix_hash) for a conversation, if any."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT summary_text, message_count, prefix_hash FROM conversation_summaries "
+                "WHERE conversation_id = ?", (conversation_id,)
+            ).fetchone()
+        return (row[0], row[1], row[2]) if row else None
+    
+    def put(self, conversation_id: str, summary_text: str, message_count: int, prefix_hash: str):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO conversation_summaries "
+                "(conversation_id, summary_text, message_count, prefix_hash, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (conversation_id, summary_text, message_count, prefix_hash, datetime.utcnow().isoformat())
+            )
+
 
 class AISummaryService:
     """Service for generating AI-powered case summaries."""
     
-    def __init__(self, openai_client=None):
+    MAX_LEVELS = 4  # Rounds of notes-of-notes before a backlog is cut
+    
+    def __init__(
+        self,
+        openai_client=None,
+        store: Optional[SummaryStore] = None,
+        chunk_tokens: int = 3000,
+        notes_max_tokens: int = 600
+    ):
+        """
+        Initialize the summary service.
+        
+        Args:
+            openai_client: Enables AI summaries (basic summaries without it)
+            store: Running-summary store; without one every summary is built from scratch
+            chunk_tokens: Largest slice of conversation sent to the LLM in one prompt
+            notes_max_tokens: Length of the notes a slice is condensed to
+        """
         self.openai_client = openai_client
+        self.store = store
+        self.chunk_tokens = chunk_tokens
+        self.notes_max_tokens = notes_max_tokens
+        self._conversation_locks: Dict[str, asyncio.Lock] = {}
     
     async def generate_case_summary(
         self,
         messages: List[Dict[str, Any]],
-        metadata: Optional[Dict[str, Any]] = None
+        metadata: Optional[Dict[str, Any]] = None,
+        conversation_id: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Generate comprehensive AI case summary from conversation.
@@ -27,6 +136,8 @@ class AISummaryService:
         Args:
             messages: List of chat messages (user and assistant)
             metadata: Additional context (law type, jurisdiction, etc.)
+            conversation_id: Key of the running summary (metadata['conversation_id']
+                or the opening messages when not given)
             
         Returns:
             Dictionary with structured case summary
@@ -38,17 +149,11 @@ class AISummaryService:
             if not messages or len(messages) == 0:
                 raise ValueError("No messages provided for summary generation")
             
-            # Extract conversation
-            conversation_text = self._format_conversation(messages)
-            logger.info(f"[AI_SUMMARY] Formatted conversation: {len(conversation_text)} chars")
-            
             # Generate summary using OpenAI or fallback
             if self.openai_client:
                 logger.info("[AI_SUMMARY] Using OpenAI for summary generation")
                 try:
-                    # Build AI prompt for summary generation
-                    summary_prompt = self._build_summary_prompt(conversation_text, metadata)
-                    summary_content = await self._generate_with_openai(summary_prompt)
+                    summary_content, folded = await self._rolling_summary(messages, metadata, conversation_id)
                     
                     # Structure the summary
                     structured_summary = self._structure_summary(summary_content, messages, metadata)
@@ -57,7 +162,8 @@ class AISummaryService:
                         "success": True,
                         "summary": structured_summary,
                         "generated_at": datetime.now().isoformat(),
-                        "message_count": len(messages)
+                        "message_count": len(messages),
+                        "new_messages_summarized": folded
                     }
                 except Exception as openai_error:
                     logger.warning(f"[AI_SUMMARY] OpenAI failed, using fallback: {openai_error}")
@@ -93,6 +199,113 @@ class AISummaryService:
                     "error": f"Failed to generate summary: {str(e)}. Please ensure you have messages in the conversation."
                 }
     
+    async def _rolling_summary(
+        self,
+        messages: List[Dict[str, Any]],
+        metadata: Optional[Dict[str, Any]],
+        conversation_id: Optional[str]
+    ) -> Tuple[str, int]:
+        """
+        Running summary updated with the messages added since it was stored.
+        
+        Returns:
+            (summary text, number of messages newly folded in)
+        """
+        key = conversation_id or (metadata or {}).get('conversation_id') or self._conversation_key(messages)
+        lock = self._conversation_locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            summary, start = None, 0
+            stored = self.store.get(key) if self.store else None
+            if stored:
+                stored_summary, stored_count, prefix_hash = stored
+                # Reuse only if the client still has the messages it covers, unchanged
+                if stored_count <= len(messages) and self._prefix_hash(messages[:stored_count]) == prefix_hash:
+                    summary, start = stored_summary, stored_count
+                else:
+                    logger.info(f"[AI_SUMMARY] Conversation {key[:12]} changed; summarizing from scratch")
+            
+            new_messages = messages[start:]
+            if summary is not None and not self._format_conversation(new_messages).strip():
+                return summary, 0
+            
+            conversation_text = await self._condense(new_messages)
+            logger.info(
+                f"[AI_SUMMARY] Folding {len(new_messages)} new messages ({len(conversation_text)} chars) "
+                f"into {'running' if summary else 'new'} summary"
+            )
+            if summary is None:
+                summary_prompt = self._build_summary_prompt(conversation_text, metadata)
+            else:
+                summary_prompt = self._build_update_prompt(summary, conversation_text, metadata)
+            summary = await self._generate_with_openai(summary_prompt)
+            
+            if self.store:
+                self.store.put(key, summary, len(messages), self._prefix_hash(messages))
+            return summary, len(new_messages)
+    
+    async def _condense(self, messages: List[Dict[str, Any]]) -> str:
+        """
+        Conversation text that fits one prompt.
+        
+        Short backlogs are returned as formatted; longer ones are split into
+        chunks, each condensed to notes concurrently, and the notes are
+        condensed again until they fit (hierarchical summarization).
+        """
+        parts = [part for part in self._format_conversation(messages).split("\n\n") if part]
+        for _ in range(self.MAX_LEVELS):
+            text = "\n\n".join(parts)
+            if _count_tokens(text) <= self.chunk_tokens or len(parts) <= 1:
+                return text
+            chunks = self._chunk(parts)
+            notes = await asyncio.gather(*[
+                self._generate_with_openai(
+                    NOTES_PROMPT.format(conversation=chunk),
+                    system='You are an expert legal analyst taking case notes. Be factual and specific.',
+                    max_tokens=self.notes_max_tokens
+                )
+                for chunk in chunks
+            ])
+            logger.info(f"[AI_SUMMARY] Condensed {len(chunks)} chunks into notes")
+            if len(chunks) == 1:
+                return notes[0]
+            parts = [f"NOTES ({i}):\n{note}" for i, note in enumerate(notes, 1)]
+        # Notes that stopped shrinking: keep the most recent part that fits
+        return "\n\n".join(parts)[-self.chunk_tokens * 4:]
+    
+    def _chunk(self, parts: List[str]) -> List[str]:
+        """Group consecutive turns into chunks of at most chunk_tokens (oversized turns are cut)."""
+        chunks, current, size = [], [], 0
+        limit_chars = self.chunk_tokens * 4
+        for part in parts:
+            tokens = _count_tokens(part)
+            if tokens > self.chunk_tokens:
+                part, tokens = part[:limit_chars], self.chunk_tokens
+            if current and size + tokens > self.chunk_tokens:
+                chunks.append("\n\n".join(current))
+                current, size = [], 0
+            current.append(part)
+            size += tokens
+        if current:
+            chunks.append("\n\n".join(current))
+        return chunks
+    
+    @staticmethod
+    def _message_text(msg: Dict[str, Any]) -> str:
+        return f"{msg.get('role', '')}:{msg.get('content') or msg.get('message') or msg.get('response', '')}"
+    
+    def _prefix_hash(self, messages: List[Dict[str, Any]]) -> str:
+        digest = hashlib.sha256()
+        for msg in messages:
+            digest.update(self._message_text(msg).encode('utf-8'))
+            digest.update(b"\x00")
+        return digest.hexdigest()
+    
+    def _conversation_key(self, messages: List[Dict[str, Any]]) -> str:
+        """Key for a conversation without an ID: its opening messages and timestamp."""
+        opening = messages[:2]
+        seed = "|".join(self._message_text(msg) + str(msg.get('timestamp', '')) for msg in opening)
+        return "auto:" + hashlib.sha256(seed.encode('utf-8')).hexdigest()
+    
     def _format_conversation(self, messages: List[Dict[str, Any]]) -> str:
         """Format conversation for AI analysis."""
         formatted = []
@@ -169,7 +382,24 @@ IMPORTANT: This is a summary of general legal information provided, NOT legal ad
 
         return prompt
     
-    async def _generate_with_openai(self, prompt: str) -> str:
+    def _build_update_prompt(self, summary: str, conversation: str, metadata: Optional[Dict]) -> str:
+        """Build prompt that folds new messages into the running summary."""
+        law_type = metadata.get('law_category') or metadata.get('law_type', 'General Law') if metadata else 'General Law'
+        jurisdiction = metadata.get('jurisdiction', 'Not specified') if metadata else 'Not specified'
+        return UPDATE_PROMPT.format(
+            law_type=law_type,
+            jurisdiction=jurisdiction,
+            date=datetime.now().strftime('%Y-%m-%d'),
+            summary=summary,
+            conversation=conversation
+        )
+    
+    async def _generate_with_openai(
+        self,
+        prompt: str,
+        system: str = 'You are an expert legal analyst creating case summaries. Be thorough, professional, and specific.',
+        max_tokens: int = 2000
+    ) -> str:
         """Generate summary using OpenAI."""
         try:
             from app.core.openai_client_unified import chat_completion
@@ -177,7 +407,7 @@ IMPORTANT: This is a summary of general legal information provided, NOT legal ad
             messages = [
                 {
                     'role': 'system',
-                    'content': 'You are an expert legal analyst creating case summaries. Be thorough, professional, and specific.'
+                    'content': system
                 },
                 {
                     'role': 'user',
@@ -185,10 +415,12 @@ IMPORTANT: This is a summary of general legal information provided, NOT legal ad
                 }
             ]
             
-            response = chat_completion(
+            # Off the event loop so chunk notes can be generated concurrently
+            response = await asyncio.to_thread(
+                chat_completion,
                 messages=messages,
                 temperature=0.3,  # Lower temperature for consistent summaries
-                max_tokens=2000
+                max_tokens=max_tokens
             )
             
             return response
@@ -357,7 +589,12 @@ def get_ai_summary_service():
             import openai
             # Only pass api_key - proxies and other unsupported args are not allowed
             client = openai.OpenAI(api_key=settings.OPENAI_API_KEY) if settings.OPENAI_API_KEY else None
-            _ai_summary_service = AISummaryService(openai_client=client)
+            _ai_summary_service = AISummaryService(
+                openai_client=client,
+                store=SummaryStore(f"{settings.DOC_STORE_PATH}/summaries.db"),
+                chunk_tokens=settings.SUMMARY_CHUNK_TOKENS,
+                notes_max_tokens=settings.SUMMARY_NOTES_MAX_TOKENS
+            )
         except:
             _ai_summary_service = AISummaryService(openai_client=None)
     return _ai_summary_service
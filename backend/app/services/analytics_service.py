@@ -1,140 +1,374 @@
-"""Analytics service for tracking usage, feedback, and metrics."""
+"""Analytics service for tracking usage, feedback, and metrics.
+
+Each worker keeps one fixed-size bucket per day (counters, a HyperLogLog of
+user ids, a count-min/top-k of citations and a t-digest of response
+times) and periodically writes it to a local SQLite time series, one row
+per (day, worker). Reads merge the rows of every worker, so all workers
+report the same numbers and history survives restarts.
+"""
+import os
+import json
+import time
+import uuid
+import socket
+import sqlite3
 import logging
+import threading
+from pathlib import Path
 from typing import Dict, List, Optional
 from datetime import datetime, timedelta
-from collections import defaultdict
 
 from app.core.config import settings
+from app.services.analytics_sketches import CountMinTopK, HyperLogLog, TDigest
 
 logger = logging.getLogger(__name__)
 
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS daily (
+    day TEXT NOT NULL,
+    worker TEXT NOT NULL,
+    counters TEXT NOT NULL,
+    users BLOB NOT NULL,
+    citations BLOB NOT NULL,
+    latency BLOB NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (day, worker)
+) WITHOUT ROWID;
+"""
+
+_COMPACTED = "compacted"
+
+
+def _empty_counters() -> Dict[str, int]:
+    return {
+        'messages': 0,
+        'queries': 0,
+        'feedback_positive': 0,
+        'feedback_negative': 0,
+        'confidence_high': 0,
+        'confidence_medium': 0,
+        'confidence_low': 0,
+    }
+
+
+class DayBucket:
+    """One day of analytics as fixed-size sketches."""
+
+    def __init__(self, precision: int = 12, top_k: int = 100, row_key: Optional[str] = None):
+        self.row_key = row_key
+        self.counters = _empty_counters()
+        self.users = HyperLogLog(precision)
+        self.citations = CountMinTopK(k=top_k)
+        self.latency = TDigest()
+        self.dirty = False
+
+    def merge(self, other: "DayBucket"):
+        for key, value in other.counters.items():
+            self.counters[key] = self.counters.get(key, 0) + value
+        self.users.merge(other.users)
+        self.citations.merge(other.citations)
+        self.latency.merge(other.latency)
+
+    def to_row(self) -> tuple:
+        return (json.dumps(self.counters), self.users.to_bytes(),
+                self.citations.to_bytes(), self.latency.to_bytes())
+
+    @classmethod
+    def from_row(cls, counters: str, users: bytes, citations: bytes, latency: bytes) -> "DayBucket":
+        bucket = cls()
+        bucket.counters.update(json.loads(counters))
+        bucket.users = HyperLogLog.from_bytes(users)
+        bucket.citations = CountMinTopK.from_bytes(citations)
+        bucket.latency = TDigest.from_bytes(latency)
+        return bucket
+
 
 class AnalyticsService:
     """Service for tracking analytics and metrics."""
-    
-    def __init__(self):
-        """Initialize analytics service."""
-        # In-memory storage (replace with Firestore/Cloud SQL in production)
-        self.metrics = {
-            'users_by_day': defaultdict(set),  # {date: set of user_ids}
-            'messages_by_day': defaultdict(int),  # {date: count}
-            'feedback': {
-                'positive': 0,
-                'negative': 0,
-                'total': 0
-            },
-            'confidence_levels': {
-                'high': 0,
-                'medium': 0,
-                'low': 0
-            },
-            'citation_counts': defaultdict(int),  # {source: count}
-            'queries': []  # List of query logs
-        }
-    
+
+    def __init__(self, db_path: Optional[str] = None, flush_interval: Optional[float] = None):
+        """
+        Initialize analytics service.
+
+        Args:
+            db_path: SQLite time-series file (defaults to settings.ANALYTICS_DB_PATH)
+            flush_interval: Seconds between background flushes (defaults to settings.ANALYTICS_FLUSH_SECONDS)
+        """
+        self.precision = settings.ANALYTICS_HLL_PRECISION
+        self.top_k = settings.ANALYTICS_TOP_K
+        self.flush_interval = flush_interval if flush_interval is not None else settings.ANALYTICS_FLUSH_SECONDS
+        self.worker_id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._days: Dict[str, DayBucket] = {}
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+
+        db_path = db_path or settings.ANALYTICS_DB_PATH
+        if db_path != ':memory:':
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        with self._db_lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+            self._conn.commit()
+        self.compact()
+
+        self._stop = threading.Event()
+        if self.flush_interval > 0:
+            threading.Thread(target=self._flush_loop, name="analytics-flush", daemon=True).start()
+        logger.info(f"Analytics ready: {db_path} (worker {self.worker_id})")
+
+    def _new_bucket(self, row_key: Optional[str] = None) -> DayBucket:
+        return DayBucket(self.precision, self.top_k, row_key)
+
+    def _bucket(self, date: Optional[datetime]) -> DayBucket:
+        """This worker's bucket for a day (caller holds the lock)."""
+        date_str = (date or datetime.utcnow()).strftime('%Y-%m-%d')
+        bucket = self._days.get(date_str)
+        if bucket is None:
+            bucket = self._new_bucket(f"{self.worker_id}-{uuid.uuid4().hex[:8]}")
+            self._days[date_str] = bucket
+        bucket.dirty = True
+        return bucket
+
     def track_user_activity(self, user_id: str, date: Optional[datetime] = None):
         """Track unique user activity."""
-        if date is None:
-            date = datetime.utcnow()
-        date_str = date.strftime('%Y-%m-%d')
-        self.metrics['users_by_day'][date_str].add(user_id)
-        logger.debug(f"Tracked user activity: {user_id} on {date_str}")
-    
+        with self._lock:
+            self._bucket(date).users.add(str(user_id))
+
     def track_message(self, date: Optional[datetime] = None):
         """Track message count."""
-        if date is None:
-            date = datetime.utcnow()
-        date_str = date.strftime('%Y-%m-%d')
-        self.metrics['messages_by_day'][date_str] += 1
-        logger.debug(f"Tracked message on {date_str}")
-    
+        with self._lock:
+            self._bucket(date).counters['messages'] += 1
+
     def track_feedback(self, is_positive: bool):
         """Track user feedback."""
-        if is_positive:
-            self.metrics['feedback']['positive'] += 1
-        else:
-            self.metrics['feedback']['negative'] += 1
-        self.metrics['feedback']['total'] += 1
-        logger.debug(f"Tracked feedback: {'positive' if is_positive else 'negative'}")
-    
+        with self._lock:
+            self._bucket(None).counters['feedback_positive' if is_positive else 'feedback_negative'] += 1
+
     def track_confidence(self, level: str):
         """Track confidence level (high, medium, low)."""
         if level in ['high', 'medium', 'low']:
-            self.metrics['confidence_levels'][level] += 1
-            logger.debug(f"Tracked confidence level: {level}")
-    
+            with self._lock:
+                self._bucket(None).counters[f'confidence_{level}'] += 1
+
     def track_citation(self, source: str):
         """Track document citation."""
-        self.metrics['citation_counts'][source] += 1
-        logger.debug(f"Tracked citation: {source}")
-    
+        with self._lock:
+            self._bucket(None).citations.add(source)
+
     def track_query(self, query: str, response_time: float, sources: List[str]):
         """Track query for analytics."""
-        self.metrics['queries'].append({
-            'query': query,
-            'response_time': response_time,
-            'sources': sources,
-            'timestamp': datetime.utcnow().isoformat()
-        })
-        # Keep only last 1000 queries
-        if len(self.metrics['queries']) > 1000:
-            self.metrics['queries'] = self.metrics['queries'][-1000:]
-    
+        with self._lock:
+            bucket = self._bucket(None)
+            bucket.counters['queries'] += 1
+            bucket.latency.add(response_time)
+
+    def flush(self):
+        """
+        Write this worker's changed day buckets to the time series.
+
+        Each bucket has its own row and the row holds the bucket's
+        cumulative state, so rewriting it is idempotent. Only today's
+        bucket is kept in memory afterwards; a late event for an earlier
+        day starts a fresh bucket (and row) that is merged on read.
+        """
+        today = datetime.utcnow().strftime('%Y-%m-%d')
+        now = time.time()
+        with self._db_lock:
+            with self._lock:
+                rows = [(day, bucket.row_key, *bucket.to_row(), now)
+                        for day, bucket in self._days.items() if bucket.dirty]
+                for bucket in self._days.values():
+                    bucket.dirty = False
+                for day in [day for day in self._days if day != today]:
+                    del self._days[day]
+            if not rows:
+                return
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO daily (day, worker, counters, users, citations, latency, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            self._conn.commit()
+
+    def _flush_loop(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.warning(f"Analytics flush failed: {e}")
+
+    def close(self):
+        """Stop the background flush and write pending buckets."""
+        self._stop.set()
+        self.flush()
+
+    def compact(self, keep_days: int = 2):
+        """
+        Merge the per-worker rows of days older than keep_days into one row per day.
+
+        Recent days are left alone because live workers still rewrite them.
+        """
+        cutoff = (datetime.utcnow() - timedelta(days=keep_days)).strftime('%Y-%m-%d')
+        with self._db_lock:
+            # Serialise with other workers compacting the same file
+            self._conn.execute("BEGIN IMMEDIATE")
+            days = [row[0] for row in self._conn.execute(
+                "SELECT day FROM daily WHERE day < ? GROUP BY day HAVING COUNT(*) > 1", (cutoff,)
+            )]
+            for day in days:
+                merged = self._new_bucket()
+                for row in self._conn.execute(
+                    "SELECT counters, users, citations, latency FROM daily WHERE day = ?", (day,)
+                ):
+                    merged.merge(DayBucket.from_row(*row))
+                self._conn.execute("DELETE FROM daily WHERE day = ?", (day,))
+                self._conn.execute(
+                    "INSERT INTO daily (day, worker, counters, users, citations, latency, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (day, _COMPACTED, *merged.to_row(), time.time())
+                )
+            self._conn.commit()
+        if days:
+            logger.info(f"Compacted analytics for {len(days)} days")
+
+    def _days_back(self, days: int) -> List[str]:
+        now = datetime.utcnow()
+        return [(now - timedelta(days=i)).strftime('%Y-%m-%d') for i in range(days)]
+
+    def _load(self, days: Optional[int] = None, columns: str = "counters, users, citations, latency") -> Dict[str, list]:
+        """Stored rows per day (all workers) after flushing this worker's state."""
+        self.flush()
+        query = f"SELECT day, {columns} FROM daily"
+        params: tuple = ()
+        if days is not None:
+            query += " WHERE day >= ?"
+            params = (self._days_back(days)[-1],)
+        with self._db_lock:
+            rows = self._conn.execute(query, params).fetchall()
+        by_day: Dict[str, list] = {}
+        for row in rows:
+            by_day.setdefault(row[0], []).append(row[1:])
+        return by_day
+
+    def _merged(self, days: Optional[int] = None) -> Dict[str, DayBucket]:
+        merged = {}
+        for day, rows in self._load(days).items():
+            bucket = self._new_bucket()
+            for row in rows:
+                bucket.merge(DayBucket.from_row(*row))
+            merged[day] = bucket
+        return merged
+
+    def _counters(self, days: Optional[int] = None) -> Dict[str, Dict[str, int]]:
+        totals = {}
+        for day, rows in self._load(days, columns="counters").items():
+            counters = _empty_counters()
+            for (raw,) in rows:
+                for key, value in json.loads(raw).items():
+                    counters[key] = counters.get(key, 0) + value
+            totals[day] = counters
+        return totals
+
+    def _total(self, counters: Dict[str, Dict[str, int]]) -> Dict[str, int]:
+        total = _empty_counters()
+        for day_counters in counters.values():
+            for key, value in day_counters.items():
+                total[key] = total.get(key, 0) + value
+        return total
+
     def get_unique_users_by_day(self, days: int = 30) -> Dict[str, int]:
-        """Get unique users per day for last N days."""
+        """Get unique users per day for last N days (HyperLogLog estimate)."""
+        by_day = self._load(days, columns="users")
         result = {}
-        for i in range(days):
-            date = datetime.utcnow() - timedelta(days=i)
-            date_str = date.strftime('%Y-%m-%d')
-            result[date_str] = len(self.metrics['users_by_day'].get(date_str, set()))
+        for date_str in self._days_back(days):
+            users = HyperLogLog(self.precision)
+            for (raw,) in by_day.get(date_str, []):
+                users.merge(HyperLogLog.from_bytes(raw))
+            result[date_str] = users.count()
         return result
-    
+
+    def get_unique_users(self, days: int = 30) -> int:
+        """Distinct users over the whole window (not the sum of daily counts)."""
+        users = HyperLogLog(self.precision)
+        for rows in self._load(days, columns="users").values():
+            for (raw,) in rows:
+                users.merge(HyperLogLog.from_bytes(raw))
+        return users.count()
+
     def get_messages_by_day(self, days: int = 30) -> Dict[str, int]:
         """Get message count per day for last N days."""
-        result = {}
-        for i in range(days):
-            date = datetime.utcnow() - timedelta(days=i)
-            date_str = date.strftime('%Y-%m-%d')
-            result[date_str] = self.metrics['messages_by_day'].get(date_str, 0)
-        return result
-    
+        counters = self._counters(days)
+        return {
+            date_str: counters.get(date_str, {}).get('messages', 0)
+            for date_str in self._days_back(days)
+        }
+
+    def get_feedback_counts(self) -> Dict[str, int]:
+        """Get all-time feedback counts."""
+        total = self._total(self._counters())
+        positive, negative = total['feedback_positive'], total['feedback_negative']
+        return {'positive': positive, 'negative': negative, 'total': positive + negative}
+
     def get_feedback_percentage(self) -> Dict[str, float]:
         """Get feedback percentages."""
-        total = self.metrics['feedback']['total']
+        counts = self.get_feedback_counts()
+        total = counts['total']
         if total == 0:
             return {'positive': 0.0, 'negative': 0.0}
-        
+
         return {
-            'positive': (self.metrics['feedback']['positive'] / total) * 100,
-            'negative': (self.metrics['feedback']['negative'] / total) * 100
+            'positive': (counts['positive'] / total) * 100,
+            'negative': (counts['negative'] / total) * 100
         }
-    
+
     def get_confidence_distribution(self) -> Dict[str, int]:
         """Get confidence level distribution."""
-        return self.metrics['confidence_levels'].copy()
-    
-    def get_top_cited_documents(self, limit: int = 10) -> List[Dict[str, any]]:
-        """Get most cited documents."""
-        sorted_citations = sorted(
-            self.metrics['citation_counts'].items(),
-            key=lambda x: x[1],
-            reverse=True
-        )
+        total = self._total(self._counters())
+        return {level: total[f'confidence_{level}'] for level in ('high', 'medium', 'low')}
+
+    def get_top_cited_documents(self, limit: int = 10, days: Optional[int] = None) -> List[Dict[str, any]]:
+        """Get most cited documents (count-min estimates; all time unless days is given)."""
+        citations = CountMinTopK(k=self.top_k)
+        for rows in self._load(days, columns="citations").values():
+            for (raw,) in rows:
+                citations.merge(CountMinTopK.from_bytes(raw))
         return [
             {'source': source, 'count': count}
-            for source, count in sorted_citations[:limit]
+            for source, count in citations.most_common(limit)
         ]
-    
+
+    def get_response_time_percentiles(self, days: int = 30) -> Dict[str, Optional[float]]:
+        """Response-time percentiles over the last N days (t-digest estimates)."""
+        latency = TDigest()
+        for rows in self._load(days, columns="latency").values():
+            for (raw,) in rows:
+                latency.merge(TDigest.from_bytes(raw))
+        return latency.percentiles()
+
+    def get_response_times_by_day(self, days: int = 30) -> Dict[str, Dict[str, Optional[float]]]:
+        """Daily p50/p95/p99 response times for last N days."""
+        merged = self._merged(days)
+        return {
+            date_str: merged[date_str].latency.percentiles((50, 95, 99)) if date_str in merged
+            else {'p50': None, 'p95': None, 'p99': None}
+            for date_str in self._days_back(days)
+        }
+
     def get_analytics_summary(self) -> Dict:
         """Get complete analytics summary."""
+        total = self._total(self._counters())
         return {
             'unique_users_by_day': self.get_unique_users_by_day(30),
+            'unique_users_30d': self.get_unique_users(30),
             'messages_by_day': self.get_messages_by_day(30),
             'feedback_percentages': self.get_feedback_percentage(),
             'confidence_distribution': self.get_confidence_distribution(),
             'top_cited_documents': self.get_top_cited_documents(10),
-            'total_queries': len(self.metrics['queries']),
-            'total_feedback': self.metrics['feedback']['total']
+            'response_time_percentiles': self.get_response_time_percentiles(30),
+            'total_queries': total['queries'],
+            'total_feedback': total['feedback_positive'] + total['feedback_negative']
         }
 
 
@@ -149,3 +383,8 @@ def get_analytics_service() -> AnalyticsService:
         _analytics_service = AnalyticsService()
     return _analytics_service
 
+
+def shutdown_analytics_service():
+    """Flush pending analytics if the service was started."""
+    if _analytics_service is not None:
+        _analytics_service.close()
@@ -0,0 +1,243 @@
+"""Fixed-size streaming sketches for analytics.
+
+Each sketch has constant memory, O(1) (amortised) updates, a compact
+binary form, and an exact merge, so per-worker and per-day sketches can
+be persisted and combined later:
+
+- HyperLogLog: distinct counts (unique users), ~1.6% error at p=12
+- CountMinTopK: approximate frequencies plus a bounded heavy-hitter list
+- TDigest: quantiles (p50/p95/p99 latency), most accurate at the tails
+
+Hashes use blake2b rather than hash() so sketches built in different
+processes agree.
+"""
+import json
+import math
+import hashlib
+import struct
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+
+def _hash64(item: str) -> int:
+    return int.from_bytes(hashlib.blake2b(item.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+class HyperLogLog:
+    """Distinct-count sketch with 2^p one-byte registers."""
+
+    def __init__(self, precision: int = 12):
+        if not 4 <= precision <= 18:
+            raise ValueError("HyperLogLog precision must be between 4 and 18")
+        self.p = precision
+        self.m = 1 << precision
+        self.registers = np.zeros(self.m, dtype=np.uint8)
+
+    def add(self, item: str):
+        h = _hash64(item)
+        index = h >> (64 - self.p)
+        rest = h & ((1 << (64 - self.p)) - 1)
+        rank = (64 - self.p) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def count(self) -> int:
+        m = self.m
+        alpha = {16: 0.673, 32: 0.697, 64: 0.709}.get(m, 0.7213 / (1 + 1.079 / m))
+        estimate = alpha * m * m / float(np.sum(np.ldexp(1.0, -self.registers.astype(np.int32))))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)  # linear counting for small cardinalities
+        return int(round(estimate))
+
+    def merge(self, other: "HyperLogLog"):
+        if other.p != self.p:
+            raise ValueError("Cannot merge HyperLogLogs of different precision")
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def to_bytes(self) -> bytes:
+        return bytes([self.p]) + self.registers.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "HyperLogLog":
+        sketch = cls(data[0])
+        sketch.registers = np.frombuffer(data[1:], dtype=np.uint8).copy()
+        return sketch
+
+
+class CountMinTopK:
+    """Count-min sketch with a bounded list of the heaviest keys."""
+
+    def __init__(self, width: int = 2048, depth: int = 4, k: int = 100):
+        if depth > 8:
+            raise ValueError("CountMinTopK depth must be at most 8")
+        self.width = width
+        self.depth = depth
+        self.k = k
+        self.table = np.zeros((depth, width), dtype=np.uint32)
+        self.total = 0
+        self.top: Dict[str, int] = {}
+        self._rows = np.arange(depth)
+        self._floor = 0  # lower bound on the smallest tracked count
+
+    def _columns(self, key: str) -> np.ndarray:
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=4 * self.depth).digest()
+        return np.frombuffer(digest, dtype=np.uint32) % self.width
+
+    def add(self, key: str, count: int = 1):
+        columns = self._columns(key)
+        self.table[self._rows, columns] += np.uint32(count)
+        self.total += count
+        self._offer(key, int(self.table[self._rows, columns].min()))
+
+    def _offer(self, key: str, estimate: int):
+        if key in self.top or len(self.top) < self.k:
+            self.top[key] = estimate
+            return
+        if estimate <= self._floor:
+            return
+        smallest = min(self.top, key=self.top.get)
+        self._floor = self.top[smallest]
+        if estimate > self._floor:
+            del self.top[smallest]
+            self.top[key] = estimate
+
+    def estimate(self, key: str) -> int:
+        return int(self.table[self._rows, self._columns(key)].min())
+
+    def most_common(self, limit: int = 10) -> List[Tuple[str, int]]:
+        return sorted(self.top.items(), key=lambda item: item[1], reverse=True)[:limit]
+
+    def merge(self, other: "CountMinTopK"):
+        if (other.width, other.depth) != (self.width, self.depth):
+            raise ValueError("Cannot merge count-min sketches of different shape")
+        self.table += other.table
+        self.total += other.total
+        candidates = set(self.top) | set(other.top)
+        estimates = {key: self.estimate(key) for key in candidates}
+        self.top = dict(sorted(estimates.items(), key=lambda item: item[1], reverse=True)[:self.k])
+        self._floor = min(self.top.values()) if len(self.top) >= self.k else 0
+
+    def to_bytes(self) -> bytes:
+        header = json.dumps({'w': self.width, 'd': self.depth, 'k': self.k,
+                             'n': self.total, 'top': self.top}).encode("utf-8")
+        return struct.pack("<I", len(header)) + header + self.table.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "CountMinTopK":
+        (size,) = struct.unpack_from("<I", data)
+        header = json.loads(data[4:4 + size])
+        sketch = cls(width=header['w'], depth=header['d'], k=header['k'])
+        sketch.table = np.frombuffer(data[4 + size:], dtype=np.uint32).reshape(sketch.depth, sketch.width).copy()
+        sketch.total = header['n']
+        sketch.top = header['top']
+        sketch._floor = min(sketch.top.values()) if len(sketch.top) >= sketch.k else 0
+        return sketch
+
+
+class TDigest:
+    """Merging t-digest (k1 scale function) for streaming quantiles."""
+
+    def __init__(self, compression: float = 100.0):
+        self.compression = compression
+        self.means = np.zeros(0, dtype=np.float64)
+        self.weights = np.zeros(0, dtype=np.float64)
+        self.count = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self._buffer: List[Tuple[float, float]] = []
+        self._buffer_limit = int(5 * compression)
+
+    def add(self, value: float, weight: float = 1.0):
+        value = float(value)
+        self._buffer.append((value, weight))
+        self.count += weight
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        if len(self._buffer) >= self._buffer_limit:
+            self._compress()
+
+    def _k(self, q: float) -> float:
+        return self.compression / (2 * math.pi) * math.asin(2 * min(max(q, 0.0), 1.0) - 1)
+
+    def _q(self, k: float) -> float:
+        return (math.sin(min(k * 2 * math.pi / self.compression, math.pi / 2)) + 1) / 2
+
+    def _compress(self):
+        if not self._buffer:
+            return
+        values, weights = zip(*self._buffer)
+        self._buffer = []
+        means = np.concatenate([self.means, np.asarray(values, dtype=np.float64)])
+        weights = np.concatenate([self.weights, np.asarray(weights, dtype=np.float64)])
+        order = np.argsort(means, kind="mergesort")
+        means, weights = means[order], weights[order]
+
+        total = float(weights.sum())
+        merged_means: List[float] = []
+        merged_weights: List[float] = []
+        current_mean, current_weight = float(means[0]), float(weights[0])
+        so_far = 0.0
+        limit = total * self._q(self._k(0.0) + 1)
+        for mean, weight in zip(means[1:].tolist(), weights[1:].tolist()):
+            if so_far + current_weight + weight <= limit:
+                current_weight += weight
+                current_mean += (mean - current_mean) * weight / current_weight
+            else:
+                merged_means.append(current_mean)
+                merged_weights.append(current_weight)
+                so_far += current_weight
+                limit = total * self._q(self._k(so_far / total) + 1)
+                current_mean, current_weight = mean, weight
+        merged_means.append(current_mean)
+        merged_weights.append(current_weight)
+        self.means = np.asarray(merged_means)
+        self.weights = np.asarray(merged_weights)
+
+    def quantile(self, q: float) -> Optional[float]:
+        self._compress()
+        if not self.count:
+            return None
+        if len(self.means) == 1:
+            return float(self.means[0])
+        target = min(max(q, 0.0), 1.0) * self.count
+        centers = np.cumsum(self.weights) - self.weights / 2
+        if target <= centers[0]:
+            span = centers[0]
+            return float(self.min + (self.means[0] - self.min) * (target / span if span else 0.0))
+        if target >= centers[-1]:
+            span = self.count - centers[-1]
+            return float(self.means[-1] + (self.max - self.means[-1]) * ((target - centers[-1]) / span if span else 0.0))
+        i = int(np.searchsorted(centers, target)) - 1
+        fraction = (target - centers[i]) / (centers[i + 1] - centers[i])
+        return float(self.means[i] + (self.means[i + 1] - self.means[i]) * fraction)
+
+    def percentiles(self, points: Iterable[float] = (50, 90, 95, 99)) -> Dict[str, Optional[float]]:
+        return {f"p{point:g}": self.quantile(point / 100.0) for point in points}
+
+    def merge(self, other: "TDigest"):
+        other._compress()
+        if not other.count:
+            return
+        self._buffer.extend(zip(other.means.tolist(), other.weights.tolist()))
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+
+    def to_bytes(self) -> bytes:
+        self._compress()
+        header = struct.pack("<dddI", self.compression, self.min, self.max, len(self.means))
+        return header + self.means.tobytes() + self.weights.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "TDigest":
+        compression, minimum, maximum, n = struct.unpack_from("<dddI", data)
+        offset = struct.calcsize("<dddI")
+        sketch = cls(compression)
+        sketch.means = np.frombuffer(data, dtype=np.float64, count=n, offset=offset).copy()
+        sketch.weights = np.frombuffer(data, dtype=np.float64, count=n, offset=offset + 8 * n).copy()
+        sketch.count = float(sketch.weights.sum())
+        sketch.min, sketch.max = minimum, maximum
+        return sketch
@@ -0,0 +1,539 @@
+"""Write-behind BigQuery writer for conversation, message and audit events.
+
+Request handlers no longer run one DML statement per message, title change
+or timestamp bump. They hand the change to the writer and return:
+
+- every change is written to a local SQLite spool (WAL) before the call
+  returns, so buffered rows survive a restart and are sent on the next start
+- append-only rows (messages, login events) are sent in batches with
+  streaming inserts, or with load jobs when BIGQUERY_APPEND_MODE is "load"
+- changes to mutable rows (conversations) are coalesced per row key while
+  buffered: later values win, counters add up, so a burst of messages in
+  one conversation becomes a single MERGE row
+- a background thread flushes every BIGQUERY_FLUSH_SECONDS, or sooner once
+  BIGQUERY_BATCH_ROWS changes are buffered
+- a spooled change is only deleted after its MERGE returns, so a crash or a
+  failed delete in between sends it again. Each flush generation has a
+  write id that the MERGE records on the row (TableSpec.write_ids), and
+  a change whose write id is already there is skipped, so counters are
+  never added twice. Generations are never coalesced with each other,
+  and they are written oldest first.
+
+Until a change has been flushed, the process that made it serves it from
+the buffer (pending_rows / pending_changes / apply_pending), so a user
+sees their own messages and titles immediately.
+"""
+import json
+import time
+import uuid
+import sqlite3
+import logging
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    from app.core.config import settings
+except Exception:  # settings unavailable (e.g. missing env); use defaults
+    settings = None
+
+logger = logging.getLogger(__name__)
+
+try:
+    from google.cloud import bigquery
+    BIGQUERY_AVAILABLE = True
+except ImportError:
+    BIGQUERY_AVAILABLE = False
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS appends (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    table_name TEXT NOT NULL,
+    row TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS patches (
+    table_name TEXT NOT NULL,
+    row_key TEXT NOT NULL,
+    generation INTEGER NOT NULL,
+    patch TEXT NOT NULL,
+    PRIMARY KEY (table_name, row_key, generation)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS spool_info (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+# Write ids kept per row; a replay is recognised while its id is among them
+APPLIED_WRITES_KEPT = 16
+
+
+def _setting(name: str, default):
+    return getattr(settings, name, default) if settings is not None else default
+
+
+def utc_now() -> str:
+    """Current time as an ISO-8601 UTC timestamp, the format rows are buffered in."""
+    return datetime.now(timezone.utc).isoformat()
+
+
+def parse_timestamp(value) -> Optional[datetime]:
+    """Timezone-aware datetime from a buffered ISO string or a BigQuery value."""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value
+
+
+@dataclass(frozen=True)
+class TableSpec:
+    """How rows of one table are written."""
+    name: str
+    key: Tuple[str, ...] = ()  # Row key of a mutable table (MERGE condition)
+    fields: Dict[str, str] = field(default_factory=dict)  # Non-key columns -> BigQuery type
+    counters: Tuple[str, ...] = ()  # Columns updated by adding a delta
+    write_ids: Optional[str] = None  # ARRAY<STRING> column of recently applied write ids
+    row_id: Optional[str] = None  # Append-only: column used as the streaming insert id
+
+
+TABLES: Dict[str, TableSpec] = {
+    'conversations': TableSpec(
+        name='conversations',
+        key=('conversation_id', 'user_id', 'env'),
+        fields={
+            'title': 'STRING',
+            'created_at': 'TIMESTAMP',
+            'updated_at': 'TIMESTAMP',
+            'is_archived': 'BOOL',
+            'is_pinned': 'BOOL',
+            'message_count': 'INT64',
+        },
+        counters=('message_count',),
+        write_ids='applied_writes',
+    ),
+    'messages': TableSpec(name='messages', row_id='message_id'),
+    'login_events': TableSpec(name='login_events', row_id='event_id'),
+}
+
+
+def _new_patch() -> Dict[str, Any]:
+    return {'create': False, 'set': {}, 'add': {}}
+
+
+def merge_patches(older: Optional[Dict[str, Any]], newer: Dict[str, Any]) -> Dict[str, Any]:
+    """Combine two changes to the same row: later values win, counter deltas add."""
+    if older is None:
+        return {'create': newer['create'], 'set': dict(newer['set']), 'add': dict(newer['add'])}
+    merged = {
+        'create': older['create'] or newer['create'],
+        'set': {**older['set'], **newer['set']},
+        'add': dict(older['add']),
+    }
+    for column, delta in newer['add'].items():
+        merged['add'][column] = merged['add'].get(column, 0) + delta
+    return merged
+
+
+def apply_patch(row: Dict[str, Any], patch: Dict[str, Any]) -> Dict[str, Any]:
+    """Row as it will be once the patch is written."""
+    updated = dict(row)
+    updated.update(patch['set'])
+    for column, delta in patch['add'].items():
+        updated[column] = (updated.get(column) or 0) + delta
+    return updated
+
+
+def _row_key(spec: TableSpec, values: Dict[str, Any]) -> str:
+    return json.dumps([values[column] for column in spec.key])
+
+
+def _matches(values: Dict[str, Any], match: Dict[str, Any]) -> bool:
+    return all(values.get(column) == value for column, value in match.items())
+
+
+class BigQueryEventWriter:
+    """Buffers, coalesces and batches writes to one BigQuery dataset."""
+
+    def __init__(
+        self,
+        client,
+        project_id: str,
+        dataset_id: str,
+        spool_path: Optional[str] = None,
+        flush_interval: Optional[float] = None,
+        batch_rows: Optional[int] = None,
+        append_mode: Optional[str] = None
+    ):
+        """
+        Initialize the writer.
+
+        Args:
+            client: google.cloud.bigquery.Client
+            project_id: GCP project of the dataset
+            dataset_id: Dataset holding the tables in TABLES
+            spool_path: SQLite spool file (defaults to one per dataset under BIGQUERY_SPOOL_DIR)
+            flush_interval: Seconds between background flushes (0 disables the thread)
+            batch_rows: Buffered changes that trigger an early flush; also the request batch size
+            append_mode: "stream" (insert_rows_json) or "load" (load jobs)
+        """
+        self.client = client
+        self.project_id = project_id
+        self.dataset_id = dataset_id
+        self.flush_interval = flush_interval if flush_interval is not None else float(_setting("BIGQUERY_FLUSH_SECONDS", 2.0))
+        self.batch_rows = batch_rows or int(_setting("BIGQUERY_BATCH_ROWS", 500))
+        self.append_mode = append_mode or _setting("BIGQUERY_APPEND_MODE", "stream")
+
+        self._lock = threading.Lock()  # Buffers
+        self._db_lock = threading.Lock()  # Spool connection
+        self._flush_lock = threading.Lock()  # One flush at a time
+        self._appends: Dict[str, List[Tuple[int, Dict[str, Any]]]] = {}
+        # Changes of the current generation, and of earlier ones still to be written
+        self._patches: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._retry_patches: Dict[int, Dict[Tuple[str, str], Dict[str, Any]]] = {}
+        # Changes taken by the running flush; still served to reads until written
+        self._inflight_appends: Dict[str, List[Tuple[int, Dict[str, Any]]]] = {}
+        self._inflight_patches: Dict[int, Dict[Tuple[str, str], Dict[str, Any]]] = {}
+        # Millisecond clock start, so generations (and write ids) never repeat after a restart
+        self._generation = int(time.time() * 1000)
+        self._buffered = 0
+
+        if spool_path is None:
+            spool_dir = Path(_setting("BIGQUERY_SPOOL_DIR", "./data/bigquery_spool"))
+            spool_path = str(spool_dir / f"{project_id}.{dataset_id}.db")
+        if spool_path != ':memory:':
+            Path(spool_path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(spool_path, check_same_thread=False)
+        with self._db_lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+            self._conn.execute(
+                "INSERT OR IGNORE INTO spool_info (key, value) VALUES ('spool_id', ?)", (uuid.uuid4().hex,)
+            )
+            self._spool_id = self._conn.execute("SELECT value FROM spool_info WHERE key = 'spool_id'").fetchone()[0]
+            self._conn.commit()
+        self._recover()
+
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread = None
+        if self.flush_interval > 0:
+            self._thread = threading.Thread(target=self._flush_loop, name="bigquery-writer", daemon=True)
+            self._thread.start()
+        logger.info(f"BigQuery writer ready: {project_id}.{dataset_id} (spool {spool_path}, {self._buffered} recovered)")
+
+    def _table(self, table: str) -> str:
+        return f"{self.project_id}.{self.dataset_id}.{table}"
+
+    def _recover(self):
+        """Load changes left in the spool by a previous process."""
+        with self._db_lock:
+            appends = self._conn.execute("SELECT seq, table_name, row FROM appends ORDER BY seq").fetchall()
+            patches = self._conn.execute(
+                "SELECT table_name, row_key, generation, patch FROM patches ORDER BY generation"
+            ).fetchall()
+        for seq, table, row in appends:
+            self._appends.setdefault(table, []).append((seq, json.loads(row)))
+        # Each generation may already have been written, so they stay apart
+        for table, row_key, generation, patch in patches:
+            self._retry_patches.setdefault(generation, {})[(table, row_key)] = json.loads(patch)
+            self._generation = max(self._generation, generation + 1)
+        self._buffered = len(appends) + len(patches)
+
+    def _write_id(self, generation: int) -> str:
+        return f"{self._spool_id}:{generation}"
+
+    # ----- writes -----
+
+    def append(self, table: str, row: Dict[str, Any]):
+        """Buffer a row for an append-only table."""
+        payload = json.dumps(row, default=str)
+        with self._lock:
+            with self._db_lock:
+                seq = self._conn.execute(
+                    "INSERT INTO appends (table_name, row) VALUES (?, ?)", (table, payload)
+                ).lastrowid
+                self._conn.commit()
+            self._appends.setdefault(table, []).append((seq, json.loads(payload)))
+            self._buffered += 1
+            full = self._buffered >= self.batch_rows
+        if full:
+            self._wake.set()
+
+    def upsert(
+        self,
+        table: str,
+        key: Dict[str, Any],
+        values: Optional[Dict[str, Any]] = None,
+        increments: Optional[Dict[str, int]] = None,
+        create: bool = False
+    ):
+        """
+        Buffer a change to a mutable row.
+
+        Args:
+            table: Table name in TABLES
+            key: Values of the table's key columns
+            values: Columns to set (a later change to the same column wins)
+            increments: Counter columns to add to
+            create: Insert the row if it does not exist yet (values must then
+                hold every column the insert needs)
+        """
+        spec = TABLES[table]
+        patch = _new_patch()
+        patch['create'] = create
+        patch['set'] = {**key, **(values or {})}
+        patch['add'] = dict(increments or {})
+        patch = json.loads(json.dumps(patch, default=str))
+        row_key = _row_key(spec, key)
+        with self._lock:
+            generation = self._generation
+            with self._db_lock:
+                existing = self._conn.execute(
+                    "SELECT patch FROM patches WHERE table_name = ? AND row_key = ? AND generation = ?",
+                    (table, row_key, generation)
+                ).fetchone()
+                spooled = merge_patches(json.loads(existing[0]) if existing else None, patch)
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO patches (table_name, row_key, generation, patch) VALUES (?, ?, ?, ?)",
+                    (table, row_key, generation, json.dumps(spooled))
+                )
+                self._conn.commit()
+            buffer_key = (table, row_key)
+            if buffer_key not in self._patches:
+                self._buffered += 1
+            self._patches[buffer_key] = merge_patches(self._patches.get(buffer_key), patch)
+            full = self._buffered >= self.batch_rows
+        if full:
+            self._wake.set()
+
+    # ----- read-your-writes -----
+
+    def pending_rows(self, table: str, **match) -> List[Dict[str, Any]]:
+        """Buffered append-only rows whose columns equal the given values."""
+        with self._lock:
+            rows = self._inflight_appends.get(table, []) + self._appends.get(table, [])
+            return [dict(row) for _, row in rows if _matches(row, match)]
+
+    def pending_changes(self, table: str, **match) -> List[Dict[str, Any]]:
+        """Buffered changes ({'create', 'set', 'add'}) to rows whose columns equal the given values."""
+        with self._lock:
+            earlier = {**self._inflight_patches, **self._retry_patches}
+            sources = [earlier[generation] for generation in sorted(earlier)] + [self._patches]
+            merged: Dict[str, Dict[str, Any]] = {}
+            for source in sources:
+                for (name, row_key), patch in source.items():
+                    if name == table:
+                        merged[row_key] = merge_patches(merged.get(row_key), patch)
+        return [patch for patch in merged.values() if _matches(patch['set'], match)]
+
+    def apply_pending(self, table: str, row: Dict[str, Any]) -> Dict[str, Any]:
+        """Row read from BigQuery with this process's buffered changes applied."""
+        spec = TABLES[table]
+        changes = self.pending_changes(table, **{column: row.get(column) for column in spec.key})
+        for patch in changes:
+            row = apply_patch(row, {'create': False, 'set': patch['set'], 'add': patch['add']})
+        return row
+
+    # ----- flushing -----
+
+    def flush(self):
+        """Send everything buffered; failed batches stay buffered and spooled for the next flush."""
+        with self._flush_lock:
+            with self._lock:
+                appends, self._appends = self._appends, {}
+                generations, self._retry_patches = self._retry_patches, {}
+                if self._patches:
+                    generations[self._generation] = self._patches
+                    self._patches = {}
+                    self._generation += 1
+                self._inflight_appends, self._inflight_patches = appends, generations
+                self._buffered = 0
+            if not appends and not generations:
+                return
+
+            failed_appends: Dict[str, List[Tuple[int, Dict[str, Any]]]] = {}
+            for table, rows in appends.items():
+                for start in range(0, len(rows), self.batch_rows):
+                    batch = rows[start:start + self.batch_rows]
+                    try:
+                        self._send_rows(table, [row for _, row in batch])
+                    except Exception as e:
+                        logger.warning(f"BigQuery append to {table} failed ({len(batch)} rows buffered): {e}")
+                        failed_appends.setdefault(table, []).extend(batch)
+                        continue
+                    self._forget_appends([seq for seq, _ in batch])
+
+            failed_patches: Dict[int, Dict[Tuple[str, str], Dict[str, Any]]] = {}
+            blocked = set()  # Rows with an earlier change still unwritten wait for it
+            for generation in sorted(generations):
+                by_table: Dict[str, List[Tuple[str, Dict[str, Any]]]] = {}
+                for (table, row_key), patch in generations[generation].items():
+                    if (table, row_key) in blocked:
+                        failed_patches.setdefault(generation, {})[(table, row_key)] = patch
+                    else:
+                        by_table.setdefault(table, []).append((row_key, patch))
+                for table, items in by_table.items():
+                    for start in range(0, len(items), self.batch_rows):
+                        batch = items[start:start + self.batch_rows]
+                        try:
+                            self._merge_rows(TABLES[table], [patch for _, patch in batch], self._write_id(generation))
+                        except Exception as e:
+                            logger.warning(f"BigQuery merge into {table} failed ({len(batch)} rows buffered): {e}")
+                            failed = {(table, row_key): patch for row_key, patch in batch}
+                            failed_patches.setdefault(generation, {}).update(failed)
+                            blocked.update(failed)
+                            continue
+                        self._forget_patches(table, [row_key for row_key, _ in batch], generation)
+
+            with self._lock:
+                # Put failures back in front of anything buffered meanwhile
+                for table, rows in failed_appends.items():
+                    self._appends[table] = rows + self._appends.get(table, [])
+                    self._buffered += len(rows)
+                # Failed generations are retried as they are, with the same write id
+                for generation, patches in failed_patches.items():
+                    self._retry_patches[generation] = patches
+                    self._buffered += len(patches)
+                self._inflight_appends, self._inflight_patches = {}, {}
+
+    # A failed spool delete only means the change is sent again after a
+    # restart (deduplicated by insert id / write id), so it is not fatal
+
+    def _forget_appends(self, seqs: List[int]):
+        try:
+            with self._db_lock:
+                self._conn.executemany("DELETE FROM appends WHERE seq = ?", [(seq,) for seq in seqs])
+                self._conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Could not remove {len(seqs)} sent rows from the BigQuery spool: {e}")
+
+    def _forget_patches(self, table: str, row_keys: List[str], generation: int):
+        try:
+            with self._db_lock:
+                self._conn.executemany(
+                    "DELETE FROM patches WHERE table_name = ? AND row_key = ? AND generation = ?",
+                    [(table, row_key, generation) for row_key in row_keys]
+                )
+                self._conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Could not remove {len(row_keys)} sent changes from the BigQuery spool: {e}")
+
+    def _send_rows(self, table: str, rows: List[Dict[str, Any]]):
+        spec = TABLES.get(table)
+        if self.append_mode == "load":
+            job_config = bigquery.LoadJobConfig(
+                source_format=bigquery.SourceFormat.NEWLINE_DELIMITED_JSON,
+                write_disposition=bigquery.WriteDisposition.WRITE_APPEND,
+            )
+            self.client.load_table_from_json(rows, self._table(table), job_config=job_config).result()
+            return
+        row_ids = [row.get(spec.row_id) for row in rows] if spec and spec.row_id else None
+        errors = self.client.insert_rows_json(self._table(table), rows, row_ids=row_ids)
+        if errors:
+            raise RuntimeError(f"{len(errors)} rows rejected: {errors[:3]}")
+
+    def _merge_rows(self, spec: TableSpec, patches: List[Dict[str, Any]], write_id: str):
+        """Apply coalesced changes with one MERGE over an array of structs (skipping rows that already have write_id)."""
+        columns = list(spec.key) + list(spec.fields)
+        types = {**{column: 'STRING' for column in spec.key}, **spec.fields}
+        structs = []
+        for patch in patches:
+            values = apply_patch({}, patch) if patch['create'] else {**patch['set'], **patch['add']}
+            params = [
+                bigquery.ScalarQueryParameter(column, types[column], self._param_value(types[column], values.get(column)))
+                for column in columns
+            ]
+            params.append(bigquery.ScalarQueryParameter('_create', 'BOOL', patch['create']))
+            params.append(bigquery.ScalarQueryParameter('_write_id', 'STRING', write_id))
+            structs.append(bigquery.StructQueryParameter(None, *params))
+
+        condition = " AND ".join(f"T.{column} = S.{column}" for column in spec.key)
+        updates = ", ".join(
+            f"{column} = T.{column} + COALESCE(S.{column}, 0)" if column in spec.counters
+            else f"{column} = COALESCE(S.{column}, T.{column})"
+            for column in spec.fields
+        )
+        inserted = [
+            f"COALESCE(S.{column}, 0)" if column in spec.counters else f"S.{column}"
+            for column in columns
+        ]
+        matched = "WHEN MATCHED"
+        if spec.write_ids:
+            applied = f"IFNULL(T.{spec.write_ids}, [])"
+            matched += f" AND S._write_id NOT IN UNNEST({applied})"
+            updates += (
+                f", {spec.write_ids} = ARRAY_CONCAT([S._write_id], ARRAY("
+                f"SELECT id FROM UNNEST({applied}) AS id WITH OFFSET AS pos "
+                f"WHERE pos < {APPLIED_WRITES_KEPT - 1} ORDER BY pos))"
+            )
+            columns.append(spec.write_ids)
+            inserted.append("[S._write_id]")
+        query = f"""
+        MERGE `{self._table(spec.name)}` T
+        USING UNNEST(@rows) S
+        ON {condition}
+        {matched} THEN UPDATE SET {updates}
+        WHEN NOT MATCHED AND S._create THEN INSERT ({", ".join(columns)}) VALUES ({", ".join(inserted)})
+        """
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=[bigquery.ArrayQueryParameter('rows', 'STRUCT', structs)]
+        )
+        self.client.query(query, job_config=job_config).result()
+
+    @staticmethod
+    def _param_value(bq_type: str, value):
+        if bq_type == 'TIMESTAMP':
+            return parse_timestamp(value)
+        return value
+
+    def _flush_loop(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.warning(f"BigQuery writer flush failed: {e}")
+
+    def close(self):
+        """Stop the background flush and send what is buffered."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.flush_interval + 5)
+        self.flush()
+
+
+# One writer per dataset
+_writers: Dict[str, BigQueryEventWriter] = {}
+_writers_lock = threading.Lock()
+
+
+def get_bigquery_writer(client, project_id: str, dataset_id: str) -> Optional[BigQueryEventWriter]:
+    """
+    Get or create the writer for a dataset.
+
+    Returns None when write-behind is disabled (BIGQUERY_WRITE_BEHIND) or the
+    BigQuery SDK is missing; callers then write synchronously.
+    """
+    if not BIGQUERY_AVAILABLE or client is None or not _setting("BIGQUERY_WRITE_BEHIND", True):
+        return None
+    name = f"{project_id}.{dataset_id}"
+    with _writers_lock:
+        if name not in _writers:
+            _writers[name] = BigQueryEventWriter(client, project_id, dataset_id)
+        return _writers[name]
+
+
+def shutdown_bigquery_writers():
+    """Flush every writer that was started."""
+    with _writers_lock:
+        writers = list(_writers.values())
+    for writer in writers:
+        writer.close()
@@ -8,6 +8,7 @@ import logging
 from typing import List, Dict, Optional, Any
 from datetime import datetime
 import re
+from app.core.tracing import traced
 
 logger = logging.getLogger(__name__)
 
@@ -285,6 +286,7 @@ class CaseCitationService:
         self.cases = LANDMARK_CASES
         logger.info("CaseCitationService initialized with landmark case database")
     
+    @traced("case_citations")
     def find_relevant_cases(
         self,
         query: str,
@@ -384,6 +386,7 @@ class CaseCitationService:
         else:  # full
             return f"{name} {citation} ({court})"
     
+    @traced("case_citations.format")
     def generate_case_reference_block(self, cases: List[Dict], context: str = "") -> str:
         """
         Generate a formatted block of case references for chat response.
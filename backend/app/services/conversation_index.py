@@ -0,0 +1,452 @@
+"""
+Conversation Search Index for LegalAI
+Local SQLite FTS5 full-text index of each user's conversations, messages,
+and attachments. Kept in sync from the conversation write path so search
+never has to scan BigQuery.
+
+Users whose history predates the index are backfilled from BigQuery once
+(see SearchService); until a user is marked backfilled, search keeps
+using BigQuery for them, since the index only holds their recent writes.
+The write path only reaches the index of the instance that served it, so
+each user's sync time is recorded as a watermark and rows written through
+other instances since then are re-synced from BigQuery once it is stale.
+"""
+import os
+import re
+import sqlite3
+import hashlib
+import logging
+from datetime import datetime
+from pathlib import Path
+from threading import Lock
+from typing import List, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY,
+    doc_key TEXT NOT NULL UNIQUE,
+    owner TEXT NOT NULL,
+    env TEXT NOT NULL,
+    result_type TEXT NOT NULL,
+    conversation_id TEXT,
+    message_id TEXT,
+    attachment_id TEXT,
+    title TEXT,
+    body TEXT,
+    created_at TEXT,
+    is_archived INTEGER NOT NULL DEFAULT 0,
+    status TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_documents_owner ON documents(owner, env);
+CREATE INDEX IF NOT EXISTS idx_documents_conversation ON documents(conversation_id);
+
+CREATE TABLE IF NOT EXISTS backfilled_users (
+    owner TEXT NOT NULL,
+    env TEXT NOT NULL,
+    backfilled_at TEXT NOT NULL,
+    synced_at TEXT,
+    PRIMARY KEY (owner, env)
+);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5(
+    owner, title, body,
+    content='documents', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2'
+);
+
+CREATE TRIGGER IF NOT EXISTS documents_ai AFTER INSERT ON documents BEGIN
+    INSERT INTO documents_fts(rowid, owner, title, body)
+    VALUES (new.id, new.owner, new.title, new.body);
+END;
+CREATE TRIGGER IF NOT EXISTS documents_ad AFTER DELETE ON documents BEGIN
+    INSERT INTO documents_fts(documents_fts, rowid, owner, title, body)
+    VALUES ('delete', old.id, old.owner, old.title, old.body);
+END;
+CREATE TRIGGER IF NOT EXISTS documents_au AFTER UPDATE ON documents BEGIN
+    INSERT INTO documents_fts(documents_fts, rowid, owner, title, body)
+    VALUES ('delete', old.id, old.owner, old.title, old.body);
+    INSERT INTO documents_fts(rowid, owner, title, body)
+    VALUES (new.id, new.owner, new.title, new.body);
+END;
+"""
+
+
+def _owner_token(user_id: str, env: str) -> str:
+    """
+    Single FTS token identifying a user's partition.
+
+    Every query is ANDed with this token, so the inverted index itself
+    restricts matches to the caller's documents.
+    """
+    digest = hashlib.sha1(f"{env}:{user_id}".encode('utf-8')).hexdigest()[:24]
+    return f"u{digest}"
+
+
+def _to_iso(value) -> str:
+    if value is None:
+        return datetime.utcnow().isoformat()
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def build_match_query(query: str) -> Optional[str]:
+    """
+    Convert free text into a safe FTS5 MATCH expression.
+
+    Every token must match; the last token is a prefix match so
+    results update as the user types.
+    """
+    tokens = _TOKEN_RE.findall(query.lower())
+    if not tokens:
+        return None
+    terms = [f'"{t}"' for t in tokens[:-1]]
+    terms.append(f'"{tokens[-1]}"*')
+    return " AND ".join(terms)
+
+
+class ConversationSearchIndex:
+    """SQLite FTS5 index of user conversation content, partitioned per user."""
+
+    def __init__(self, db_path: Optional[str] = None, env: Optional[str] = None):
+        if db_path is None:
+            db_path = os.getenv('CONVERSATION_INDEX_PATH') or os.path.join(
+                os.path.dirname(os.path.dirname(os.path.dirname(__file__))),
+                'data', 'search', 'conversations.db'
+            )
+        self.db_path = db_path
+        self.env = env or os.getenv('ENVIRONMENT', 'dev')
+        self._lock = Lock()
+
+        if db_path != ':memory:':
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(backfilled_users)")}
+            if 'synced_at' not in columns:  # index files written before sync watermarks
+                self._conn.execute("ALTER TABLE backfilled_users ADD COLUMN synced_at TEXT")
+            self._conn.commit()
+        logger.info(f"Conversation search index ready: {db_path}")
+
+    # ===== WRITE PATH =====
+
+    def _row(self, doc_key: str, user_id: str, result_type: str, **fields) -> Dict:
+        return {
+            'doc_key': doc_key,
+            'owner': _owner_token(user_id, self.env),
+            'env': self.env,
+            'result_type': result_type,
+            'conversation_id': fields.get('conversation_id'),
+            'message_id': fields.get('message_id'),
+            'attachment_id': fields.get('attachment_id'),
+            'title': fields.get('title') or '',
+            'body': fields.get('body') or '',
+            'created_at': _to_iso(fields.get('created_at')),
+            'is_archived': 1 if fields.get('is_archived') else 0,
+            'status': fields.get('status'),
+        }
+
+    def _upsert(self, doc_key: str, user_id: str, result_type: str, **fields):
+        columns = self._row(doc_key, user_id, result_type, **fields)
+        names = ", ".join(columns)
+        placeholders = ", ".join(f":{k}" for k in columns)
+        updates = ", ".join(f"{k}=excluded.{k}" for k in columns if k != 'doc_key')
+        with self._lock:
+            self._conn.execute(
+                f"INSERT INTO documents ({names}) VALUES ({placeholders}) "
+                f"ON CONFLICT(doc_key) DO UPDATE SET {updates}",
+                columns
+            )
+            self._conn.commit()
+
+    def index_conversation(
+        self,
+        user_id: str,
+        conversation_id: str,
+        title: str,
+        created_at=None,
+        is_archived: bool = False
+    ):
+        """Add or refresh a conversation title entry."""
+        self._upsert(
+            f"conversation:{conversation_id}", user_id, 'conversation',
+            conversation_id=conversation_id, title=title, body='',
+            created_at=created_at, is_archived=is_archived
+        )
+
+    def index_message(
+        self,
+        user_id: str,
+        conversation_id: str,
+        message_id: str,
+        content: str,
+        created_at=None
+    ):
+        """Add a message to the index."""
+        self._upsert(
+            f"message:{message_id}", user_id, 'message',
+            conversation_id=conversation_id, message_id=message_id,
+            body=content, created_at=created_at
+        )
+
+    def index_attachment(
+        self,
+        user_id: str,
+        attachment_id: str,
+        file_name: str,
+        conversation_id: Optional[str] = None,
+        ocr_text: Optional[str] = None,
+        status: str = 'completed',
+        created_at=None
+    ):
+        """Add or refresh an attachment (file name plus OCR text when available)."""
+        self._upsert(
+            f"attachment:{attachment_id}", user_id, 'attachment',
+            conversation_id=conversation_id, attachment_id=attachment_id,
+            title=file_name, body=ocr_text or '', status=status,
+            created_at=created_at
+        )
+
+    def update_conversation_title(self, user_id: str, conversation_id: str, title: str):
+        """Rename a conversation."""
+        owner = _owner_token(user_id, self.env)
+        with self._lock:
+            self._conn.execute(
+                "UPDATE documents SET title = ? WHERE doc_key = ? AND owner = ?",
+                (title, f"conversation:{conversation_id}", owner)
+            )
+            self._conn.commit()
+
+    def set_conversation_archived(self, user_id: str, conversation_id: str, archived: bool = True):
+        """Mark a conversation archived (its title stops matching)."""
+        owner = _owner_token(user_id, self.env)
+        with self._lock:
+            self._conn.execute(
+                "UPDATE documents SET is_archived = ? WHERE doc_key = ? AND owner = ?",
+                (1 if archived else 0, f"conversation:{conversation_id}", owner)
+            )
+            self._conn.commit()
+
+    def update_attachment_status(
+        self,
+        user_id: str,
+        attachment_id: str,
+        status: str,
+        conversation_id: Optional[str] = None
+    ):
+        """Update attachment status after upload confirmation."""
+        owner = _owner_token(user_id, self.env)
+        with self._lock:
+            self._conn.execute(
+                "UPDATE documents SET status = ?, conversation_id = COALESCE(?, conversation_id) "
+                "WHERE doc_key = ? AND owner = ?",
+                (status, conversation_id, f"attachment:{attachment_id}", owner)
+            )
+            self._conn.commit()
+
+    def delete_message(self, message_id: str):
+        """Remove a message from the index."""
+        with self._lock:
+            self._conn.execute("DELETE FROM documents WHERE doc_key = ?", (f"message:{message_id}",))
+            self._conn.commit()
+
+    def delete_conversation(self, conversation_id: str):
+        """Remove a conversation and everything indexed under it."""
+        with self._lock:
+            self._conn.execute("DELETE FROM documents WHERE conversation_id = ?", (conversation_id,))
+            self._conn.commit()
+
+    def backfill_user(
+        self,
+        user_id: str,
+        conversations: List[Dict],
+        messages: List[Dict],
+        attachments: List[Dict],
+        synced_at: Optional[datetime] = None,
+        overwrite: bool = False
+    ) -> int:
+        """
+        Load a user's history (BigQuery rows) and record the sync watermark.
+
+        On the first backfill, rows already in the index came from the live
+        write path and are newer than the history, so they are left as they
+        are; a re-sync of rows changed since the watermark overwrites them.
+
+        Args:
+            synced_at: When the rows were read (defaults to now); the next
+                re-sync starts from here
+            overwrite: Replace rows already in the index
+
+        Returns:
+            Number of documents added or updated
+        """
+        rows = [
+            self._row(f"conversation:{c['conversation_id']}", user_id, 'conversation',
+                      conversation_id=c['conversation_id'], title=c.get('title'),
+                      created_at=c.get('created_at'), is_archived=c.get('is_archived'))
+            for c in conversations
+        ] + [
+            self._row(f"message:{m['message_id']}", user_id, 'message',
+                      conversation_id=m.get('conversation_id'), message_id=m['message_id'],
+                      body=m.get('content'), created_at=m.get('created_at'))
+            for m in messages
+        ] + [
+            self._row(f"attachment:{a['attachment_id']}", user_id, 'attachment',
+                      conversation_id=a.get('conversation_id'), attachment_id=a['attachment_id'],
+                      title=a.get('file_name'), body=a.get('ocr_text'), status=a.get('status'),
+                      created_at=a.get('uploaded_at'))
+            for a in attachments
+        ]
+        owner = _owner_token(user_id, self.env)
+        synced = _to_iso(synced_at)
+        with self._lock:
+            added = 0
+            if rows:
+                names = ", ".join(rows[0])
+                placeholders = ", ".join(f":{k}" for k in rows[0])
+                conflict = "DO NOTHING"
+                if overwrite:
+                    conflict = "DO UPDATE SET " + ", ".join(f"{k}=excluded.{k}" for k in rows[0] if k != 'doc_key')
+                added = self._conn.executemany(
+                    f"INSERT INTO documents ({names}) VALUES ({placeholders}) "
+                    f"ON CONFLICT(doc_key) {conflict}",
+                    rows
+                ).rowcount
+            self._conn.execute(
+                "INSERT INTO backfilled_users (owner, env, backfilled_at, synced_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(owner, env) DO UPDATE SET synced_at = excluded.synced_at",
+                (owner, self.env, synced, synced)
+            )
+            self._conn.commit()
+        logger.info(f"Synced search index for a user: {added} of {len(rows)} documents written")
+        return added
+
+    def pending_attachments(self, user_id: str) -> List[str]:
+        """IDs of the user's attachments not yet indexed as completed."""
+        owner = _owner_token(user_id, self.env)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT attachment_id FROM documents WHERE owner = ? AND env = ? "
+                "AND result_type = 'attachment' AND COALESCE(status, '') != 'completed'",
+                (owner, self.env)
+            ).fetchall()
+        return [row['attachment_id'] for row in rows]
+
+    # ===== READ PATH =====
+
+    def synced_at(self, user_id: str) -> Optional[datetime]:
+        """
+        When the user's history was last synced from BigQuery, or None until
+        it has been backfilled (see backfill_user).
+        """
+        owner = _owner_token(user_id, self.env)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COALESCE(synced_at, backfilled_at) AS synced_at FROM backfilled_users "
+                "WHERE owner = ? AND env = ?",
+                (owner, self.env)
+            ).fetchone()
+        return datetime.fromisoformat(row['synced_at']) if row else None
+
+    def search(
+        self,
+        query: str,
+        user_id: str,
+        limit: int = 20,
+        offset: int = 0
+    ) -> List[Dict]:
+        """
+        Ranked full-text search over a single user's partition.
+
+        SECURITY: the owner token is part of the MATCH expression, so
+        other users' rows are never candidates.
+        """
+        match = build_match_query(query)
+        if not match:
+            return []
+
+        owner = _owner_token(user_id, self.env)
+        full_match = f'owner:"{owner}" AND {{title body}}: ({match})'
+
+        sql = """
+        SELECT
+          d.result_type,
+          d.conversation_id,
+          d.message_id,
+          d.attachment_id,
+          CASE WHEN d.result_type = 'message'
+               THEN COALESCE(c.title, '')
+               ELSE d.title
+          END AS title,
+          CASE WHEN d.result_type = 'conversation'
+               THEN substr(d.title, 1, 200)
+               ELSE snippet(documents_fts, 2, '', '', '...', 32)
+          END AS snippet,
+          d.created_at,
+          (CASE d.result_type
+             WHEN 'conversation' THEN 2.0
+             WHEN 'message' THEN 1.0
+             ELSE 0.8
+           END) - bm25(documents_fts, 0.0, 4.0, 1.0) AS relevance_score
+        FROM documents_fts
+        JOIN documents d ON d.id = documents_fts.rowid
+        LEFT JOIN documents c ON c.doc_key = 'conversation:' || d.conversation_id
+        WHERE documents_fts MATCH ?
+          AND d.env = ?
+          AND NOT (d.result_type = 'conversation' AND d.is_archived = 1)
+          AND NOT (d.result_type = 'attachment' AND COALESCE(d.status, '') != 'completed')
+        ORDER BY relevance_score DESC, d.created_at DESC
+        LIMIT ? OFFSET ?
+        """
+
+        with self._lock:
+            rows = self._conn.execute(sql, (full_match, self.env, limit, offset)).fetchall()
+
+        # bm25() is lower-is-better, so it is subtracted from the type boost
+        results = []
+        for row in rows:
+            results.append({
+                'result_type': row['result_type'],
+                'conversation_id': row['conversation_id'],
+                'message_id': row['message_id'],
+                'attachment_id': row['attachment_id'],
+                'title': row['title'] or '',
+                'snippet': row['snippet'] or (row['title'] or ''),
+                'created_at': datetime.fromisoformat(row['created_at']),
+                'relevance_score': round(row['relevance_score'], 4),
+            })
+        return results
+
+
+# Global instance
+_conversation_index = None
+
+def get_conversation_index() -> Optional[ConversationSearchIndex]:
+    """Get conversation search index instance (None if it cannot be opened)"""
+    global _conversation_index
+    if _conversation_index is None:
+        try:
+            _conversation_index = ConversationSearchIndex()
+        except Exception as e:
+            logger.error(f"Failed to open conversation search index: {e}")
+            return None
+    return _conversation_index
+
+
+def sync_index(method: str, **kwargs):
+    """Mirror a successful write into the search index (never fails the write)"""
+    index = get_conversation_index()
+    if index is None:
+        return
+    try:
+        getattr(index, method)(**kwargs)
+    except Exception as e:
+        logger.warning(f"Search index update '{method}' failed: {e}")
@@ -2,12 +2,20 @@
 Conversation Service for LegalAI
 Manages ChatGPT-like conversation and message persistence
 All operations are user-scoped (never trust client user_id)
+
+Writes go through the write-behind BigQuery writer when it is enabled:
+they are spooled locally and sent in batches, and reads merge in this
+process's not-yet-flushed changes.
 """
 import uuid
+import json
 import logging
 import os
 from typing import List, Optional, Dict, Any
-from datetime import datetime
+from datetime import datetime, timezone
+
+from app.services.conversation_index import sync_index
+from app.services.bigquery_writer import get_bigquery_writer, parse_timestamp, utc_now
 
 logger = logging.getLogger(__name__)
 
@@ -25,6 +33,7 @@ class ConversationService:
     
     def __init__(self):
         self.client = None
+        self.writer = None
         self.project_id = os.getenv('GCP_PROJECT_ID')
         self.dataset_id = os.getenv('BIGQUERY_DATASET', 'legalai')
         self.env = os.getenv('ENVIRONMENT', 'dev')
@@ -52,6 +61,33 @@ class ConversationService:
                 logger.info("ConversationService initialized with default credentials")
         except Exception as e:
             logger.error(f"Failed to initialize BigQuery: {e}")
+            return
+
+        try:
+            self.writer = get_bigquery_writer(self.client, self.project_id, self.dataset_id)
+        except Exception as e:
+            logger.error(f"Failed to start BigQuery writer, writing synchronously: {e}")
+    
+    def _conversation_key(self, conversation_id: str, user_id: str) -> Dict[str, str]:
+        return {'conversation_id': conversation_id, 'user_id': user_id, 'env': self.env}
+    
+    def _pending_conversations(self, user_id: str) -> Dict[str, Dict]:
+        """Conversations created by this process that may not be in BigQuery yet."""
+        created = {}
+        for patch in self.writer.pending_changes('conversations', user_id=user_id, env=self.env):
+            if patch['create']:
+                row = {**patch['set'], **patch['add']}
+                for column in ('created_at', 'updated_at'):
+                    row[column] = parse_timestamp(row.get(column))
+                created[row['conversation_id']] = row
+        return created
+    
+    def _with_pending(self, conversation: Dict) -> Dict:
+        """Conversation row with this process's buffered changes applied."""
+        conversation = self.writer.apply_pending('conversations', conversation)
+        for column in ('created_at', 'updated_at'):
+            conversation[column] = parse_timestamp(conversation.get(column))
+        return conversation
     
     async def create_conversation(
         self,
@@ -65,8 +101,36 @@ class ConversationService:
         """
         if not self.client:
             logger.warning("BigQuery not available, using mock")
+            conversation_id = str(uuid.uuid4())
+            sync_index('index_conversation', user_id=user_id,
+                       conversation_id=conversation_id, title=title)
+            return {
+                'conversation_id': conversation_id,
+                'user_id': user_id,
+                'title': title,
+                'created_at': datetime.utcnow(),
+                'updated_at': datetime.utcnow(),
+                'is_archived': False,
+                'is_pinned': False,
+                'message_count': 0
+            }
+        
+        if self.writer:
+            conversation_id = str(uuid.uuid4())
+            now = utc_now()
+            self.writer.upsert(
+                'conversations',
+                self._conversation_key(conversation_id, user_id),
+                values={'title': title, 'created_at': now, 'updated_at': now,
+                        'is_archived': False, 'is_pinned': False},
+                increments={'message_count': 0},
+                create=True
+            )
+            logger.info(f"Queued conversation {conversation_id} for user {user_id}")
+            sync_index('index_conversation', user_id=user_id,
+                       conversation_id=conversation_id, title=title)
             return {
-                'conversation_id': str(uuid.uuid4()),
+                'conversation_id': conversation_id,
                 'user_id': user_id,
                 'title': title,
                 'created_at': datetime.utcnow(),
@@ -99,6 +163,8 @@ class ConversationService:
             query_job.result()
             
             logger.info(f"Created conversation {conversation_id} for user {user_id}")
+            sync_index('index_conversation', user_id=user_id,
+                       conversation_id=conversation_id, title=title)
             
             return {
                 'conversation_id': conversation_id,
@@ -172,12 +238,39 @@ class ConversationService:
             results = list(query_job.result())
             
             conversations = [dict(row) for row in results]
+            if self.writer:
+                conversations = self._merge_pending_list(conversations, user_id, limit, offset, archived)
             return conversations
             
         except Exception as e:
             logger.error(f"Failed to list conversations: {e}")
             return []
     
+    def _merge_pending_list(
+        self,
+        conversations: List[Dict],
+        user_id: str,
+        limit: int,
+        offset: int,
+        archived: bool
+    ) -> List[Dict]:
+        """Apply buffered changes to a sidebar page; new conversations join the first page."""
+        rows = {c['conversation_id']: self._with_pending(c) for c in conversations}
+        if offset == 0:
+            for conversation_id, row in self._pending_conversations(user_id).items():
+                if conversation_id not in rows:
+                    messages = sorted(
+                        self.writer.pending_rows('messages', conversation_id=conversation_id, user_id=user_id),
+                        key=lambda m: m['created_at']
+                    )
+                    row['first_message'] = messages[0]['content'] if messages else None
+                    row['last_message_at'] = parse_timestamp(messages[-1]['created_at']) if messages else None
+                    rows[conversation_id] = row
+        merged = [row for row in rows.values() if bool(row.get('is_archived')) == archived]
+        oldest = datetime.min.replace(tzinfo=timezone.utc)
+        merged.sort(key=lambda c: (bool(c.get('is_pinned')), c.get('updated_at') or oldest), reverse=True)
+        return merged[:limit]
+    
     async def get_conversation(
         self,
         conversation_id: str,
@@ -213,11 +306,18 @@ class ConversationService:
             conv_job = self.client.query(conv_query, job_config=conv_job_config)
             conv_results = list(conv_job.result())
             
-            if not conv_results:
+            if conv_results:
+                conversation = dict(conv_results[0])
+                if self.writer:
+                    conversation = self._with_pending(conversation)
+            elif self.writer:
+                # Created by this process and not flushed yet
+                conversation = self._pending_conversations(user_id).get(conversation_id)
+            else:
+                conversation = None
+            if not conversation:
                 return None  # Not found or access denied
             
-            conversation = dict(conv_results[0])
-            
             # Get messages
             msg_query = f"""
             SELECT message_id, conversation_id, role, content, created_at, metadata
@@ -238,6 +338,8 @@ class ConversationService:
             
             msg_job = self.client.query(msg_query, job_config=msg_job_config)
             messages = [dict(row) for row in msg_job.result()]
+            if self.writer:
+                messages = self._merge_pending_messages(messages, conversation_id, user_id)
             
             conversation['messages'] = messages
             
@@ -247,6 +349,21 @@ class ConversationService:
             logger.error(f"Failed to get conversation: {e}")
             return None
     
+    def _merge_pending_messages(self, messages: List[Dict], conversation_id: str, user_id: str) -> List[Dict]:
+        seen = {m['message_id'] for m in messages}
+        for row in self.writer.pending_rows('messages', conversation_id=conversation_id, user_id=user_id):
+            if row['message_id'] not in seen:
+                messages.append({
+                    'message_id': row['message_id'],
+                    'conversation_id': row['conversation_id'],
+                    'role': row['role'],
+                    'content': row['content'],
+                    'created_at': parse_timestamp(row['created_at']),
+                    'metadata': json.loads(row['metadata']) if row.get('metadata') else None,
+                })
+        messages.sort(key=lambda m: parse_timestamp(m['created_at']))
+        return messages
+    
     async def create_message(
         self,
         conversation_id: str,
@@ -261,8 +378,42 @@ class ConversationService:
         SECURITY: user_id from session, verifies conversation ownership.
         """
         if not self.client:
+            message_id = str(uuid.uuid4())
+            sync_index('index_message', user_id=user_id, conversation_id=conversation_id,
+                       message_id=message_id, content=content)
             return {
-                'message_id': str(uuid.uuid4()),
+                'message_id': message_id,
+                'conversation_id': conversation_id,
+                'role': role,
+                'content': content,
+                'created_at': datetime.utcnow(),
+                'metadata': metadata
+            }
+        
+        if self.writer:
+            message_id = str(uuid.uuid4())
+            now = utc_now()
+            self.writer.append('messages', {
+                'message_id': message_id,
+                'conversation_id': conversation_id,
+                'user_id': user_id,
+                'role': role,
+                'content': content,
+                'created_at': now,
+                'metadata': json.dumps(metadata or {}),
+                'env': self.env,
+            })
+            # Consecutive messages coalesce into one timestamp / count update
+            self.writer.upsert(
+                'conversations',
+                self._conversation_key(conversation_id, user_id),
+                values={'updated_at': now},
+                increments={'message_count': 1}
+            )
+            sync_index('index_message', user_id=user_id, conversation_id=conversation_id,
+                       message_id=message_id, content=content)
+            return {
+                'message_id': message_id,
                 'conversation_id': conversation_id,
                 'role': role,
                 'content': content,
@@ -316,6 +467,8 @@ class ConversationService:
             self.client.query(update_query, job_config=update_job_config).result()
             
             logger.info(f"Created message {message_id} in conversation {conversation_id}")
+            sync_index('index_message', user_id=user_id, conversation_id=conversation_id,
+                       message_id=message_id, content=content)
             
             return {
                 'message_id': message_id,
@@ -337,6 +490,18 @@ class ConversationService:
     ) -> bool:
         """Archive conversation (soft delete)"""
         if not self.client:
+            sync_index('set_conversation_archived', user_id=user_id,
+                       conversation_id=conversation_id)
+            return True
+        
+        if self.writer:
+            self.writer.upsert(
+                'conversations',
+                self._conversation_key(conversation_id, user_id),
+                values={'is_archived': True, 'updated_at': utc_now()}
+            )
+            sync_index('set_conversation_archived', user_id=user_id,
+                       conversation_id=conversation_id)
             return True
         
         try:
@@ -358,6 +523,8 @@ class ConversationService:
             )
             
             self.client.query(query, job_config=job_config).result()
+            sync_index('set_conversation_archived', user_id=user_id,
+                       conversation_id=conversation_id)
             return True
             
         except Exception as e:
@@ -372,6 +539,18 @@ class ConversationService:
     ) -> bool:
         """Update conversation title"""
         if not self.client:
+            sync_index('update_conversation_title', user_id=user_id,
+                       conversation_id=conversation_id, title=title)
+            return True
+        
+        if self.writer:
+            self.writer.upsert(
+                'conversations',
+                self._conversation_key(conversation_id, user_id),
+                values={'title': title, 'updated_at': utc_now()}
+            )
+            sync_index('update_conversation_title', user_id=user_id,
+                       conversation_id=conversation_id, title=title)
             return True
         
         try:
@@ -394,6 +573,8 @@ class ConversationService:
             )
             
             self.client.query(query, job_config=job_config).result()
+            sync_index('update_conversation_title', user_id=user_id,
+                       conversation_id=conversation_id, title=title)
             return True
             
         except Exception as e:
@@ -9,6 +9,7 @@ import re
 from pathlib import Path
 from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime
+from app.core.tracing import traced
 
 logger = logging.getLogger(__name__)
 
@@ -61,6 +62,7 @@ class CourtLookupService:
         """Check if the service is available."""
         return self._initialized and self.lookup_api is not None
     
+    @traced("court_lookup")
     def lookup(
         self,
         city: Optional[str] = None,
@@ -1,5 +1,7 @@
 """Document management service for organizing and tracking documents."""
 import logging
+import sqlite3
+from threading import Lock
 from typing import List, Dict, Optional
 from datetime import datetime
 from pathlib import Path
@@ -9,39 +11,87 @@ from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Record fields promoted to indexed columns; the full record lives in `data`
+_INDEXED_FIELDS = ('source_type', 'organization', 'subject', 'status', 'created_at', 'updated_at')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    doc_id TEXT PRIMARY KEY,
+    source_type TEXT,
+    organization TEXT,
+    subject TEXT,
+    status TEXT,
+    created_at TEXT,
+    updated_at TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_documents_organization ON documents(organization, updated_at);
+CREATE INDEX IF NOT EXISTS idx_documents_subject ON documents(subject, updated_at);
+CREATE INDEX IF NOT EXISTS idx_documents_status ON documents(status, updated_at);
+CREATE INDEX IF NOT EXISTS idx_documents_source_type ON documents(source_type, updated_at);
+CREATE INDEX IF NOT EXISTS idx_documents_updated ON documents(updated_at);
+
+CREATE TABLE IF NOT EXISTS document_tags (
+    doc_id TEXT NOT NULL,
+    tag TEXT NOT NULL,
+    PRIMARY KEY (tag, doc_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_document_tags_doc ON document_tags(doc_id);
+"""
+
 
 class DocumentService:
     """Service for managing document metadata and organization."""
     
-    def __init__(self):
-        """Initialize document service."""
-        self.documents_file = Path(settings.DOC_STORE_PATH) / "documents.json"
-        self.documents_file.parent.mkdir(parents=True, exist_ok=True)
-        self.documents: Dict[str, Dict] = {}
-        self._load_documents()
-    
-    def _load_documents(self):
-        """Load documents from storage."""
-        if self.documents_file.exists():
-            try:
-                with open(self.documents_file, 'r', encoding='utf-8') as f:
-                    self.documents = json.load(f)
-                logger.info(f"Loaded {len(self.documents)} documents from storage")
-            except Exception as e:
-                logger.error(f"Error loading documents: {e}")
-                self.documents = {}
-        else:
-            logger.info("No existing documents file, starting fresh")
+    def __init__(self, db_path: Optional[str] = None):
+        """
+        Initialize document service.
+        
+        Args:
+            db_path: SQLite registry file (defaults to DOC_STORE_PATH/documents.db)
+        """
+        self.db_path = Path(db_path or Path(settings.DOC_STORE_PATH) / "documents.db")
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+            self._conn.commit()
+        self._import_legacy_json()
     
-    def _save_documents(self):
-        """Save documents to storage."""
+    def _import_legacy_json(self):
+        """One-time import of the old documents.json registry."""
+        legacy_file = self.db_path.parent / "documents.json"
+        if not legacy_file.exists():
+            return
+        with self._lock:
+            if self._conn.execute("SELECT 1 FROM documents LIMIT 1").fetchone():
+                return
         try:
-            with open(self.documents_file, 'w', encoding='utf-8') as f:
-                json.dump(self.documents, f, indent=2, ensure_ascii=False)
-            logger.info(f"Saved {len(self.documents)} documents to storage")
+            with open(legacy_file, 'r', encoding='utf-8') as f:
+                documents = json.load(f)
+            with self._lock, self._conn:
+                for document in documents.values():
+                    self._write(document)
+            logger.info(f"Imported {len(documents)} documents from {legacy_file}")
         except Exception as e:
-            logger.error(f"Error saving documents: {e}")
-            raise
+            logger.error(f"Error importing legacy documents: {e}")
+    
+    def _write(self, document: Dict):
+        """Upsert one record and its tags (caller holds the lock and transaction)."""
+        self._conn.execute(
+            "INSERT OR REPLACE INTO documents (doc_id, source_type, organization, subject, status, "
+            "created_at, updated_at, data) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (document['doc_id'], *(document.get(f) for f in _INDEXED_FIELDS),
+             json.dumps(document, ensure_ascii=False))
+        )
+        self._conn.execute("DELETE FROM document_tags WHERE doc_id = ?", (document['doc_id'],))
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO document_tags (doc_id, tag) VALUES (?, ?)",
+            [(document['doc_id'], tag) for tag in document.get('tags') or []]
+        )
     
     def register_document(
         self,
@@ -51,10 +101,12 @@ class DocumentService:
         organization: Optional[str] = None,
         subject: Optional[str] = None,
         tags: Optional[List[str]] = None,
-        metadata: Optional[Dict] = None
+        metadata: Optional[Dict] = None,
+        chunk_count: int = 0
     ):
         """Register a new document."""
-        self.documents[doc_id] = {
+        now = datetime.utcnow().isoformat()
+        document = {
             'doc_id': doc_id,
             'source_name': source_name,
             'source_type': source_type,
@@ -62,55 +114,93 @@ class DocumentService:
             'subject': subject,
             'tags': tags or [],
             'metadata': metadata or {},
-            'created_at': datetime.utcnow().isoformat(),
-            'updated_at': datetime.utcnow().isoformat(),
-            'chunk_count': 0,
+            'created_at': now,
+            'updated_at': now,
+            'chunk_count': chunk_count,
             'status': 'indexed'
         }
-        self._save_documents()
+        with self._lock, self._conn:
+            self._write(document)
         logger.info(f"Registered document: {doc_id}")
     
     def update_document(self, doc_id: str, **updates):
         """Update document metadata."""
-        if doc_id in self.documents:
-            self.documents[doc_id].update(updates)
-            self.documents[doc_id]['updated_at'] = datetime.utcnow().isoformat()
-            self._save_documents()
-            logger.info(f"Updated document: {doc_id}")
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT data FROM documents WHERE doc_id = ?", (doc_id,)).fetchone()
+            if row is None:
+                return
+            document = json.loads(row[0])
+            document.update(updates)
+            document['updated_at'] = datetime.utcnow().isoformat()
+            self._write(document)
+        logger.info(f"Updated document: {doc_id}")
     
     def get_document(self, doc_id: str) -> Optional[Dict]:
         """Get document by ID."""
-        return self.documents.get(doc_id)
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM documents WHERE doc_id = ?", (doc_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+    
+    def _filter_sql(
+        self,
+        organization: Optional[str],
+        subject: Optional[str],
+        source_type: Optional[str],
+        tags: Optional[List[str]],
+        status: Optional[str]
+    ):
+        clauses, params = [], []
+        for column, value in (('organization', organization), ('subject', subject),
+                              ('source_type', source_type), ('status', status)):
+            if value:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if tags:
+            placeholders = ",".join("?" * len(tags))
+            clauses.append(f"doc_id IN (SELECT doc_id FROM document_tags WHERE tag IN ({placeholders}))")
+            params.extend(tags)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        return where, params
     
     def list_documents(
         self,
         organization: Optional[str] = None,
         subject: Optional[str] = None,
         source_type: Optional[str] = None,
-        tags: Optional[List[str]] = None
+        tags: Optional[List[str]] = None,
+        status: Optional[str] = None,
+        limit: Optional[int] = None,
+        offset: int = 0
     ) -> List[Dict]:
-        """List documents with optional filters."""
-        results = list(self.documents.values())
-        
-        if organization:
-            results = [d for d in results if d.get('organization') == organization]
-        if subject:
-            results = [d for d in results if d.get('subject') == subject]
-        if source_type:
-            results = [d for d in results if d.get('source_type') == source_type]
-        if tags:
-            results = [d for d in results if any(tag in d.get('tags', []) for tag in tags)]
-        
-        # Sort by updated_at descending
-        results.sort(key=lambda x: x.get('updated_at', ''), reverse=True)
-        
-        return results
+        """List documents with optional filters, most recently updated first."""
+        where, params = self._filter_sql(organization, subject, source_type, tags, status)
+        sql = f"SELECT data FROM documents {where} ORDER BY updated_at DESC"
+        if limit is not None:
+            sql += " LIMIT ? OFFSET ?"
+            params += [limit, offset]
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [json.loads(row[0]) for row in rows]
+    
+    def count_documents(
+        self,
+        organization: Optional[str] = None,
+        subject: Optional[str] = None,
+        source_type: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+        status: Optional[str] = None
+    ) -> int:
+        """Count documents matching the same filters as list_documents."""
+        where, params = self._filter_sql(organization, subject, source_type, tags, status)
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM documents {where}", params).fetchone()[0]
     
     def delete_document(self, doc_id: str) -> bool:
         """Delete document metadata."""
-        if doc_id in self.documents:
-            del self.documents[doc_id]
-            self._save_documents()
+        with self._lock, self._conn:
+            deleted = self._conn.execute("DELETE FROM documents WHERE doc_id = ?", (doc_id,)).rowcount
+            self._conn.execute("DELETE FROM document_tags WHERE doc_id = ?", (doc_id,))
+        if deleted:
             logger.info(f"Deleted document: {doc_id}")
             return True
         return False
@@ -126,4 +216,3 @@ def get_document_service() -> DocumentService:
     if _document_service is None:
         _document_service = DocumentService()
     return _document_service
-
@@ -0,0 +1,950 @@
+"""
+Clause templates for generated legal documents.
+
+Each document type is a list of sections. Static sections (boilerplate
+clauses, headings, signature blocks) are plain str.format templates rendered
+locally; a variable section names the form field whose free text may be
+drafted into clause language by the LLM before the section is rendered.
+
+Some clauses differ by jurisdiction (e.g. Ontario residential tenancies
+and employment standards); overrides replace the default template of a
+section, and the resolved section list per (document type, jurisdiction)
+is cached.
+"""
+from dataclasses import dataclass
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+RULE = "═══════════════════════════════════════════════════════════════"
+
+
+@dataclass(frozen=True)
+class ClauseSection:
+    """One section of a document template."""
+    name: str
+    template: str
+    variable_field: Optional[str] = None  # Form field the LLM drafts into clause text
+    instruction: str = ""  # What the drafted text should be
+
+
+@dataclass(frozen=True)
+class DocumentTemplate:
+    """Sections and field defaults for one document type."""
+    title: str
+    sections: Tuple[ClauseSection, ...]
+    defaults: Dict[str, str]
+
+
+def _body(template: str) -> str:
+    # Drop only the newlines around the triple-quoted literal; extra leading
+    # blank lines are kept as spacing before the section.
+    return template.removeprefix("\n").rstrip("\n")
+
+
+def _static(name: str, template: str) -> ClauseSection:
+    return ClauseSection(name, _body(template))
+
+
+def _variable(name: str, template: str, field: str, instruction: str) -> ClauseSection:
+    return ClauseSection(name, _body(template), field, instruction)
+
+
+TEMPLATES: Dict[str, DocumentTemplate] = {
+    'sue_letter': DocumentTemplate(
+        title="Legal Complaint",
+        defaults={
+            'plaintiff_name': '[PLAINTIFF NAME]',
+            'defendant_name': '[DEFENDANT NAME]',
+            'plaintiff_address': '[PLAINTIFF ADDRESS]',
+            'defendant_address': '[DEFENDANT ADDRESS]',
+            'incident_date': '[DATE OF INCIDENT]',
+            'legal_grounds': '[DESCRIPTION OF LEGAL GROUNDS]',
+            'damages_amount': '[AMOUNT]',
+            'relief_sought': '[RELIEF SOUGHT]',
+            'additional_clauses': '',
+        },
+        sections=(
+            _static('caption', """
+LEGAL COMPLAINT
+
+IN THE {court_jurisdiction} COURT
+
+{plaintiff_name}
+Plaintiff
+
+v.
+
+{defendant_name}
+Defendant
+
+CASE NO: [TO BE ASSIGNED]
+
+""" + RULE + """
+
+COMPLAINT FOR DAMAGES
+
+""" + RULE + """
+
+NOW COMES the Plaintiff, {plaintiff_name}, by and through undersigned counsel, and for their Complaint against Defendant {defendant_name}, states as follows:
+"""),
+            _static('parties', """
+PARTIES
+
+1. Plaintiff {plaintiff_name} is a resident of:
+   {plaintiff_address}
+
+2. Defendant {defendant_name} is a resident of:
+   {defendant_address}
+"""),
+            _static('jurisdiction_and_venue', """
+JURISDICTION AND VENUE
+
+3. This Court has jurisdiction over this matter pursuant to applicable law.
+
+4. Venue is proper in this Court.
+"""),
+            _variable('factual_allegations', """
+FACTUAL ALLEGATIONS
+
+5. On or about {incident_date}, the following events occurred:
+
+{legal_grounds}
+""", 'legal_grounds', "a numbered-paragraph statement of the facts, in chronological order"),
+            _static('legal_grounds', """
+LEGAL GROUNDS
+
+6. The Defendant's actions constitute:
+   {legal_grounds_summary}
+
+7. As a direct and proximate result of Defendant's actions, Plaintiff has suffered damages.
+"""),
+            _static('damages', """
+DAMAGES
+
+8. Plaintiff has incurred the following damages:
+   - Economic damages: ${damages_amount}
+   - Non-economic damages: [TO BE PROVEN AT TRIAL]
+   - Punitive damages: [AS APPLICABLE]
+"""),
+            _variable('relief_sought', """
+RELIEF SOUGHT
+
+WHEREFORE, Plaintiff respectfully requests that this Court:
+
+{relief_sought}
+
+{additional_clauses}
+
+And for such other and further relief as the Court deems just and proper.
+""", 'relief_sought', "a lettered list of the orders and relief requested from the court"),
+            _static('signature', """
+Respectfully submitted,
+
+_______________________________
+{plaintiff_name}
+Plaintiff
+
+Date: {today}
+
+""" + RULE + """
+
+VERIFICATION
+
+I, {plaintiff_name}, declare under penalty of perjury that the foregoing is true and correct to the best of my knowledge.
+
+_______________________________
+{plaintiff_name}
+
+Date: {today}
+
+""" + RULE + """
+
+IMPORTANT NOTICE:
+This is a legal document. It should be reviewed by a licensed attorney before filing with any court.
+Filing requirements vary by jurisdiction. Consult local court rules.
+"""),
+        ),
+    ),
+    'amendment': DocumentTemplate(
+        title="Amendment to Contract",
+        defaults={
+            'party_a': '[PARTY A NAME]',
+            'party_b': '[PARTY B NAME]',
+            'original_contract_name': '[ORIGINAL CONTRACT NAME]',
+            'reason_for_amendment': '[REASON FOR AMENDMENT]',
+            'sections_to_amend': '[SECTIONS TO AMEND]',
+            'new_terms': '[NEW TERMS AND CONDITIONS]',
+            'additional_notes': '',
+        },
+        sections=(
+            _static('preamble', """
+AMENDMENT TO CONTRACT
+
+""" + RULE + """
+
+This Amendment ("Amendment") is entered into as of {effective_date}, by and between:
+
+PARTY A: {party_a}
+PARTY B: {party_b}
+
+(collectively, the "Parties")
+"""),
+            _static('recitals', """
+RECITALS
+
+WHEREAS, the Parties entered into a contract titled "{original_contract_name}" (the "Original Contract");
+
+WHEREAS, the Parties wish to amend certain provisions of the Original Contract;
+
+WHEREAS, the reason for this amendment is: {reason_for_amendment};
+
+NOW, THEREFORE, in consideration of the mutual covenants and agreements contained herein, the Parties agree as follows:
+"""),
+            _static('sections_amended', """
+AMENDMENTS
+
+1. SECTIONS TO BE AMENDED
+
+The following sections of the Original Contract are hereby amended:
+
+{sections_to_amend}
+"""),
+            _variable('new_terms', """
+2. NEW TERMS AND CONDITIONS
+
+The amended sections shall now read as follows:
+
+{new_terms}
+""", 'new_terms', "the replacement wording of each amended section, numbered to match the original contract"),
+            _static('boilerplate', """
+3. EFFECTIVE DATE
+
+This Amendment shall be effective as of {effective_date}.
+
+4. REMAINING TERMS
+
+All other terms and conditions of the Original Contract not specifically amended herein shall remain in full force and effect.
+
+5. GOVERNING LAW
+
+This Amendment shall be governed by the laws of {governing_jurisdiction}.
+
+6. ENTIRE AGREEMENT
+
+This Amendment, together with the Original Contract, constitutes the entire agreement between the Parties with respect to the subject matter hereof.
+"""),
+            _static('signature', """
+{additional_notes}
+
+IN WITNESS WHEREOF, the Parties have executed this Amendment as of the date first written above.
+
+PARTY A:
+
+_______________________________
+{party_a}
+Date: _______________
+
+
+PARTY B:
+
+_______________________________
+{party_b}
+Date: _______________
+
+""" + RULE + """
+
+IMPORTANT NOTICE:
+This amendment should be reviewed by legal counsel before execution.
+Both parties should retain signed copies for their records.
+"""),
+        ),
+    ),
+    'nda': DocumentTemplate(
+        title="Non-Disclosure Agreement",
+        defaults={
+            'disclosing_party': '[DISCLOSING PARTY NAME]',
+            'receiving_party': '[RECEIVING PARTY NAME]',
+            'purpose': '[PURPOSE OF DISCLOSURE]',
+            'confidential_info': '[DESCRIPTION OF CONFIDENTIAL INFORMATION]',
+            'term_years': '2',
+        },
+        sections=(
+            _static('preamble', """
+NON-DISCLOSURE AGREEMENT (NDA)
+
+""" + RULE + """
+
+This Non-Disclosure Agreement ("Agreement") is entered into as of {effective_date}, by and between:
+
+DISCLOSING PARTY: {disclosing_party}
+RECEIVING PARTY: {receiving_party}
+"""),
+            _static('recitals', """
+RECITALS
+
+WHEREAS, the Disclosing Party possesses certain confidential and proprietary information;
+
+WHEREAS, the Receiving Party desires to receive such information for the following purpose:
+{purpose};
+
+NOW, THEREFORE, in consideration of the mutual covenants contained herein, the parties agree as follows:
+"""),
+            _variable('definition', """
+1. DEFINITION OF CONFIDENTIAL INFORMATION
+
+"Confidential Information" means:
+{confidential_info}
+""", 'confidential_info', "a precise definition of the categories of information that are confidential"),
+            _static('obligations', """
+2. OBLIGATIONS OF RECEIVING PARTY
+
+The Receiving Party agrees to:
+a) Hold the Confidential Information in strict confidence;
+b) Not disclose the Confidential Information to any third parties;
+c) Use the Confidential Information solely for the stated purpose;
+d) Protect the Confidential Information with the same degree of care used for its own confidential information.
+
+3. TERM
+
+This Agreement shall remain in effect for {term_years} years from the Effective Date.
+
+4. EXCEPTIONS
+
+This Agreement does not apply to information that:
+a) Is or becomes publicly available through no breach of this Agreement;
+b) Was rightfully in the Receiving Party's possession prior to disclosure;
+c) Is independently developed by the Receiving Party;
+d) Is required to be disclosed by law or court order.
+
+5. RETURN OF MATERIALS
+
+Upon termination of this Agreement or upon request, the Receiving Party shall return or destroy all Confidential Information.
+
+6. GOVERNING LAW
+
+This Agreement shall be governed by the laws of {nda_governing_law}.
+
+7. REMEDIES
+
+The parties acknowledge that breach of this Agreement may cause irreparable harm for which monetary damages may be inadequate, and agree that injunctive relief may be appropriate.
+"""),
+            _static('signature', """
+IN WITNESS WHEREOF, the parties have executed this Agreement as of the date first written above.
+
+DISCLOSING PARTY:
+
+_______________________________
+{disclosing_party}
+Date: _______________
+
+
+RECEIVING PARTY:
+
+_______________________________
+{receiving_party}
+Date: _______________
+
+""" + RULE + """
+"""),
+        ),
+    ),
+    'will': DocumentTemplate(
+        title="Last Will and Testament",
+        defaults={
+            'testator_name': '[YOUR NAME]',
+            'testator_address': '[YOUR ADDRESS]',
+            'executor_name': '[EXECUTOR NAME]',
+            'executor_address': '[EXECUTOR ADDRESS]',
+            'beneficiaries': '[LIST OF BENEFICIARIES AND THEIR SHARES]',
+            'specific_bequests': 'No specific bequests.',
+        },
+        sections=(
+            _static('declaration', """
+LAST WILL AND TESTAMENT
+
+""" + RULE + """
+
+I, {testator_name}, residing at:
+{testator_address}
+
+being of sound mind and memory, do hereby make, publish, and declare this to be my Last Will and Testament, hereby revoking all wills and codicils previously made by me.
+"""),
+            _static('executor', """
+ARTICLE I - EXECUTOR
+
+I hereby nominate and appoint {executor_name}, residing at {executor_address}, as the Executor of this Will.
+"""),
+            _variable('beneficiaries', """
+ARTICLE II - BENEFICIARIES
+
+I hereby give, devise, and bequeath my estate as follows:
+
+{beneficiaries}
+""", 'beneficiaries', "the distribution of the residue of the estate, naming each beneficiary and their share"),
+            _variable('specific_bequests', """
+ARTICLE III - SPECIFIC BEQUESTS
+
+{specific_bequests}
+""", 'specific_bequests', "each specific gift of property and its recipient, as separate lettered bequests"),
+            _static('guardian', """
+ARTICLE IV - GUARDIAN FOR MINOR CHILDREN
+
+{guardian_clause}
+"""),
+            _static('executor_powers', """
+ARTICLE V - POWERS OF EXECUTOR
+
+I grant my Executor full power and authority to:
+a) Sell, transfer, or dispose of any property;
+b) Pay all debts, taxes, and expenses;
+c) Distribute assets to beneficiaries;
+d) Take any actions necessary to administer this estate.
+
+ARTICLE VI - GOVERNING LAW
+
+This Will shall be governed by the laws of {governing_jurisdiction}.
+"""),
+            _static('signature', """
+IN WITNESS WHEREOF, I have hereunto set my hand this {today_long}.
+
+_______________________________
+{testator_name}
+Testator
+"""),
+            _static('witnesses', """
+
+WITNESSES:
+
+We, the undersigned witnesses, each do hereby declare that the Testator signed this Will in our presence, and that we signed as witnesses in the Testator's presence and in the presence of each other.
+
+Witness 1:
+_______________________________
+Name: _______________
+Address: _______________
+Date: _______________
+
+Witness 2:
+_______________________________
+Name: _______________
+Address: _______________
+Date: _______________
+
+""" + RULE + """
+
+IMPORTANT NOTICE:
+This Will should be reviewed by an attorney and executed according to state law requirements.
+Most jurisdictions require two witnesses and may require notarization.
+Store the original in a safe place and inform your executor of its location.
+"""),
+        ),
+    ),
+    'power_of_attorney': DocumentTemplate(
+        title="Power of Attorney",
+        defaults={
+            'principal_name': '[YOUR NAME]',
+            'principal_address': '[YOUR ADDRESS]',
+            'agent_name': '[AGENT NAME]',
+            'agent_address': '[AGENT ADDRESS]',
+            'powers_granted': '[POWERS GRANTED TO AGENT]',
+        },
+        sections=(
+            _static('appointment', """
+POWER OF ATTORNEY
+
+""" + RULE + """
+
+KNOW ALL MEN BY THESE PRESENTS:
+
+I, {principal_name} (the "Principal"), residing at:
+{principal_address}
+
+do hereby appoint {agent_name} (the "Agent" or "Attorney-in-Fact"), residing at:
+{agent_address}
+
+as my true and lawful Attorney-in-Fact to act in my name, place, and stead.
+"""),
+            _variable('powers', """
+POWERS GRANTED
+
+I hereby grant to my Agent full power and authority to:
+
+{powers_granted}
+""", 'powers_granted', "a lettered list of the specific powers the Agent may exercise"),
+            _static('terms', """
+EFFECTIVE DATE
+
+This Power of Attorney shall be effective as of {effective_date}.{durable_clause}
+
+LIMITATIONS
+
+This Power of Attorney does not authorize my Agent to:
+- Make healthcare decisions (unless specifically stated)
+- Change my will or estate plan
+- Act in a manner contrary to my best interests
+
+REVOCATION
+
+I reserve the right to revoke this Power of Attorney at any time by providing written notice to my Agent.
+
+GOVERNING LAW
+
+This Power of Attorney shall be governed by the laws of {governing_jurisdiction}.
+
+THIRD PARTY RELIANCE
+
+Any third party who receives a copy of this document may rely upon and act under it. Revocation of this Power of Attorney is not effective as to a third party until the third party has actual knowledge of the revocation.
+"""),
+            _static('signature', """
+IN WITNESS WHEREOF, I have executed this Power of Attorney on {today}.
+
+_______________________________
+{principal_name}
+Principal
+"""),
+            _static('execution', """
+STATE OF _______________
+COUNTY OF _______________
+
+On this ___ day of _______, 20___, before me personally appeared {principal_name}, known to me to be the person whose name is subscribed to the foregoing instrument, and acknowledged that they executed the same.
+
+_______________________________
+Notary Public
+My Commission Expires: _______________
+
+""" + RULE + """
+
+IMPORTANT NOTICE:
+This Power of Attorney must be notarized to be valid in most jurisdictions.
+Provide copies to relevant financial institutions and healthcare providers.
+Review and update this document regularly.
+"""),
+        ),
+    ),
+    'lease_agreement': DocumentTemplate(
+        title="Residential Lease Agreement",
+        defaults={
+            'landlord_name': '[LANDLORD NAME]',
+            'tenant_name': '[TENANT NAME]',
+            'property_address': '[PROPERTY ADDRESS]',
+            'lease_term': '[TERM]',
+            'start_date': '[START DATE]',
+            'monthly_rent': '[AMOUNT]',
+            'security_deposit': '[AMOUNT]',
+            'utilities_included': 'Tenant is responsible for all utilities unless otherwise specified.',
+            'pet_policy': 'No pets allowed without prior written consent of Landlord.',
+        },
+        sections=(
+            _static('parties', """
+RESIDENTIAL LEASE AGREEMENT
+
+""" + RULE + """
+
+This Lease Agreement ("Lease") is entered into as of {start_date_or_today}, by and between:
+
+LANDLORD: {landlord_name}
+TENANT: {tenant_name}
+"""),
+            _static('premises', """
+PROPERTY
+
+The Landlord hereby leases to the Tenant the following property:
+{property_address}
+(the "Premises")
+
+TERM
+
+The term of this Lease shall be {lease_term} months, commencing on {start_date}.
+
+RENT
+
+Tenant agrees to pay rent in the amount of ${monthly_rent} per month, due on the first day of each month.
+"""),
+            _static('deposit', """
+SECURITY DEPOSIT
+
+Tenant has deposited ${security_deposit} as a security deposit, to be held by Landlord and returned upon termination of this Lease, subject to deductions for damages.
+"""),
+            _variable('utilities', """
+UTILITIES
+
+{utilities_included}
+""", 'utilities_included', "which utilities and services are included in the rent and which the Tenant pays"),
+            _variable('pets', """
+PETS
+
+{pet_policy}
+""", 'pet_policy', "the pet policy"),
+            _static('maintenance', """
+MAINTENANCE AND REPAIRS
+
+Landlord shall maintain the Premises in habitable condition. Tenant shall be responsible for minor repairs and maintenance.
+
+USE OF PREMISES
+
+The Premises shall be used solely as a residential dwelling. No commercial activities are permitted without Landlord's written consent.
+"""),
+            _static('termination', """
+TERMINATION
+
+Either party may terminate this Lease upon 30 days' written notice, subject to applicable law.
+"""),
+            _static('boilerplate', """
+GOVERNING LAW
+
+This Lease shall be governed by the laws of {governing_jurisdiction}.
+
+ENTIRE AGREEMENT
+
+This Lease constitutes the entire agreement between the parties.
+"""),
+            _static('signature', """
+IN WITNESS WHEREOF, the parties have executed this Lease as of the date first written above.
+
+LANDLORD:
+
+_______________________________
+{landlord_name}
+Date: _______________
+
+
+TENANT:
+
+_______________________________
+{tenant_name}
+Date: _______________
+
+""" + RULE + """
+"""),
+        ),
+    ),
+    'employment_contract': DocumentTemplate(
+        title="Employment Contract",
+        defaults={
+            'employer_name': '[EMPLOYER NAME]',
+            'employee_name': '[EMPLOYEE NAME]',
+            'position': '[JOB POSITION]',
+            'start_date': '[START DATE]',
+            'salary': '[AMOUNT]',
+            'benefits': 'Employee shall be eligible for benefits as described in the Employee Handbook.',
+            'work_hours': 'Standard work hours are Monday through Friday, 9:00 AM to 5:00 PM.',
+        },
+        sections=(
+            _static('parties', """
+EMPLOYMENT CONTRACT
+
+""" + RULE + """
+
+This Employment Contract ("Agreement") is entered into as of {start_date_or_today}, by and between:
+
+EMPLOYER: {employer_name}
+EMPLOYEE: {employee_name}
+"""),
+            _static('position', """
+POSITION
+
+Employee is hired for the position of {position}.
+
+START DATE
+
+Employment shall commence on {start_date}.
+
+COMPENSATION
+
+Employee shall receive an annual salary of ${salary}, payable in accordance with Employer's standard payroll practices.
+"""),
+            _variable('benefits', """
+BENEFITS
+
+{benefits}
+""", 'benefits', "the benefits the Employee is entitled to and when they begin"),
+            _variable('work_hours', """
+WORK HOURS
+
+{work_hours}
+""", 'work_hours', "the Employee's regular hours of work and any overtime arrangement"),
+            _static('probation', """
+PROBATION PERIOD
+
+{probation_clause}
+"""),
+            _static('termination', """
+TERMINATION
+
+{termination_clause}
+"""),
+            _static('confidentiality', """
+CONFIDENTIALITY
+
+Employee agrees to maintain the confidentiality of all proprietary information of the Employer.
+"""),
+            _static('non_compete', """
+NON-COMPETE
+
+Employee agrees not to engage in any competing business during employment and for a reasonable period thereafter, as permitted by law.
+"""),
+            _static('boilerplate', """
+GOVERNING LAW
+
+This Agreement shall be governed by the laws of {governing_jurisdiction}.
+
+ENTIRE AGREEMENT
+
+This Agreement constitutes the entire agreement between the parties regarding employment.
+"""),
+            _static('signature', """
+IN WITNESS WHEREOF, the parties have executed this Agreement as of the date first written above.
+
+EMPLOYER:
+
+_______________________________
+{employer_name}
+Date: _______________
+
+
+EMPLOYEE:
+
+_______________________________
+{employee_name}
+Date: _______________
+
+""" + RULE + """
+"""),
+        ),
+    ),
+    'business_contract': DocumentTemplate(
+        title="Business Contract",
+        defaults={
+            'party_a_name': '[PARTY A NAME]',
+            'party_b_name': '[PARTY B NAME]',
+            'contract_purpose': '[PURPOSE OF CONTRACT]',
+            'obligations_party_a': '[OBLIGATIONS OF PARTY A]',
+            'obligations_party_b': '[OBLIGATIONS OF PARTY B]',
+            'payment_terms': '[PAYMENT TERMS]',
+            'contract_term': '[TERM]',
+        },
+        sections=(
+            _static('parties', """
+BUSINESS CONTRACT
+
+""" + RULE + """
+
+This Business Contract ("Agreement") is entered into as of {effective_date}, by and between:
+
+PARTY A: {party_a_name}
+PARTY B: {party_b_name}
+
+(collectively, the "Parties")
+"""),
+            _variable('purpose', """
+PURPOSE
+
+The purpose of this Agreement is:
+{contract_purpose}
+""", 'contract_purpose', "the purpose and scope of the agreement"),
+            _variable('obligations_party_a', """
+OBLIGATIONS OF PARTY A
+
+Party A agrees to:
+{obligations_party_a}
+""", 'obligations_party_a', "a lettered list of Party A's obligations"),
+            _variable('obligations_party_b', """
+OBLIGATIONS OF PARTY B
+
+Party B agrees to:
+{obligations_party_b}
+""", 'obligations_party_b', "a lettered list of Party B's obligations"),
+            _variable('payment_terms', """
+PAYMENT TERMS
+
+{payment_terms}
+""", 'payment_terms', "the amounts, schedule and method of payment"),
+            _static('term', """
+TERM
+
+This Agreement shall remain in effect for {contract_term}, commencing on {effective_date_or_placeholder}.
+
+TERMINATION
+
+Either party may terminate this Agreement upon written notice if the other party materially breaches any provision of this Agreement.
+
+CONFIDENTIALITY
+
+Both parties agree to maintain the confidentiality of all proprietary information exchanged under this Agreement.
+
+DISPUTE RESOLUTION
+
+Any disputes arising under this Agreement shall be resolved through mediation, and if necessary, arbitration.
+
+GOVERNING LAW
+
+This Agreement shall be governed by the laws of {governing_jurisdiction}.
+
+ENTIRE AGREEMENT
+
+This Agreement constitutes the entire agreement between the parties and supersedes all prior agreements and understandings.
+"""),
+            _static('signature', """
+IN WITNESS WHEREOF, the parties have executed this Agreement as of the date first written above.
+
+PARTY A:
+
+_______________________________
+{party_a_name}
+Date: _______________
+
+
+PARTY B:
+
+_______________________________
+{party_b_name}
+Date: _______________
+
+""" + RULE + """
+
+IMPORTANT NOTICE:
+This is a general business contract template.
+Have this agreement reviewed by legal counsel before execution.
+Customize terms to fit your specific business needs.
+"""),
+        ),
+    ),
+}
+
+
+# Jurisdiction-specific replacements for default section templates, most
+# specific jurisdiction first; matched against the lower-cased jurisdiction name
+JURISDICTION_CLAUSES: Dict[str, Dict[Tuple[str, str], str]] = {
+    'ontario': {
+        ('lease_agreement', 'deposit'): """
+RENT DEPOSIT
+
+Tenant has paid a rent deposit of ${security_deposit}, which may not exceed one rental period's rent and shall be applied to the rent for the last rental period of the tenancy, as permitted by the Residential Tenancies Act, 2006 (Ontario). No damage or security deposit may be required.
+""",
+        ('lease_agreement', 'termination'): """
+TERMINATION
+
+This tenancy may only be terminated in accordance with the Residential Tenancies Act, 2006 (Ontario). A Tenant ending a monthly tenancy must give at least 60 days' written notice, effective on the last day of a rental period. Most residential tenancies in Ontario must use the Ontario Standard Form of Lease.
+""",
+        ('employment_contract', 'termination'): """
+TERMINATION
+
+{termination_clause} In all cases the Employee shall receive no less than the notice or pay in lieu of notice, and any severance pay, required by the Employment Standards Act, 2000 (Ontario).
+""",
+        ('employment_contract', 'non_compete'): """
+NON-COMPETE
+
+No non-competition covenant applies. Non-compete agreements are prohibited under the Employment Standards Act, 2000 (Ontario), except for executives and in connection with the sale of a business.
+""",
+        ('will', 'witnesses'): """
+
+WITNESSES:
+
+We, the undersigned witnesses, each do hereby declare that the Testator signed this Will in our presence, both of us being present at the same time, and that we signed as witnesses in the Testator's presence and in the presence of each other. Neither of us is a beneficiary under this Will or the spouse of a beneficiary.
+
+Witness 1:
+_______________________________
+Name: _______________
+Address: _______________
+Date: _______________
+
+Witness 2:
+_______________________________
+Name: _______________
+Address: _______________
+Date: _______________
+
+""" + RULE + """
+
+IMPORTANT NOTICE:
+This Will should be reviewed by a lawyer and executed in accordance with the Succession Law Reform Act (Ontario).
+Two witnesses must be present at the same time; notarization is not required.
+Store the original in a safe place and inform your executor of its location.
+""",
+        ('power_of_attorney', 'execution'): """
+WITNESSES:
+
+Signed by the Principal in the presence of both of us, who were present at the same time and signed as witnesses in the Principal's presence. Neither of us is the Agent, the spouse or partner of the Principal or Agent, or a child of the Principal.
+
+Witness 1:
+_______________________________
+Name: _______________
+Address: _______________
+Date: _______________
+
+Witness 2:
+_______________________________
+Name: _______________
+Address: _______________
+Date: _______________
+
+""" + RULE + """
+
+IMPORTANT NOTICE:
+In Ontario this document is a Continuing Power of Attorney for Property under the Substitute Decisions Act, 1992, and must be signed in front of two eligible witnesses.
+Provide copies to relevant financial institutions.
+Review and update this document regularly.
+""",
+    },
+}
+
+
+@lru_cache(maxsize=256)
+def resolve_sections(document_type: str, jurisdiction: str = "") -> Tuple[ClauseSection, ...]:
+    """Sections of a document type with the jurisdiction's clause overrides applied (cached)."""
+    template = TEMPLATES[document_type]
+    jurisdiction = jurisdiction.lower()
+    overrides = [clauses for name, clauses in JURISDICTION_CLAUSES.items() if name in jurisdiction]
+    sections = []
+    for section in template.sections:
+        for clauses in overrides:
+            override = clauses.get((document_type, section.name))
+            if override is not None:
+                section = ClauseSection(section.name, _body(override), section.variable_field, section.instruction)
+                break
+        sections.append(section)
+    return tuple(sections)
+
+
+def prepare_fields(document_type: str, form_data: Dict[str, Any], jurisdiction: Optional[str]) -> Dict[str, Any]:
+    """Template fields: defaults, the submitted form data and derived clauses."""
+    today = datetime.now().strftime('%B %d, %Y')
+    fields: Dict[str, Any] = dict(TEMPLATES[document_type].defaults)
+    fields.update(form_data)
+    fields.update({
+        'today': today,
+        'today_long': datetime.now().strftime('%d day of %B, %Y'),
+        'effective_date': form_data.get('effective_date', today),
+        'effective_date_or_placeholder': form_data.get('effective_date', '[EFFECTIVE DATE]'),
+        'start_date_or_today': form_data.get('start_date', today),
+        'court_jurisdiction': jurisdiction or 'UNITED STATES',
+        'governing_jurisdiction': jurisdiction or 'the applicable jurisdiction',
+        'nda_governing_law': form_data.get('governing_law', jurisdiction or 'the applicable jurisdiction'),
+        'legal_grounds_summary': form_data.get('legal_grounds', '[LEGAL GROUNDS FOR LAWSUIT]'),
+        'guardian_clause': (
+            f"I appoint {form_data.get('guardian_minor')} as guardian of any minor children."
+            if form_data.get('guardian_minor') else 'Not applicable.'
+        ),
+        'durable_clause': (
+            "\n\nThis Power of Attorney shall not be affected by the subsequent disability or incapacity "
+            "of the Principal (Durable Power of Attorney)." if form_data.get('durable') else ""
+        ),
+        'probation_clause': (
+            f"Employee shall be subject to a probationary period of {form_data.get('probation_period')} days."
+            if form_data.get('probation_period') else 'No probationary period applies.'
+        ),
+        'termination_clause': (
+            f"Either party may terminate this Agreement upon {form_data.get('termination_notice')} days' written notice."
+            if form_data.get('termination_notice') else 'Termination terms as per applicable law.'
+        ),
+    })
+    return fields
+
+
+def render_section(section: ClauseSection, fields: Dict[str, Any]) -> str:
+    """Render one section's template locally."""
+    return section.template.format_map(fields)
+
+
+def section_names(document_type: str) -> List[str]:
+    return [section.name for section in TEMPLATES[document_type].sections]
@@ -8,6 +8,8 @@ from google.cloud import storage
 from google.oauth2 import service_account
 import json
 
+from app.core.object_transfer import GCSObjectStore, TransferManager, TransferResult
+
 logger = logging.getLogger(__name__)
 
 class GcsService:
@@ -105,6 +107,28 @@ class GcsService:
             logger.error(f"Failed to generate download URL for {blob_name}: {e}")
             raise Exception(f"Failed to generate download URL: {str(e)}")
 
+    def upload_file(self, local_path: str, blob_name: str) -> TransferResult:
+        """Upload a local file in parallel chunks (resumes an interrupted upload)."""
+        if not self.client or not self.bucket:
+            raise Exception("GCS service not configured")
+
+        try:
+            return TransferManager(GCSObjectStore(self.bucket)).upload_file(local_path, blob_name)
+        except Exception as e:
+            logger.error(f"Failed to upload {local_path} to {blob_name}: {e}")
+            raise Exception(f"Failed to upload file: {str(e)}")
+
+    def download_file(self, blob_name: str, local_path: str) -> TransferResult:
+        """Download a blob with parallel ranged reads (resumes an interrupted download)."""
+        if not self.client or not self.bucket:
+            raise Exception("GCS service not configured")
+
+        try:
+            return TransferManager(GCSObjectStore(self.bucket)).download_file(blob_name, local_path)
+        except Exception as e:
+            logger.error(f"Failed to download {blob_name} to {local_path}: {e}")
+            raise Exception(f"Failed to download file: {str(e)}")
+
     def delete_file(self, blob_name: str) -> bool:
         """Delete a file from GCS."""
         if not self.client or not self.bucket:
@@ -0,0 +1,277 @@
+"""
+Ingestion Job Queue for LegalAI
+Runs document parsing, chunking, embedding and indexing on a dedicated
+worker pool instead of inside the HTTP request. The queue is bounded,
+tenants are served round-robin so one bulk uploader cannot starve the
+others, and a full queue is reported as QueueFullError with a retry hint.
+"""
+import time
+import uuid
+import asyncio
+import logging
+import threading
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+ProgressCallback = Callable[[float, str], None]
+
+
+class QueueFullError(Exception):
+    """Raised when the ingestion queue (or a tenant's share of it) is full."""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class IngestionJob:
+    """A single queued ingestion and its progress."""
+
+    def __init__(self, tenant: str, kind: str, description: str, fn: Callable[[ProgressCallback], Dict]):
+        self.job_id = uuid.uuid4().hex
+        self.tenant = tenant
+        self.kind = kind
+        self.description = description
+        self.fn = fn
+        self.status = 'queued'
+        self.progress = 0.0
+        self.stage = 'queued'
+        self.result: Optional[Dict] = None
+        self.error: Optional[str] = None
+        self.exception: Optional[BaseException] = None
+        self.created_at = datetime.utcnow()
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self.done = threading.Event()
+        self._waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+        self._waiters_lock = threading.Lock()
+
+    def add_waiter(self, loop: asyncio.AbstractEventLoop, future: asyncio.Future) -> bool:
+        """Resolve the future on its loop when the job finishes; False if it already has."""
+        with self._waiters_lock:
+            if self.done.is_set():
+                return False
+            self._waiters.append((loop, future))
+            return True
+
+    def finish(self):
+        """Mark the job finished and wake its waiters."""
+        with self._waiters_lock:
+            self.done.set()
+            waiters, self._waiters = self._waiters, []
+        for loop, future in waiters:
+            try:
+                loop.call_soon_threadsafe(_resolve, future)
+            except RuntimeError:  # the waiter's loop is closed
+                pass
+
+    def update_progress(self, fraction: float, stage: str):
+        self.progress = max(0.0, min(1.0, fraction))
+        self.stage = stage
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'job_id': self.job_id,
+            'tenant': self.tenant,
+            'kind': self.kind,
+            'description': self.description,
+            'status': self.status,
+            'progress': round(self.progress, 3),
+            'stage': self.stage,
+            'result': self.result,
+            'error': self.error,
+            'created_at': self.created_at.isoformat(),
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+
+class IngestionJobQueue:
+    """Bounded, tenant-fair ingestion queue with its own worker threads."""
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        max_queued: Optional[int] = None,
+        max_per_tenant: Optional[int] = None,
+        retention: Optional[int] = None
+    ):
+        """
+        Initialize the queue and start the worker pool.
+
+        Args:
+            workers: Worker threads (defaults to settings.INGEST_WORKERS)
+            max_queued: Jobs waiting across all tenants before 429
+            max_per_tenant: Jobs waiting per tenant before 429
+            retention: Finished jobs kept for status lookups
+        """
+        self.workers = workers or settings.INGEST_WORKERS
+        self.max_queued = max_queued or settings.INGEST_QUEUE_MAX
+        self.max_per_tenant = max_per_tenant or settings.INGEST_MAX_JOBS_PER_TENANT
+        self.retention = retention or settings.INGEST_JOB_RETENTION
+
+        self._cond = threading.Condition()
+        self._tenant_queues: "OrderedDict[str, Deque[IngestionJob]]" = OrderedDict()
+        self._queued = 0
+        self._running = 0
+        self._jobs: "OrderedDict[str, IngestionJob]" = OrderedDict()
+        self._avg_duration = 10.0  # seconds, exponential moving average
+
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"ingest-worker-{i}", daemon=True)
+            thread.start()
+        logger.info(f"Ingestion queue started ({self.workers} workers, capacity {self.max_queued})")
+
+    def _retry_after(self) -> int:
+        backlog = self._queued + self._running
+        return int(max(1, min(300, backlog * self._avg_duration / self.workers)))
+
+    def submit(
+        self,
+        tenant: str,
+        kind: str,
+        fn: Callable[[ProgressCallback], Dict],
+        description: str = ''
+    ) -> IngestionJob:
+        """
+        Queue an ingestion job.
+
+        Args:
+            tenant: Fairness key (organization or user)
+            kind: Job type, e.g. 'file', 'image', 'artillery_upload'
+            fn: Work function; receives a progress(fraction, stage) callback
+                and returns the result dict
+            description: Human-readable label (usually the file name)
+
+        Raises:
+            QueueFullError: queue or tenant share is full
+        """
+        tenant = tenant or 'default'
+        with self._cond:
+            tenant_queue = self._tenant_queues.get(tenant)
+            if self._queued >= self.max_queued:
+                raise QueueFullError("Ingestion queue is full", self._retry_after())
+            if tenant_queue is not None and len(tenant_queue) >= self.max_per_tenant:
+                raise QueueFullError(f"Too many queued ingestion jobs for {tenant}", self._retry_after())
+
+            job = IngestionJob(tenant, kind, description, fn)
+            if tenant_queue is None:
+                tenant_queue = self._tenant_queues[tenant] = deque()
+            tenant_queue.append(job)
+            self._queued += 1
+            self._jobs[job.job_id] = job
+            self._evict_finished()
+            self._cond.notify()
+
+        logger.info(f"Queued ingestion job {job.job_id} ({kind}) for {tenant}: {description}")
+        return job
+
+    def _evict_finished(self):
+        excess = len(self._jobs) - self.retention
+        if excess <= 0:
+            return
+        for job_id in [jid for jid, job in self._jobs.items() if job.done.is_set()][:excess]:
+            del self._jobs[job_id]
+
+    def _next_job(self) -> IngestionJob:
+        """Round-robin across tenants (caller holds the condition)."""
+        while self._queued == 0:
+            self._cond.wait()
+        tenant, tenant_queue = next(iter(self._tenant_queues.items()))
+        job = tenant_queue.popleft()
+        del self._tenant_queues[tenant]
+        if tenant_queue:
+            # Tenant goes to the back of the rotation
+            self._tenant_queues[tenant] = tenant_queue
+        self._queued -= 1
+        self._running += 1
+        return job
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                job = self._next_job()
+
+            job.status = 'running'
+            job.stage = 'starting'
+            job.started_at = datetime.utcnow()
+            start = time.perf_counter()
+            try:
+                job.result = job.fn(job.update_progress)
+                job.status = 'completed'
+                job.update_progress(1.0, 'completed')
+            except Exception as e:
+                logger.error(f"Ingestion job {job.job_id} failed: {e}")
+                job.status = 'failed'
+                job.stage = 'failed'
+                job.error = getattr(e, 'detail', None) or str(e)
+                job.exception = e
+            finally:
+                job.finished_at = datetime.utcnow()
+                job.fn = None
+                with self._cond:
+                    self._running -= 1
+                    duration = time.perf_counter() - start
+                    self._avg_duration = 0.8 * self._avg_duration + 0.2 * duration
+                job.finish()
+
+    def get(self, job_id: str) -> Optional[IngestionJob]:
+        """Look up a job by ID."""
+        with self._cond:
+            return self._jobs.get(job_id)
+
+    def list_jobs(self, tenant: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """Most recent jobs, optionally for a single tenant."""
+        with self._cond:
+            jobs = [j for j in reversed(self._jobs.values()) if tenant is None or j.tenant == tenant]
+        return [j.to_dict() for j in jobs[:limit]]
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth and capacity."""
+        with self._cond:
+            return {
+                'queued': self._queued,
+                'running': self._running,
+                'workers': self.workers,
+                'capacity': self.max_queued,
+                'tenants_waiting': len(self._tenant_queues),
+                'avg_job_seconds': round(self._avg_duration, 2),
+            }
+
+
+def _resolve(future: asyncio.Future):
+    if not future.done():
+        future.set_result(True)
+
+
+async def wait_for_job(job: IngestionJob, timeout: Optional[float] = None) -> bool:
+    """Wait for a job without blocking the event loop or a thread; False on timeout."""
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+    if not job.add_waiter(loop, future):
+        return True
+    try:
+        await asyncio.wait_for(future, timeout)
+    except asyncio.TimeoutError:
+        return False
+    return True
+
+
+# Global instance
+_ingestion_queue: Optional[IngestionJobQueue] = None
+_ingestion_queue_lock = threading.Lock()
+
+
+def get_ingestion_queue() -> IngestionJobQueue:
+    """Get or create the global ingestion queue (starts its workers on first use)"""
+    global _ingestion_queue
+    if _ingestion_queue is None:
+        with _ingestion_queue_lock:
+            if _ingestion_queue is None:
+                _ingestion_queue = IngestionJobQueue()
+    return _ingestion_queue
@@ -15,6 +15,7 @@ import json
 import logging
 from typing import List, Dict, Any, Optional
 from pathlib import Path
+from app.core.tracing import traced
 
 logger = logging.getLogger(__name__)
 
@@ -52,6 +53,7 @@ class LEGIDPipeline:
         self.llm = llm_client
         self.retriever = retriever_client
         
+    @traced("legid.classify")
     async def classify(self, question: str) -> Dict[str, Any]:
         """
         STAGE 1: Classify question
@@ -79,6 +81,7 @@ class LEGIDPipeline:
             logger.error(f"Failed to parse classification JSON: {response}")
             return self._default_classification()
     
+    @traced("legid.retrieve")
     async def retrieve(self, question: str, classification: Dict[str, Any]) -> Dict[str, Any]:
         """
         STAGE 2: Multi-query retrieval
@@ -125,6 +128,7 @@ class LEGIDPipeline:
             logger.error(f"Failed to parse retrieval JSON: {response}")
             return {"queries_used": [], "chunks": [], "total_chunks_found": 0}
     
+    @traced("legid.reason")
     async def reason(self, question: str, classification: Dict, retrieval: Dict) -> Dict[str, Any]:
         """
         STAGE 3: 4-layer reasoning
@@ -165,6 +169,7 @@ Analyze using 4-layer reasoning and output JSON."""}
             logger.error(f"Failed to parse reasoning JSON: {response}")
             return self._default_reasoning()
     
+    @traced("legid.write")
     async def write(self, reasoning: Dict) -> str:
         """
         STAGE 4: Write natural human paralegal answer
@@ -189,6 +194,7 @@ Write a natural human paralegal answer. Remember the hard bans!"""}
         logger.info(f"Draft written: {len(response)} chars")
         return response
     
+    @traced("legid.verify")
     async def verify(self, draft: str, reasoning: Dict) -> Dict[str, Any]:
         """
         STAGE 5: Template detection + citation validation
@@ -227,6 +233,7 @@ Verify and output JSON."""}
             logger.error(f"Failed to parse verification JSON: {response}")
             return {"passes_quality_gate": True, "banned_patterns_found": [], "citation_violations": []}
     
+    @traced("legid.suggest_followups")
     async def suggest_followups(self, question: str, classification: Dict, answer: str) -> Dict[str, Any]:
         """
         STAGE 6: Context-aware follow-up suggestions
@@ -261,6 +268,7 @@ Generate 2-4 natural follow-up suggestions as JSON."""}
             logger.error(f"Failed to parse follow-ups JSON: {response}")
             return {"suggestions": [], "progressive_disclosure_available": False}
     
+    @traced("legid.pipeline")
     async def run_full_pipeline(self, question: str, user_context: Optional[Dict] = None) -> Dict[str, Any]:
         """
         Execute complete 5-stage pipeline
@@ -5,6 +5,7 @@ Supports OpenAI with fallback handling
 import logging
 from typing import List, Dict, Any, Optional
 import json
+from app.core.tracing import traced
 
 logger = logging.getLogger(__name__)
 
@@ -21,6 +22,7 @@ class LLMClient:
         """
         self.chat_completion = chat_completion_func
     
+    @traced("llm")
     async def chat_completion_async(
         self,
         messages: List[Dict[str, str]],
@@ -4,7 +4,9 @@ import uuid
 from typing import Optional, List, Dict, Any
 from datetime import datetime
 import json
+import sqlite3
 from pathlib import Path
+from threading import Lock
 
 from app.models.matter import Matter, MatterStatus, MatterType, CreateMatterRequest, UpdateMatterRequest
 from app.core.config import settings
@@ -12,6 +14,35 @@ from app.core.config import settings
 logger = logging.getLogger(__name__)
 
 
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS matters (
+    matter_id TEXT PRIMARY KEY,
+    user_id TEXT,
+    session_id TEXT,
+    matter_type TEXT,
+    status TEXT,
+    created_at TEXT,
+    updated_at TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_matters_user ON matters(user_id, updated_at);
+CREATE INDEX IF NOT EXISTS idx_matters_session ON matters(session_id, updated_at);
+CREATE INDEX IF NOT EXISTS idx_matters_status ON matters(status, updated_at);
+CREATE INDEX IF NOT EXISTS idx_matters_type ON matters(matter_type, updated_at);
+
+CREATE TABLE IF NOT EXISTS matter_documents (
+    matter_id TEXT NOT NULL,
+    document_id TEXT NOT NULL,
+    PRIMARY KEY (matter_id, document_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_matter_documents_document ON matter_documents(document_id);
+"""
+
+
+def _enum_value(value) -> Optional[str]:
+    return value.value if hasattr(value, 'value') else value
+
+
 class MatterService:
     """Service for managing matters with GCP-friendly storage."""
     
@@ -20,49 +51,72 @@ class MatterService:
         Initialize matter service.
         
         Args:
-            storage_path: Path to store matters (JSON file or directory)
-                        For GCP, this could be Cloud Storage or Firestore
+            storage_path: Path to the SQLite matter registry
+                        For GCP, this could be Cloud SQL or Firestore
         """
-        self.storage_path = Path(storage_path or f"{settings.DOC_STORE_PATH}/matters.json")
+        self.storage_path = Path(storage_path or f"{settings.DOC_STORE_PATH}/matters.db")
         self.storage_path.parent.mkdir(parents=True, exist_ok=True)
-        self.matters: Dict[str, Matter] = {}
-        self._load_matters()
+        self._lock = Lock()
+        self._conn = sqlite3.connect(str(self.storage_path), check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+            self._conn.commit()
+        self._import_legacy_json()
+    
+    def _import_legacy_json(self):
+        """One-time import of the old matters.json registry."""
+        legacy_file = self.storage_path.parent / "matters.json"
+        if not legacy_file.exists():
+            return
+        with self._lock:
+            if self._conn.execute("SELECT 1 FROM matters LIMIT 1").fetchone():
+                return
+        try:
+            with open(legacy_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            with self._lock, self._conn:
+                for matter_data in data.values():
+                    self._write(self._from_dict(matter_data))
+            logger.info(f"Imported {len(data)} matters from {legacy_file}")
+        except Exception as e:
+            logger.error(f"Error importing legacy matters: {e}")
+    
+    @staticmethod
+    def _from_dict(matter_data: Dict[str, Any]) -> Matter:
+        # Convert datetime strings back to datetime
+        matter_data['created_at'] = datetime.fromisoformat(matter_data['created_at'])
+        matter_data['updated_at'] = datetime.fromisoformat(matter_data['updated_at'])
+        return Matter(**matter_data)
     
-    def _load_matters(self):
-        """Load matters from storage."""
-        if self.storage_path.exists():
-            try:
-                with open(self.storage_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    for matter_id, matter_data in data.items():
-                        # Convert datetime strings back to datetime
-                        matter_data['created_at'] = datetime.fromisoformat(matter_data['created_at'])
-                        matter_data['updated_at'] = datetime.fromisoformat(matter_data['updated_at'])
-                        self.matters[matter_id] = Matter(**matter_data)
-                logger.info(f"Loaded {len(self.matters)} matters from storage")
-            except Exception as e:
-                logger.error(f"Error loading matters: {e}")
-                self.matters = {}
-        else:
-            logger.info("No existing matters file, starting fresh")
+    def _write(self, matter: Matter):
+        """Upsert a single matter row (caller holds the lock and transaction)."""
+        matter_dict = matter.dict()
+        matter_dict['created_at'] = matter.created_at.isoformat()
+        matter_dict['updated_at'] = matter.updated_at.isoformat()
+        self._conn.execute(
+            "INSERT OR REPLACE INTO matters (matter_id, user_id, session_id, matter_type, status, "
+            "created_at, updated_at, data) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                matter.matter_id, matter.user_id, matter.session_id,
+                _enum_value(matter.matter_type), _enum_value(matter.status),
+                matter_dict['created_at'], matter_dict['updated_at'],
+                json.dumps(matter_dict, ensure_ascii=False)
+            )
+        )
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO matter_documents (matter_id, document_id) VALUES (?, ?)",
+            [(matter.matter_id, document_id) for document_id in matter.raw_documents]
+        )
     
-    def _save_matters(self):
-        """Save matters to storage."""
+    def _save_matter(self, matter: Matter):
+        """Persist one matter."""
         try:
-            # Convert to JSON-serializable format
-            data = {}
-            for matter_id, matter in self.matters.items():
-                matter_dict = matter.dict()
-                matter_dict['created_at'] = matter.created_at.isoformat()
-                matter_dict['updated_at'] = matter.updated_at.isoformat()
-                data[matter_id] = matter_dict
-            
-            with open(self.storage_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
-            
-            logger.info(f"Saved {len(self.matters)} matters to storage")
+            with self._lock, self._conn:
+                self._write(matter)
         except Exception as e:
-            logger.error(f"Error saving matters: {e}")
+            logger.error(f"Error saving matter {matter.matter_id}: {e}")
             raise
     
     def create_matter(self, request: CreateMatterRequest) -> Matter:
@@ -89,15 +143,16 @@ class MatterService:
             metadata={}
         )
         
-        self.matters[matter_id] = matter
-        self._save_matters()
+        self._save_matter(matter)
         
         logger.info(f"Created matter {matter_id} of type {request.matter_type}")
         return matter
     
     def get_matter(self, matter_id: str) -> Optional[Matter]:
         """Get matter by ID."""
-        return self.matters.get(matter_id)
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM matters WHERE matter_id = ?", (matter_id,)).fetchone()
+        return self._from_dict(json.loads(row[0])) if row else None
     
     def update_matter(self, matter_id: str, request: UpdateMatterRequest) -> Optional[Matter]:
         """
@@ -110,10 +165,11 @@ class MatterService:
         Returns:
             Updated matter or None if not found
         """
-        matter = self.matters.get(matter_id)
+        matter = self.get_matter(matter_id)
         if not matter:
             return None
         
+        structured_before = json.dumps(matter.structured_data, sort_keys=True, default=str)
         if request.status:
             matter.status = request.status
         if request.structured_data:
@@ -122,30 +178,51 @@ class MatterService:
             matter.metadata.update(request.metadata)
         
         matter.updated_at = datetime.utcnow()
-        self._save_matters()
+        self._save_matter(matter)
+        
+        if json.dumps(matter.structured_data, sort_keys=True, default=str) != structured_before:
+            # Playbooks are generated from the structured data; rebuild cached ones now
+            from app.services.playbook_service import schedule_playbook_refresh
+            schedule_playbook_refresh(matter)
         
         logger.info(f"Updated matter {matter_id}")
         return matter
     
     def add_document(self, matter_id: str, document_id: str) -> bool:
         """Add a document ID to a matter."""
-        matter = self.matters.get(matter_id)
-        if not matter:
-            return False
-        
-        if document_id not in matter.raw_documents:
-            matter.raw_documents.append(document_id)
-            matter.updated_at = datetime.utcnow()
-            self._save_matters()
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT data FROM matters WHERE matter_id = ?", (matter_id,)).fetchone()
+            if not row:
+                return False
+            
+            linked = self._conn.execute(
+                "SELECT 1 FROM matter_documents WHERE matter_id = ? AND document_id = ?",
+                (matter_id, document_id)
+            ).fetchone()
+            if not linked:
+                matter = self._from_dict(json.loads(row[0]))
+                matter.raw_documents.append(document_id)
+                matter.updated_at = datetime.utcnow()
+                self._write(matter)
         
         return True
     
+    def get_matters_for_document(self, document_id: str) -> List[str]:
+        """IDs of the matters a document is attached to."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT matter_id FROM matter_documents WHERE document_id = ?", (document_id,)
+            ).fetchall()
+        return [row[0] for row in rows]
+    
     def list_matters(
         self,
         user_id: Optional[str] = None,
         session_id: Optional[str] = None,
         matter_type: Optional[MatterType] = None,
-        status: Optional[MatterStatus] = None
+        status: Optional[MatterStatus] = None,
+        limit: Optional[int] = None,
+        offset: int = 0
     ) -> List[Matter]:
         """
         List matters with optional filters.
@@ -155,25 +232,31 @@ class MatterService:
             session_id: Filter by session ID
             matter_type: Filter by matter type
             status: Filter by status
+            limit: Page size (all matches when None)
+            offset: Page offset
             
         Returns:
-            List of matching matters
+            List of matching matters, most recently updated first
         """
-        results = list(self.matters.values())
+        clauses, params = [], []
+        for column, value in (('user_id', user_id), ('session_id', session_id),
+                              ('matter_type', _enum_value(matter_type)), ('status', _enum_value(status))):
+            if value:
+                clauses.append(f"{column} = ?")
+                params.append(value)
         
-        if user_id:
-            results = [m for m in results if m.user_id == user_id]
-        if session_id:
-            results = [m for m in results if m.session_id == session_id]
-        if matter_type:
-            results = [m for m in results if m.matter_type == matter_type]
-        if status:
-            results = [m for m in results if m.status == status]
+        sql = "SELECT data FROM matters"
+        if clauses:
+            sql += f" WHERE {' AND '.join(clauses)}"
+        sql += " ORDER BY updated_at DESC"
+        if limit is not None:
+            sql += " LIMIT ? OFFSET ?"
+            params += [limit, offset]
         
-        # Sort by updated_at descending
-        results.sort(key=lambda x: x.updated_at, reverse=True)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
         
-        return results
+        return [self._from_dict(json.loads(row[0])) for row in rows]
 
 
 # Global singleton instance
@@ -10,6 +10,8 @@ from datetime import datetime
 from typing import Dict, List, Optional, Any
 from threading import Lock
 
+from app.services.conversation_index import sync_index
+
 logger = logging.getLogger(__name__)
 
 
@@ -132,6 +134,9 @@ class PersistentStorage:
         conversation_id = conversation['conversation_id']
         self._conversations[conversation_id] = conversation
         self._save_conversations()
+        sync_index('index_conversation', user_id=conversation.get('user_id', ''),
+                   conversation_id=conversation_id, title=conversation.get('title', ''),
+                   created_at=conversation.get('created_at'))
         return conversation
     
     def delete_conversation(self, conversation_id: str) -> bool:
@@ -150,6 +155,7 @@ class PersistentStorage:
             if messages_to_delete:
                 self._save_messages()
             
+            sync_index('delete_conversation', conversation_id=conversation_id)
             return True
         return False
     
@@ -185,6 +191,9 @@ class PersistentStorage:
         message_id = message['message_id']
         self._messages[message_id] = message
         self._save_messages()
+        sync_index('index_message', user_id=message.get('user_id', ''),
+                   conversation_id=message.get('conversation_id'), message_id=message_id,
+                   content=message.get('content', ''), created_at=message.get('created_at'))
         
         # Update conversation's preview and message count
         conv_id = message.get('conversation_id')
@@ -201,6 +210,8 @@ class PersistentStorage:
                 conv['title'] = content[:50] + ('...' if len(content) > 50 else '')
             
             self._save_conversations()
+            sync_index('update_conversation_title', user_id=conv.get('user_id', ''),
+                       conversation_id=conv_id, title=conv.get('title', ''))
         
         return message
     
@@ -209,6 +220,7 @@ class PersistentStorage:
         if message_id in self._messages:
             del self._messages[message_id]
             self._save_messages()
+            sync_index('delete_message', message_id=message_id)
             return True
         return False
 
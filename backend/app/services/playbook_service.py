@@ -1,14 +1,30 @@
-"""Playbook service for generating structured legal advice options."""
+"""Playbook service for generating structured legal advice options.
+
+Playbooks are cached per (matter, language) under a fingerprint of the
+fields they are generated from: matter type, jurisdiction, structured data
+and language. Views are served from the cache; when the fingerprint no
+longer matches, the stale playbook is returned while a fresh one is
+generated in the background. MatterService and WorkflowService schedule
+that regeneration as soon as the relevant fields change.
+"""
 import logging
 import json
 import re
-from typing import List, Dict, Optional, Any
+import sqlite3
+import asyncio
+import hashlib
+import threading
+from datetime import datetime
+from pathlib import Path
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Dict, Optional, Any, Tuple
 from pydantic import BaseModel
 
 from app.models.matter import Matter, MatterType
 from app.rag.rag_service import get_rag_service
 from app.core.openai_client import get_openai_client
 from app.core.config import settings
+from app.rag.context_assembler import get_context_assembler
 
 logger = logging.getLogger(__name__)
 
@@ -33,6 +49,73 @@ class PlaybookResponse(BaseModel):
     jurisdiction: Dict[str, str]
     options: List[PlaybookOption]
     disclaimer: str
+    generated_at: Optional[str] = None
+    stale: bool = False  # Served from cache while a newer version is generated
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS playbooks (
+    matter_id TEXT NOT NULL,
+    language TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    data TEXT NOT NULL,
+    generated_at TEXT NOT NULL,
+    PRIMARY KEY (matter_id, language)
+) WITHOUT ROWID;
+"""
+
+
+def playbook_fingerprint(matter: Matter, language: str = "en") -> str:
+    """Fingerprint of everything a matter's playbook is generated from."""
+    payload = json.dumps(
+        [MatterType(matter.matter_type).value, matter.jurisdiction,
+         matter.structured_data, language],
+        sort_keys=True, default=str
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class PlaybookCache:
+    """SQLite store of the latest generated playbook per matter and language."""
+
+    def __init__(self, storage_path: Optional[str] = None):
+        self.storage_path = Path(storage_path or f"{settings.DOC_STORE_PATH}/playbooks.db")
+        self.storage_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.storage_path), check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+            self._conn.commit()
+
+    def get(self, matter_id: str, language: str) -> Optional[Tuple[str, PlaybookResponse]]:
+        """(fingerprint, playbook) cached for a matter, if any."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT fingerprint, data FROM playbooks WHERE matter_id = ? AND language = ?",
+                (matter_id, language)
+            ).fetchone()
+        if not row:
+            return None
+        return row[0], PlaybookResponse(**json.loads(row[1]))
+
+    def put(self, matter_id: str, language: str, fingerprint: str, playbook: PlaybookResponse):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO playbooks (matter_id, language, fingerprint, data, generated_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (matter_id, language, fingerprint, json.dumps(playbook.dict(), ensure_ascii=False),
+                 playbook.generated_at or datetime.utcnow().isoformat())
+            )
+
+    def languages(self, matter_id: str) -> Dict[str, str]:
+        """Language -> cached fingerprint for a matter."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT language, fingerprint FROM playbooks WHERE matter_id = ?", (matter_id,)
+            ).fetchall()
+        return {language: fingerprint for language, fingerprint in rows}
 
 
 class PlaybookService:
@@ -42,6 +125,97 @@ class PlaybookService:
         """Initialize playbook service."""
         self.rag_service = get_rag_service()
         self.openai_client = get_openai_client()
+        self.cache = get_playbook_cache()
+        self._executor = ThreadPoolExecutor(max_workers=settings.PLAYBOOK_WORKERS, thread_name_prefix="playbook")
+        self._pending: Dict[Tuple[str, str, str], Future] = {}
+        self._pending_lock = threading.Lock()
+
+    async def get_playbook(self, matter: Matter, language: str = "en") -> PlaybookResponse:
+        """
+        Playbook for a matter, served from the cache when possible.
+
+        A cached playbook whose fingerprint still matches is returned as is;
+        one generated from older matter fields is returned with stale=True
+        while regeneration runs in the background. Only a matter with no
+        cached playbook waits for generation.
+
+        Args:
+            matter: The matter to get the playbook for
+            language: Language code (en, fr, hi, pa, es, ta, zh)
+
+        Returns:
+            Playbook response with structured options
+        """
+        if not settings.PLAYBOOK_CACHE_ENABLED:
+            return await asyncio.to_thread(self.generate_playbook, matter, language)
+
+        fingerprint = playbook_fingerprint(matter, language)
+        cached = self.cache.get(matter.matter_id, language)
+        if cached is not None:
+            cached_fingerprint, playbook = cached
+            if cached_fingerprint == fingerprint:
+                return playbook
+            self.schedule_generation(matter, language)
+            playbook.stale = True
+            return playbook
+
+        future = self.schedule_generation(matter, language)
+        try:
+            return await asyncio.wait_for(
+                asyncio.shield(asyncio.wrap_future(future)), timeout=settings.PLAYBOOK_WAIT_TIMEOUT
+            )
+        except asyncio.TimeoutError:
+            logger.warning(f"Playbook for matter {matter.matter_id} still generating; serving fallback")
+            return self._get_fallback_playbook(matter, language)
+
+    def schedule_generation(self, matter: Matter, language: str = "en") -> Future:
+        """
+        Generate and cache a matter's playbook in the background.
+
+        Requests for a (matter, language, fingerprint) that is already being
+        generated share the pending job.
+        """
+        key = (matter.matter_id, language, playbook_fingerprint(matter, language))
+        with self._pending_lock:
+            future = self._pending.get(key)
+            if future is None:
+                future = self._pending[key] = self._executor.submit(self._generate_and_cache, matter.copy(deep=True), language, key)
+        return future
+
+    def _generate_and_cache(self, matter: Matter, language: str, key: Tuple[str, str, str]) -> PlaybookResponse:
+        try:
+            try:
+                playbook = self._generate(matter, language)
+            except Exception as e:
+                logger.error(f"Error generating playbook: {e}")
+                # Keep serving the previous playbook if there is one; don't cache the fallback
+                cached = self.cache.get(matter.matter_id, language)
+                return cached[1] if cached else self._get_fallback_playbook(matter, language)
+            self.cache.put(matter.matter_id, language, key[2], playbook)
+            logger.info(f"Cached playbook for matter {matter.matter_id} ({language})")
+            return playbook
+        finally:
+            with self._pending_lock:
+                self._pending.pop(key, None)
+
+    def refresh_playbooks(self, matter: Matter, languages: Optional[List[str]] = None) -> int:
+        """
+        Regenerate the cached playbooks of a matter whose inputs changed.
+
+        Args:
+            matter: The matter in its updated state
+            languages: Also (pre)generate these languages
+
+        Returns:
+            Number of generations scheduled
+        """
+        cached = self.cache.languages(matter.matter_id)
+        scheduled = 0
+        for language in set(cached) | set(languages or []):
+            if cached.get(language) != playbook_fingerprint(matter, language):
+                self.schedule_generation(matter, language)
+                scheduled += 1
+        return scheduled
     
     def _get_language_prompt(self, language: str = "en") -> str:
         """Get language-specific prompt instructions."""
@@ -62,7 +236,7 @@ class PlaybookService:
         language: str = "en"
     ) -> PlaybookResponse:
         """
-        Generate playbook options for a matter.
+        Generate playbook options for a matter (uncached).
         
         Args:
             matter: The matter to generate playbook for
@@ -71,9 +245,18 @@ class PlaybookService:
         Returns:
             Playbook response with structured options
         """
+        try:
+            return self._generate(matter, language)
+        except Exception as e:
+            logger.error(f"Error generating playbook: {e}")
+            # Return fallback options
+            return self._get_fallback_playbook(matter, language)
+
+    def _generate(self, matter: Matter, language: str) -> PlaybookResponse:
+        """Run retrieval and the LLM for a playbook; raises on failure."""
         # Build context query from matter
         jurisdiction_str = f"{matter.jurisdiction.get('country', '')} {matter.jurisdiction.get('region', '')}"
-        matter_type_str = matter.matter_type.value.replace('_', ' ').title()
+        matter_type_str = MatterType(matter.matter_type).value.replace('_', ' ').title()
         
         # Extract key facts from structured data
         facts_summary = self._extract_facts_summary(matter.structured_data)
@@ -133,9 +316,15 @@ Respond ONLY with valid JSON in this format:
   ]
 }}"""
 
+        # The RAG answer is the bulk of this prompt; keep its query-relevant part within budget
+        assembler = get_context_assembler()
+        rag_context = assembler.fit(
+            rag_result['answer'], query, assembler.section_budget('documents', ['documents', 'case_law'])
+        )
+
         user_prompt = f"""Based on this context:
 
-{rag_result['answer']}
+{rag_context}
 
 And the retrieved sources:
 {self._format_sources(rag_result['sources'])}
@@ -151,44 +340,39 @@ Respond in {self._get_language_prompt(language)}."""
             {'role': 'user', 'content': user_prompt}
         ]
         
-        try:
-            response_text = self.openai_client.chat_completion(
-                messages=messages,
-                temperature=0.7
-            )
-            
-            # Parse JSON from response
-            # Extract JSON from response (handle markdown code blocks)
-            json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
-            if json_match:
-                playbook_data = json.loads(json_match.group())
-            else:
-                # Fallback: try to parse entire response
-                playbook_data = json.loads(response_text)
-            
-            # Convert to PlaybookOption objects
-            options = [
-                PlaybookOption(**opt) for opt in playbook_data.get('options', [])
-            ]
-            
-            # Ensure we have at least 2 options
-            if len(options) < 2:
-                logger.warning(f"Only {len(options)} options generated, expected 2-3")
-            
-            disclaimer = self._get_disclaimer(language)
-            
-            return PlaybookResponse(
-                matter_id=matter.matter_id,
-                matter_type=matter.matter_type.value,
-                jurisdiction=matter.jurisdiction,
-                options=options,
-                disclaimer=disclaimer
-            )
-            
-        except Exception as e:
-            logger.error(f"Error generating playbook: {e}")
-            # Return fallback options
-            return self._get_fallback_playbook(matter, language)
+        response_text = self.openai_client.chat_completion(
+            messages=messages,
+            temperature=0.7
+        )
+        
+        # Parse JSON from response
+        # Extract JSON from response (handle markdown code blocks)
+        json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
+        if json_match:
+            playbook_data = json.loads(json_match.group())
+        else:
+            # Fallback: try to parse entire response
+            playbook_data = json.loads(response_text)
+        
+        # Convert to PlaybookOption objects
+        options = [
+            PlaybookOption(**opt) for opt in playbook_data.get('options', [])
+        ]
+        
+        # Ensure we have at least 2 options
+        if len(options) < 2:
+            logger.warning(f"Only {len(options)} options generated, expected 2-3")
+        
+        disclaimer = self._get_disclaimer(language)
+        
+        return PlaybookResponse(
+            matter_id=matter.matter_id,
+            matter_type=MatterType(matter.matter_type).value,
+            jurisdiction=matter.jurisdiction,
+            options=options,
+            disclaimer=disclaimer,
+            generated_at=datetime.utcnow().isoformat()
+        )
     
     def _extract_facts_summary(self, structured_data: Dict[str, Any]) -> str:
         """Extract key facts from structured data."""
@@ -259,15 +443,24 @@ Respond in {self._get_language_prompt(language)}."""
         
         return PlaybookResponse(
             matter_id=matter.matter_id,
-            matter_type=matter.matter_type.value,
+            matter_type=MatterType(matter.matter_type).value,
             jurisdiction=matter.jurisdiction,
             options=options,
             disclaimer=self._get_disclaimer(language)
         )
 
 
-# Global singleton instance
+# Global singleton instances
 _playbook_service: Optional[PlaybookService] = None
+_playbook_cache: Optional[PlaybookCache] = None
+
+
+def get_playbook_cache() -> PlaybookCache:
+    """Get or create the global playbook cache."""
+    global _playbook_cache
+    if _playbook_cache is None:
+        _playbook_cache = PlaybookCache()
+    return _playbook_cache
 
 
 def get_playbook_service() -> PlaybookService:
@@ -277,3 +470,23 @@ def get_playbook_service() -> PlaybookService:
         _playbook_service = PlaybookService()
     return _playbook_service
 
+
+def schedule_playbook_refresh(matter: Matter, languages: Optional[List[str]] = None) -> int:
+    """
+    Regenerate a matter's playbooks after its playbook inputs changed.
+
+    Only cached languages (plus any given) whose fingerprint differs are
+    regenerated; the cache is checked first so matters that never had a
+    playbook don't start the RAG/LLM stack.
+    """
+    if not settings.PLAYBOOK_CACHE_ENABLED:
+        return 0
+    try:
+        cached = get_playbook_cache().languages(matter.matter_id)
+        wanted = set(cached) | set(languages or [])
+        if all(cached.get(language) == playbook_fingerprint(matter, language) for language in wanted):
+            return 0
+        return get_playbook_service().refresh_playbooks(matter, languages)
+    except Exception as e:
+        logger.warning(f"Could not schedule playbook refresh for matter {matter.matter_id}: {e}")
+        return 0
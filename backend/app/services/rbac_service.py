@@ -1,9 +1,17 @@
 """
 Role-Based Access Control (RBAC) Service
 Manages user roles, permissions, and access control for API endpoints.
+
+Permission sets are precomputed as bitmasks per role, and verified token
+claims are cached per request and in a short-TTL process cache (never past
+the token's own exp), so an authorization check is a dictionary lookup.
 """
 import logging
-from typing import Dict, List, Optional, Set
+import threading
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Set, Tuple
 from enum import Enum
 from datetime import datetime
 import jwt
@@ -50,6 +58,41 @@ class Permission(str, Enum):
     ADMIN_ANALYTICS = "admin:analytics"
 
 
+# Permission -> bit in a role's permission mask
+PERMISSION_BITS: Dict[Permission, int] = {permission: 1 << i for i, permission in enumerate(Permission)}
+
+
+def permission_mask(permissions) -> int:
+    """Bitmask of a set of permissions."""
+    mask = 0
+    for permission in permissions:
+        mask |= PERMISSION_BITS[permission]
+    return mask
+
+
+# Verified claims for the current request: token -> (payload, role)
+_request_claims: ContextVar[Optional[Dict[str, Tuple[Dict, Optional[UserRole]]]]] = ContextVar(
+    "rbac_request_claims", default=None
+)
+
+
+class RequestTokenScopeMiddleware:
+    """ASGI middleware giving each HTTP request its own token-claims cache."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        reset = _request_claims.set({})
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _request_claims.reset(reset)
+
+
 class RBACService:
     """Service for managing role-based access control."""
     
@@ -102,10 +145,72 @@ class RBACService:
         "Health Law": {Permission.CHAT_ADVANCED, Permission.API_STATUTE_SEARCH},
     }
     
+    ROLE_LIMITS: Dict[UserRole, Dict[str, int]] = {
+        UserRole.GUEST: {
+            "daily_messages": 10,
+            "document_uploads": 0,
+            "api_calls": 0,
+            "chat_history_days": 1,
+        },
+        UserRole.STANDARD: {
+            "daily_messages": 100,
+            "document_uploads": 5,
+            "api_calls": 10,
+            "chat_history_days": 30,
+        },
+        UserRole.PREMIUM: {
+            "daily_messages": -1,  # Unlimited
+            "document_uploads": -1,  # Unlimited
+            "api_calls": -1,  # Unlimited
+            "chat_history_days": -1,  # Unlimited
+        },
+        UserRole.ADMIN: {
+            "daily_messages": -1,  # Unlimited
+            "document_uploads": -1,  # Unlimited
+            "api_calls": -1,  # Unlimited
+            "chat_history_days": -1,  # Unlimited
+        },
+    }
+    
+    API_PERMISSIONS: Dict[str, Permission] = {
+        "case_lookup": Permission.API_CASE_LOOKUP,
+        "amendment_generation": Permission.API_AMENDMENT_GENERATION,
+        "statute_search": Permission.API_STATUTE_SEARCH,
+        "translation": Permission.API_TRANSLATION,
+        "document_generation": Permission.API_DOCUMENT_GENERATION,
+    }
+    
     def __init__(self):
         """Initialize RBAC service."""
         self.jwt_secret = os.getenv("JWT_SECRET_KEY", "your-secret-key-change-in-production")
         self.jwt_algorithm = "HS256"
+
+        # Verified token claims: token -> (cache expiry, payload, role)
+        self.token_cache_ttl = float(os.getenv("RBAC_TOKEN_CACHE_TTL", "60"))
+        self.token_cache_size = int(os.getenv("RBAC_TOKEN_CACHE_SIZE", "10000"))
+        self._token_cache: "OrderedDict[str, Tuple[float, Dict, Optional[UserRole]]]" = OrderedDict()
+        self._token_lock = threading.Lock()
+
+        # Permission masks and access decisions, computed once per role
+        self.role_masks: Dict[UserRole, int] = {
+            role: permission_mask(permissions) for role, permissions in self.ROLE_PERMISSIONS.items()
+        }
+        self._role_permissions: Dict[UserRole, frozenset] = {
+            role: frozenset(permissions) for role, permissions in self.ROLE_PERMISSIONS.items()
+        }
+        self._law_category_access = {
+            (role, category): self._law_category_decision(role, required)
+            for role in UserRole
+            for category, required in self.LAW_CATEGORY_PERMISSIONS.items()
+        }
+        self._default_category_access = {
+            role: self._law_category_decision(role, {Permission.CHAT_BASIC}) for role in UserRole
+        }
+        self._api_access = {
+            (role, api_name): self._api_decision(role, api_name, permission)
+            for role in UserRole
+            for api_name, permission in self.API_PERMISSIONS.items()
+        }
         logger.info("RBAC service initialized")
     
     def get_role_permissions(self, role: UserRole) -> Set[Permission]:
@@ -118,7 +223,7 @@ class RBACService:
         Returns:
             Set of permissions
         """
-        return self.ROLE_PERMISSIONS.get(role, set()).copy()
+        return set(self._role_permissions.get(role, ()))
     
     def has_permission(self, role: UserRole, permission: Permission) -> bool:
         """
@@ -131,8 +236,7 @@ class RBACService:
         Returns:
             True if role has permission
         """
-        role_permissions = self.ROLE_PERMISSIONS.get(role, set())
-        return permission in role_permissions
+        return bool(self.role_masks.get(role, 0) & PERMISSION_BITS[permission])
     
     def has_any_permission(self, role: UserRole, permissions: Set[Permission]) -> bool:
         """
@@ -145,8 +249,7 @@ class RBACService:
         Returns:
             True if role has at least one permission
         """
-        role_permissions = self.ROLE_PERMISSIONS.get(role, set())
-        return bool(role_permissions & permissions)
+        return bool(self.role_masks.get(role, 0) & permission_mask(permissions))
     
     def has_all_permissions(self, role: UserRole, permissions: Set[Permission]) -> bool:
         """
@@ -159,8 +262,8 @@ class RBACService:
         Returns:
             True if role has all permissions
         """
-        role_permissions = self.ROLE_PERMISSIONS.get(role, set())
-        return permissions.issubset(role_permissions)
+        required = permission_mask(permissions)
+        return self.role_masks.get(role, 0) & required == required
     
     def can_access_law_category(self, role: UserRole, law_category: str) -> Dict[str, any]:
         """
@@ -173,16 +276,15 @@ class RBACService:
         Returns:
             Dictionary with access status and missing permissions
         """
-        required_permissions = self.LAW_CATEGORY_PERMISSIONS.get(law_category, {Permission.CHAT_BASIC})
+        decision = self._law_category_access.get((role, law_category)) or self._default_category_access[role]
+        return dict(decision)
+    
+    def _law_category_decision(self, role: UserRole, required_permissions: Set[Permission]) -> Dict[str, any]:
         role_permissions = self.ROLE_PERMISSIONS.get(role, set())
-        
-        has_access = required_permissions.issubset(role_permissions)
-        missing_permissions = required_permissions - role_permissions
-        
         return {
-            "has_access": has_access,
+            "has_access": required_permissions.issubset(role_permissions),
             "required_permissions": list(required_permissions),
-            "missing_permissions": list(missing_permissions),
+            "missing_permissions": list(required_permissions - role_permissions),
             "role": role.value
         }
     
@@ -197,24 +299,16 @@ class RBACService:
         Returns:
             Dictionary with access status
         """
-        api_permission_map = {
-            "case_lookup": Permission.API_CASE_LOOKUP,
-            "amendment_generation": Permission.API_AMENDMENT_GENERATION,
-            "statute_search": Permission.API_STATUTE_SEARCH,
-            "translation": Permission.API_TRANSLATION,
-            "document_generation": Permission.API_DOCUMENT_GENERATION,
-        }
-        
-        required_permission = api_permission_map.get(api_name)
-        
-        if not required_permission:
+        decision = self._api_access.get((role, api_name))
+        if decision is None:
             return {
                 "has_access": False,
                 "error": f"Unknown API: {api_name}"
             }
-        
+        return dict(decision)
+    
+    def _api_decision(self, role: UserRole, api_name: str, required_permission: Permission) -> Dict[str, any]:
         has_access = self.has_permission(role, required_permission)
-        
         return {
             "has_access": has_access,
             "api_name": api_name,
@@ -253,6 +347,53 @@ class RBACService:
         token = jwt.encode(payload, self.jwt_secret, algorithm=self.jwt_algorithm)
         return token
     
+    def _resolve_token(self, token: str) -> Optional[Tuple[Dict, Optional[UserRole]]]:
+        """Verified (payload, role) for a token, from the request cache, the process cache or a decode."""
+        request_claims = _request_claims.get()
+        if request_claims is not None and token in request_claims:
+            return request_claims[token]
+
+        now = time.time()
+        with self._token_lock:
+            cached = self._token_cache.get(token)
+            if cached is not None:
+                if cached[0] > now:
+                    self._token_cache.move_to_end(token)
+                    claims = cached[1], cached[2]
+                else:
+                    del self._token_cache[token]
+                    cached = None
+
+        if cached is None:
+            try:
+                payload = jwt.decode(token, self.jwt_secret, algorithms=[self.jwt_algorithm])
+            except jwt.ExpiredSignatureError:
+                logger.warning("Token expired")
+                return None
+            except jwt.InvalidTokenError as e:
+                logger.warning(f"Invalid token: {e}")
+                return None
+
+            try:
+                role = UserRole(payload.get("role"))
+            except ValueError:
+                role = None
+            claims = payload, role
+
+            # Never cache past the token's own expiry; invalid tokens are not cached
+            expires_at = now + self.token_cache_ttl
+            if isinstance(payload.get("exp"), (int, float)):
+                expires_at = min(expires_at, payload["exp"])
+            if expires_at > now:
+                with self._token_lock:
+                    self._token_cache[token] = (expires_at, payload, role)
+                    while len(self._token_cache) > self.token_cache_size:
+                        self._token_cache.popitem(last=False)
+
+        if request_claims is not None:
+            request_claims[token] = claims
+        return claims
+
     def verify_token(self, token: str) -> Optional[Dict[str, any]]:
         """
         Verify and decode JWT token.
@@ -263,15 +404,8 @@ class RBACService:
         Returns:
             Decoded token payload or None if invalid
         """
-        try:
-            payload = jwt.decode(token, self.jwt_secret, algorithms=[self.jwt_algorithm])
-            return payload
-        except jwt.ExpiredSignatureError:
-            logger.warning("Token expired")
-            return None
-        except jwt.InvalidTokenError as e:
-            logger.warning(f"Invalid token: {e}")
-            return None
+        claims = self._resolve_token(token)
+        return dict(claims[0]) if claims else None
     
     def get_user_role_from_token(self, token: str) -> Optional[UserRole]:
         """
@@ -283,15 +417,9 @@ class RBACService:
         Returns:
             UserRole or None if invalid
         """
-        payload = self.verify_token(token)
-        if payload:
-            role_str = payload.get("role")
-            try:
-                return UserRole(role_str)
-            except ValueError:
-                return None
-        return None
-    
+        claims = self._resolve_token(token)
+        return claims[1] if claims else None
+
     def get_role_limits(self, role: UserRole) -> Dict[str, any]:
         """
         Get usage limits for a role.
@@ -302,34 +430,7 @@ class RBACService:
         Returns:
             Dictionary with role limits
         """
-        limits = {
-            UserRole.GUEST: {
-                "daily_messages": 10,
-                "document_uploads": 0,
-                "api_calls": 0,
-                "chat_history_days": 1,
-            },
-            UserRole.STANDARD: {
-                "daily_messages": 100,
-                "document_uploads": 5,
-                "api_calls": 10,
-                "chat_history_days": 30,
-            },
-            UserRole.PREMIUM: {
-                "daily_messages": -1,  # Unlimited
-                "document_uploads": -1,  # Unlimited
-                "api_calls": -1,  # Unlimited
-                "chat_history_days": -1,  # Unlimited
-            },
-            UserRole.ADMIN: {
-                "daily_messages": -1,  # Unlimited
-                "document_uploads": -1,  # Unlimited
-                "api_calls": -1,  # Unlimited
-                "chat_history_days": -1,  # Unlimited
-            },
-        }
-        
-        return limits.get(role, limits[UserRole.GUEST])
+        return dict(self.ROLE_LIMITS.get(role, self.ROLE_LIMITS[UserRole.GUEST]))
     
     def get_upgrade_recommendation(self, role: UserRole, requested_feature: str) -> Dict[str, any]:
         """
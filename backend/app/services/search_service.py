@@ -4,8 +4,12 @@ User-scoped full-text search across conversations, messages, and attachments
 """
 import os
 import logging
+import threading
+from datetime import datetime, timedelta
 from typing import List, Dict, Optional
 
+from app.services.conversation_index import get_conversation_index
+
 logger = logging.getLogger(__name__)
 
 try:
@@ -25,6 +29,13 @@ class SearchService:
         self.project_id = os.getenv('GCP_PROJECT_ID')
         self.dataset_id = os.getenv('BIGQUERY_DATASET', 'legalai')
         self.env = os.getenv('ENVIRONMENT', 'dev')
+        # Writes through other instances reach the local index by re-sync only:
+        # a user's rows are re-read from BigQuery once their sync is this old
+        self.max_lag = timedelta(seconds=float(os.getenv('SEARCH_INDEX_MAX_LAG_SECONDS', '60')))
+        # Re-syncs also re-read this far back, for write-behind flushes and clock skew
+        self.sync_overlap = timedelta(seconds=float(os.getenv('SEARCH_INDEX_SYNC_OVERLAP_SECONDS', '900')))
+        self._backfilling: set = set()
+        self._backfill_lock = threading.Lock()
         self._initialize()
     
     def _initialize(self):
@@ -62,8 +73,27 @@ class SearchService:
         
         SECURITY: All results scoped to user_id from server session.
         
-        Returns results ranked by relevance (simple LIKE for now).
+        Served from the local full-text index once the user's history has
+        been backfilled into it; until then a backfill is started in the
+        background and the BigQuery LIKE scan answers. When the user's last
+        sync is older than SEARCH_INDEX_MAX_LAG_SECONDS, rows written since
+        (possibly through other instances) are re-synced in the background.
         """
+        index = get_conversation_index()
+        if index is not None:
+            try:
+                # Without BigQuery the index is all there is
+                if not self.client:
+                    return index.search(query, user_id, limit=limit, offset=offset)
+                synced_at = index.synced_at(user_id)
+                if synced_at is not None:
+                    if datetime.utcnow() - synced_at > self.max_lag:
+                        self._start_backfill(index, user_id, since=synced_at - self.sync_overlap)
+                    return index.search(query, user_id, limit=limit, offset=offset)
+                self._start_backfill(index, user_id)
+            except Exception as e:
+                logger.error(f"Local search index failed, falling back to BigQuery: {e}")
+        
         if not self.client:
             logger.warning("BigQuery not available, returning empty results")
             return []
@@ -159,6 +189,74 @@ class SearchService:
             logger.error(f"Search failed: {e}")
             return []
 
+    
+    def _start_backfill(self, index, user_id: str, since: Optional[datetime] = None):
+        """Backfill (or re-sync since a watermark) a user's history into the local index, in the background."""
+        if not self.client:
+            return
+        with self._backfill_lock:
+            if user_id in self._backfilling:
+                return
+            self._backfilling.add(user_id)
+        threading.Thread(
+            target=self._backfill, args=(index, user_id, since), name="search-backfill", daemon=True
+        ).start()
+    
+    def _backfill(self, index, user_id: str, since: Optional[datetime] = None):
+        try:
+            synced_at = datetime.utcnow()
+            params = [
+                bigquery.ScalarQueryParameter("user_id", "STRING", user_id),
+                bigquery.ScalarQueryParameter("env", "STRING", self.env),
+            ]
+            changed = {'conversations': "", 'messages': "", 'attachments': ""}
+            if since is not None:
+                # Conversations change in place (renames, archiving); messages
+                # are append-only; attachment status updates carry no timestamp
+                params += [
+                    bigquery.ScalarQueryParameter("since", "TIMESTAMP", since),
+                    bigquery.ArrayQueryParameter("pending", "STRING", index.pending_attachments(user_id)),
+                ]
+                changed = {
+                    'conversations': "AND updated_at >= @since",
+                    'messages': "AND created_at >= @since",
+                    'attachments': "AND (uploaded_at >= @since OR attachment_id IN UNNEST(@pending))",
+                }
+            job_config = bigquery.QueryJobConfig(query_parameters=params)
+            dataset = f"{self.project_id}.{self.dataset_id}"
+            queries = {
+                'conversations': f"""
+                SELECT conversation_id, title, created_at, is_archived
+                FROM `{dataset}.conversations`
+                WHERE user_id = @user_id AND env = @env {changed['conversations']}
+                """,
+                'messages': f"""
+                SELECT message_id, conversation_id, content, created_at
+                FROM `{dataset}.messages`
+                WHERE user_id = @user_id AND env = @env {changed['messages']}
+                """,
+                'attachments': f"""
+                SELECT attachment_id, conversation_id, file_name, status, uploaded_at,
+                       JSON_EXTRACT_SCALAR(metadata, '$.ocr_text') AS ocr_text
+                FROM `{dataset}.attachments`
+                WHERE user_id = @user_id AND env = @env {changed['attachments']}
+                """,
+            }
+            rows = {
+                name: [dict(row) for row in self.client.query(sql, job_config=job_config).result()]
+                for name, sql in queries.items()
+            }
+            index.backfill_user(
+                user_id, rows['conversations'], rows['messages'], rows['attachments'],
+                synced_at=synced_at, overwrite=since is not None
+            )
+        except Exception as e:
+            # The watermark is not moved, so the next search tries again
+            logger.error(f"Search index backfill failed: {e}")
+        finally:
+            with self._backfill_lock:
+                self._backfilling.discard(user_id)
+
 
 # Global instance
 _search_service = None
@@ -4,10 +4,14 @@ Manages file uploads to Google Cloud Storage with user scoping
 """
 import os
 import uuid
+import asyncio
 import logging
 from typing import Optional, Dict, List
 from datetime import datetime, timedelta
 
+from app.services.conversation_index import sync_index
+from app.core.object_transfer import GCSObjectStore, TransferManager
+
 logger = logging.getLogger(__name__)
 
 try:
@@ -108,6 +112,43 @@ class StorageService:
             logger.error(f"Failed to generate signed URL: {e}")
             return None
     
+    def _transfer(self) -> Optional[TransferManager]:
+        if not self.storage_client:
+            return None
+        return TransferManager(GCSObjectStore(self.storage_client.bucket(self.bucket_name)))
+    
+    async def upload_file(self, local_path: str, path: str) -> Optional[str]:
+        """
+        Upload a server-side file (e.g. evidence received by email) in parallel chunks.
+        
+        Returns:
+            gs:// URL of the object, or None if the upload failed
+        """
+        transfer = self._transfer()
+        if transfer is None:
+            logger.warning("GCS not available, file not uploaded")
+            return None
+        
+        try:
+            await asyncio.to_thread(transfer.upload_file, local_path, path)
+            return f"gs://{self.bucket_name}/{path}"
+        except Exception as e:
+            logger.error(f"Failed to upload {local_path}: {e}")
+            return None
+    
+    async def download_file(self, path: str, local_path: str) -> bool:
+        """Download an attachment to disk with parallel ranged reads (resumable)."""
+        transfer = self._transfer()
+        if transfer is None:
+            return False
+        
+        try:
+            await asyncio.to_thread(transfer.download_file, path, local_path)
+            return True
+        except Exception as e:
+            logger.error(f"Failed to download {path}: {e}")
+            return False
+    
     async def create_attachment_metadata(
         self,
         attachment_id: str,
@@ -121,6 +162,8 @@ class StorageService:
     ) -> bool:
         """Save attachment metadata to BigQuery"""
         if not self.bq_client:
+            sync_index('index_attachment', user_id=user_id, attachment_id=attachment_id,
+                       file_name=file_name, conversation_id=conversation_id, status=status)
             return True
         
         try:
@@ -148,6 +191,8 @@ class StorageService:
             )
             
             self.bq_client.query(query, job_config=job_config).result()
+            sync_index('index_attachment', user_id=user_id, attachment_id=attachment_id,
+                       file_name=file_name, conversation_id=conversation_id, status=status)
             return True
             
         except Exception as e:
@@ -163,6 +208,8 @@ class StorageService:
     ) -> Optional[Dict]:
         """Confirm upload and update attachment status"""
         if not self.bq_client:
+            sync_index('update_attachment_status', user_id=user_id, attachment_id=attachment_id,
+                       status='completed', conversation_id=conversation_id)
             return {
                 'attachment_id': attachment_id,
                 'user_id': user_id,
@@ -199,6 +246,8 @@ class StorageService:
             )
             
             self.bq_client.query(update_query, job_config=update_config).result()
+            sync_index('update_attachment_status', user_id=user_id, attachment_id=attachment_id,
+                       status='completed', conversation_id=conversation_id)
             
             # Get updated attachment
             return await self.get_attachment(attachment_id, user_id)
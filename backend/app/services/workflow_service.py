@@ -240,6 +240,11 @@ class WorkflowService:
         
         if new_status:
             logger.info(f"Matter {matter.matter_id} transitioned from {matter.status} to {new_status} via {event}")
+            if event == WorkflowEvent.TICKET_PARSED:
+                # Parsed ticket fields are final and explaining options comes next:
+                # rebuild outdated cached playbooks and pre-generate the default one
+                from app.services.playbook_service import schedule_playbook_refresh
+                schedule_playbook_refresh(matter, languages=["en"])
             return new_status
         
         logger.warning(f"Invalid transition for matter {matter.matter_id}: {matter.status} -> {event}")
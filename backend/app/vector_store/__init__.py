@@ -4,6 +4,7 @@ from typing import Union
 
 from app.core.config import settings
 from app.vector_store.faiss_store import FaissVectorStore as FaissStore
+from app.vector_store.sharded_store import ShardedVectorStore, get_sharded_vector_store
 
 logger = logging.getLogger(__name__)
 
@@ -27,7 +28,7 @@ except ImportError:
 _vector_store = None
 
 
-def get_vector_store(dim: int = None) -> Union[FaissStore, 'AzureStore', 'PineconeStore']:
+def get_vector_store(dim: int = None) -> Union[FaissStore, ShardedVectorStore, 'AzureStore', 'PineconeStore']:
     """
     Get or create the global vector store instance.
     
@@ -37,6 +38,7 @@ def get_vector_store(dim: int = None) -> Union[FaissStore, 'AzureStore', 'Pineco
     - Azure AI Search: Enterprise, requires Azure subscription
     
     Set VECTOR_STORE in .env to choose: "faiss", "pinecone", or "azure"
+    (FAISS_SHARDED=true splits the FAISS store by jurisdiction)
     
     Args:
         dim: Vector dimension (optional, defaults to settings.EMBEDDING_DIMENSIONS)
@@ -92,6 +94,13 @@ def get_vector_store(dim: int = None) -> Union[FaissStore, 'AzureStore', 'Pineco
     
     # FAISS (default - local, free)
     if vector_store_type == "faiss" or _vector_store is None:
+        if settings.FAISS_SHARDED:
+            if settings.EMBEDDING_PROVIDER == "rtld":
+                logger.warning("FAISS_SHARDED is ignored with the RTLD embedding provider (RTLD owns its index)")
+            else:
+                logger.info(f"✅ Using jurisdiction-sharded FAISS as vector store (local, dimension: {dim})")
+                _vector_store = get_sharded_vector_store(dim=dim)
+                return _vector_store
         logger.info(f"✅ Using FAISS as vector store (local, dimension: {dim})")
         _vector_store = FaissStore(dim=dim)
     
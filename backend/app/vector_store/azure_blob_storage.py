@@ -14,6 +14,7 @@ except ImportError:
     logger.warning("Azure Storage SDK not installed. Install with: pip install azure-storage-blob")
 
 from app.core.config import settings
+from app.core.object_transfer import AzureBlobObjectStore, TransferManager
 
 logger = logging.getLogger(__name__)
 
@@ -53,10 +54,14 @@ class AzureBlobStorageClient:
             )
         else:
             raise ValueError("Either connection_string or account_name must be provided")
+        
+        self.transfer = TransferManager(
+            AzureBlobObjectStore(self.blob_service.get_container_client(self.container_name))
+        )
     
     def download_blob(self, blob_name: str, destination_path: Optional[str] = None) -> str:
         """
-        Download a blob to a local file.
+        Download a blob to a local file (parallel ranged reads, resumable).
         
         Args:
             blob_name: Name of the blob
@@ -72,20 +77,14 @@ class AzureBlobStorageClient:
             destination_path = temp_file.name
             temp_file.close()
         
-        blob_client = self.blob_service.get_blob_client(
-            container=self.container_name,
-            blob=blob_name
-        )
-        
-        with open(destination_path, "wb") as download_file:
-            download_file.write(blob_client.download_blob().readall())
+        self.transfer.download_file(blob_name, destination_path)
         
         logger.info(f"Downloaded {blob_name} to {destination_path}")
         return destination_path
     
     def upload_blob(self, file_path: str, blob_name: Optional[str] = None) -> str:
         """
-        Upload a file to blob storage.
+        Upload a file to blob storage (parallel staged blocks, resumable).
         
         Args:
             file_path: Path to local file
@@ -97,13 +96,7 @@ class AzureBlobStorageClient:
         if blob_name is None:
             blob_name = Path(file_path).name
         
-        blob_client = self.blob_service.get_blob_client(
-            container=self.container_name,
-            blob=blob_name
-        )
-        
-        with open(file_path, "rb") as data:
-            blob_client.upload_blob(data, overwrite=True)
+        self.transfer.upload_file(file_path, blob_name)
         
         logger.info(f"Uploaded {file_path} as {blob_name}")
         return blob_name
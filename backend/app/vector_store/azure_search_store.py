@@ -2,6 +2,7 @@
 import logging
 from typing import List, Dict, Tuple, Optional
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 import uuid
 
 from azure.search.documents import SearchClient, SearchIndexClient
@@ -22,6 +23,7 @@ from azure.core.credentials import AzureKeyCredential
 from azure.identity import DefaultAzureCredential
 
 from app.core.config import settings
+from app.core.tracing import traced
 
 logger = logging.getLogger(__name__)
 
@@ -83,7 +85,7 @@ class AzureSearchVectorStore:
     def _create_index(self):
         """Create Azure AI Search index with vector search configuration."""
         fields = [
-            SimpleField(name="id", type=SearchFieldDataType.String, key=True),
+            SimpleField(name="id", type=SearchFieldDataType.String, key=True, filterable=True),
             SearchableField(name="content", type=SearchFieldDataType.String, analyzer_name="en.microsoft"),
             SimpleField(name="parent_id", type=SearchFieldDataType.String, filterable=True),
             SimpleField(name="child_id", type=SearchFieldDataType.String, filterable=True),
@@ -128,40 +130,62 @@ class AzureSearchVectorStore:
     def add_documents(
         self,
         documents: List[Dict],
-        batch_size: Optional[int] = None
+        batch_size: Optional[int] = None,
+        max_concurrency: Optional[int] = None
     ) -> List[str]:
         """
         Add documents to the index in batches.
         
+        Batches are uploaded concurrently (up to max_concurrency in flight)
+        so a large ingest is not serialized on per-batch round trips.
+        
         Args:
             documents: List of document dicts with required fields
             batch_size: Batch size for uploads (defaults to config)
+            max_concurrency: Upload batches in flight (defaults to config)
             
         Returns:
             List of document IDs added
         """
         batch_size = batch_size or settings.BATCH_SIZE
-        doc_ids = []
+        max_concurrency = max_concurrency or settings.UPLOAD_CONCURRENCY
+        batches = [documents[i:i + batch_size] for i in range(0, len(documents), batch_size)]
+        if not batches:
+            return []
         
-        for i in range(0, len(documents), batch_size):
-            batch = documents[i:i + batch_size]
+        def upload(batch_num: int, batch: List[Dict]) -> List[str]:
             try:
                 result = self.search_client.upload_documents(documents=batch)
-                
-                # Check for errors
-                for r in result:
-                    if r.succeeded:
-                        doc_ids.append(r.key)
-                    else:
-                        logger.error(f"Failed to upload document {r.key}: {r.error_message}")
-                
-                logger.info(f"Uploaded batch {i//batch_size + 1} ({len(batch)} documents)")
             except Exception as e:
                 logger.error(f"Error uploading batch: {e}")
                 raise
+            
+            # Check for errors
+            keys = []
+            for r in result:
+                if r.succeeded:
+                    keys.append(r.key)
+                else:
+                    logger.error(f"Failed to upload document {r.key}: {r.error_message}")
+            
+            logger.info(f"Uploaded batch {batch_num} ({len(batch)} documents)")
+            return keys
+        
+        doc_ids = []
+        if len(batches) == 1 or max_concurrency <= 1:
+            for n, batch in enumerate(batches, 1):
+                doc_ids.extend(upload(n, batch))
+            return doc_ids
+        
+        with ThreadPoolExecutor(max_workers=min(max_concurrency, len(batches))) as executor:
+            futures = [executor.submit(upload, n, batch) for n, batch in enumerate(batches, 1)]
+            # Collect in submission order so IDs line up with the input
+            for future in futures:
+                doc_ids.extend(future.result())
         
         return doc_ids
     
+    @traced("vector_search.azure")
     def search(
         self,
         query_vector: List[float],
@@ -231,6 +255,82 @@ class AzureSearchVectorStore:
             logger.warning(f"Could not retrieve parent {parent_id}: {e}")
             return None
     
+    def get_parent_contexts(self, parent_ids: List[str]) -> Dict[str, Dict]:
+        """
+        Retrieve several parent chunks in one request.
+        
+        Uses a search.in() filter on the key field instead of one
+        get_document round trip per parent. Indexes created before the key
+        was filterable reject the filter, so IDs the batch did not return
+        are fetched one by one with get_document.
+        
+        Args:
+            parent_ids: Parent chunk IDs
+            
+        Returns:
+            Dict of parent_id -> parent document (missing IDs are omitted)
+        """
+        parent_ids = list(dict.fromkeys(pid for pid in parent_ids if pid))
+        parents: Dict[str, Dict] = {}
+        batch_size = settings.BATCH_SIZE
+        
+        for i in range(0, len(parent_ids), batch_size):
+            batch = parent_ids[i:i + batch_size]
+            id_list = ",".join(pid.replace("'", "''") for pid in batch)
+            try:
+                results = self.search_client.search(
+                    search_text="*",
+                    filter=f"search.in(id, '{id_list}', ',')",
+                    top=len(batch),
+                    select=["id", "content", "source", "page", "subject", "parent_id", "child_id", "is_config"]
+                )
+                for result in results:
+                    doc = dict(result)
+                    parents[doc["id"]] = doc
+            except Exception as e:
+                logger.warning(f"Batch parent lookup failed, falling back to get_document: {e}")
+        
+        for parent_id in parent_ids:
+            if parent_id not in parents:
+                parent_doc = self.get_parent_context(parent_id)
+                if parent_doc:
+                    parents[parent_id] = parent_doc
+        
+        return parents
+    
+    def delete_document(self, doc_id: str, organization: Optional[str] = None) -> int:
+        """
+        Delete a document's chunks and parent chunks.
+        
+        The key field cannot be prefix-filtered, so chunk IDs are listed
+        (only the organization's, when given) and matched on the doc_id
+        prefix.
+        
+        Args:
+            doc_id: Document ID (chunk IDs are prefixed with it)
+            organization: Organization the document was ingested for
+            
+        Returns:
+            Number of chunks deleted
+        """
+        prefix = f"{doc_id}_"
+        filter_expr = None
+        if organization is not None:
+            escaped = organization.replace("'", "''")
+            filter_expr = f"organization eq '{escaped}'"
+        ids = [
+            result["id"]
+            for result in self.search_client.search(search_text="*", filter=filter_expr, select=["id"])
+            if result["id"].startswith(prefix)
+        ]
+        
+        batch_size = settings.BATCH_SIZE
+        for i in range(0, len(ids), batch_size):
+            self.search_client.delete_documents(documents=[{"id": doc} for doc in ids[i:i + batch_size]])
+        
+        logger.info(f"Deleted {len(ids)} chunks of document {doc_id}")
+        return len(ids)
+    
     def get_stats(self) -> Dict:
         """Get statistics about the index."""
         try:
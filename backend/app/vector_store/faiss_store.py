@@ -1,5 +1,6 @@
 """FAISS vector store implementation."""
 import json
+import threading
 import numpy as np
 from pathlib import Path
 from typing import List, Dict, Tuple, Optional
@@ -7,6 +8,9 @@ import logging
 import faiss
 
 from app.core.config import settings
+from app.vector_store.compressed_index import create_index, index_stats, open_index, write_index
+from app.vector_store.snapshot import MappedRecordMap, load_store, local_saved_at, publish_store, snapshots_enabled
+from app.core.tracing import traced
 
 logger = logging.getLogger(__name__)
 
@@ -21,7 +25,13 @@ except ImportError:
 class FaissVectorStore:
     """FAISS-based vector store with metadata management."""
 
-    def __init__(self, dim: int, index_path: Optional[str] = None, metadata_path: Optional[str] = None):
+    def __init__(
+        self,
+        dim: int,
+        index_path: Optional[str] = None,
+        metadata_path: Optional[str] = None,
+        snapshot_name: Optional[str] = "faiss"
+    ):
         """
         Initialize FAISS vector store.
 
@@ -29,10 +39,18 @@ class FaissVectorStore:
             dim: Embedding dimension
             index_path: Path to FAISS index file
             metadata_path: Path to metadata JSONL file
+            snapshot_name: Snapshot loaded at startup when VECTOR_SNAPSHOTS is
+                enabled (None = always load from index_path/metadata_path)
         """
         self.dim = dim
+        self._write_lock = threading.Lock()
         self.index_path = Path(index_path or settings.FAISS_INDEX_PATH)
         self.metadata_path = Path(metadata_path or settings.FAISS_METADATA_PATH)
+        # Parent chunks (no vectors) for parent-child retrieval, keyed by ID
+        self.parents_path = self.metadata_path.with_name('parents.jsonl')
+        self.parent_store: Dict[str, Dict] = {}
+        self.snapshot_name = snapshot_name
+        self.snapshot_version: Optional[str] = None
 
         # Check if RTLD is being used
         self.use_rtld = settings.EMBEDDING_PROVIDER == "rtld" and RTLD_AVAILABLE
@@ -51,13 +69,24 @@ class FaissVectorStore:
             self.metadata_store: List[Dict] = []
             self.text_store: List[str] = []  # Store chunk text by FAISS id
 
-            # Initialize or load index
+            # Initialize or load index (a prebuilt snapshot first, when enabled
+            # and at least as new as the local files)
+            if self.snapshot_name and snapshots_enabled() and self.load_snapshot():
+                return
             if self.index_path.exists() and self.metadata_path.exists():
                 self.load()
             else:
-                # Create new IndexFlatIP (inner product) for normalized vectors
-                self.index = faiss.IndexFlatIP(dim)
-                logger.info(f"Created new FAISS index with dimension {dim}")
+                # Create new inner-product index for normalized vectors
+                # (flat, or int8/PQ codes with on-disk re-scoring vectors)
+                self.index = create_index(
+                    dim,
+                    str(self.index_path),
+                    compression=settings.VECTOR_COMPRESSION,
+                    rescore_factor=settings.VECTOR_RESCORE_FACTOR
+                )
+                logger.info(f"Created new FAISS index with dimension {dim} ({settings.VECTOR_COMPRESSION})")
+
+        self._load_parents()
     
     def add_documents(
         self,
@@ -85,7 +114,10 @@ class FaissVectorStore:
             if 'vector' in doc and doc['vector']:
                 vectors_list.append(doc['vector'])
             else:
-                # Skip documents without vectors (like parent chunks in parent-child)
+                # Documents without vectors are parent chunks: keep them for
+                # get_parent_contexts() instead of the vector index
+                if doc.get('id'):
+                    self.parent_store[doc['id']] = {k: v for k, v in doc.items() if k != 'vector'}
                 continue
             
             # Extract text
@@ -109,7 +141,8 @@ class FaissVectorStore:
             metadatas.append(metadata)
         
         if not vectors_list:
-            logger.warning("No vectors found in documents, skipping")
+            if not self.parent_store:
+                logger.warning("No vectors found in documents, skipping")
             return []
         
         # Convert to numpy array
@@ -147,20 +180,23 @@ class FaissVectorStore:
         if vectors.shape[1] != self.dim:
             raise ValueError(f"Vector dimension {vectors.shape[1]} does not match index dimension {self.dim}")
         
-        # Add vectors to FAISS index
-        self.index.add(vectors)
-        
-        # Get the IDs (they're sequential starting from current size)
-        start_id = len(self.metadata_store)
-        ids = list(range(start_id, start_id + len(vectors)))
-        
-        # Store metadata and texts
-        self.metadata_store.extend(metadatas)
-        self.text_store.extend(texts)
+        # Ingestion jobs add concurrently; FAISS ids and metadata must stay aligned
+        with self._write_lock:
+            # Add vectors to FAISS index
+            self.index.add(vectors)
+            
+            # Get the IDs (they're sequential starting from current size)
+            start_id = len(self.metadata_store)
+            ids = list(range(start_id, start_id + len(vectors)))
+            
+            # Store metadata and texts
+            self.metadata_store.extend(metadatas)
+            self.text_store.extend(texts)
         
         logger.info(f"Added {len(vectors)} vectors to index (IDs: {ids[0]}-{ids[-1]})")
         return ids
     
+    @traced("vector_search.faiss")
     def search(
         self,
         query_vector: List[float],
@@ -202,6 +238,11 @@ class FaissVectorStore:
         k = min(top_k, self.index.ntotal)
         distances, indices = self.index.search(query_vector, k)
         
+        # Deleted chunks stay in the index; search deeper until enough are live
+        while k < self.index.ntotal and self._live_count(indices[0]) < top_k:
+            k = min(k * 2, self.index.ntotal)
+            distances, indices = self.index.search(query_vector, k)
+        
         # Build results with metadata and text in Azure-compatible format
         results = []
         for i, (score, idx) in enumerate(zip(distances[0], indices[0])):
@@ -210,6 +251,10 @@ class FaissVectorStore:
             if idx >= len(self.metadata_store):
                 logger.warning(f"Index {idx} out of bounds for metadata store")
                 continue
+            if self.metadata_store[idx].get('deleted', False):
+                continue
+            if len(results) >= top_k:
+                break
             
             metadata = self.metadata_store[idx].copy()
             text = self.text_store[idx]
@@ -233,14 +278,85 @@ class FaissVectorStore:
         logger.info(f"Search returned {len(results)} results")
         return results
     
+    def _live_count(self, indices: np.ndarray) -> int:
+        return sum(
+            1 for idx in indices
+            if 0 <= idx < len(self.metadata_store) and not self.metadata_store[idx].get('deleted', False)
+        )
+    
+    def delete_document(self, doc_id: str, organization: Optional[str] = None) -> int:
+        """
+        Remove a document's chunks and parent chunks.
+        
+        FAISS cannot drop single vectors, so chunks are marked deleted and
+        skipped by search.
+        
+        Args:
+            doc_id: Document ID (chunk IDs are prefixed with it)
+            organization: Ignored for FAISS (only used for Azure)
+            
+        Returns:
+            Number of chunks deleted
+        """
+        prefix = f"{doc_id}_"
+        deleted = 0
+        with self._write_lock:
+            for i, metadata in enumerate(self.metadata_store):
+                if metadata.get('deleted', False):
+                    continue
+                if metadata.get('doc_id') == doc_id or str(metadata.get('id', '')).startswith(prefix):
+                    # Assign the record back: mapped snapshot records iterate as copies
+                    self.metadata_store[i] = {**metadata, 'deleted': True}
+                    deleted += 1
+            for parent_id in [pid for pid in self.parent_store if pid.startswith(prefix)]:
+                del self.parent_store[parent_id]
+        
+        logger.info(f"Marked {deleted} chunks of document {doc_id} as deleted")
+        return deleted
+    
+    def get_parent_context(self, parent_id: str) -> Optional[Dict]:
+        """Retrieve a parent chunk by ID."""
+        return self.parent_store.get(parent_id)
+
+    def get_parent_contexts(self, parent_ids: List[str]) -> Dict[str, Dict]:
+        """
+        Retrieve several parent chunks at once.
+
+        Args:
+            parent_ids: Parent chunk IDs
+
+        Returns:
+            Dict of parent_id -> parent document (missing IDs are omitted)
+        """
+        return {pid: self.parent_store[pid] for pid in parent_ids if pid in self.parent_store}
+
+    def _save_parents(self):
+        with open(self.parents_path, 'w', encoding='utf-8') as f:
+            for parent in self.parent_store.values():
+                f.write(json.dumps(parent, ensure_ascii=False) + '\n')
+
+    def _load_parents(self):
+        if not self.parents_path.exists():
+            return
+        with open(self.parents_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    parent = json.loads(line)
+                    self.parent_store[parent['id']] = parent
+        logger.info(f"Loaded {len(self.parent_store)} parent chunks from {self.parents_path}")
+
     def save(self):
         """Save index and metadata to disk."""
+        if self.parent_store or self.parents_path.exists():
+            self.parents_path.parent.mkdir(parents=True, exist_ok=True)
+            self._save_parents()
+
         if self.use_rtld:
             # Delegate to RTLD service
             self.rtld_service.save_index()
         else:
             # Save FAISS index
-            faiss.write_index(self.index, str(self.index_path))
+            write_index(self.index, str(self.index_path))
             logger.info(f"Saved FAISS index to {self.index_path}")
 
             # Save metadata as JSONL
@@ -267,7 +383,7 @@ class FaissVectorStore:
             self.dim = self.rtld_service.embedding_dim
         else:
             # Load FAISS index
-            self.index = faiss.read_index(str(self.index_path))
+            self.index = open_index(str(self.index_path))
             self.dim = self.index.d
             logger.info(f"Loaded FAISS index from {self.index_path} (dim={self.dim}, size={self.index.ntotal})")
 
@@ -286,12 +402,63 @@ class FaissVectorStore:
             else:
                 logger.warning(f"Metadata file {self.metadata_path} not found")
     
+    def publish_snapshot(self) -> str:
+        """
+        Save, then publish the index, metadata, texts and parents as a new snapshot version.
+
+        Returns:
+            The published version
+        """
+        if self.use_rtld:
+            return self.rtld_service.publish_snapshot()
+        with self._write_lock:
+            self.save()
+            parent_ids = list(self.parent_store.keys())
+            return publish_store(
+                self.snapshot_name or "faiss",
+                self.index_path,
+                records={
+                    'metadata': self.metadata_store,
+                    'texts': self.text_store,
+                    'parents': (self.parent_store[pid] for pid in parent_ids),
+                },
+                state={'parent_ids': parent_ids},
+                meta={'dim': self.dim, 'vectors': self.index.ntotal}
+            )
+
+    def load_snapshot(self) -> bool:
+        """
+        Map the latest snapshot instead of reading the index and JSONL files.
+
+        Returns:
+            True if the snapshot was loaded; False to fall back to the local
+            files (also when they were saved after the snapshot was published)
+        """
+        try:
+            index, records, state, manifest = load_store(
+                self.snapshot_name, self.index_path, ('metadata', 'texts', 'parents'),
+                not_older_than=local_saved_at(self.index_path, self.metadata_path, self.parents_path)
+            )
+        except Exception as e:
+            logger.warning(f"Snapshot {self.snapshot_name} unavailable, loading {self.index_path}: {e}")
+            return False
+
+        self.index = index
+        self.dim = index.d
+        self.metadata_store = records['metadata']
+        self.text_store = records['texts']
+        self.parent_store = MappedRecordMap(state.get('parent_ids', []), records['parents'])
+        self.snapshot_version = manifest['version']
+        return True
+
     def get_stats(self) -> Dict:
         """Get statistics about the index."""
         return {
             'total_vectors': self.index.ntotal,
             'dimension': self.dim,
-            'index_type': type(self.index).__name__
+            'index_type': type(self.index).__name__,
+            'storage': index_stats(self.index),
+            'snapshot_version': self.snapshot_version
         }
 
 
@@ -2,6 +2,7 @@
 import logging
 from typing import List, Dict, Any, Optional
 import time
+from app.core.tracing import traced
 
 logger = logging.getLogger(__name__)
 
@@ -134,6 +135,7 @@ class PineconeVectorStore:
                 clean[key] = str(value)
         return clean
     
+    @traced("vector_search.pinecone")
     def search(
         self,
         query_embedding: List[float],
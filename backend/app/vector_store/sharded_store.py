@@ -0,0 +1,358 @@
+"""Jurisdiction-sharded FAISS vector store.
+
+Almost every legal query is scoped to one province or state, so the corpus
+is split into one FaissVectorStore per (jurisdiction, law type) under
+FAISS_SHARD_DIR. A manifest records each shard's key and size; shards are
+only read from disk the first time a query or ingest touches them.
+
+Queries scoped by jurisdiction or country are routed to the matching shards
+and nothing else; unscoped queries fan out over every shard in parallel and
+the per-shard top-k lists are merged by score.
+"""
+import re
+import json
+import heapq
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import faiss
+
+from app.core.config import settings
+from app.vector_store.faiss_store import FaissVectorStore
+from app.vector_store.compressed_index import reconstruct_all
+from app.core.tracing import traced
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SHARD = "general"
+MANIFEST_NAME = "manifest.json"
+
+_CANADA = (
+    'canada', 'ontario', 'british_columbia', 'quebec', 'alberta', 'nova_scotia', 'new_brunswick',
+    'manitoba', 'saskatchewan', 'prince_edward_island', 'newfoundland', 'northwest_territories',
+    'nunavut', 'yukon',
+)
+_USA = (
+    'usa', 'united_states', 'california', 'texas', 'florida', 'new_york', 'pennsylvania', 'illinois',
+    'ohio', 'georgia', 'north_carolina', 'new_jersey', 'virginia', 'washington', 'arizona',
+    'massachusetts', 'tennessee', 'indiana', 'missouri', 'maryland', 'wisconsin', 'colorado',
+    'minnesota', 'south_carolina', 'alabama', 'louisiana', 'kentucky', 'oregon', 'oklahoma',
+    'connecticut', 'utah', 'iowa', 'nevada', 'arkansas', 'mississippi', 'kansas', 'new_mexico',
+    'nebraska', 'west_virginia', 'idaho', 'hawaii', 'new_hampshire', 'maine', 'montana',
+    'rhode_island', 'delaware', 'south_dakota', 'north_dakota', 'alaska', 'vermont', 'wyoming',
+)
+
+# Jurisdiction slug -> country
+JURISDICTION_COUNTRY: Dict[str, str] = {
+    **{name: 'Canada' for name in _CANADA},
+    **{name: 'USA' for name in _USA},
+}
+
+
+def shard_slug(value: Optional[str]) -> str:
+    """Normalize a jurisdiction or law type ("British Columbia" -> "british_columbia")."""
+    return re.sub(r"[^a-z0-9]+", "_", (value or "").lower()).strip("_")
+
+
+def shard_key(doc: Dict, by_law_type: bool = True) -> str:
+    """Shard of a document: <jurisdiction>__<law type> from organization/subject metadata."""
+    jurisdiction = shard_slug(doc.get('jurisdiction') or doc.get('organization')) or DEFAULT_SHARD
+    if not by_law_type:
+        return jurisdiction
+    law_type = shard_slug(doc.get('law_type') or doc.get('subject')) or DEFAULT_SHARD
+    return f"{jurisdiction}__{law_type}"
+
+
+def split_shard_key(key: str) -> Tuple[str, str]:
+    """(jurisdiction, law type) of a shard key."""
+    jurisdiction, _, law_type = key.partition("__")
+    return jurisdiction, law_type or DEFAULT_SHARD
+
+
+class ShardedVectorStore:
+    """Per-jurisdiction FAISS shards with routed search (same interface as FaissVectorStore)."""
+
+    def __init__(
+        self,
+        dim: int,
+        root_dir: Optional[str] = None,
+        by_law_type: Optional[bool] = None,
+        search_workers: Optional[int] = None
+    ):
+        """
+        Initialize the sharded store (no shard is loaded yet).
+
+        Args:
+            dim: Embedding dimension
+            root_dir: Directory holding one sub-directory per shard
+            by_law_type: Split each jurisdiction further by law type (subject)
+            search_workers: Threads used when a query fans out to several shards
+        """
+        self.dim = dim
+        self.root_dir = Path(root_dir or settings.FAISS_SHARD_DIR)
+        self.by_law_type = settings.FAISS_SHARD_BY_LAW_TYPE if by_law_type is None else by_law_type
+        self.search_workers = max(1, search_workers or settings.FAISS_SHARD_SEARCH_WORKERS)
+        self.manifest_path = self.root_dir / MANIFEST_NAME
+
+        self._shards: Dict[str, FaissVectorStore] = {}
+        self._lock = threading.Lock()
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self.manifest: Dict[str, Dict] = self._read_manifest()
+        logger.info(f"Sharded FAISS store at {self.root_dir}: {len(self.manifest)} shards, "
+                    f"{sum(s.get('vectors', 0) for s in self.manifest.values())} vectors (lazy)")
+
+    # ----- shards -----
+
+    def _read_manifest(self) -> Dict[str, Dict]:
+        manifest: Dict[str, Dict] = {}
+        if self.manifest_path.exists():
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f).get('shards', {})
+        # Shards written without a manifest update (e.g. a crash before save) are still routable
+        if self.root_dir.exists():
+            for path in self.root_dir.iterdir():
+                if path.is_dir() and path.name not in manifest and (path / "metadata.jsonl").exists():
+                    jurisdiction, law_type = split_shard_key(path.name)
+                    manifest[path.name] = {'jurisdiction': jurisdiction, 'law_type': law_type, 'vectors': 0}
+        return manifest
+
+    def _shard(self, key: str) -> FaissVectorStore:
+        """Shard store, loaded from (or created in) its directory on first use."""
+        shard = self._shards.get(key)
+        if shard is not None:
+            return shard
+        with self._lock:
+            shard = self._shards.get(key)
+            if shard is None:
+                path = self.root_dir / key
+                path.mkdir(parents=True, exist_ok=True)
+                shard = FaissVectorStore(
+                    dim=self.dim,
+                    index_path=str(path / "index.faiss"),
+                    metadata_path=str(path / "metadata.jsonl"),
+                    snapshot_name=None
+                )
+                self._shards[key] = shard
+                if key not in self.manifest:
+                    jurisdiction, law_type = split_shard_key(key)
+                    self.manifest[key] = {'jurisdiction': jurisdiction, 'law_type': law_type, 'vectors': 0}
+                logger.info(f"Loaded shard {key} ({shard.index.ntotal} vectors)")
+        return shard
+
+    def route(
+        self,
+        jurisdictions: Optional[Iterable[str]] = None,
+        law_types: Optional[Iterable[str]] = None,
+        countries: Optional[Iterable[str]] = None
+    ) -> List[str]:
+        """
+        Shard keys a query has to search.
+
+        Every given scope must match (e.g. Ontario and Canada -> the Ontario
+        shards); no scope at all means every shard.
+        """
+        wanted = {shard_slug(j) for j in jurisdictions or () if j}
+        wanted_countries = {c.lower() for c in countries or () if c}
+        wanted_law_types = {shard_slug(t) for t in law_types or () if t}
+
+        keys = []
+        for key, info in self.manifest.items():
+            jurisdiction = info.get('jurisdiction', DEFAULT_SHARD)
+            if wanted and jurisdiction not in wanted:
+                continue
+            if wanted_countries and JURISDICTION_COUNTRY.get(jurisdiction, '').lower() not in wanted_countries:
+                continue
+            if wanted_law_types and self.by_law_type and info.get('law_type') not in wanted_law_types:
+                continue
+            keys.append(key)
+        return sorted(keys)
+
+    # ----- FaissVectorStore interface -----
+
+    def add_documents(self, documents: List[Dict]) -> List[str]:
+        """Add documents (vectors and vector-less parent chunks), grouped by shard."""
+        groups: Dict[str, List[Dict]] = {}
+        for doc in documents:
+            groups.setdefault(shard_key(doc, self.by_law_type), []).append(doc)
+
+        ids = []
+        for key, docs in groups.items():
+            ids.extend(self._shard(key).add_documents(docs))
+        return ids
+
+    def add_embeddings(self, vectors: np.ndarray, metadatas: List[Dict], texts: List[str]) -> List[int]:
+        """
+        Add embeddings, grouped by shard.
+
+        Returns:
+            Shard-local FAISS IDs, in input order
+        """
+        if len(vectors) != len(metadatas) or len(vectors) != len(texts):
+            raise ValueError("vectors, metadatas, and texts must have same length")
+
+        groups: Dict[str, List[int]] = {}
+        for i, metadata in enumerate(metadatas):
+            groups.setdefault(shard_key(metadata, self.by_law_type), []).append(i)
+
+        ids: List[int] = [0] * len(metadatas)
+        for key, rows in groups.items():
+            shard_ids = self._shard(key).add_embeddings(
+                vectors[rows], [metadatas[i] for i in rows], [texts[i] for i in rows]
+            )
+            for row, shard_id in zip(rows, shard_ids):
+                ids[row] = shard_id
+        return ids
+
+    @traced("vector_search.sharded")
+    def search(
+        self,
+        query_vector: List[float],
+        top_k: int = 10,
+        search_text: Optional[str] = None,
+        filters: Optional[str] = None,
+        jurisdictions: Optional[Iterable[str]] = None,
+        law_types: Optional[Iterable[str]] = None,
+        countries: Optional[Iterable[str]] = None
+    ) -> List[Tuple[float, Dict]]:
+        """
+        Search the shards in scope and merge their results.
+
+        Args:
+            query_vector: Query vector
+            top_k: Number of results to return
+            search_text: Ignored (Azure compatibility)
+            filters: Ignored (Azure compatibility)
+            jurisdictions: Provinces/states to search (e.g. "Ontario")
+            law_types: Law types (subjects) to search
+            countries: Countries to search ("Canada", "USA")
+
+        Returns:
+            List of (score, document_dict), best first
+        """
+        keys = self.route(jurisdictions, law_types, countries)
+        if not keys:
+            logger.info("No shard matches the query scope")
+            return []
+
+        query = np.asarray(query_vector, dtype=np.float32).reshape(1, -1)
+        if query.shape[1] != self.dim:
+            raise ValueError(f"Query dimension {query.shape[1]} does not match index dimension {self.dim}")
+        faiss.normalize_L2(query)
+
+        def search_shard(key: str) -> List[Tuple[float, Dict]]:
+            shard = self._shard(key)
+            if shard.index.ntotal == 0:
+                return []
+            return shard.search(query.copy(), top_k=top_k)
+
+        if len(keys) == 1:
+            return search_shard(keys[0])
+
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.search_workers, thread_name_prefix="faiss-shard")
+        merged = [hit for hits in self._pool.map(search_shard, keys) for hit in hits]
+        logger.info(f"Searched {len(keys)} shards")
+        return heapq.nlargest(top_k, merged, key=lambda hit: hit[0])
+
+    def get_parent_context(self, parent_id: str) -> Optional[Dict]:
+        """Retrieve a parent chunk by ID from the loaded shards."""
+        for shard in list(self._shards.values()):
+            parent = shard.get_parent_context(parent_id)
+            if parent is not None:
+                return parent
+        return None
+
+    def get_parent_contexts(self, parent_ids: List[str]) -> Dict[str, Dict]:
+        """
+        Retrieve several parent chunks at once.
+
+        Parents live in the shard of their children, which a search has
+        already loaded.
+        """
+        found: Dict[str, Dict] = {}
+        for shard in list(self._shards.values()):
+            missing = [pid for pid in parent_ids if pid not in found]
+            if not missing:
+                break
+            found.update(shard.get_parent_contexts(missing))
+        return found
+
+    def delete_document(self, doc_id: str, organization: Optional[str] = None) -> int:
+        """
+        Remove a document's chunks and parent chunks from every shard.
+
+        A document can span jurisdictions, so each shard is loaded.
+
+        Returns:
+            Number of chunks deleted
+        """
+        return sum(self._shard(key).delete_document(doc_id) for key in list(self.manifest))
+
+    def save(self):
+        """Save the loaded shards and the manifest."""
+        for key, shard in list(self._shards.items()):
+            shard.save()
+            self.manifest[key]['vectors'] = shard.index.ntotal
+        self.root_dir.mkdir(parents=True, exist_ok=True)
+        with open(self.manifest_path, 'w', encoding='utf-8') as f:
+            json.dump({'by_law_type': self.by_law_type, 'shards': self.manifest}, f, indent=2, sort_keys=True)
+        logger.info(f"Saved {len(self._shards)} loaded shards and the manifest to {self.root_dir}")
+
+    def get_stats(self) -> Dict:
+        """Statistics from the manifest (shards are not loaded for this)."""
+        vectors = {key: info.get('vectors', 0) for key, info in self.manifest.items()}
+        for key, shard in list(self._shards.items()):
+            vectors[key] = shard.index.ntotal
+        return {
+            'total_vectors': sum(vectors.values()),
+            'dimension': self.dim,
+            'index_type': 'ShardedVectorStore',
+            'shards': len(vectors),
+            'loaded_shards': len(self._shards),
+            'largest_shards': heapq.nlargest(10, vectors.items(), key=lambda item: item[1]),
+        }
+
+    def import_store(self, store: FaissVectorStore, batch_size: int = 10_000) -> Dict[str, int]:
+        """
+        Split an unsharded store into shards (vectors, metadata, texts and parents).
+
+        Returns:
+            Vectors written per shard
+        """
+        vectors = reconstruct_all(store.index)
+        counts: Dict[str, int] = {}
+        for start in range(0, len(vectors), batch_size):
+            end = min(start + batch_size, len(vectors))
+            metadatas = store.metadata_store[start:end]
+            self.add_embeddings(np.ascontiguousarray(vectors[start:end]), metadatas, store.text_store[start:end])
+            for metadata in metadatas:
+                key = shard_key(metadata, self.by_law_type)
+                counts[key] = counts.get(key, 0) + 1
+
+        # Parents go to the shard of their (first) child
+        parent_shard = {}
+        for metadata in store.metadata_store:
+            if metadata.get('parent_id'):
+                parent_shard.setdefault(metadata['parent_id'], shard_key(metadata, self.by_law_type))
+        for parent_id, parent in store.parent_store.items():
+            key = parent_shard.get(parent_id, shard_key(parent, self.by_law_type))
+            self._shard(key).parent_store[parent_id] = parent
+
+        self.save()
+        return counts
+
+
+# Global singleton instance
+_sharded_store: Optional[ShardedVectorStore] = None
+
+
+def get_sharded_vector_store(dim: Optional[int] = None) -> ShardedVectorStore:
+    """Get or create the global sharded vector store instance."""
+    global _sharded_store
+    if _sharded_store is None:
+        _sharded_store = ShardedVectorStore(dim=dim or settings.EMBEDDING_DIMENSIONS)
+    return _sharded_store
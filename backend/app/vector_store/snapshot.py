@@ -0,0 +1,576 @@
+"""Versioned vector-store snapshots for fast cold starts.
+
+A snapshot is a set of files (the saved index and its sidecars, plus the
+metadata/text records) described by a manifest. Every file is cut into
+fixed-size blocks that are stored content-addressed in the remote
+(gs://bucket/prefix or a shared directory):
+
+    <remote>/<name>/LATEST                      current version
+    <remote>/<name>/manifests/<version>.json    files, block hashes, checksum
+    <remote>/<name>/blocks/<sha256>             block contents
+
+A pod syncs the latest version into its local cache, reusing every block
+that is unchanged since the version it already has, so only deltas are
+downloaded (indexes and records are append-only, so a new version mostly
+differs in its last blocks). Blocks, files and the manifest itself are
+verified with SHA-256. The synced files are then memory-mapped: records
+are decoded only when a row is read, and the index is copied to its live
+location only when something is added to it.
+
+A store only starts from a snapshot that is at least as new as the state it
+saved itself (load_store's not_older_than), so writes made since the last
+publish are not lost on restart.
+"""
+import os
+import json
+import time
+import shutil
+import calendar
+import hashlib
+import logging
+import threading
+from collections.abc import MutableMapping
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from app.core.config import settings
+from app.vector_store.compressed_index import MappedIndex, index_files, open_index
+
+logger = logging.getLogger(__name__)
+
+try:
+    from google.cloud import storage
+    GCS_AVAILABLE = True
+except ImportError:
+    GCS_AVAILABLE = False
+
+MANIFEST_NAME = "MANIFEST.json"
+SNAPSHOT_INDEX = "index.faiss"
+SNAPSHOT_STATE = "state.json"
+_VERIFIED_MARKER = ".verified"
+
+
+def snapshots_enabled() -> bool:
+    """Load vector stores from snapshots at startup (VECTOR_SNAPSHOTS)."""
+    return settings.VECTOR_SNAPSHOTS
+
+
+def local_saved_at(*paths: Union[str, Path]) -> Optional[float]:
+    """When a store last saved its files (latest mtime; None when none exist)."""
+    times = [os.path.getmtime(path) for path in paths if os.path.exists(path)]
+    return max(times) if times else None
+
+
+def created_at(manifest: Dict) -> float:
+    """Publish time of a snapshot manifest (epoch seconds)."""
+    return float(calendar.timegm(time.strptime(manifest['created_at'], '%Y-%m-%dT%H:%M:%SZ')))
+
+
+# ----- records -----
+
+def write_records(path: Union[str, Path], records: Iterable[Any]) -> int:
+    """
+    Write JSON records as <path>.bin (concatenated UTF-8) and <path>.idx (uint64 offsets).
+
+    Returns:
+        Number of records written
+    """
+    path = str(path)
+    offsets = [0]
+    with open(f"{path}.bin", 'wb') as f:
+        for record in records:
+            data = json.dumps(record, ensure_ascii=False, default=str).encode('utf-8')
+            f.write(data)
+            offsets.append(offsets[-1] + len(data))
+    np.asarray(offsets, dtype=np.uint64).tofile(f"{path}.idx")
+    return len(offsets) - 1
+
+
+class MappedRecords:
+    """
+    List-like view of records written by write_records.
+
+    The files are memory-mapped and a record is decoded on first access.
+    Records read by index are kept, so in-place updates to them stick;
+    appended records live in memory until the owning store saves them.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        path = str(path)
+        self._offsets = np.fromfile(f"{path}.idx", dtype=np.uint64)
+        size = int(self._offsets[-1]) if len(self._offsets) else 0
+        self._data = np.memmap(f"{path}.bin", dtype=np.uint8, mode='r') if size else np.zeros(0, np.uint8)
+        self._base = max(0, len(self._offsets) - 1)
+        self._decoded: Dict[int, Any] = {}
+        self._appended: List[Any] = []
+
+    def _decode(self, i: int) -> Any:
+        start, end = int(self._offsets[i]), int(self._offsets[i + 1])
+        return json.loads(self._data[start:end].tobytes().decode('utf-8'))
+
+    def __len__(self) -> int:
+        return self._base + len(self._appended)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if i >= self._base:
+            return self._appended[i - self._base]
+        if i < 0:
+            raise IndexError(i)
+        record = self._decoded.get(i)
+        if record is None:
+            record = self._decoded[i] = self._decode(i)
+        return record
+
+    def __setitem__(self, i: int, value: Any):
+        if i < 0:
+            i += len(self)
+        if i >= self._base:
+            self._appended[i - self._base] = value
+        else:
+            self._decoded[i] = value
+
+    def __iter__(self) -> Iterator[Any]:
+        # Full scans do not pin every decoded record in memory
+        for i in range(self._base):
+            record = self._decoded.get(i)
+            yield record if record is not None else self._decode(i)
+        yield from self._appended
+
+    def append(self, record: Any):
+        self._appended.append(record)
+
+    def extend(self, records: Iterable[Any]):
+        self._appended.extend(records)
+
+
+class MappedRecordMap(MutableMapping):
+    """Dict view over MappedRecords: key -> record, decoded on first access."""
+
+    def __init__(self, keys: Sequence[str], records: MappedRecords):
+        self._positions = {key: i for i, key in enumerate(keys)}
+        self._records = records
+        self._changed: Dict[str, Any] = {}
+        self._deleted: set = set()
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self._changed:
+            return self._changed[key]
+        if key in self._deleted or key not in self._positions:
+            raise KeyError(key)
+        return self._records[self._positions[key]]
+
+    def __setitem__(self, key: str, value: Any):
+        self._changed[key] = value
+        self._deleted.discard(key)
+
+    def __delitem__(self, key: str):
+        if key not in self:
+            raise KeyError(key)
+        self._changed.pop(key, None)
+        self._deleted.add(key)
+
+    def __contains__(self, key) -> bool:
+        return key in self._changed or (key in self._positions and key not in self._deleted)
+
+    def __iter__(self) -> Iterator[str]:
+        for key in self._positions:
+            if key not in self._deleted and key not in self._changed:
+                yield key
+        yield from self._changed
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+
+# ----- remotes -----
+
+class _DirRemote:
+    """Snapshot remote on a (shared) filesystem."""
+
+    def __init__(self, root: str):
+        self.root = Path(root)
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = self.root / key
+        return path.read_bytes() if path.exists() else None
+
+    def put(self, key: str, data: bytes):
+        path = self.root / key
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+
+    def exists(self, key: str) -> bool:
+        return (self.root / key).exists()
+
+
+class _GCSRemote:
+    """Snapshot remote in a GCS bucket."""
+
+    def __init__(self, url: str):
+        if not GCS_AVAILABLE:
+            raise ImportError("google-cloud-storage is required for gs:// snapshot remotes")
+        bucket, _, prefix = url[len("gs://"):].partition("/")
+        self.bucket = storage.Client().bucket(bucket)
+        self.prefix = prefix.strip("/")
+
+    def _blob(self, key: str):
+        return self.bucket.blob(f"{self.prefix}/{key}" if self.prefix else key)
+
+    def get(self, key: str) -> Optional[bytes]:
+        blob = self._blob(key)
+        return blob.download_as_bytes() if blob.exists() else None
+
+    def put(self, key: str, data: bytes):
+        self._blob(key).upload_from_string(data)
+
+    def exists(self, key: str) -> bool:
+        return self._blob(key).exists()
+
+
+def _open_remote(url: Optional[str]):
+    if not url:
+        return None
+    return _GCSRemote(url) if url.startswith("gs://") else _DirRemote(url)
+
+
+def _checksum(manifest: Dict) -> str:
+    body = {k: v for k, v in manifest.items() if k != 'checksum'}
+    return hashlib.sha256(json.dumps(body, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+class SnapshotError(Exception):
+    """A snapshot is missing, incomplete or fails verification."""
+
+
+class SnapshotManager:
+    """Publish and sync versioned snapshots of one store."""
+
+    def __init__(
+        self,
+        name: str,
+        cache_dir: Optional[str] = None,
+        remote: Optional[str] = None,
+        block_size_mb: Optional[int] = None,
+        keep: Optional[int] = None
+    ):
+        """
+        Args:
+            name: Snapshot name (one per store, e.g. "faiss")
+            cache_dir: Local snapshot cache (VECTOR_SNAPSHOT_DIR)
+            remote: gs://bucket/prefix or a directory (VECTOR_SNAPSHOT_REMOTE);
+                without a remote, snapshots are only published to the cache
+            block_size_mb: Block size for delta transfers (VECTOR_SNAPSHOT_BLOCK_MB)
+            keep: Local versions kept after a sync (VECTOR_SNAPSHOT_KEEP)
+        """
+        self.name = name
+        self.cache_dir = Path(cache_dir or settings.VECTOR_SNAPSHOT_DIR) / name
+        self.remote = _open_remote(remote if remote is not None else settings.VECTOR_SNAPSHOT_REMOTE)
+        self.block_size = int(block_size_mb or settings.VECTOR_SNAPSHOT_BLOCK_MB) << 20
+        self.keep = max(1, int(keep or settings.VECTOR_SNAPSHOT_KEEP))
+
+    # ----- publishing -----
+
+    def _hash_blocks(self, path: str) -> Dict[str, Any]:
+        blocks, file_hash, size = [], hashlib.sha256(), 0
+        with open(path, 'rb') as f:
+            while True:
+                block = f.read(self.block_size)
+                if not block:
+                    break
+                file_hash.update(block)
+                blocks.append(hashlib.sha256(block).hexdigest())
+                size += len(block)
+        return {'size': size, 'sha256': file_hash.hexdigest(), 'blocks': blocks}
+
+    def publish(self, files: Dict[str, str], meta: Optional[Dict] = None) -> str:
+        """
+        Publish files as a new version.
+
+        Args:
+            files: Snapshot-relative name -> local path
+            meta: Store-specific values recorded in the manifest
+
+        Returns:
+            The new version
+        """
+        manifest: Dict[str, Any] = {
+            'name': self.name,
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'block_size': self.block_size,
+            'files': {rel: self._hash_blocks(path) for rel, path in sorted(files.items())},
+            'meta': meta or {},
+        }
+        manifest['version'] = time.strftime('%Y%m%dT%H%M%S', time.gmtime()) + "-" + _checksum(manifest)[:8]
+        manifest['checksum'] = _checksum(manifest)
+        version = manifest['version']
+
+        # The local cache gets a verified copy, so the publishing pod can start from it too
+        target = self.cache_dir / version
+        staging = self.cache_dir / f".{version}.tmp"
+        shutil.rmtree(staging, ignore_errors=True)
+        staging.mkdir(parents=True)
+        for rel, path in files.items():
+            shutil.copyfile(path, staging / rel)
+        (staging / MANIFEST_NAME).write_text(json.dumps(manifest, indent=2), encoding='utf-8')
+        (staging / _VERIFIED_MARKER).touch()
+        shutil.rmtree(target, ignore_errors=True)
+        os.replace(staging, target)
+
+        if self.remote is not None:
+            uploaded = 0
+            for rel, info in manifest['files'].items():
+                with open(files[rel], 'rb') as f:
+                    for digest in info['blocks']:
+                        block = f.read(self.block_size)
+                        key = f"{self.name}/blocks/{digest}"
+                        if not self.remote.exists(key):
+                            self.remote.put(key, block)
+                            uploaded += len(block)
+            self.remote.put(f"{self.name}/manifests/{version}.json", json.dumps(manifest).encode('utf-8'))
+            self.remote.put(f"{self.name}/LATEST", version.encode('utf-8'))
+            logger.info(f"Published snapshot {self.name}@{version} ({uploaded / 1e6:.1f} MB of new blocks)")
+        else:
+            logger.info(f"Published snapshot {self.name}@{version} to the local cache")
+
+        self._prune(keep={version})
+        return version
+
+    # ----- syncing -----
+
+    def local_versions(self) -> List[str]:
+        """Complete local versions, oldest first."""
+        if not self.cache_dir.exists():
+            return []
+        return sorted(p.name for p in self.cache_dir.iterdir()
+                      if p.is_dir() and (p / _VERIFIED_MARKER).exists())
+
+    def _load_manifest(self, path: Path) -> Dict:
+        manifest = json.loads(path.read_text(encoding='utf-8'))
+        if manifest.get('checksum') != _checksum(manifest):
+            raise SnapshotError(f"Manifest checksum mismatch: {path}")
+        return manifest
+
+    def sync(self, version: Optional[str] = None) -> Path:
+        """
+        Make a verified version available locally (the latest one by default).
+
+        Returns:
+            Directory holding the snapshot files
+        """
+        local = self.local_versions()
+        if self.remote is None:
+            if version is None and local:
+                version = local[-1]
+            if version not in local:
+                raise SnapshotError(f"No local snapshot {self.name}@{version or 'latest'} and no remote configured")
+            return self.cache_dir / version
+
+        if version is None:
+            latest = self.remote.get(f"{self.name}/LATEST")
+            if latest is None:
+                raise SnapshotError(f"No snapshot published for {self.name}")
+            version = latest.decode('utf-8').strip()
+        if version in local:
+            return self.cache_dir / version
+
+        data = self.remote.get(f"{self.name}/manifests/{version}.json")
+        if data is None:
+            raise SnapshotError(f"Snapshot manifest {self.name}@{version} not found")
+        manifest = json.loads(data)
+        if manifest.get('checksum') != _checksum(manifest):
+            raise SnapshotError(f"Manifest checksum mismatch for {self.name}@{version}")
+
+        previous = self._previous_blocks(local[-1]) if local else {}
+        staging = self.cache_dir / f".{version}.tmp"
+        shutil.rmtree(staging, ignore_errors=True)
+        staging.mkdir(parents=True)
+        downloaded = reused = 0
+        for rel, info in manifest['files'].items():
+            file_hash = hashlib.sha256()
+            with open(staging / rel, 'wb') as out:
+                for digest in info['blocks']:
+                    block = self._read_local_block(previous.get(digest))
+                    if block is None:
+                        block = self.remote.get(f"{self.name}/blocks/{digest}")
+                        if block is None:
+                            raise SnapshotError(f"Block {digest} of {rel} missing from the remote")
+                        downloaded += len(block)
+                    else:
+                        reused += len(block)
+                    if hashlib.sha256(block).hexdigest() != digest:
+                        raise SnapshotError(f"Block checksum mismatch in {rel}")
+                    file_hash.update(block)
+                    out.write(block)
+            if file_hash.hexdigest() != info['sha256']:
+                raise SnapshotError(f"File checksum mismatch: {rel}")
+
+        (staging / MANIFEST_NAME).write_text(json.dumps(manifest, indent=2), encoding='utf-8')
+        (staging / _VERIFIED_MARKER).touch()
+        os.replace(staging, self.cache_dir / version)
+        logger.info(f"Synced snapshot {self.name}@{version}: downloaded {downloaded / 1e6:.1f} MB, "
+                    f"reused {reused / 1e6:.1f} MB from the local cache")
+        self._prune(keep={version})
+        return self.cache_dir / version
+
+    def _previous_blocks(self, version: str) -> Dict[str, tuple]:
+        """digest -> (path, offset, size) of the blocks in a local version."""
+        try:
+            manifest = self._load_manifest(self.cache_dir / version / MANIFEST_NAME)
+        except (OSError, ValueError, SnapshotError) as e:
+            logger.warning(f"Ignoring local snapshot {version}: {e}")
+            return {}
+        blocks = {}
+        block_size = manifest['block_size']
+        for rel, info in manifest['files'].items():
+            path = self.cache_dir / version / rel
+            for i, digest in enumerate(info['blocks']):
+                size = min(block_size, info['size'] - i * block_size)
+                blocks.setdefault(digest, (path, i * block_size, size))
+        return blocks
+
+    @staticmethod
+    def _read_local_block(location: Optional[tuple]) -> Optional[bytes]:
+        if location is None:
+            return None
+        path, offset, size = location
+        try:
+            with open(path, 'rb') as f:
+                f.seek(offset)
+                return f.read(size)
+        except OSError:
+            return None
+
+    def _prune(self, keep: set):
+        versions = self.local_versions()
+        for version in versions[:-self.keep]:
+            if version not in keep:
+                shutil.rmtree(self.cache_dir / version, ignore_errors=True)
+
+    def manifest(self, directory: Path) -> Dict:
+        """Verified manifest of a synced snapshot directory."""
+        return self._load_manifest(Path(directory) / MANIFEST_NAME)
+
+
+# ----- store snapshots -----
+
+def publish_store(
+    name: str,
+    index_path: Union[str, Path],
+    records: Dict[str, Iterable[Any]],
+    state: Optional[Dict[str, Any]] = None,
+    meta: Optional[Dict[str, Any]] = None
+) -> str:
+    """
+    Publish a saved index (with its sidecar files) and record sets as a new version.
+
+    Args:
+        name: Snapshot name
+        index_path: Index file written by write_index
+        records: Record set name -> records (e.g. metadata, texts)
+        state: Small JSON-serializable store state (ID maps, counters)
+        meta: Values recorded in the manifest
+
+    Returns:
+        The new version
+    """
+    manager = SnapshotManager(name)
+    index_path = str(index_path)
+    staging = manager.cache_dir / ".publish.tmp"
+    shutil.rmtree(staging, ignore_errors=True)
+    staging.mkdir(parents=True)
+    try:
+        files = {SNAPSHOT_INDEX + path[len(index_path):]: path for path in index_files(index_path)}
+        for record_set, rows in records.items():
+            write_records(staging / record_set, rows)
+            for suffix in ('.bin', '.idx'):
+                files[record_set + suffix] = str(staging / f"{record_set}{suffix}")
+        with open(staging / SNAPSHOT_STATE, 'w', encoding='utf-8') as f:
+            json.dump(state or {}, f, ensure_ascii=False, default=str)
+        files[SNAPSHOT_STATE] = str(staging / SNAPSHOT_STATE)
+        return manager.publish(files, meta)
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
+
+def load_store(
+    name: str,
+    index_target: Union[str, Path],
+    record_sets: Sequence[str],
+    not_older_than: Optional[float] = None
+) -> Tuple[MappedIndex, Dict[str, MappedRecords], Dict[str, Any], Dict[str, Any]]:
+    """
+    Sync the latest version of a store snapshot and map it.
+
+    Args:
+        name: Snapshot name
+        index_target: Live index path the index is copied to on its first write
+        record_sets: Record sets to map
+        not_older_than: When the store last saved its own state (epoch
+            seconds); an older snapshot is refused so those writes win
+
+    Returns:
+        (index, records by set name, state, manifest)
+
+    Raises:
+        SnapshotError: No usable snapshot, or it is older than not_older_than
+    """
+    manager = SnapshotManager(name)
+    directory = manager.sync()
+    manifest = manager.manifest(directory)
+    # Published seconds are truncated, so a snapshot published in the same
+    # second as the save it was made from still counts as current
+    if not_older_than is not None and created_at(manifest) < int(not_older_than):
+        raise SnapshotError(
+            f"Snapshot {name}@{manifest['version']} is older than the locally saved state "
+            f"({manifest['created_at']} < {time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(not_older_than))})"
+        )
+    index = open_index(str(directory / SNAPSHOT_INDEX), mmap_target=str(index_target))
+    records = {record_set: MappedRecords(directory / record_set) for record_set in record_sets}
+    with open(directory / SNAPSHOT_STATE, 'r', encoding='utf-8') as f:
+        state = json.load(f)
+    logger.info(f"Mapped snapshot {name}@{manifest['version']} ({index.ntotal} vectors)")
+    return index, records, state, manifest
+
+
+# ----- readiness -----
+
+_readiness_lock = threading.Lock()
+_readiness: Dict[str, Dict[str, Any]] = {}
+
+
+def mark_loading(component: str):
+    """Register a component that has to load before the pod is ready."""
+    with _readiness_lock:
+        _readiness[component] = {'status': 'loading', 'started_at': time.time()}
+
+
+def mark_ready(component: str, **details):
+    """Mark a component as loaded."""
+    with _readiness_lock:
+        entry = _readiness.setdefault(component, {'started_at': time.time()})
+        entry.update(details, status='ready', load_seconds=round(time.time() - entry['started_at'], 3))
+
+
+def mark_failed(component: str, error: str):
+    """Mark a component as failed to load."""
+    with _readiness_lock:
+        entry = _readiness.setdefault(component, {'started_at': time.time()})
+        entry.update(status='failed', error=error)
+
+
+def readiness_report() -> Dict[str, Any]:
+    """Overall readiness plus per-component status."""
+    with _readiness_lock:
+        components = {name: dict(entry) for name, entry in _readiness.items()}
+    return {
+        'ready': all(c['status'] == 'ready' for c in components.values()),
+        'components': components,
+    }
@@ -83,9 +83,16 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# Shared sentence/section chunker (optional, same boundaries as the app ingestion paths)
+try:
+    from app.rag.chunker import TextChunker
+    SHARED_CHUNKER_AVAILABLE = True
+except ImportError:
+    SHARED_CHUNKER_AVAILABLE = False
+
 
 class SimpleTextSplitter:
-    """Simple text splitter to replace langchain dependency."""
+    """Simple text splitter to replace langchain dependency (fallback when the shared chunker is unavailable)."""
 
     def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 200):
         self.chunk_size = chunk_size
@@ -156,10 +163,13 @@ class ArtilleryDocumentProcessor:
         self.separators = ["\n\n", "\n", ". ", " ", ""]
 
         # Initialize text splitter
-        self.text_splitter = SimpleTextSplitter(
-            chunk_size=chunk_size,
-            chunk_overlap=chunk_overlap
-        )
+        if SHARED_CHUNKER_AVAILABLE:
+            self.text_splitter = TextChunker(chunk_size, chunk_overlap)
+        else:
+            self.text_splitter = SimpleTextSplitter(
+                chunk_size=chunk_size,
+                chunk_overlap=chunk_overlap
+            )
 
         # Offence number patterns
         self.offence_patterns = [
@@ -659,18 +669,22 @@ class ArtilleryDocumentProcessor:
         if not content or not content.strip():
             return []
 
-        # Split text into chunks
-        chunks = self.text_splitter.split_text(content)
-
         chunk_list = []
         base_metadata = metadata.copy()
 
-        for i, chunk_text in enumerate(chunks):
+        if SHARED_CHUNKER_AVAILABLE:
+            # Sentence-aligned chunks with character/byte offsets into the source
+            pieces = [(c.index, c.text, c.offsets()) for c in self.text_splitter.iter_chunks(content)]
+        else:
+            pieces = [(i, text, {}) for i, text in enumerate(self.text_splitter.split_text(content))]
+
+        for i, chunk_text, offsets in pieces:
             # Skip empty chunks
             if not chunk_text.strip():
                 continue
 
             chunk_metadata = base_metadata.copy()
+            chunk_metadata.update(offsets)
             chunk_metadata.update({
                 'chunk_index': i,
                 'chunk_id': f"{base_metadata.get('doc_id', 'doc')}_chunk_{i}",
@@ -13,6 +13,20 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+try:
+    from app.embeddings.embedding_cache import cached_embed
+    EMBEDDING_CACHE_AVAILABLE = True
+except ImportError:
+    EMBEDDING_CACHE_AVAILABLE = False
+    logger.warning("Shared embedding cache not available - embedding every text")
+
+# Per-stage request tracing (optional, shared with the app)
+try:
+    from app.core.tracing import traced
+except ImportError:
+    def traced(stage):
+        return lambda func: func
+
 
 class ArtilleryEmbeddingService:
     """
@@ -62,6 +76,7 @@ class ArtilleryEmbeddingService:
         self.unified_dim = 384
         logger.info(f"🎯 Unified embedding space: {self.unified_dim}D")
 
+    @traced("embedding")
     def embed_text(self, texts: Union[str, List[str]]) -> np.ndarray:
         """
         Embed text using SentenceTransformer.
@@ -81,14 +96,20 @@ class ArtilleryEmbeddingService:
         logger.debug(f"📝 Embedding {len(texts)} text chunks...")
 
         try:
-            # Generate embeddings using SentenceTransformer
-            embeddings = self.text_model.encode(
-                texts,
-                convert_to_numpy=True,
-                normalize_embeddings=True,  # L2 normalization for cosine similarity
-                show_progress_bar=False,
-                batch_size=32
-            )
+            # Generate embeddings using SentenceTransformer (cache misses only)
+            def encode(batch: List[str]) -> np.ndarray:
+                return self.text_model.encode(
+                    batch,
+                    convert_to_numpy=True,
+                    normalize_embeddings=True,  # L2 normalization for cosine similarity
+                    show_progress_bar=False,
+                    batch_size=32
+                )
+
+            if EMBEDDING_CACHE_AVAILABLE:
+                embeddings = cached_embed("sentence-transformers/all-MiniLM-L6-v2", texts, encode)
+            else:
+                embeddings = encode(texts)
 
             # Ensure correct shape
             if len(embeddings.shape) == 1:
@@ -7,7 +7,7 @@ import os
 import json
 import pickle
 import logging
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Tuple
 import numpy as np
 import faiss
 
@@ -20,15 +20,68 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# Cross-encoder reranking (optional, shared with the app retrieval paths)
+try:
+    from app.rag.reranker import get_reranker
+    from app.core.config import settings as app_settings
+    RERANKER_AVAILABLE = True
+except ImportError:
+    RERANKER_AVAILABLE = False
+
+# Compressed (int8 / PQ) storage with exact re-scoring (optional, shared with the app stores)
+try:
+    from app.vector_store.compressed_index import (
+        create_index, default_compression, index_files, index_stats, open_index,
+        reconstruct_all, subset_vectors, write_index
+    )
+    COMPRESSION_AVAILABLE = True
+except ImportError:
+    COMPRESSION_AVAILABLE = False
+
+# Versioned snapshots for fast cold starts (optional, shared with the app stores)
+try:
+    from app.vector_store.snapshot import load_store, local_saved_at, publish_store, snapshots_enabled
+    SNAPSHOTS_AVAILABLE = True
+except ImportError:
+    SNAPSHOTS_AVAILABLE = False
+
+# Per-stage request tracing (optional, shared with the app)
+try:
+    from app.core.tracing import traced
+except ImportError:
+    def traced(stage):
+        return lambda func: func
+
+# Coalescing of identical concurrent searches (optional, shared with the app)
+try:
+    from app.core.single_flight import flight_key, get_single_flight
+    SINGLE_FLIGHT_AVAILABLE = True
+except ImportError:
+    SINGLE_FLIGHT_AVAILABLE = False
+
+# Parallel, resumable GCS transfers (optional, shared with the app)
+try:
+    from app.core.object_transfer import gcs_transfer_manager
+    TRANSFER_AVAILABLE = True
+except ImportError:
+    TRANSFER_AVAILABLE = False
+
+# Metadata fields whose filters are served from per-value position lists
+# (searching only that jurisdiction's vectors) instead of a filtered over-fetch
+SHARD_KEYS = ('province', 'jurisdiction', 'law_type')
+
 
 class ArtilleryVectorStore:
     """
     Artillery FAISS Vector Store for PLAZA-AI.
 
     Features:
-    - FAISS IndexFlatIP for exact cosine similarity search
-    - In-memory FAISS index with disk/GCS persistence
-    - Metadata management and filtering
+    - FAISS IndexFlatIP for exact cosine similarity search, or int8/PQ
+      codes with exact re-scoring from on-disk vectors (VECTOR_COMPRESSION)
+    - In-memory FAISS index with disk/GCS persistence, or a memory-mapped
+      snapshot synced by delta at startup (VECTOR_SNAPSHOTS)
+    - Metadata management and filtering; province/jurisdiction/law type
+      filters only score the vectors of that shard
     - Batch operations for efficiency
     """
 
@@ -40,7 +93,8 @@ class ArtilleryVectorStore:
         gcs_bucket: Optional[str] = None,
         gcs_index_path: str = "faiss_index.bin",
         gcs_metadata_path: str = "metadata.pkl",
-        description: str = "artillery_legal_documents"
+        description: str = "artillery_legal_documents",
+        compression: Optional[str] = None
     ):
         """
         Initialize Artillery vector store.
@@ -53,6 +107,8 @@ class ArtilleryVectorStore:
             gcs_index_path: Path in GCS bucket for index
             gcs_metadata_path: Path in GCS bucket for metadata
             description: Description of the index
+            compression: Storage for a new index: "flat", "sq8" or "pq"
+                (defaults to the VECTOR_COMPRESSION setting)
         """
         self.dimension = dimension
         self.description = description
@@ -67,23 +123,43 @@ class ArtilleryVectorStore:
         self.gcs_metadata_path = gcs_metadata_path
         self.gcs_available = GCS_AVAILABLE and gcs_bucket is not None
 
-        # Initialize FAISS index (IndexFlatIP for cosine similarity)
-        self.index = faiss.IndexFlatIP(dimension)
+        # Ensure local directories exist
+        os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+        os.makedirs(os.path.dirname(self.metadata_path), exist_ok=True)
+
+        # Initialize FAISS index (inner product for cosine similarity; flat or compressed)
+        self.compression = (compression or default_compression()) if COMPRESSION_AVAILABLE else "flat"
+        self.index = self._new_index()
 
         # Metadata storage
         self.metadata: List[Dict[str, Any]] = []
         self.id_to_index: Dict[str, int] = {}  # chunk_id -> FAISS index position
         self.next_id = 0
+        # (shard key, value) -> FAISS positions, built on the first scoped search
+        self._shards: Optional[Dict[Tuple[str, Any], List[int]]] = None
+        self.snapshot_version: Optional[str] = None
 
-        # Ensure local directories exist
-        os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
-        os.makedirs(os.path.dirname(self.metadata_path), exist_ok=True)
-
-        # Load existing index if available
-        self.load()
+        # Load existing index if available (a prebuilt snapshot first, when
+        # enabled and at least as new as the index saved locally or in GCS)
+        if not (SNAPSHOTS_AVAILABLE and snapshots_enabled() and self.load_snapshot()):
+            self.load()
 
         logger.info(f"🗄️ Artillery Vector Store initialized: {dimension}D, {self.ntotal} vectors")
 
+    def _new_index(self):
+        if COMPRESSION_AVAILABLE:
+            return create_index(self.dimension, self.index_path, compression=self.compression)
+        return faiss.IndexFlatIP(self.dimension)
+
+    def _write_index(self):
+        if COMPRESSION_AVAILABLE:
+            write_index(self.index, self.index_path)
+        else:
+            faiss.write_index(self.index, self.index_path)
+
+    def _read_index(self):
+        return open_index(self.index_path) if COMPRESSION_AVAILABLE else faiss.read_index(self.index_path)
+
     @property
     def ntotal(self) -> int:
         """Get total number of vectors in index."""
@@ -130,17 +206,21 @@ class ArtilleryVectorStore:
 
             self.metadata.append(metadata_copy)
             self.id_to_index[chunk_id] = start_idx + i
+            if self._shards is not None:
+                self._add_to_shards(start_idx + i, metadata_copy)
 
         self.next_id = self.index.ntotal
 
         logger.info(f"✅ Added {len(embeddings)} vectors to index (total: {self.ntotal})")
         return chunk_ids
 
+    @traced("vector_search.artillery")
     def search(
         self,
         query_embedding: np.ndarray,
         k: int = 10,
-        filters: Optional[Dict[str, Any]] = None
+        filters: Optional[Dict[str, Any]] = None,
+        query: Optional[str] = None
     ) -> List[Dict[str, Any]]:
         """
         Search for similar vectors with optional metadata filtering.
@@ -149,13 +229,38 @@ class ArtilleryVectorStore:
             query_embedding: Query vector of shape (dimension,) or (1, dimension)
             k: Number of results to return
             filters: Metadata filters (e.g., {'offence_number': '123456789'})
+            query: Query text; when given, the top candidates are reranked
+                with the cross-encoder before the top k are returned
 
         Returns:
             List of result dicts with 'score', 'content', 'metadata', 'chunk_id'
         """
+        if not SINGLE_FLIGHT_AVAILABLE:
+            return self._search(query_embedding, k, filters, query)
+
+        # Identical concurrent searches share one run; waiters get their own copies
+        key = flight_key(id(self), self.ntotal, np.asarray(query_embedding, dtype='float32'), k, filters, query)
+        return get_single_flight("artillery_search").do(
+            key,
+            lambda: self._search(query_embedding, k, filters, query),
+            share=lambda results: [dict(r, metadata=dict(r.get('metadata') or {})) for r in results]
+        )
+
+    def _search(
+        self,
+        query_embedding: np.ndarray,
+        k: int,
+        filters: Optional[Dict[str, Any]],
+        query: Optional[str]
+    ) -> List[Dict[str, Any]]:
         if self.ntotal == 0:
             return []
 
+        reranker = get_reranker() if (query and RERANKER_AVAILABLE) else None
+        final_k = k
+        if reranker is not None:
+            k = max(k, app_settings.RERANK_CANDIDATES)
+
         # Ensure query vector is correct shape
         query_embedding = np.array(query_embedding, dtype='float32')
         if query_embedding.ndim == 1:
@@ -164,6 +269,14 @@ class ArtilleryVectorStore:
         # Normalize query for cosine similarity
         faiss.normalize_L2(query_embedding)
 
+        # Jurisdiction-scoped queries score only their shard, exactly
+        positions = self._shard_positions(filters) if filters else None
+        if positions is not None:
+            results = self._search_positions(query_embedding, positions, filters, k)
+            if reranker is not None:
+                results = reranker.rerank(query, results, top_n=final_k)
+            return results
+
         # Search FAISS index (get more results if filtering)
         search_k = min(k * 3, self.ntotal) if filters else k
         distances, indices = self.index.search(query_embedding, search_k)
@@ -174,31 +287,100 @@ class ArtilleryVectorStore:
             if idx == -1:  # FAISS returns -1 for invalid results
                 continue
 
-            metadata = self.metadata[idx].copy()
-
-            # Apply filters
-            if filters:
-                match = True
-                for key, value in filters.items():
-                    if metadata.get(key) != value:
-                        match = False
-                        break
-                if not match:
-                    continue
-
-            # Create result
-            result = {
-                'score': float(score),
-                'content': metadata.get('content', ''),
-                'metadata': metadata,
-                'chunk_id': metadata.get('chunk_id', f'chunk_{idx}')
-            }
-            results.append(result)
+            # Apply filters (to the chunk or a near-duplicate linked to it)
+            metadata = self._matching_view(self.metadata[idx], filters)
+            if metadata is None:
+                continue
+
+            results.append(self._result(score, idx, metadata))
 
             # Stop when we have enough results
             if len(results) >= k:
                 break
 
+        if reranker is not None:
+            results = reranker.rerank(query, results, top_n=final_k)
+
+        return results
+
+    @staticmethod
+    def _matching_view(metadata: Dict[str, Any], filters: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """
+        Copy of the chunk's metadata as seen by a filtered search, or None.
+
+        Near-duplicate chunks that were linked instead of indexed live on as
+        'aliases' of their canonical chunk; a search filtered on, say, the
+        duplicate's doc_id sees the canonical content under the duplicate's
+        identity.
+        """
+        if metadata.get('deleted', False):
+            return None
+        if not filters:
+            return metadata.copy()
+        for view in [metadata, *({**metadata, **alias} for alias in metadata.get('aliases', ()))]:
+            if all(view.get(key) == value for key, value in filters.items()):
+                return dict(view)
+        return None
+
+    @staticmethod
+    def _result(score: float, idx: int, metadata: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            'score': float(score),
+            'content': metadata.get('content', ''),
+            'metadata': metadata,
+            'chunk_id': metadata.get('chunk_id', f'chunk_{idx}')
+        }
+
+    def _add_to_shards(self, idx: int, metadata: Dict[str, Any]):
+        # Linked near-duplicates match filters on their own values (see _matching_view)
+        for view in [metadata, *metadata.get('aliases', ())]:
+            for key in SHARD_KEYS:
+                value = view.get(key)
+                if isinstance(value, (str, int, float, bool)):
+                    self._shards.setdefault((key, value), []).append(idx)
+
+    def _shard_positions(self, filters: Dict[str, Any]) -> Optional[np.ndarray]:
+        """Positions matching the filters' shard keys, or None when no shard key is filtered."""
+        scoped = [(key, filters[key]) for key in SHARD_KEYS
+                  if isinstance(filters.get(key), (str, int, float, bool))]
+        if not scoped:
+            return None
+        if self._shards is None:
+            self._shards = {}
+            for idx, metadata in enumerate(self.metadata):
+                self._add_to_shards(idx, metadata)
+
+        positions = None
+        for key_value in scoped:
+            shard = self._shards.get(key_value, [])
+            positions = set(shard) if positions is None else positions.intersection(shard)
+        return np.array(sorted(positions), dtype=np.int64)
+
+    def _search_positions(
+        self,
+        query_embedding: np.ndarray,
+        positions: np.ndarray,
+        filters: Dict[str, Any],
+        k: int
+    ) -> List[Dict[str, Any]]:
+        """Exact search over the given positions, applying the remaining filters."""
+        if len(positions) == 0:
+            return []
+        if COMPRESSION_AVAILABLE:
+            vectors = subset_vectors(self.index, positions)
+        else:
+            vectors = self.index.reconstruct_batch(positions)
+        scores = vectors @ query_embedding[0]
+
+        results = []
+        for j in np.argsort(-scores):
+            idx = int(positions[j])
+            metadata = self._matching_view(self.metadata[idx], filters)
+            if metadata is None:
+                continue
+            results.append(self._result(scores[j], idx, metadata))
+            if len(results) >= k:
+                break
         return results
 
     def get_metadata_by_id(self, chunk_id: str) -> Optional[Dict[str, Any]]:
@@ -234,6 +416,8 @@ class ArtilleryVectorStore:
         idx = self.id_to_index[chunk_id]
         if idx < len(self.metadata):
             self.metadata[idx].update(updates)
+            if any(key in updates for key in SHARD_KEYS):
+                self._shards = None
             return True
 
         return False
@@ -250,20 +434,46 @@ class ArtilleryVectorStore:
         """
         chunks = []
         for metadata in self.metadata:
-            if metadata.get('doc_id') == doc_id:
-                chunk_id = metadata.get('chunk_id')
+            view = self._matching_view(metadata, {'doc_id': doc_id})
+            if view is not None:
                 chunks.append({
-                    'chunk_id': chunk_id,
-                    'content': metadata.get('content', ''),
-                    'metadata': metadata
+                    'chunk_id': view.get('chunk_id'),
+                    'content': view.get('content', ''),
+                    'metadata': view
                 })
 
         return chunks
 
+    def link_duplicates(self, links: List[Tuple[str, Dict[str, Any]]]) -> int:
+        """
+        Record near-duplicate chunks that were skipped at ingest as aliases
+        of the chunks they duplicate.
+
+        Args:
+            links: (canonical chunk_id, the duplicate's identity metadata) pairs
+
+        Returns:
+            Number of aliases recorded
+        """
+        linked = 0
+        for canonical_id, alias in links:
+            idx = self.id_to_index.get(canonical_id)
+            if idx is None or idx >= len(self.metadata):
+                continue
+            self.metadata[idx].setdefault('aliases', []).append(alias)
+            if self._shards is not None:
+                self._add_to_shards(idx, alias)
+            linked += 1
+        return linked
+
     def delete_document(self, doc_id: str) -> int:
         """
         Mark all chunks of a document as deleted.
 
+        A chunk that other documents' near-duplicates are linked to is handed
+        to the first of them (by chunk_id) instead, so those documents keep
+        their content.
+
         Args:
             doc_id: Document ID to delete
 
@@ -271,11 +481,31 @@ class ArtilleryVectorStore:
             Number of chunks marked as deleted
         """
         deleted_count = 0
-        for metadata in self.metadata:
+        for idx, metadata in enumerate(self.metadata):
+            if metadata.get('deleted', False):
+                continue
+            aliases = metadata.get('aliases', [])
+            if metadata.get('doc_id') != doc_id and not any(a.get('doc_id') == doc_id for a in aliases):
+                continue
+            # Snapshot records iterate as decoded copies; index access keeps the changes
+            metadata = self.metadata[idx]
+            aliases = metadata.get('aliases', [])
+            kept =sorted((a for a in aliases if a.get('doc_id') != doc_id), key=lambda a: a.get('chunk_id', ''))
+            deleted_count += len(aliases) - len(kept)
             if metadata.get('doc_id') == doc_id:
-                chunk_id = metadata.get('chunk_id')
-                if self.update_metadata(chunk_id, {'deleted': True}):
-                    deleted_count += 1
+                deleted_count += 1
+                if kept:
+                    heir = kept.pop(0)
+                    self.id_to_index.pop(metadata.get('chunk_id'), None)
+                    metadata.update(heir)
+                    self.id_to_index[heir['chunk_id']] = idx
+                else:
+                    metadata['deleted'] = True
+            if kept:
+                metadata['aliases'] = kept
+            else:
+                metadata.pop('aliases', None)
+        self._shards = None
 
         logger.info(f"🗑️ Marked {deleted_count} chunks as deleted for doc {doc_id}")
         return deleted_count
@@ -299,13 +529,15 @@ class ArtilleryVectorStore:
             'total_vectors': self.ntotal,
             'dimension': self.dimension,
             'index_type': type(self.index).__name__,
+            'storage': index_stats(self.index) if COMPRESSION_AVAILABLE else {'codec': 'flat'},
             'description': self.description,
             'gcs_enabled': self.gcs_available,
             'total_documents': len(doc_ids),
             'total_provinces': len(provinces),
             'total_offence_numbers': len(offence_numbers),
             'provinces': sorted(list(provinces)),
-            'metadata_entries': len(self.metadata)
+            'metadata_entries': len(self.metadata),
+            'snapshot_version': self.snapshot_version
         }
 
     def save(self) -> bool:
@@ -321,33 +553,34 @@ class ArtilleryVectorStore:
                 storage_client = storage.Client()
                 bucket = storage_client.bucket(self.gcs_bucket)
 
-                # Save FAISS index
-                blob = bucket.blob(self.gcs_index_path)
-                with open(self.index_path, 'wb') as f:
-                    faiss.write_index(self.index, f)
-                blob.upload_from_filename(self.index_path)
+                # Save FAISS index (plus the re-scoring vectors of a compressed index)
+                self._write_index()
+                self._gcs_upload(bucket, self.index_path, self.gcs_index_path)
+                if COMPRESSION_AVAILABLE:
+                    for path in index_files(self.index_path)[1:]:
+                        suffix = path[len(self.index_path):]
+                        self._gcs_upload(bucket, path, self.gcs_index_path + suffix)
 
                 # Save metadata
-                blob = bucket.blob(self.gcs_metadata_path)
                 with open(self.metadata_path, 'wb') as f:
                     pickle.dump({
-                        'metadata': self.metadata,
+                        'metadata': list(self.metadata),
                         'id_to_index': self.id_to_index,
                         'next_id': self.next_id,
                         'dimension': self.dimension,
                         'description': self.description
                     }, f)
-                blob.upload_from_filename(self.metadata_path)
+                self._gcs_upload(bucket, self.metadata_path, self.gcs_metadata_path)
 
                 logger.info(f"☁️ Saved to GCS: gs://{self.gcs_bucket}")
             else:
                 # Save locally
                 os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
-                faiss.write_index(self.index, self.index_path)
+                self._write_index()
 
                 with open(self.metadata_path, 'wb') as f:
                     pickle.dump({
-                        'metadata': self.metadata,
+                        'metadata': list(self.metadata),
                         'id_to_index': self.id_to_index,
                         'next_id': self.next_id,
                         'dimension': self.dimension,
@@ -362,6 +595,29 @@ class ArtilleryVectorStore:
             logger.error(f"❌ Failed to save index: {e}")
             return False
 
+    @staticmethod
+    def _gcs_upload(bucket, path: str, blob_name: str):
+        """Upload a file in parallel resumable chunks (single stream without the transfer layer)."""
+        if TRANSFER_AVAILABLE:
+            gcs_transfer_manager(bucket).upload_file(path, blob_name)
+        else:
+            bucket.blob(blob_name).upload_from_filename(path)
+
+    @staticmethod
+    def _gcs_download(bucket, blob_name: str, path: str) -> bool:
+        """Download a blob if it exists; returns whether it did."""
+        if TRANSFER_AVAILABLE:
+            try:
+                gcs_transfer_manager(bucket).download_file(blob_name, path)
+            except FileNotFoundError:
+                return False
+            return True
+        blob = bucket.blob(blob_name)
+        if not blob.exists():
+            return False
+        blob.download_to_filename(path)
+        return True
+
     def load(self) -> bool:
         """
         Load index and metadata (from disk or GCS).
@@ -376,27 +632,26 @@ class ArtilleryVectorStore:
                 bucket = storage_client.bucket(self.gcs_bucket)
 
                 # Load index
-                index_blob = bucket.blob(self.gcs_index_path)
-                if index_blob.exists():
-                    index_blob.download_to_filename(self.index_path)
-                    self.index = faiss.read_index(self.index_path)
+                if self._gcs_download(bucket, self.gcs_index_path, self.index_path):
+                    for suffix in ('.vectors', '.meta.json'):
+                        self._gcs_download(bucket, self.gcs_index_path + suffix, self.index_path + suffix)
+                    self.index = self._read_index()
 
                 # Load metadata
-                metadata_blob = bucket.blob(self.gcs_metadata_path)
-                if metadata_blob.exists():
-                    metadata_blob.download_to_filename(self.metadata_path)
+                if self._gcs_download(bucket, self.gcs_metadata_path, self.metadata_path):
                     with open(self.metadata_path, 'rb') as f:
                         data = pickle.load(f)
                         self.metadata = data.get('metadata', [])
                         self.id_to_index = data.get('id_to_index', {})
                         self.next_id = data.get('next_id', self.index.ntotal)
+                    self._shards = None
 
                     logger.info(f"☁️ Loaded from GCS: gs://{self.gcs_bucket}")
                     return True
 
             # Fall back to local files
             if os.path.exists(self.index_path):
-                self.index = faiss.read_index(self.index_path)
+                self.index = self._read_index()
 
             if os.path.exists(self.metadata_path):
                 with open(self.metadata_path, 'rb') as f:
@@ -404,6 +659,7 @@ class ArtilleryVectorStore:
                     self.metadata = data.get('metadata', [])
                     self.id_to_index = data.get('id_to_index', {})
                     self.next_id = data.get('next_id', self.index.ntotal)
+                self._shards = None
 
             logger.info(f"📂 Loaded index with {self.ntotal} vectors")
             return True
@@ -412,6 +668,57 @@ class ArtilleryVectorStore:
             logger.error(f"❌ Failed to load index: {e}")
             return False
 
+    def publish_snapshot(self) -> Optional[str]:
+        """
+        Write the index locally and publish it with the metadata as a new snapshot version.
+
+        Returns:
+            The published version, or None if snapshots are unavailable
+        """
+        if not SNAPSHOTS_AVAILABLE:
+            logger.warning("Snapshots unavailable (app.vector_store.snapshot not importable)")
+            return None
+        self._write_index()
+        return publish_store(
+            self.description,
+            self.index_path,
+            records={'metadata': self.metadata},
+            state={'id_to_index': self.id_to_index, 'next_id': self.next_id},
+            meta={'dimension': self.dimension, 'vectors': self.ntotal}
+        )
+
+    def load_snapshot(self) -> bool:
+        """
+        Map the latest snapshot instead of downloading and unpickling the full metadata.
+
+        Returns:
+            True if the snapshot was loaded; False when it is unavailable or
+            older than the last save
+        """
+        try:
+            index, records, state, manifest = load_store(
+                self.description, self.index_path, ('metadata',), not_older_than=self._saved_at()
+            )
+        except Exception as e:
+            logger.warning(f"Snapshot {self.description} unavailable, falling back to a full load: {e}")
+            return False
+
+        self.index = index
+        self.metadata = records['metadata']
+        self.id_to_index = state.get('id_to_index', {})
+        self.next_id = state.get('next_id', index.ntotal)
+        self._shards = None
+        self.snapshot_version = manifest['version']
+        logger.info(f"📂 Mapped snapshot {self.snapshot_version} with {self.ntotal} vectors")
+        return True
+
+    def _saved_at(self) -> Optional[float]:
+        """When the index was last saved (to GCS when configured, else locally)."""
+        if self.gcs_available:
+            blob = storage.Client().bucket(self.gcs_bucket).get_blob(self.gcs_metadata_path)
+            return blob.updated.timestamp() if blob is not None and blob.updated else None
+        return local_saved_at(self.index_path, self.metadata_path)
+
     def rebuild_index(self) -> bool:
         """
         Rebuild the FAISS index from current metadata.
@@ -425,31 +732,34 @@ class ArtilleryVectorStore:
             active_vectors = []
             active_metadata = []
 
+            if COMPRESSION_AVAILABLE:
+                vectors = reconstruct_all(self.index)
+            else:
+                vectors = self.index.reconstruct_n(0, self.ntotal)
             for i, metadata in enumerate(self.metadata):
                 if not metadata.get('deleted', False):
-                    # Get vector from FAISS index
-                    vectors = self.index.get_xb()
                     if i < len(vectors):
                         active_vectors.append(vectors[i])
                         active_metadata.append(metadata)
 
             if not active_vectors:
                 # Create empty index
-                self.index = faiss.IndexFlatIP(self.dimension)
+                self.index = self._new_index()
                 self.metadata = []
                 self.id_to_index = {}
                 self.next_id = 0
+                self._shards = None
                 return True
 
             # Rebuild index
             vectors_array = np.array(active_vectors, dtype='float32')
-            self.index = faiss.IndexFlatIP(self.dimension)
+            self.index = self._new_index()
             self.index.add(vectors_array)
 
             # Update metadata and mappings
+            self._shards = None
             self.metadata = active_metadata
             self.id_to_index = {meta['chunk_id']: i for i, meta in enumerate(active_metadata)}
-            self.id_to_index = {meta['chunk_id']: i for i, meta in enumerate(active_metadata)}
             self.next_id = len(active_metadata)
 
             logger.info(f"🔄 Rebuilt index: {self.ntotal} active vectors")
@@ -112,6 +112,8 @@ CREATE TABLE IF NOT EXISTS `auth-login-page-481522.legalai.conversations` (
   message_count INT64,
   preview STRING,
   is_archived BOOL,
+  is_pinned BOOL,
+  applied_writes ARRAY<STRING>,  -- recent write ids of the write-behind writer (idempotent replays)
   env STRING NOT NULL  -- dev, staging, prod
 )
 PARTITION BY DATE(created_at)
@@ -120,6 +122,10 @@ OPTIONS(
   labels=[("app", "legid"), ("type", "chat")]
 );
 
+-- Existing tables
+ALTER TABLE `auth-login-page-481522.legalai.conversations` ADD COLUMN IF NOT EXISTS is_pinned BOOL;
+ALTER TABLE `auth-login-page-481522.legalai.conversations` ADD COLUMN IF NOT EXISTS applied_writes ARRAY<STRING>;
+
 
 -- ============================================
 -- 5. MESSAGES TABLE (Optional)
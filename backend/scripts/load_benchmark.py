@@ -0,0 +1,461 @@
+"""
+Load Benchmark: percentile latency and throughput for the chat/search endpoints
+
+This script:
+1. Drives /api/artillery/search, /api/artillery/chat and /api/query/answer
+   over HTTP, or in-process through the FastAPI app
+2. Runs at a fixed concurrency (closed loop) or a fixed arrival rate (open loop)
+3. Optionally swaps the LLM and embedding models for local stand-ins
+4. Reports p50/p95/p99 latency and throughput as JSON
+5. Compares the report against a stored baseline and flags regressions
+
+Examples:
+    # Against a running server, 8 concurrent clients, 200 requests per target
+    python scripts/load_benchmark.py --url http://localhost:8000 --concurrency 8 --requests 200
+
+    # In-process with stand-in models, 20 req/s for 30s, compared to a baseline
+    python scripts/load_benchmark.py --in-process --stub-models --rate 20 --duration 30 \\
+        --baseline scripts/benchmark_baseline.json
+"""
+
+import sys
+import json
+import time
+import random
+import hashlib
+import logging
+import argparse
+import platform
+import threading
+from pathlib import Path
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional, Callable
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+API_BASE_URL = "http://localhost:8000"
+REPORT_VERSION = 1
+
+DEFAULT_QUESTIONS = [
+    "What are the penalties for speeding in Ontario?",
+    "How many demerit points do you get for careless driving?",
+    "Can I fight a red light camera ticket?",
+    "What happens if I miss my court date for a traffic ticket?",
+    "What are the penalties for a first DUI offence?",
+    "How long does a traffic ticket stay on your record?",
+    "What is stunt driving under the Highway Traffic Act?",
+    "How do I request disclosure for my ticket?",
+]
+
+# Target name -> (path, payload builder)
+TARGETS: Dict[str, tuple] = {
+    "artillery-search": (
+        "/api/artillery/search",
+        lambda q: {"query": q, "k": 10, "score_threshold": 0.0},
+    ),
+    "artillery-chat": (
+        "/api/artillery/chat",
+        lambda q: {"message": q, "province": "Ontario", "country": "CA", "language": "en"},
+    ),
+    "query": (
+        "/api/query/answer",
+        lambda q: {"question": q, "country": "CA", "province": "Ontario"},
+    ),
+}
+
+# Metrics compared against the baseline (lower is better for all of them
+# except throughput)
+LATENCY_METRICS = ["p50_ms", "p95_ms", "p99_ms", "mean_ms"]
+
+
+# ============================================================================
+# LOCAL STAND-INS
+# ============================================================================
+
+class StubEmbeddingService:
+    """
+    Deterministic, model-free embedding service.
+
+    Produces unit vectors seeded from the text hash, so identical text maps
+    to identical vectors and similarity search still behaves sensibly.
+    """
+
+    def __init__(self, dimension: int = 384):
+        import numpy as np
+        self._np = np
+        self.dimension = dimension
+        self.unified_dim = dimension
+
+    def _vector(self, text: str):
+        seed = int.from_bytes(hashlib.sha256(text.encode('utf-8')).digest()[:8], 'little')
+        vec = self._np.random.default_rng(seed).standard_normal(self.dimension).astype('float32')
+        return vec / self._np.linalg.norm(vec)
+
+    def embed_text(self, text: str):
+        return self._np.stack([self._vector(text)])
+
+    def embed_texts(self, texts: List[str], batch_size: int = 32):
+        return self._np.stack([self._vector(t) for t in texts])
+
+    def embed_query(self, text: str):
+        return self._vector(text)
+
+
+def make_stub_chat_completion(latency_ms: float = 0.0) -> Callable:
+    """Build a chat_completion stand-in that sleeps for a fixed latency."""
+
+    def stub_chat_completion(messages=None, **kwargs) -> str:
+        if latency_ms:
+            time.sleep(latency_ms / 1000.0)
+        question = ""
+        for message in reversed(messages or []):
+            if message.get("role") == "user":
+                question = message.get("content", "")[:200]
+                break
+        return (
+            "Direct Answer: This is a benchmark stand-in response.\n\n"
+            f"Question: {question}\n\n"
+            "This is general legal information, not legal advice."
+        )
+
+    return stub_chat_completion
+
+
+def install_stub_models(llm_latency_ms: float = 0.0, dimension: int = 384):
+    """Swap the LLM and embedding clients used by the app for local stand-ins."""
+    stub_embeddings = StubEmbeddingService(dimension=dimension)
+    stub_llm = make_stub_chat_completion(llm_latency_ms)
+
+    from app import main
+    main._embedding_service = stub_embeddings
+    main.chat_completion = stub_llm
+
+    try:
+        from app.rag import rag_service
+        rag_service.chat_completion = stub_llm
+        rag_service.get_embedding_service = lambda: stub_embeddings
+        rag_service.get_rag_service().embedding_service = stub_embeddings
+    except Exception as e:
+        logger.warning(f"RAG service stand-ins not installed: {e}")
+
+    logger.info(f"✓ Stand-in models installed (LLM latency {llm_latency_ms:.0f}ms, dim {dimension})")
+
+
+# ============================================================================
+# TRANSPORTS
+# ============================================================================
+
+class HttpTransport:
+    """POST JSON to a running server (one pooled session per thread)."""
+
+    def __init__(self, base_url: str, timeout: float = 120.0):
+        import requests
+        self._requests = requests
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def post(self, path: str, payload: Dict) -> int:
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._requests.Session()
+            self._local.session = session
+        response = session.post(f"{self.base_url}{path}", json=payload, timeout=self.timeout)
+        return response.status_code
+
+
+class InProcessTransport:
+    """Call the FastAPI app in-process through its test client."""
+
+    def __init__(self):
+        from fastapi.testclient import TestClient
+        from app.main import app
+        self.client = TestClient(app)
+
+    def post(self, path: str, payload: Dict) -> int:
+        return self.client.post(path, json=payload).status_code
+
+
+# ============================================================================
+# STATISTICS
+# ============================================================================
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Linear-interpolated percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    if len(sorted_values) == 1:
+        return sorted_values[0]
+    rank = (pct / 100.0) * (len(sorted_values) - 1)
+    low = int(rank)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (rank - low)
+
+
+def summarize(latencies_ms: List[float], errors: int, wall_seconds: float) -> Dict:
+    """Summarize a run into the report's per-target metrics."""
+    values = sorted(latencies_ms)
+    total = len(values) + errors
+    return {
+        "requests": total,
+        "successful": len(values),
+        "errors": errors,
+        "error_rate": round(errors / total, 4) if total else 0.0,
+        "throughput_rps": round(len(values) / wall_seconds, 3) if wall_seconds > 0 else 0.0,
+        "mean_ms": round(sum(values) / len(values), 2) if values else 0.0,
+        "min_ms": round(values[0], 2) if values else 0.0,
+        "max_ms": round(values[-1], 2) if values else 0.0,
+        "p50_ms": round(percentile(values, 50), 2),
+        "p95_ms": round(percentile(values, 95), 2),
+        "p99_ms": round(percentile(values, 99), 2),
+        "wall_seconds": round(wall_seconds, 3),
+    }
+
+
+# ============================================================================
+# LOAD GENERATION
+# ============================================================================
+
+class LoadRunner:
+    """Closed-loop (fixed concurrency) or open-loop (fixed arrival rate) load."""
+
+    def __init__(self, transport, questions: List[str], concurrency: int = 4,
+                 rate: Optional[float] = None, seed: int = 42):
+        self.transport = transport
+        self.questions = questions
+        self.concurrency = max(1, concurrency)
+        self.rate = rate
+        self.random = random.Random(seed)
+
+    def _one(self, path: str, payload: Dict):
+        start = time.perf_counter()
+        try:
+            status = self.transport.post(path, payload)
+            ok = 200 <= status < 300
+        except Exception as e:
+            logger.debug(f"Request failed: {e}")
+            ok = False
+        return ok, (time.perf_counter() - start) * 1000.0
+
+    def run(self, target: str, total_requests: int = 100, duration: Optional[float] = None) -> Dict:
+        path, build_payload = TARGETS[target]
+        latencies: List[float] = []
+        errors = 0
+        lock = threading.Lock()
+
+        def record(result):
+            nonlocal errors
+            ok, elapsed_ms = result
+            with lock:
+                if ok:
+                    latencies.append(elapsed_ms)
+                else:
+                    errors += 1
+
+        def next_payload():
+            return build_payload(self.random.choice(self.questions))
+
+        started = time.perf_counter()
+        deadline = started + duration if duration else None
+
+        if self.rate:
+            # Open loop: arrivals follow a Poisson process regardless of how
+            # fast responses come back, so queueing shows up in the tail.
+            workers = max(self.concurrency, int(self.rate * 4))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = []
+                next_at = started
+                sent = 0
+                while (deadline and time.perf_counter() < deadline) or (not deadline and sent < total_requests):
+                    delay = next_at - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                    futures.append(executor.submit(self._one, path, next_payload()))
+                    sent += 1
+                    next_at += self.random.expovariate(self.rate)
+                for future in futures:
+                    record(future.result())
+        else:
+            # Closed loop: each worker issues its next request as soon as the
+            # previous one finishes.
+            counter = {"sent": 0}
+
+            def worker():
+                while True:
+                    with lock:
+                        if deadline:
+                            if time.perf_counter() >= deadline:
+                                return
+                        elif counter["sent"] >= total_requests:
+                            return
+                        counter["sent"] += 1
+                        payload = next_payload()
+                    record(self._one(path, payload))
+
+            threads = [threading.Thread(target=worker, daemon=True) for _ in range(self.concurrency)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+
+        return summarize(latencies, errors, time.perf_counter() - started)
+
+
+# ============================================================================
+# BASELINE COMPARISON
+# ============================================================================
+
+def compare_to_baseline(report: Dict, baseline: Dict, tolerance: float) -> List[Dict]:
+    """
+    Compare per-target metrics with a stored report.
+
+    A latency metric regresses when it grows by more than `tolerance`
+    (fractional); throughput regresses when it drops by more than that.
+    """
+    findings = []
+    for target, current in report.get("targets", {}).items():
+        previous = baseline.get("targets", {}).get(target)
+        if not previous:
+            continue
+        for metric in LATENCY_METRICS + ["throughput_rps"]:
+            old, new = previous.get(metric), current.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            regressed = change < -tolerance if metric == "throughput_rps" else change > tolerance
+            findings.append({
+                "target": target,
+                "metric": metric,
+                "baseline": old,
+                "current": new,
+                "change_pct": round(change * 100, 1),
+                "regressed": regressed,
+            })
+    return findings
+
+
+def print_report(report: Dict, findings: Optional[List[Dict]] = None):
+    """Print a human-readable summary of the report."""
+    print("\n" + "=" * 80)
+    print("LOAD BENCHMARK REPORT")
+    print("=" * 80)
+    cfg = report["config"]
+    mode = f"rate={cfg['rate']} req/s" if cfg.get("rate") else f"concurrency={cfg['concurrency']}"
+    print(f"  Transport: {cfg['transport']}  |  {mode}  |  stub models: {cfg['stub_models']}")
+    print(f"\n  {'target':<18}{'reqs':>7}{'err%':>7}{'rps':>9}{'p50':>10}{'p95':>10}{'p99':>10}")
+    for target, m in report["targets"].items():
+        print(f"  {target:<18}{m['requests']:>7}{m['error_rate'] * 100:>6.1f}%{m['throughput_rps']:>9.2f}"
+              f"{m['p50_ms']:>8.1f}ms{m['p95_ms']:>8.1f}ms{m['p99_ms']:>8.1f}ms")
+
+    if findings:
+        print("\nBASELINE COMPARISON:")
+        for f in findings:
+            marker = "✗ REGRESSION" if f["regressed"] else "✓"
+            print(f"  {marker:<13}{f['target']:<18}{f['metric']:<16}"
+                  f"{f['baseline']:>10} → {f['current']:<10} ({f['change_pct']:+.1f}%)")
+    print("=" * 80)
+
+
+def load_questions(path: Optional[str]) -> List[str]:
+    """Questions from a JSON list, a test-case file, or one-per-line text."""
+    if not path:
+        return DEFAULT_QUESTIONS
+    text = Path(path).read_text(encoding='utf-8')
+    if path.endswith(".json"):
+        data = json.loads(text)
+        if isinstance(data, dict):
+            data = data.get("test_cases", data.get("questions", []))
+        return [item["question"] if isinstance(item, dict) else str(item) for item in data]
+    return [line.strip() for line in text.splitlines() if line.strip()]
+
+
+def main():
+    """Main function to run the load benchmark."""
+    parser = argparse.ArgumentParser(description="Percentile latency / throughput benchmark")
+    parser.add_argument("--url", default=API_BASE_URL, help="Base URL of a running backend")
+    parser.add_argument("--in-process", action="store_true", help="Drive the FastAPI app in-process")
+    parser.add_argument("--stub-models", action="store_true",
+                        help="Use local stand-ins for the LLM and embeddings (in-process only)")
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0, help="Simulated stand-in LLM latency")
+    parser.add_argument("--targets", default=",".join(TARGETS), help="Comma-separated targets")
+    parser.add_argument("--concurrency", type=int, default=4, help="Concurrent clients (closed loop)")
+    parser.add_argument("--rate", type=float, default=None, help="Arrival rate in req/s (open loop)")
+    parser.add_argument("--requests", type=int, default=100, help="Requests per target")
+    parser.add_argument("--duration", type=float, default=None, help="Seconds per target (overrides --requests)")
+    parser.add_argument("--warmup", type=int, default=3, help="Unmeasured warm-up requests per target")
+    parser.add_argument("--questions", default=None, help="JSON or text file of questions")
+    parser.add_argument("--output", default=str(Path(__file__).parent / "load_benchmark_report.json"))
+    parser.add_argument("--baseline", default=None, help="Baseline report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Allowed fractional regression")
+    parser.add_argument("--save-baseline", action="store_true", help="Also write the report as the baseline")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    targets = [t.strip() for t in args.targets.split(",") if t.strip()]
+    unknown = [t for t in targets if t not in TARGETS]
+    if unknown:
+        parser.error(f"Unknown targets: {unknown}. Choose from {list(TARGETS)}")
+
+    if args.in_process:
+        transport = InProcessTransport()
+        if args.stub_models:
+            install_stub_models(llm_latency_ms=args.llm_latency_ms)
+        transport_name = "in-process"
+    else:
+        if args.stub_models:
+            logger.warning("--stub-models only applies to --in-process runs; ignoring")
+        transport = HttpTransport(args.url)
+        transport_name = args.url
+
+    runner = LoadRunner(transport, load_questions(args.questions),
+                        concurrency=args.concurrency, rate=args.rate, seed=args.seed)
+
+    report = {
+        "version": REPORT_VERSION,
+        "created_at": datetime.utcnow().isoformat(),
+        "environment": {"python": platform.python_version(), "platform": platform.platform()},
+        "config": {
+            "transport": transport_name,
+            "stub_models": bool(args.stub_models and args.in_process),
+            "llm_latency_ms": args.llm_latency_ms,
+            "concurrency": args.concurrency,
+            "rate": args.rate,
+            "requests": args.requests,
+            "duration": args.duration,
+            "seed": args.seed,
+        },
+        "targets": {},
+    }
+
+    for target in targets:
+        logger.info(f"Benchmarking {target}...")
+        if args.warmup:
+            LoadRunner(transport, runner.questions, concurrency=1).run(target, total_requests=args.warmup)
+        report["targets"][target] = runner.run(target, total_requests=args.requests, duration=args.duration)
+
+    findings = None
+    if args.baseline and Path(args.baseline).exists():
+        baseline = json.loads(Path(args.baseline).read_text(encoding='utf-8'))
+        findings = compare_to_baseline(report, baseline, args.tolerance)
+        report["baseline_comparison"] = {"baseline": args.baseline, "tolerance": args.tolerance,
+                                         "findings": findings}
+
+    print_report(report, findings)
+
+    Path(args.output).write_text(json.dumps(report, indent=2), encoding='utf-8')
+    print(f"\n✓ Report saved to: {args.output}")
+    if args.save_baseline and args.baseline:
+        Path(args.baseline).write_text(json.dumps(report, indent=2), encoding='utf-8')
+        print(f"✓ Baseline saved to: {args.baseline}")
+
+    if findings and any(f["regressed"] for f in findings):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
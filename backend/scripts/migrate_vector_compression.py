@@ -0,0 +1,96 @@
+"""CLI script to migrate FAISS indexes to compressed (int8 / PQ) storage.
+
+Examples:
+    # Recall-vs-memory report only (no changes)
+    python scripts/migrate_vector_compression.py --report-only
+
+    # Migrate the main store and the RTLD indexes to int8 codes
+    python scripts/migrate_vector_compression.py --compression sq8
+
+    # Migrate a specific index file (e.g. the Artillery store)
+    python scripts/migrate_vector_compression.py --compression pq \\
+        --index ./data/artillery_legal_documents_index.bin
+
+Vector order is preserved, so the metadata files of every store stay valid.
+The original index is kept next to it as <index>.flat.bak. Set
+VECTOR_COMPRESSION to the same codec so new indexes are created compressed.
+"""
+import argparse
+import json
+import logging
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.vector_store.compressed_index import (
+    COMPRESSION_CHOICES, index_stats, migrate_index, open_index, recall_report, reconstruct_all
+)
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def default_index_paths():
+    """Index files of the app FAISS store, the RTLD indexes and the Artillery store."""
+    paths = []
+    try:
+        from app.core.config import settings
+        paths.append(Path(settings.FAISS_INDEX_PATH))
+    except Exception as e:
+        logger.warning(f"Settings unavailable, skipping the app FAISS store: {e}")
+    paths.extend(sorted(Path("./data/rtld_faiss").glob("*.faiss")))
+    paths.extend(sorted(Path("./data").glob("*_index.bin")))
+    return [p for p in paths if p.exists()]
+
+
+def print_report(path: Path, k: int, queries: int, rescore_factor: int):
+    vectors = reconstruct_all(open_index(str(path)))
+    if len(vectors) == 0:
+        logger.info(f"{path}: empty, nothing to report")
+        return
+    print(f"\n{path} ({len(vectors)} vectors, dim={vectors.shape[1]})")
+    print(f"{'codec':<6} {'bytes/vec':>9} {'resident MB':>12} {'x smaller':>10} "
+          f"{'recall@' + str(k) + ' codes':>16} {'recall@' + str(k) + ' rescored':>19}")
+    for row in recall_report(vectors, k=k, num_queries=queries, rescore_factor=rescore_factor):
+        print(f"{row['codec']:<6} {row['bytes_per_vector']:>9} {row['resident_mb']:>12} "
+              f"{row['compression_ratio']:>10} {row['recall_codes_only']:>16} {row['recall_rescored']:>19}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrate FAISS indexes to compressed storage")
+    parser.add_argument("--compression", choices=[c for c in COMPRESSION_CHOICES if c != "flat"],
+                        help="Target codec (omit with --report-only)")
+    parser.add_argument("--index", action="append", type=Path,
+                        help="Index file to migrate (repeatable; defaults to all known stores)")
+    parser.add_argument("--rescore-factor", type=int, default=4,
+                        help="Compressed candidates re-scored per requested result")
+    parser.add_argument("--pq-m", type=int, default=None, help="PQ sub-quantizers (bytes per vector)")
+    parser.add_argument("--report-only", action="store_true", help="Print the recall-vs-memory report and exit")
+    parser.add_argument("--no-report", action="store_true", help="Skip the recall-vs-memory report")
+    parser.add_argument("--k", type=int, default=10, help="Recall@k cut-off for the report")
+    parser.add_argument("--queries", type=int, default=200, help="Sampled queries for the report")
+    args = parser.parse_args()
+
+    if not args.report_only and not args.compression:
+        parser.error("--compression is required unless --report-only is given")
+
+    paths = args.index or default_index_paths()
+    if not paths:
+        logger.error("No FAISS indexes found")
+        return
+
+    for path in paths:
+        if not args.no_report:
+            print_report(path, args.k, args.queries, args.rescore_factor)
+        if args.report_only:
+            continue
+        logger.info(f"Migrating {path} to {args.compression}")
+        migrated = migrate_index(str(path), args.compression, rescore_factor=args.rescore_factor, pq_m=args.pq_m)
+        print(json.dumps({'index': str(path), **index_stats(migrated)}))
+        migrated.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""CLI script to publish vector-store snapshots for fast pod cold starts.
+
+Examples:
+    # Publish the app FAISS store and the Artillery store
+    VECTOR_SNAPSHOT_REMOTE=gs://my-bucket/vector-snapshots python scripts/publish_vector_snapshot.py
+
+    # Only the Artillery store
+    python scripts/publish_vector_snapshot.py --store artillery
+
+Each run publishes a new version: blocks already in the remote are not
+uploaded again. Pods with VECTOR_SNAPSHOTS=true sync the latest version at
+startup (downloading only changed blocks) and map it instead of reading
+the index, JSONL and pickle files.
+"""
+import argparse
+import logging
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def publish_app_store() -> str:
+    from app.core.config import settings
+    from app.vector_store.faiss_store import FaissVectorStore
+    store = FaissVectorStore(dim=settings.EMBEDDING_DIMENSIONS)
+    return store.publish_snapshot()
+
+
+def publish_artillery_store(description: str) -> str:
+    from artillery.vector_store import ArtilleryVectorStore
+    store = ArtilleryVectorStore(description=description)
+    return store.publish_snapshot()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Publish vector-store snapshots")
+    parser.add_argument("--store", choices=["all", "app", "artillery"], default="all")
+    parser.add_argument("--artillery-description", default="artillery_legal_documents",
+                        help="Artillery store to publish (its description / file prefix)")
+    args = parser.parse_args()
+
+    # Publishing always starts from the local store files
+    from app.core.config import settings
+    settings.VECTOR_SNAPSHOTS = False
+
+    if args.store in ("all", "app"):
+        print(f"faiss: {publish_app_store()}")
+    if args.store in ("all", "artillery"):
+        print(f"{args.artillery_description}: {publish_artillery_store(args.artillery_description)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""CLI script to split the FAISS vector store into jurisdiction shards.
+
+Examples:
+    # Split ./data/faiss into ./data/faiss_shards (jurisdiction + law type)
+    python scripts/reshard_vector_store.py
+
+    # One shard per jurisdiction only
+    python scripts/reshard_vector_store.py --no-law-type
+
+Chunks are assigned to shards by their organization (jurisdiction) and
+subject (law type) metadata; chunks without one go to the "general" shard.
+The source index is left untouched. Set FAISS_SHARDED=true (and the same
+FAISS_SHARD_BY_LAW_TYPE) to serve queries from the shards.
+"""
+import argparse
+import json
+import logging
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.core.config import settings
+from app.vector_store.faiss_store import FaissVectorStore
+from app.vector_store.sharded_store import ShardedVectorStore
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Split the FAISS vector store into jurisdiction shards")
+    parser.add_argument("--index", default=settings.FAISS_INDEX_PATH, help="Source FAISS index")
+    parser.add_argument("--metadata", default=settings.FAISS_METADATA_PATH, help="Source metadata JSONL")
+    parser.add_argument("--shard-dir", default=settings.FAISS_SHARD_DIR, help="Output shard directory")
+    parser.add_argument("--no-law-type", action="store_true", help="Shard by jurisdiction only")
+    args = parser.parse_args()
+
+    if not Path(args.index).exists() or not Path(args.metadata).exists():
+        logger.error(f"No FAISS store at {args.index}")
+        return
+    if Path(args.shard_dir, "manifest.json").exists():
+        logger.error(f"{args.shard_dir} already holds shards; remove it first to reshard")
+        return
+
+    source = FaissVectorStore(dim=settings.EMBEDDING_DIMENSIONS, index_path=args.index, metadata_path=args.metadata)
+    sharded = ShardedVectorStore(dim=source.dim, root_dir=args.shard_dir, by_law_type=not args.no_law_type)
+    counts = sharded.import_store(source)
+
+    for key, count in sorted(counts.items(), key=lambda item: -item[1]):
+        print(f"{key:<60} {count:>8}")
+    print(json.dumps(sharded.get_stats(), default=str))
+
+
+if __name__ == "__main__":
+    main()
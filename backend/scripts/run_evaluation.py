@@ -0,0 +1,536 @@
+"""
+Evaluation Runner: answer quality and per-case latency over evaluation/test_cases
+
+This script:
+1. Loads every test case from evaluation/test_cases/*.json
+2. Runs each case through the RAG pipeline in two stages, retrieval and
+   generation, with bounded parallelism
+3. Caches each stage's output keyed by a hash of its configuration and
+   input, so a prompt change reruns only generation and a retrieval change
+   only reaches the LLM for cases whose prompt actually changed
+4. Scores answers against the case expectations (required / forbidden
+   phrases, ticket facts, disclaimer) and with the LEGID scoring harness
+5. Reports quality next to per-case and percentile latency as JSON and
+   compares the report against a previous one
+
+Cached stages keep the latency measured when they were computed, so a
+report from a mostly cached run still shows what each configuration costs.
+
+Examples:
+    # Whole suite, 8 cases at a time, against the configured models
+    python scripts/run_evaluation.py --concurrency 8
+
+    # Local stand-in models, compared with the last saved report
+    python scripts/run_evaluation.py --stub-models --baseline ../evaluation/results/baseline.json
+
+    # Recompute answers but keep cached retrieval
+    python scripts/run_evaluation.py --refresh generation
+"""
+
+import re
+import sys
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import argparse
+import platform
+import threading
+from pathlib import Path
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from scripts.load_benchmark import StubEmbeddingService, make_stub_chat_completion, summarize
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+EVALUATION_DIR = Path(__file__).resolve().parent.parent.parent / "evaluation"
+REPORT_VERSION = 1
+STAGES = ("retrieval", "generation")
+
+_WORD_RE = re.compile(r"[\w$]+", re.UNICODE)
+_STOPWORDS = frozenset("a an the of to in on for and or is are be by with your you this that it".split())
+_DISCLAIMER_RE = re.compile(
+    r"not legal advice|general (legal )?information|consult (a|with a|with) (licensed )?(lawyer|paralegal)",
+    re.IGNORECASE
+)
+_GUARANTEE_RE = re.compile(r"\bguarantee|\byou will win\b|\bcertain to win\b", re.IGNORECASE)
+# Expected phrases that name a feature of the answer rather than its wording
+PHRASE_PATTERNS = {"disclaimer": _DISCLAIMER_RE}
+
+
+# ============================================================================
+# STAGE CACHE
+# ============================================================================
+
+def _json_default(value):
+    # numpy scalars (retrieval scores) and anything else without a JSON form
+    return value.item() if hasattr(value, "item") else str(value)
+
+
+def config_hash(*parts: Any) -> str:
+    """Stable hash of JSON-serializable configuration and inputs."""
+    payload = json.dumps(parts, sort_keys=True, default=_json_default, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class StageCache:
+    """Stage outputs in a local SQLite file, keyed by (stage, config hash)."""
+
+    def __init__(self, path: str, refresh: Tuple[str, ...] = ()):
+        if path != ':memory:':
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.refresh = set(refresh)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS stage_cache ("
+                "stage TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, created_at TEXT NOT NULL, "
+                "PRIMARY KEY (stage, key)) WITHOUT ROWID"
+            )
+            self._conn.commit()
+
+    def get(self, stage: str, key: str) -> Optional[Dict]:
+        if stage in self.refresh:
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM stage_cache WHERE stage = ? AND key = ?", (stage, key)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, stage: str, key: str, value: Dict):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO stage_cache (stage, key, value, created_at) VALUES (?, ?, ?, ?)",
+                (stage, key, json.dumps(value, default=_json_default), datetime.utcnow().isoformat())
+            )
+            self._conn.commit()
+
+    def cached(self, stage: str, key: str, compute: Callable[[], Any]) -> Tuple[Any, float, bool]:
+        """(output, latency in ms when computed, served from cache)."""
+        hit = self.get(stage, key)
+        if hit is not None:
+            return hit["output"], hit["elapsed_ms"], True
+        start = time.perf_counter()
+        output = compute()
+        elapsed_ms = (time.perf_counter() - start) * 1000.0
+        # Round-trip through JSON so hits and misses look the same downstream
+        output = json.loads(json.dumps(output, default=_json_default))
+        self.put(stage, key, {"output": output, "elapsed_ms": elapsed_ms})
+        return output, elapsed_ms, False
+
+
+# ============================================================================
+# SCORING
+# ============================================================================
+
+def _normalize(text: str) -> str:
+    return " ".join(_WORD_RE.findall(text.lower()))
+
+
+def _content_words(text: str) -> List[str]:
+    return [w for w in _WORD_RE.findall(text.lower()) if w not in _STOPWORDS]
+
+
+def phrase_coverage(phrase: str, answer_words: set) -> float:
+    """Fraction of the phrase's content words that appear in the answer."""
+    words = _content_words(phrase)
+    if not words:
+        return 1.0
+    return sum(1 for w in words if w in answer_words) / len(words)
+
+
+def _offence_identified(answer: str, ticket: Dict) -> bool:
+    code = ticket.get("offence_code") or ""
+    section = re.search(r"\d+(\.\d+)?(\(\d+\))*", code)
+    if section and section.group(0) in answer:
+        return True
+    words = set(_content_words(answer))
+    return phrase_coverage(ticket.get("offence_description", ""), words) >= 0.5
+
+
+def _demerit_points_correct(answer: str, ticket: Dict) -> bool:
+    points = ticket.get("demerit_points")
+    if points is None:
+        return False
+    return re.search(rf"\b{int(points)}\s*(demerit\s*)?points?\b", answer, re.IGNORECASE) is not None
+
+
+# Case flags that can be checked mechanically -> check(answer, ticket_data)
+CHECKS: Dict[str, Callable[[str, Dict], bool]] = {
+    "offence_identified": _offence_identified,
+    "demerit_points_correct": _demerit_points_correct,
+    "options_presented": lambda a, t: bool(re.search(r"\b(fight|dispute|trial)\b", a, re.I))
+    and bool(re.search(r"\bpay\b", a, re.I)),
+    "disclaimer_present": lambda a, t: bool(_DISCLAIMER_RE.search(a)),
+    "no_guarantees": lambda a, t: not _GUARANTEE_RE.search(a),
+    "deadline_mentioned": lambda a, t: bool(re.search(r"\b\d+\s*days?\b|deadline", a, re.I)),
+    "process_explained": lambda a, t: bool(re.search(r"disclosure|trial request|early resolution", a, re.I)),
+    "consequences_explained": lambda a, t: bool(re.search(r"insurance|suspension|demerit", a, re.I)),
+}
+
+
+def score_case(case: Dict, answer: str, scoring_harness=None) -> Dict:
+    """
+    Score one answer against its case expectations.
+
+    quality is the mean of the required-phrase recall, the share of
+    forbidden phrases avoided and the share of checkable flags met.
+    """
+    expected = case.get("expected_output", {})
+    ticket = case.get("ticket_data", {})
+    normalized = _normalize(answer)
+    answer_words = set(_content_words(answer))
+
+    required = expected.get("must_include", [])
+    included = {
+        phrase: bool(PHRASE_PATTERNS[phrase.lower()].search(answer)) if phrase.lower() in PHRASE_PATTERNS
+        else _normalize(phrase) in normalized
+        for phrase in required
+    }
+    coverage = [phrase_coverage(phrase, answer_words) for phrase in required]
+    forbidden = expected.get("must_not_include", [])
+    violations = [phrase for phrase in forbidden if _normalize(phrase) in normalized]
+
+    checks, unchecked = {}, []
+    for flag, wanted in expected.items():
+        if not isinstance(wanted, bool):
+            continue
+        if flag in CHECKS:
+            checks[flag] = CHECKS[flag](answer, ticket) == wanted
+        else:
+            unchecked.append(flag)
+
+    parts = []
+    if required:
+        parts.append(sum(included.values()) / len(required))
+    if forbidden:
+        parts.append(1 - len(violations) / len(forbidden))
+    if checks:
+        parts.append(sum(checks.values()) / len(checks))
+
+    result = {
+        "quality": round(sum(parts) / len(parts), 4) if parts else 0.0,
+        "must_include": included,
+        "must_include_coverage": round(sum(coverage) / len(coverage), 4) if coverage else 1.0,
+        "violations": violations,
+        "checks": checks,
+        "unchecked": unchecked,
+    }
+    if scoring_harness is not None:
+        grade = scoring_harness.grade_answer(answer, case.get("question", ""))
+        result["legid_percentage"] = grade["percentage"]
+        result["legid_grade"] = grade["grade"]
+    return result
+
+
+# ============================================================================
+# PIPELINE
+# ============================================================================
+
+def case_query(case: Dict) -> str:
+    """The question, anchored to the ticket it is about."""
+    ticket = case.get("ticket_data", {})
+    details = ", ".join(str(ticket[k]) for k in ("offence_description", "offence_code") if ticket.get(k))
+    return f"{case['question']} ({details})" if details else case["question"]
+
+
+def install_stub_models(rag, llm_latency_ms: float = 0.0, dimension: int = 384) -> str:
+    """Swap the RAG service's LLM and embeddings for local stand-ins; returns the model label."""
+    from app.rag import rag_service
+    rag_service.chat_completion = make_stub_chat_completion(llm_latency_ms)
+    rag.embedding_service = StubEmbeddingService(dimension=dimension)
+    logger.info(f"✓ Stand-in models installed (LLM latency {llm_latency_ms:.0f}ms, dim {dimension})")
+    return f"stub-{llm_latency_ms:g}ms"
+
+
+class EvaluationRunner:
+    """Runs cases through cached retrieval and generation stages."""
+
+    def __init__(self, rag, cache: StageCache, model: str, concurrency: int = 4,
+                 top_k: Optional[int] = None, hybrid_search: bool = True,
+                 include_parent_context: bool = True, retrieval_label: Optional[str] = None):
+        from app.core.config import settings
+        self.rag = rag
+        self.cache = cache
+        self.concurrency = max(1, concurrency)
+        self.include_parent_context = include_parent_context
+        self.generation_config = {
+            "model": model,
+            "temperature": settings.OPENAI_TEMPERATURE,
+            "max_tokens": settings.OPENAI_MAX_TOKENS,
+        }
+        store = rag.vector_store
+        stats = store.get_stats() if hasattr(store, "get_stats") else {}
+        embedder = rag.embedding_service
+        self.retrieval_config = {
+            "top_k": top_k or rag.top_k,
+            "hybrid_search": hybrid_search,
+            "include_parent_context": include_parent_context,
+            "use_parent_child": rag.use_parent_child,
+            "embedding": getattr(embedder, "local_model_id", None) or type(embedder).__name__,
+            "vector_store": type(store).__name__,
+            "vectors": stats.get("total_vectors"),
+            "snapshot_version": stats.get("snapshot_version"),
+            "label": retrieval_label,
+        }
+        try:
+            from app.services.legid_scoring_harness import get_scoring_harness
+            self.scoring_harness = get_scoring_harness()
+        except Exception as e:
+            logger.warning(f"LEGID scoring harness unavailable: {e}")
+            self.scoring_harness = None
+
+    def _generate(self, messages: List[Dict]) -> str:
+        from app.rag import rag_service
+        return rag_service.chat_completion(
+            messages=messages,
+            temperature=self.generation_config["temperature"],
+            max_tokens=self.generation_config["max_tokens"]
+        )
+
+    def run_case(self, case: Dict) -> Dict:
+        """Both stages and the score for one case."""
+        from app.rag.rag_service import NO_CONTEXT_ANSWER
+        query = case_query(case)
+        cfg = self.retrieval_config
+        (results, parents), retrieval_ms, retrieval_cached = self.cache.cached(
+            "retrieval",
+            config_hash(cfg, query),
+            lambda: self.rag.retrieve_context(query, cfg["top_k"], cfg["hybrid_search"], self.include_parent_context)
+        )
+        results = [(score, doc) for score, doc in results]
+
+        if results:
+            messages, sources = self.rag.build_answer_messages(
+                query, results, parents,
+                include_parent_context=self.include_parent_context,
+                province=case.get("jurisdiction"),
+                offense_type=case.get("ticket_data", {}).get("offence_description"),
+                context={"offenseDetails": case.get("ticket_data")}
+            )
+            answer, generation_ms, generation_cached = self.cache.cached(
+                "generation",
+                config_hash(self.generation_config, messages),
+                lambda: self._generate(messages)
+            )
+        else:
+            sources, answer, generation_ms, generation_cached = [], NO_CONTEXT_ANSWER, 0.0, False
+
+        return {
+            "id": case.get("id"),
+            "file": case.get("_file"),
+            "question": case.get("question"),
+            "sources": len(sources),
+            "top_score": round(float(results[0][0]), 4) if results else None,
+            "retrieval_ms": round(retrieval_ms, 2),
+            "generation_ms": round(generation_ms, 2),
+            "total_ms": round(retrieval_ms + generation_ms, 2),
+            "cached": {"retrieval": retrieval_cached, "generation": generation_cached},
+            **score_case(case, answer, self.scoring_harness),
+            "answer": answer,
+        }
+
+    def run(self, cases: List[Dict]) -> Tuple[List[Dict], int, float]:
+        """Run all cases; returns (results in case order, errors, wall seconds)."""
+        started = time.perf_counter()
+        results: Dict[int, Dict] = {}
+        errors = 0
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            futures = {executor.submit(self.run_case, case): i for i, case in enumerate(cases)}
+            for future in as_completed(futures):
+                case = cases[futures[future]]
+                try:
+                    results[futures[future]] = future.result()
+                except Exception as e:
+                    errors += 1
+                    logger.error(f"Case {case.get('id')} failed: {e}")
+        return [results[i] for i in sorted(results)], errors, time.perf_counter() - started
+
+
+# ============================================================================
+# REPORT
+# ============================================================================
+
+def summarize_quality(results: List[Dict], pass_threshold: float) -> Dict:
+    """Suite-level quality metrics."""
+    if not results:
+        return {"cases": 0}
+    quality = [r["quality"] for r in results]
+    summary = {
+        "cases": len(results),
+        "mean_quality": round(sum(quality) / len(quality), 4),
+        "pass_rate": round(sum(1 for q in quality if q >= pass_threshold) / len(quality), 4),
+        "mean_must_include_coverage": round(sum(r["must_include_coverage"] for r in results) / len(results), 4),
+        "cases_with_violations": sum(1 for r in results if r["violations"]),
+    }
+    legid = [r["legid_percentage"] for r in results if "legid_percentage" in r]
+    if legid:
+        summary["mean_legid_percentage"] = round(sum(legid) / len(legid), 2)
+    return summary
+
+
+def compare_to_baseline(report: Dict, baseline: Dict) -> Dict:
+    """Quality and latency deltas against a previous report, overall and per case."""
+    current_q, previous_q = report["quality"], baseline.get("quality", {})
+    deltas = {
+        metric: round(current_q[metric] - previous_q[metric], 4)
+        for metric in ("mean_quality", "pass_rate", "mean_must_include_coverage", "mean_legid_percentage")
+        if metric in current_q and metric in previous_q
+    }
+    for metric in ("p50_ms", "p95_ms", "mean_ms"):
+        old, new = baseline.get("latency", {}).get(metric), report["latency"].get(metric)
+        if old and new is not None:
+            deltas[f"latency_{metric}"] = round(new - old, 2)
+    previous_cases = {case["id"]: case for case in baseline.get("cases", [])}
+    changed = []
+    for case in report["cases"]:
+        old = previous_cases.get(case["id"])
+        if old and old["quality"] != case["quality"]:
+            changed.append({"id": case["id"], "baseline": old["quality"], "current": case["quality"]})
+    return {"deltas": deltas, "changed_cases": changed}
+
+
+def print_report(report: Dict, comparison: Optional[Dict] = None):
+    """Print a human-readable summary of the report."""
+    print("\n" + "=" * 80)
+    print("EVALUATION REPORT")
+    print("=" * 80)
+    cfg = report["config"]
+    print(f"  Model: {cfg['generation']['model']}  |  concurrency={cfg['concurrency']}  |  "
+          f"top_k={cfg['retrieval']['top_k']}  |  wall {report['wall_seconds']}s")
+    print(f"\n  {'case':<12}{'quality':>9}{'legid':>8}{'retr':>10}{'gen':>10}  cached")
+    for case in report["cases"]:
+        cached = "+".join(stage[0] for stage in STAGES if case["cached"][stage]) or "-"
+        legid = f"{case['legid_percentage']:.0f}%" if "legid_percentage" in case else "n/a"
+        print(f"  {str(case['id']):<12}{case['quality']:>9.2f}{legid:>8}"
+              f"{case['retrieval_ms']:>8.1f}ms{case['generation_ms']:>8.1f}ms  {cached}")
+    q, lat = report["quality"], report["latency"]
+    print(f"\n  Mean quality {q.get('mean_quality', 0):.3f}  |  pass rate {q.get('pass_rate', 0) * 100:.0f}%  |  "
+          f"p50 {lat['p50_ms']:.1f}ms  p95 {lat['p95_ms']:.1f}ms  |  errors {report['errors']}")
+    if comparison:
+        print("\nBASELINE COMPARISON:")
+        for metric, delta in comparison["deltas"].items():
+            print(f"  {metric:<30}{delta:+}")
+        for case in comparison["changed_cases"]:
+            print(f"  {str(case['id']):<12}{case['baseline']:.2f} → {case['current']:.2f}")
+    print("=" * 80)
+
+
+def load_cases(paths: List[str]) -> List[Dict]:
+    """Test cases from JSON files ({"test_cases": [...]} or a list)."""
+    cases = []
+    for path in paths:
+        data = json.loads(Path(path).read_text(encoding='utf-8'))
+        items = data.get("test_cases", []) if isinstance(data, dict) else data
+        for item in items:
+            cases.append({**item, "_file": Path(path).name})
+    return cases
+
+
+def main():
+    """Main function to run the evaluation."""
+    parser = argparse.ArgumentParser(description="Parallel, cached evaluation over the test cases")
+    parser.add_argument("--cases", nargs="*", default=None,
+                        help="Test case files (default: evaluation/test_cases/*.json)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Cases evaluated at once")
+    parser.add_argument("--stub-models", action="store_true", help="Use local stand-ins for the LLM and embeddings")
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0, help="Simulated stand-in LLM latency")
+    parser.add_argument("--top-k", type=int, default=None, help="Retrieved chunks per case (default: RAG_TOP_K)")
+    parser.add_argument("--no-hybrid", action="store_true", help="Disable hybrid search")
+    parser.add_argument("--no-parent-context", action="store_true", help="Do not expand child chunks to parents")
+    parser.add_argument("--retrieval-label", default=None,
+                        help="Extra cache key for retrieval changes the config does not capture (e.g. re-chunked index)")
+    parser.add_argument("--model-label", default=None, help="Model name used in the generation cache key")
+    parser.add_argument("--cache", default=str(Path(__file__).parent.parent / "data" / "evaluation" / "stage_cache.db"))
+    parser.add_argument("--refresh", default="", help="Comma-separated stages to recompute (retrieval,generation)")
+    parser.add_argument("--no-cache", action="store_true", help="Recompute every stage (results are still cached)")
+    parser.add_argument("--pass-threshold", type=float, default=0.7, help="Case quality counted as a pass")
+    parser.add_argument("--output", default=str(EVALUATION_DIR / "results" / "latest_results.json"))
+    parser.add_argument("--baseline", default=None, help="Previous report to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="Also write the report as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.02,
+                        help="Allowed drop in mean quality before exiting non-zero")
+    args = parser.parse_args()
+
+    refresh = tuple(STAGES) if args.no_cache else tuple(s.strip() for s in args.refresh.split(",") if s.strip())
+    unknown = [s for s in refresh if s not in STAGES]
+    if unknown:
+        parser.error(f"Unknown stages: {unknown}. Choose from {list(STAGES)}")
+
+    case_files = args.cases or sorted(str(p) for p in (EVALUATION_DIR / "test_cases").glob("*.json"))
+    cases = load_cases(case_files)
+    if not cases:
+        parser.error("No test cases found")
+
+    from app.core.config import settings
+    from app.rag.rag_service import get_rag_service
+    rag = get_rag_service()
+    model = settings.OPENAI_CHAT_MODEL
+    if args.stub_models:
+        model = install_stub_models(rag, llm_latency_ms=args.llm_latency_ms)
+    model = args.model_label or model
+
+    runner = EvaluationRunner(
+        rag, StageCache(args.cache, refresh), model,
+        concurrency=args.concurrency,
+        top_k=args.top_k,
+        hybrid_search=not args.no_hybrid,
+        include_parent_context=not args.no_parent_context,
+        retrieval_label=args.retrieval_label
+    )
+    logger.info(f"Evaluating {len(cases)} cases from {len(case_files)} files...")
+    results, errors, wall_seconds = runner.run(cases)
+
+    report = {
+        "version": REPORT_VERSION,
+        "created_at": datetime.utcnow().isoformat(),
+        "environment": {"python": platform.python_version(), "platform": platform.platform()},
+        "config": {
+            "case_files": [Path(p).name for p in case_files],
+            "concurrency": runner.concurrency,
+            "retrieval": runner.retrieval_config,
+            "generation": runner.generation_config,
+            "refresh": list(refresh),
+        },
+        "wall_seconds": round(wall_seconds, 3),
+        "errors": errors,
+        "quality": summarize_quality(results, args.pass_threshold),
+        "latency": summarize([r["total_ms"] for r in results], errors, wall_seconds),
+        "stage_latency": {
+            stage: summarize([r[f"{stage}_ms"] for r in results], 0, wall_seconds) for stage in STAGES
+        },
+        "cache_hits": {stage: sum(1 for r in results if r["cached"][stage]) for stage in STAGES},
+        "cases": results,
+    }
+
+    comparison = None
+    if args.baseline and Path(args.baseline).exists():
+        baseline = json.loads(Path(args.baseline).read_text(encoding='utf-8'))
+        comparison = compare_to_baseline(report, baseline)
+        report["baseline_comparison"] = {"baseline": args.baseline, **comparison}
+
+    print_report(report, comparison)
+
+    Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+    Path(args.output).write_text(json.dumps(report, indent=2, default=str), encoding='utf-8')
+    print(f"\n✓ Report saved to: {args.output}")
+    if args.save_baseline and args.baseline:
+        Path(args.baseline).write_text(json.dumps(report, indent=2, default=str), encoding='utf-8')
+        print(f"✓ Baseline saved to: {args.baseline}")
+
+    if comparison and comparison["deltas"].get("mean_quality", 0) < -args.tolerance:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Tests for the Artillery vector store.
+"""
+
+import numpy as np
+import pytest
+
+pytest.importorskip("faiss")
+
+from app.core.config import settings
+from artillery.vector_store import ArtilleryVectorStore
+
+
+def _store(tmp_path) -> ArtilleryVectorStore:
+    return ArtilleryVectorStore(
+        dimension=8,
+        index_path=str(tmp_path / "index.bin"),
+        metadata_path=str(tmp_path / "metadata.pkl"),
+        description="test_store"
+    )
+
+
+@pytest.fixture
+def snapshots(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "VECTOR_SNAPSHOTS", True)
+    monkeypatch.setattr(settings, "VECTOR_SNAPSHOT_REMOTE", str(tmp_path / "remote"))
+    monkeypatch.setattr(settings, "VECTOR_SNAPSHOT_DIR", str(tmp_path / "cache"))
+
+
+def test_delete_after_snapshot_load(tmp_path, snapshots):
+    embeddings = np.random.default_rng(0).normal(size=(3, 8)).astype('float32')
+    store = _store(tmp_path)
+    store.add_vectors(embeddings, [
+        {'doc_id': 'a', 'chunk_id': 'a_0'},
+        {'doc_id': 'b', 'chunk_id': 'b_0'},
+        {'doc_id': 'c', 'chunk_id': 'c_0'},
+    ])
+    store.link_duplicates([('c_0', {'doc_id': 'd', 'chunk_id': 'd_0'})])
+    assert store.publish_snapshot()
+
+    store = _store(tmp_path)
+    assert store.snapshot_version is not None
+
+    assert store.delete_document('a') == 1
+    assert 'a_0' not in [r['chunk_id'] for r in store.search(embeddings[0], k=3)]
+    assert store.get_chunks_by_doc_id('a') == []
+
+    # The deleted chunk's linked duplicate takes it over
+    assert store.delete_document('c') == 1
+    assert [c['chunk_id'] for c in store.get_chunks_by_doc_id('d')] == ['d_0']
+    assert store.get_chunks_by_doc_id('c') == []
+
+
+def test_shard_filters_match_aliases(tmp_path):
+    embeddings = np.random.default_rng(0).normal(size=(2, 8)).astype('float32')
+    store = _store(tmp_path)
+    store.add_vectors(embeddings, [
+        {'doc_id': 'a', 'chunk_id': 'a_0', 'province': 'ON'},
+        {'doc_id': 'b', 'chunk_id': 'b_0', 'province': 'ON'},
+    ])
+    # Builds the shards before the alias is linked
+    assert len(store.search(embeddings[0], k=2, filters={'province': 'ON'})) == 2
+    store.link_duplicates([('a_0', {'doc_id': 'c', 'chunk_id': 'c_0', 'province': 'BC'})])
+
+    assert [r['chunk_id'] for r in store.search(embeddings[0], k=2, filters={'province': 'BC'})] == ['c_0']
+    store.save()
+    store = _store(tmp_path)
+    assert [r['chunk_id'] for r in store.search(embeddings[0], k=2, filters={'province': 'BC'})] == ['c_0']
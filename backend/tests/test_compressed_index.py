@@ -0,0 +1,37 @@
+"""
+Tests for compressed FAISS vector storage.
+"""
+
+import os
+
+import numpy as np
+import pytest
+
+pytest.importorskip("faiss")
+
+from app.core.config import settings
+from app.vector_store.compressed_index import CompressedVectorIndex, default_compression
+
+
+def test_default_compression_reads_settings(monkeypatch):
+    monkeypatch.setenv("VECTOR_COMPRESSION", "pq")
+    monkeypatch.setattr(settings, "VECTOR_COMPRESSION", "sq8")
+    assert default_compression() == "sq8"
+
+
+def test_empty_save_keeps_existing_vectors(tmp_path):
+    path = str(tmp_path / "index.faiss")
+    vectors = np.random.default_rng(0).normal(size=(4, 8)).astype('float32')
+    index = CompressedVectorIndex(8, path, train_size=2)
+    index.add(vectors)
+    index.save()
+    index.close()
+    size = os.path.getsize(f"{path}.vectors")
+
+    CompressedVectorIndex(8, path).save()
+    assert os.path.getsize(f"{path}.vectors") == size
+
+    # A fresh index saved where nothing existed still loads
+    empty = str(tmp_path / "empty.faiss")
+    CompressedVectorIndex(8, empty).save()
+    assert CompressedVectorIndex.load(empty).ntotal == 0
@@ -0,0 +1,25 @@
+"""
+Tests for prompt context assembly.
+"""
+
+from app.rag.context_assembler import ContextAssembler
+
+CHUNK = "A landlord must return the deposit within ten days after the tenancy ends."
+PASSAGE = (
+    f"{CHUNK} The tenant may apply to the board for an order if the deposit is not returned, "
+    "and the board may order the landlord to pay double the amount withheld."
+)
+
+
+def _kept(*passages):
+    assembler = ContextAssembler(budget=4000, passage_max_tokens=1000, dedup_threshold=0.8)
+    result = assembler.assemble("deposit", {'documents': list(passages)})
+    return [p.text for p in result.sections['documents']], result.dropped_duplicates
+
+
+def test_chunk_inside_kept_passage_is_dropped():
+    assert _kept(PASSAGE, CHUNK) == ([PASSAGE], 1)
+
+
+def test_passage_around_kept_chunk_is_kept():
+    assert _kept(CHUNK, PASSAGE) == ([CHUNK, PASSAGE], 0)
@@ -0,0 +1,34 @@
+"""
+Tests for the conversation search index.
+"""
+
+from datetime import datetime
+
+from app.services.conversation_index import ConversationSearchIndex
+
+
+def _conversation(title: str):
+    return {'conversation_id': 'c1', 'title': title, 'created_at': datetime(2026, 1, 1), 'is_archived': False}
+
+
+def test_backfill_keeps_live_rows_and_resync_overwrites():
+    index = ConversationSearchIndex(db_path=':memory:', env='test')
+    assert index.synced_at('u1') is None
+
+    index.index_conversation('u1', 'c1', 'Deposit returned')
+    index.backfill_user('u1', [_conversation('Deposit claim')], [], [], synced_at=datetime(2026, 1, 2))
+    assert index.synced_at('u1') == datetime(2026, 1, 2)
+    assert [r['title'] for r in index.search('deposit', 'u1')] == ['Deposit returned']
+
+    # Rows changed through another instance since the watermark replace the local ones
+    index.backfill_user('u1', [_conversation('Deposit appeal')], [], [], synced_at=datetime(2026, 1, 3), overwrite=True)
+    assert index.synced_at('u1') == datetime(2026, 1, 3)
+    assert [r['title'] for r in index.search('deposit', 'u1')] == ['Deposit appeal']
+
+
+def test_pending_attachments():
+    index = ConversationSearchIndex(db_path=':memory:', env='test')
+    index.index_attachment('u1', 'a1', 'lease.pdf', status='uploading')
+    index.index_attachment('u1', 'a2', 'notice.pdf')
+    assert index.pending_attachments('u1') == ['a1']
+    assert index.pending_attachments('u2') == []
@@ -0,0 +1,34 @@
+"""
+Tests for the FAISS vector store.
+"""
+
+import numpy as np
+import pytest
+
+pytest.importorskip("faiss")
+
+from app.vector_store.faiss_store import FaissVectorStore
+
+
+def test_delete_document(tmp_path):
+    store = FaissVectorStore(
+        dim=8,
+        index_path=str(tmp_path / "index.faiss"),
+        metadata_path=str(tmp_path / "metadata.jsonl"),
+        snapshot_name=None
+    )
+    vectors = np.random.default_rng(0).normal(size=(3, 8)).tolist()
+    store.add_documents([
+        {'id': 'a_parent_0', 'content': 'parent', 'vector': []},
+        {'id': 'a_parent_0_child_0', 'content': 'a0', 'parent_id': 'a_parent_0', 'vector': vectors[0]},
+        {'id': 'a_parent_0_child_1', 'content': 'a1', 'parent_id': 'a_parent_0', 'vector': vectors[1]},
+        {'id': 'b_chunk_0', 'content': 'b0', 'vector': vectors[2]},
+    ])
+
+    assert store.delete_document('a') == 2
+    assert [doc['id'] for _, doc in store.search(vectors[0], top_k=2)] == ['b_chunk_0']
+    assert store.get_parent_context('a_parent_0') is None
+
+    store.save()
+    store.load()
+    assert [doc['id'] for _, doc in store.search(vectors[0], top_k=3)] == ['b_chunk_0']
@@ -0,0 +1,24 @@
+"""
+Tests for the ingestion job queue.
+"""
+
+import asyncio
+import threading
+
+from app.services.ingestion_jobs import IngestionJobQueue, wait_for_job
+
+
+def test_wait_for_job():
+    queue = IngestionJobQueue(workers=1, max_queued=5, max_per_tenant=5, retention=10)
+    release = threading.Event()
+    job = queue.submit('org', 'file', lambda progress: release.wait(5) and {'ok': True})
+
+    async def scenario():
+        assert not await wait_for_job(job, timeout=0.05)
+        release.set()
+        assert await wait_for_job(job, timeout=5)
+        # Already finished: returns at once
+        assert await wait_for_job(job, timeout=0)
+
+    asyncio.run(scenario())
+    assert job.status == 'completed' and job.result == {'ok': True}
@@ -0,0 +1,38 @@
+"""
+Tests for near-duplicate detection at ingest.
+"""
+
+from app.rag.near_duplicates import NearDuplicateIndex, dedup_namespace
+
+TEXT = "The driver of a vehicle shall stop at a red light and remain stopped until the light turns green."
+
+
+def _index() -> NearDuplicateIndex:
+    return NearDuplicateIndex(db_path=':memory:', threshold=0.9, action="link")
+
+
+def _ingest(index: NearDuplicateIndex, namespace: str, doc_id: str, text: str = TEXT):
+    result = index.check(namespace, [(f"{doc_id}_0", text)], lambda c: c[1], lambda c: c[0])
+    index.register(namespace, result, source=doc_id)
+    return result
+
+
+def test_tenants_are_not_compared():
+    index = _index()
+    _ingest(index, dedup_namespace("rag", "org-a"), "a")
+    assert _ingest(index, dedup_namespace("rag", "org-b"), "b").duplicates == []
+
+
+def test_forget_source_drops_links():
+    index = _index()
+    namespace = dedup_namespace("rag", "org-a")
+    _ingest(index, namespace, "a")
+    assert _ingest(index, namespace, "b").duplicates
+    _ingest(index, dedup_namespace("rag", "org-b"), "a")
+
+    assert index.forget_source("a", namespace) == 1
+    assert index.get_links(namespace, "a_0") == []
+    # The linked duplicate was never embedded, so it must not become canonical
+    assert _ingest(index, namespace, "c").duplicates == []
+    # Other tenants keep their state
+    assert index.stats(dedup_namespace("rag", "org-b"))['indexed_chunks'] == 1
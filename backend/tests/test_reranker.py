@@ -0,0 +1,65 @@
+"""
+Tests for the cross-encoder reranking stage.
+"""
+
+import time
+
+from app.rag import reranker
+
+
+class SlowCrossEncoder:
+    """Scores longer passages higher, taking `delay` seconds per pair."""
+
+    delay = 0.001
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def predict(self, pairs, show_progress_bar=False):
+        time.sleep(self.delay * len(pairs))
+        return [len(passage) for _, passage in pairs]
+
+
+def _ready_reranker(monkeypatch, delay: float, budget_ms: float) -> reranker.CrossEncoderReranker:
+    monkeypatch.setattr(reranker, "CROSS_ENCODER_AVAILABLE", True)
+    monkeypatch.setattr(reranker, "CrossEncoder", SlowCrossEncoder, raising=False)
+    monkeypatch.setattr(SlowCrossEncoder, "delay", delay)
+    model = reranker.CrossEncoderReranker(model_name="stub", batch_size=4, time_budget_ms=budget_ms)
+    model.start_loading()
+    deadline = time.monotonic() + 5
+    while not model.ready and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert model.ready
+    return model
+
+
+def _docs(*texts):
+    return [{'content': text} for text in texts]
+
+
+def _texts(docs):
+    return [doc['content'] for doc in docs]
+
+
+def test_vector_order_until_loaded(monkeypatch):
+    monkeypatch.setattr(reranker, "CROSS_ENCODER_AVAILABLE", True)
+    monkeypatch.setattr(reranker, "CrossEncoder", SlowCrossEncoder, raising=False)
+    monkeypatch.setattr(SlowCrossEncoder, "delay", 0.05)
+    model = reranker.CrossEncoderReranker(model_name="stub", batch_size=4, time_budget_ms=1000)
+
+    start = time.perf_counter()
+    assert _texts(model.rerank("q", _docs("a", "bbb", "cc"), top_n=2)) == ["a", "bbb"]
+    assert time.perf_counter() - start < 0.05
+
+
+def test_rerank_within_budget(monkeypatch):
+    model = _ready_reranker(monkeypatch, delay=0.0001, budget_ms=1000)
+    assert _texts(model.rerank("q", _docs("a", "bbb", "cc"), top_n=2)) == ["bbb", "cc"]
+
+
+def test_first_batch_skipped_when_over_budget(monkeypatch):
+    # About 40ms per batch of 4 against a 10ms budget
+    model = _ready_reranker(monkeypatch, delay=0.01, budget_ms=10)
+    start = time.perf_counter()
+    assert _texts(model.rerank("q", _docs("a", "bbb", "cc"), top_n=2)) == ["a", "bbb"]
+    assert time.perf_counter() - start < 0.01